@@ -179,6 +179,18 @@ DOCUMENTATION = r"""
         env:
           - name: K8S_AUTH_VERIFY_SSL
         aliases: [ kubectl_verify_ssl ]
+      kubectl_persistent_session:
+        description:
+          - Keep a single C(kubectl exec) session open and run every command of the connection through it,
+            instead of starting a new kubectl process for each command.
+          - Commands are run in a subshell of the session, input data is sent base64 encoded, so the container
+            needs C(base64) when pipelining is enabled.
+        default: false
+        type: bool
+        vars:
+          - name: ansible_kubectl_persistent_session
+        env:
+          - name: K8S_AUTH_PERSISTENT_SESSION
 """
 
 EXAMPLES = r"""
@@ -256,14 +268,19 @@ EXAMPLES = r"""
       delegate_to: "{{ my_app_pod_name }}"
 """
 
+import base64
 import json
 import os
 import os.path
+import selectors
 import shutil
 import subprocess
+import tarfile
 import tempfile
+import threading
+import uuid
 
-from ansible.errors import AnsibleError, AnsibleFileNotFound
+from ansible.errors import AnsibleConnectionFailure, AnsibleError, AnsibleFileNotFound
 from ansible.module_utils._text import to_bytes
 from ansible.module_utils.six.moves import shlex_quote
 from ansible.parsing.yaml.loader import AnsibleLoader
@@ -290,6 +307,145 @@ CONNECTION_OPTIONS = {
     "kubectl_token": "--token",
 }
 
+# Files up to this size are packed in memory before being streamed to kubectl.
+TAR_SPOOL_SIZE = 16 * 1024 * 1024
+
+
+def drain(stream):
+    """Read ``stream`` to its end in a thread, so that a full pipe never blocks.
+
+    Returns a function that waits for the end of the stream and returns its data.
+    """
+    chunks = []
+    reader = threading.Thread(
+        target=lambda: chunks.extend(iter(lambda: stream.read(BUFSIZE), b""))
+    )
+    reader.daemon = True
+    reader.start()
+
+    def result():
+        reader.join()
+        return b"".join(chunks)
+
+    return result
+
+
+class ExecSession(object):
+    """A long running ``kubectl exec -i <pod> -- sh`` used to run many commands.
+
+    Each command is written to the shell stdin, followed by a marker that the
+    shell echoes on stdout (with the exit code) and on stderr once the command
+    has finished.
+
+    ``temporary_file``, the kubeconfig the session was started with, is kept
+    until the session is closed: kubectl may read it again while it runs.
+    """
+
+    def __init__(self, args, executable, env=None, temporary_file=None):
+        self.executable = executable
+        self.temporary_file = temporary_file
+        try:
+            self.process = subprocess.Popen(
+                args,
+                shell=False,
+                bufsize=0,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                env=env,
+            )
+        except OSError:
+            self._delete_temporary_file()
+            raise
+
+    def _delete_temporary_file(self):
+        if self.temporary_file is not None:
+            if os.path.exists(self.temporary_file):
+                os.remove(self.temporary_file)
+            self.temporary_file = None
+
+    @property
+    def alive(self):
+        return self.process.poll() is None
+
+    def _script(self, cmd, in_data, marker):
+        command = "%s -c %s" % (self.executable, shlex_quote(cmd))
+        if in_data:
+            encoded = base64.encodebytes(to_bytes(in_data)).decode("ascii")
+            script = "base64 -d <<'%s_IN' | %s\n%s%s_IN\n" % (
+                marker,
+                command,
+                encoded,
+                marker,
+            )
+        else:
+            script = "%s </dev/null\n" % command
+        script += (
+            "__rc=$?; printf '\\n%s %%d\\n' \"$__rc\"; printf '\\n%s\\n' >&2\n"
+            % (
+                marker,
+                marker,
+            )
+        )
+        return to_bytes(script)
+
+    def run(self, cmd, in_data=None):
+        marker = "__ANSIBLE_KUBECTL_%s__" % uuid.uuid4().hex
+        try:
+            script = memoryview(self._script(cmd, in_data, marker))
+            while script:
+                # stdin is unbuffered, a single write may be partial on a pipe.
+                script = script[self.process.stdin.write(script) :]
+        except (IOError, OSError) as e:
+            raise AnsibleConnectionFailure(
+                "persistent kubectl exec session is gone: %s" % e
+            )
+
+        stdout_end = to_bytes("\n%s " % marker)
+        stderr_end = to_bytes("\n%s\n" % marker)
+        buffers = {self.process.stdout: b"", self.process.stderr: b""}
+        pending = set(buffers)
+        rc = None
+        with selectors.DefaultSelector() as selector:
+            for stream in pending:
+                selector.register(stream, selectors.EVENT_READ)
+            while pending:
+                for key, dummy in selector.select():
+                    stream = key.fileobj
+                    chunk = os.read(stream.fileno(), BUFSIZE)
+                    if not chunk:
+                        raise AnsibleConnectionFailure(
+                            "persistent kubectl exec session closed unexpectedly:\n%s"
+                            % buffers[self.process.stderr]
+                        )
+                    buffers[stream] += chunk
+                    data = buffers[stream]
+                    if stream is self.process.stdout:
+                        index = data.find(stdout_end)
+                        if index == -1 or not data.endswith(b"\n"):
+                            continue
+                        rc = int(data[index + len(stdout_end) :].strip())
+                        buffers[stream] = data[:index]
+                    else:
+                        if not data.endswith(stderr_end):
+                            continue
+                        buffers[stream] = data[: -len(stderr_end)]
+                    selector.unregister(stream)
+                    pending.discard(stream)
+        return rc, buffers[self.process.stdout], buffers[self.process.stderr]
+
+    def close(self):
+        if self.alive:
+            try:
+                self.process.stdin.close()
+                self.process.wait(timeout=5)
+            except (IOError, OSError, subprocess.TimeoutExpired):
+                self.process.kill()
+                self.process.wait()
+        for stream in (self.process.stdout, self.process.stderr):
+            stream.close()
+        self._delete_temporary_file()
+
 
 class Connection(ConnectionBase):
     """Local kubectl based connections"""
@@ -310,6 +466,7 @@ class Connection(ConnectionBase):
         if not self.transport_cmd:
             raise AnsibleError("{0} command not found in PATH".format(self.transport))
         self._file_to_delete = None
+        self._session = None
 
     def delete_temporary_file(self):
         if self._file_to_delete is not None:
@@ -412,6 +569,9 @@ class Connection(ConnectionBase):
         """Run a command in the container"""
         super(Connection, self).exec_command(cmd, in_data=in_data, sudoable=sudoable)
 
+        if self.get_option("{0}_persistent_session".format(self.transport)):
+            return self._session_exec(cmd, in_data)
+
         local_cmd, censored_local_cmd = self._build_exec_cmd(
             [self._play_context.executable, "-c", cmd]
         )
@@ -433,6 +593,46 @@ class Connection(ConnectionBase):
         self.delete_temporary_file()
         return (p.returncode, stdout, stderr)
 
+    def _session_exec(self, cmd, in_data=None):
+        """Run a command through the persistent exec session, starting it if needed"""
+        if self._session is None or not self._session.alive:
+            self._close_session()
+            local_cmd, censored_local_cmd = self._build_exec_cmd(
+                [self._play_context.executable]
+            )
+            display.vvv(
+                "START SESSION %s" % (censored_local_cmd,),
+                host=self._play_context.remote_addr,
+            )
+            local_cmd = [to_bytes(i, errors="surrogate_or_strict") for i in local_cmd]
+            # The session owns the kubeconfig file and deletes it when closed.
+            temporary_file, self._file_to_delete = self._file_to_delete, None
+            try:
+                self._session = ExecSession(
+                    local_cmd,
+                    self._play_context.executable,
+                    env=self._local_env(),
+                    temporary_file=temporary_file,
+                )
+            except OSError as e:
+                raise AnsibleError(
+                    "failed to start the local {0} command: {1}".format(
+                        self.transport, e
+                    )
+                )
+
+        display.vvv("EXEC (session) %s" % cmd, host=self._play_context.remote_addr)
+        try:
+            return self._session.run(cmd, in_data)
+        except AnsibleConnectionFailure:
+            self._close_session()
+            raise
+
+    def _close_session(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
     def _prefix_login_path(self, remote_path):
         """Make sure that we put files into a standard path
 
@@ -544,7 +744,134 @@ class Connection(ConnectionBase):
                 to_bytes(out_path, errors="strict"),
             )
 
+    def _run_tar(self, remote_cmd, stdin, stdout):
+        args, dummy = self._build_exec_cmd(
+            [self._play_context.executable, "-c", remote_cmd]
+        )
+        display.vvv("EXEC %s" % (dummy,), host=self._play_context.remote_addr)
+        args = [to_bytes(i, errors="surrogate_or_strict") for i in args]
+        try:
+            return subprocess.Popen(
+                args,
+                stdin=stdin,
+                stdout=stdout,
+                stderr=subprocess.PIPE,
+                env=self._local_env(),
+            )
+        except OSError as e:
+            self.delete_temporary_file()
+            raise AnsibleError(
+                "failed to start the local {0} command: {1}".format(self.transport, e)
+            )
+
+    def put_files(self, files):
+        """Transfer several local files to the container over a single exec.
+
+        ``files`` is a list of ``(in_path, out_path)`` tuples. The files are packed
+        into one tar stream which is unpacked by ``tar`` in the container, missing
+        parent directories are created.
+        """
+        self._connect()
+        if not files:
+            return
+        display.vvv(
+            "PUT %d files in one tar stream" % len(files),
+            host=self._play_context.remote_addr,
+        )
+
+        def reset_owner(tarinfo):
+            # Same result as put_file: files belong to the user running in the container.
+            tarinfo.uid = tarinfo.gid = 0
+            tarinfo.uname = tarinfo.gname = ""
+            return tarinfo
+
+        with tempfile.SpooledTemporaryFile(max_size=TAR_SPOOL_SIZE) as spool:
+            with tarfile.open(fileobj=spool, mode="w") as archive:
+                for in_path, out_path in files:
+                    b_in_path = to_bytes(in_path, errors="surrogate_or_strict")
+                    if not os.path.isfile(b_in_path):
+                        raise AnsibleFileNotFound(
+                            "file or module does not exist: %s" % in_path
+                        )
+                    arcname = self._prefix_login_path(out_path).lstrip(os.path.sep)
+                    archive.add(in_path, arcname=arcname, filter=reset_owner)
+            spool.seek(0)
+
+            # A SpooledTemporaryFile may have no file descriptor, feed it through a pipe.
+            p = self._run_tar("tar -xf - -C /", subprocess.PIPE, subprocess.PIPE)
+            stdout, stderr = drain(p.stdout), drain(p.stderr)
+            try:
+                shutil.copyfileobj(spool, p.stdin, BUFSIZE)
+            except (IOError, OSError):
+                pass  # tar exited early, the error is reported below
+            finally:
+                p.stdin.close()
+            stdout, stderr = stdout(), stderr()
+            p.wait()
+        self.delete_temporary_file()
+
+        if p.returncode != 0:
+            raise AnsibleError(
+                "failed to transfer %d files to the container:\n%s\n%s"
+                % (len(files), stdout, stderr)
+            )
+
+    def fetch_files(self, files):
+        """Fetch several files from the container over a single exec.
+
+        ``files`` is a list of ``(in_path, out_path)`` tuples. The container packs
+        every file with ``tar`` and the stream is unpacked locally as it arrives.
+        """
+        self._connect()
+        if not files:
+            return
+        display.vvv(
+            "FETCH %d files in one tar stream" % len(files),
+            host=self._play_context.remote_addr,
+        )
+
+        wanted = {}
+        for in_path, out_path in files:
+            wanted[self._prefix_login_path(in_path).lstrip(os.path.sep)] = out_path
+        remote_cmd = "tar -cf - -C / %s" % " ".join(
+            shlex_quote(name) for name in wanted
+        )
+
+        p = self._run_tar(remote_cmd, subprocess.PIPE, subprocess.PIPE)
+        p.stdin.close()
+        stderr = drain(p.stderr)
+        fetched = set()
+        try:
+            with tarfile.open(fileobj=p.stdout, mode="r|") as archive:
+                for member in archive:
+                    out_path = wanted.get(member.name)
+                    if out_path is None or not member.isfile():
+                        continue
+                    source = archive.extractfile(member)
+                    with open(
+                        to_bytes(out_path, errors="surrogate_or_strict"), "wb"
+                    ) as out_file:
+                        shutil.copyfileobj(source, out_file, BUFSIZE)
+                    fetched.add(member.name)
+        except tarfile.TarError as e:
+            # tar could not produce a stream at all, e.g. every file is missing.
+            display.vvv("unable to read tar stream: %s" % e)
+        finally:
+            p.stdout.close()
+            stderr = stderr()
+            p.wait()
+        self.delete_temporary_file()
+
+        missing = sorted(set(wanted) - fetched)
+        if p.returncode != 0 or missing:
+            raise AnsibleError(
+                "failed to fetch %s from the container:\n%s"
+                % (", ".join("/" + name for name in missing) or "files", stderr)
+            )
+
     def close(self):
-        """Terminate the connection. Nothing to do for kubectl"""
+        """Terminate the connection and the persistent exec session if any"""
         super(Connection, self).close()
+        self._close_session()
+        self.delete_temporary_file()
         self._connected = False
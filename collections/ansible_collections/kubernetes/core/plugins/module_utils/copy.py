@@ -17,11 +17,14 @@ from __future__ import absolute_import, division, print_function
 
 __metaclass__ = type
 
+import hashlib
 import os
+import ssl
 import tarfile
+import time
 from abc import ABCMeta, abstractmethod
 from select import select
-from tempfile import NamedTemporaryFile, TemporaryFile
+from tempfile import NamedTemporaryFile
 
 from ansible.module_utils._text import to_native
 
@@ -33,12 +36,7 @@ from ansible_collections.kubernetes.core.plugins.module_utils.k8s.exceptions imp
 try:
     from kubernetes.client.api import core_v1_api
     from kubernetes.stream import stream
-    from kubernetes.stream.ws_client import (
-        ABNF,
-        ERROR_CHANNEL,
-        STDERR_CHANNEL,
-        STDOUT_CHANNEL,
-    )
+    from kubernetes.stream.ws_client import ABNF
 except ImportError:
     pass
 
@@ -48,6 +46,199 @@ except ImportError:
     # ImportError are managed by the common module already.
     pass
 
+STDIN_CHANNEL = 0
+STDOUT_CHANNEL = 1
+STDERR_CHANNEL = 2
+ERROR_CHANNEL = 3
+
+# Only the v5 exec protocol can close stdin without closing the whole stream.
+V5_CHANNEL_PROTOCOL = "v5.channel.k8s.io"
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+class ExecStream(metaclass=ABCMeta):
+    """
+    Binary exec stream to a container.
+
+    Subclasses provide the transport, this class tracks stderr and the exit
+    status reported on the error channel.
+    """
+
+    def __init__(self):
+        self.status = None
+        self.stderr = []
+        self.stdin_closed = False
+
+    @property
+    @abstractmethod
+    def connected(self):
+        pass
+
+    @abstractmethod
+    def _next_frame(self, timeout):
+        """Return the next (channel, data) frame or (None, None)."""
+        pass
+
+    @abstractmethod
+    def write(self, data):
+        pass
+
+    @abstractmethod
+    def close_stdin(self):
+        """Send EOF to the command, return False when the transport cannot."""
+        pass
+
+    @abstractmethod
+    def close(self):
+        pass
+
+    def read(self, timeout=1):
+        channel, data = self._next_frame(timeout)
+        if channel == STDERR_CHANNEL:
+            self.stderr.append(data.decode("utf-8", "replace"))
+        elif channel == ERROR_CHANNEL:
+            self.status = yaml.safe_load(data) or {}
+        return channel, data
+
+    def wait(self, sink=None):
+        """Read until the command exits, passing stdout to ``sink``."""
+        while self.connected:
+            channel, data = self.read()
+            if channel == STDOUT_CHANNEL and sink is not None:
+                sink(data)
+        self.close()
+        return self.status, "".join(self.stderr)
+
+    def finish(self):
+        """Close stdin and wait for the command to exit."""
+        if self.close_stdin():
+            self.stdin_closed = True
+            return self.wait()
+        # stdin can only be closed with the stream, keep what already arrived.
+        while self.connected:
+            channel, data = self.read(timeout=0)
+            if channel is None:
+                break
+        self.close()
+        return self.status, "".join(self.stderr)
+
+    @property
+    def succeeded(self):
+        return bool(self.status) and self.status.get("status") == "Success"
+
+
+class PodExec(ExecStream):
+    """
+    Exec stream over the Kubernetes websocket API.
+
+    Frames are read straight from the socket so stdout is never decoded, and
+    memory use is bounded by the size of a single frame.
+    """
+
+    def __init__(self, api_instance, name, namespace, command, stdin=False, **kwargs):
+        super(PodExec, self).__init__()
+        self.response = stream(
+            api_instance.connect_get_namespaced_pod_exec,
+            name,
+            namespace,
+            command=command,
+            stderr=True,
+            stdin=stdin,
+            stdout=True,
+            tty=False,
+            _preload_content=False,
+            **kwargs,
+        )
+
+    @property
+    def connected(self):
+        return self.response.is_open()
+
+    def _next_frame(self, timeout):
+        if not self.response.is_open():
+            return None, None
+        if not self.response.sock.connected:
+            self.response._connected = False
+            return None, None
+        sock = self.response.sock.sock
+        # Decrypted TLS records may already be buffered, invisible to select().
+        if isinstance(sock, ssl.SSLSocket) and sock.pending():
+            ready = True
+        else:
+            ready, dummy, dummy = select((sock,), (), (), timeout)
+        if not ready:
+            return None, None
+        code, frame = self.response.sock.recv_data_frame(True)
+        if code == ABNF.OPCODE_CLOSE:
+            self.response._connected = False
+        elif code in (ABNF.OPCODE_BINARY, ABNF.OPCODE_TEXT) and len(frame.data) > 1:
+            return frame.data[0], frame.data[1:]
+        return None, None
+
+    def write(self, data):
+        self.response.write_stdin(data)
+
+    def close_stdin(self):
+        if getattr(self.response, "subprotocol", None) != V5_CHANNEL_PROTOCOL:
+            return False
+        self.response.close_channel(STDIN_CHANNEL)
+        return True
+
+    def close(self):
+        self.response.close()
+
+
+class StdinWriter(object):
+    """File-like object sending what is written to it as stdin frames of chunk_size bytes."""
+
+    def __init__(self, exec_stream, chunk_size):
+        self.exec_stream = exec_stream
+        self.chunk_size = chunk_size
+        self.buffer = bytearray()
+        self.written = 0
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= self.chunk_size:
+            self.exec_stream.write(bytes(self.buffer[: self.chunk_size]))
+            del self.buffer[: self.chunk_size]
+            self.written += self.chunk_size
+        return len(data)
+
+    def flush(self):
+        if self.buffer:
+            self.exec_stream.write(bytes(self.buffer))
+            self.written += len(self.buffer)
+            del self.buffer[:]
+
+
+class StdoutReader(object):
+    """File-like object reading the stdout frames of an exec stream."""
+
+    def __init__(self, exec_stream):
+        self.exec_stream = exec_stream
+        self.buffer = bytearray()
+
+    def read(self, size=-1):
+        while (size < 0 or len(self.buffer) < size) and self.exec_stream.connected:
+            channel, data = self.exec_stream.read()
+            if channel == STDOUT_CHANNEL:
+                self.buffer += data
+        if size < 0:
+            size = len(self.buffer)
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+
+def file_checksum(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
 
 class K8SCopy(metaclass=ABCMeta):
     def __init__(self, module, client):
@@ -62,38 +253,35 @@ class K8SCopy(metaclass=ABCMeta):
         self.content = module.params.get("content")
 
         self.no_preserve = module.params.get("no_preserve")
+        self.chunk_size = module.params.get("chunk_size") or DEFAULT_CHUNK_SIZE
+        self.verify_checksum = module.params.get("verify_checksum")
+        self.resume = module.params.get("resume")
+        self.retries = module.params.get("retries") or 0
         self.container_arg = {}
         if module.params.get("container"):
             self.container_arg["container"] = module.params.get("container")
         self.check_mode = self.module.check_mode
 
+    def exec_stream(self, cmd, stdin=False):
+        return PodExec(
+            self.api_instance,
+            self.name,
+            self.namespace,
+            cmd,
+            stdin=stdin,
+            **self.container_arg,
+        )
+
     def _run_from_pod(self, cmd):
         try:
-            resp = stream(
-                self.api_instance.connect_get_namespaced_pod_exec,
-                self.name,
-                self.namespace,
-                command=cmd,
-                async_req=False,
-                stderr=True,
-                stdin=False,
-                stdout=True,
-                tty=False,
-                _preload_content=False,
-                **self.container_arg,
+            chunks = []
+            error, stderr = self.exec_stream(cmd).wait(chunks.append)
+            stdout = b"".join(chunks).decode("utf-8", "replace").rstrip("\n")
+            return (
+                error or {},
+                stdout.split("\n") if stdout else [],
+                stderr.rstrip("\n").split("\n") if stderr else [],
             )
-
-            stderr, stdout = [], []
-            while resp.is_open():
-                resp.update(timeout=1)
-                if resp.peek_stdout():
-                    stdout.extend(resp.read_stdout().rstrip("\n").split("\n"))
-                if resp.peek_stderr():
-                    stderr.extend(resp.read_stderr().rstrip("\n").split("\n"))
-            error = resp.read_channel(ERROR_CHANNEL)
-            resp.close()
-            error = yaml.safe_load(error)
-            return error, stdout, stderr
         except Exception as e:
             self.module.fail_json(
                 msg="Error while running/parsing from pod {1}/{2} command='{0}' : {3}".format(
@@ -111,6 +299,67 @@ class K8SCopy(metaclass=ABCMeta):
         error, out, err = self._run_from_pod(cmd=["test", "-d", file_path])
         return error.get("status") == "Success", None
 
+    def remote_file_size(self, path):
+        """Return the size of a remote file, None when it does not exist."""
+        error, out, err = self._run_from_pod(["sh", "-c", 'wc -c < "$1"', "sh", path])
+        if error.get("status") != "Success" or not out:
+            return None
+        try:
+            return int(out[0].strip())
+        except ValueError:
+            return None
+
+    def remote_checksums(self, path):
+        """Return {remote path: sha256} for a remote file or directory tree.
+
+        None is returned when sha256sum is not available in the container.
+        """
+        error, out, err = self._run_from_pod(
+            [
+                "sh",
+                "-c",
+                'if [ -d "$1" ]; then find "$1" -type f -exec sha256sum {} +; '
+                'else sha256sum "$1"; fi',
+                "sh",
+                path,
+            ]
+        )
+        if error.get("status") != "Success":
+            return None
+        checksums = {}
+        for line in out:
+            digest, sep, name = line.partition("  ")
+            if sep:
+                checksums[os.path.normpath(name)] = digest
+        return checksums
+
+    def check_integrity(self, remote_path, expected, attempts=1):
+        """Compare local checksums with the ones computed in the container.
+
+        ``expected`` maps the remote paths under ``remote_path`` to sha256
+        digests. Copies made without the v5 exec protocol may still be written
+        by the container after the stream is closed, so a mismatch is retried
+        ``attempts`` times.
+        """
+        mismatch = []
+        for attempt in range(attempts):
+            if attempt:
+                time.sleep(1)
+            actual = self.remote_checksums(remote_path)
+            if actual is None:
+                self.module.warn(
+                    "sha256sum is not available in the container, integrity was not verified"
+                )
+                return
+            mismatch = sorted(
+                path for path, digest in expected.items() if actual.get(path) != digest
+            )
+            if not mismatch:
+                return
+        self.module.fail_json(
+            msg="Checksum mismatch after copy for: {0}".format(", ".join(mismatch))
+        )
+
     @abstractmethod
     def run(self):
         pass
@@ -199,31 +448,6 @@ class K8SCopyFromPod(K8SCopy):
                 if error.get("status") == "Success":
                     return executables.get(item)(self.remote_path)
 
-    def read(self):
-        self.stdout = None
-        self.stderr = None
-
-        if self.response.is_open():
-            if not self.response.sock.connected:
-                self.response._connected = False
-            else:
-                ret, out, err = select((self.response.sock.sock,), (), (), 0)
-                if ret:
-                    code, frame = self.response.sock.recv_data_frame(True)
-                    if code == ABNF.OPCODE_CLOSE:
-                        self.response._connected = False
-                    elif (
-                        code in (ABNF.OPCODE_BINARY, ABNF.OPCODE_TEXT)
-                        and len(frame.data) > 1
-                    ):
-                        channel = frame.data[0]
-                        content = frame.data[1:]
-                        if content:
-                            if channel == STDOUT_CHANNEL:
-                                self.stdout = content
-                            elif channel == STDERR_CHANNEL:
-                                self.stderr = content.decode("utf-8", "replace")
-
     def copy(self):
         is_remote_path_dir = (
             len(self.files_to_copy) > 1 or self.files_to_copy[0] != self.remote_path
@@ -243,30 +467,13 @@ class K8SCopyFromPod(K8SCopy):
                     # create directory to copy file in
                     os.makedirs(os.path.dirname(dest_file), exist_ok=True)
 
-                pod_command = ["cat", remote_file]
-                self.response = stream(
-                    self.api_instance.connect_get_namespaced_pod_exec,
-                    self.name,
-                    self.namespace,
-                    command=pod_command,
-                    stderr=True,
-                    stdin=True,
-                    stdout=True,
-                    tty=False,
-                    _preload_content=False,
-                    **self.container_arg,
-                )
-                errors = []
                 with open(dest_file, "wb") as fh:
-                    while self.response._connected:
-                        self.read()
-                        if self.stdout:
-                            fh.write(self.stdout)
-                        if self.stderr:
-                            errors.append(self.stderr)
-                if errors:
+                    error, stderr = self.exec_stream(["cat", remote_file]).wait(
+                        fh.write
+                    )
+                if stderr:
                     self.module.fail_json(
-                        msg="Failed to copy file from Pod: {0}".format("".join(errors))
+                        msg="Failed to copy file from Pod: {0}".format(stderr)
                     )
         self.module.exit_json(
             changed=True,
@@ -275,7 +482,149 @@ class K8SCopyFromPod(K8SCopy):
             ),
         )
 
+    def copy_with_tar(self, is_dir):
+        """
+        Stream the remote file or directory through a single tar exec.
+
+        Returns the sha256 of every copied file keyed on its remote path, or
+        None when tar could not run in the container.
+        """
+        remote_path = self.remote_path.rstrip("/") or "/"
+        parent, base = os.path.split(remote_path)
+        local_root = self.local_path
+        if is_dir and os.path.isdir(self.local_path):
+            local_root = os.path.join(self.local_path, base)
+
+        pod_exec = self.exec_stream(["tar", "cf", "-", "-C", parent or "/", base])
+        checksums = {}
+        try:
+            with tarfile.open(fileobj=StdoutReader(pod_exec), mode="r|") as archive:
+                for member in archive:
+                    name = os.path.normpath(member.name)
+                    if os.path.isabs(name) or name.split(os.sep)[0] == "..":
+                        self.module.fail_json(
+                            msg="Refusing to extract {0} from Pod".format(member.name)
+                        )
+                    if not member.isfile():
+                        continue
+                    dest_file = local_root
+                    if is_dir:
+                        dest_file = os.path.join(
+                            local_root, os.path.relpath(name, start=base)
+                        )
+                        os.makedirs(os.path.dirname(dest_file), exist_ok=True)
+                    digest = hashlib.sha256()
+                    source = archive.extractfile(member)
+                    with open(dest_file, "wb") as fh:
+                        for block in iter(lambda: source.read(self.chunk_size), b""):
+                            fh.write(block)
+                            digest.update(block)
+                    checksums[
+                        os.path.normpath(os.path.join(parent or "/", name))
+                    ] = digest.hexdigest()
+        except tarfile.TarError as e:
+            if not checksums:
+                # Nothing was read, most likely there is no tar in the container.
+                pod_exec.wait()
+                return None
+            self.module.fail_json(
+                msg="Failed to copy {0} from Pod: {1} {2}".format(
+                    self.remote_path, to_native(e), "".join(pod_exec.stderr)
+                )
+            )
+        error, stderr = pod_exec.wait()
+        if not pod_exec.succeeded:
+            if not checksums:
+                return None
+            self.module.fail_json(
+                msg="Failed to copy {0} from Pod: {1}".format(
+                    self.remote_path, stderr or (error or {}).get("message")
+                )
+            )
+        return checksums
+
+    def resume_from_pod(self):
+        """Copy a single file, continuing from the size of the local file."""
+        size = self.remote_file_size(self.remote_path)
+        if size is None:
+            self.module.fail_json(
+                msg="{0} does not exist in remote pod filesystem".format(
+                    self.remote_path
+                )
+            )
+        transferred = 0
+        for attempt in range(self.retries + 1):
+            offset = 0
+            if os.path.isfile(self.local_path):
+                offset = os.path.getsize(self.local_path)
+            if offset > size:
+                offset = 0
+            if offset == size:
+                break
+            with open(self.local_path, "ab" if offset else "wb") as fh:
+                try:
+                    # tail -c +N starts at byte N, counting from 1.
+                    self.exec_stream(
+                        ["tail", "-c", "+%d" % (offset + 1), self.remote_path]
+                    ).wait(fh.write)
+                except Exception as e:
+                    self.module.warn(
+                        "Copy of {0} interrupted at attempt {1}: {2}".format(
+                            self.remote_path, attempt + 1, to_native(e)
+                        )
+                    )
+            transferred += os.path.getsize(self.local_path) - offset
+        if os.path.getsize(self.local_path) != size:
+            self.module.fail_json(
+                msg="Failed to copy {0} from Pod after {1} attempts".format(
+                    self.remote_path, self.retries + 1
+                )
+            )
+        return transferred
+
     def run(self):
+        is_dir, error = self.is_directory_path_from_pod(self.remote_path)
+        if error:
+            self.module.fail_json(msg=error)
+
+        if not self.check_mode:
+            if self.resume and not is_dir:
+                transferred = self.resume_from_pod()
+                if self.verify_checksum:
+                    self.check_integrity(
+                        self.remote_path,
+                        {
+                            os.path.normpath(self.remote_path): file_checksum(
+                                self.local_path, self.chunk_size
+                            )
+                        },
+                    )
+                self.module.exit_json(
+                    changed=transferred > 0,
+                    result="{0} successfully copied locally into {1}".format(
+                        self.remote_path, self.local_path
+                    ),
+                )
+
+            checksums = self.copy_with_tar(is_dir)
+            if checksums is not None:
+                if not checksums:
+                    self.module.exit_json(
+                        changed=False,
+                        warning="No file found from directory '{0}' into remote Pod.".format(
+                            self.remote_path
+                        ),
+                    )
+                if self.verify_checksum:
+                    self.check_integrity(self.remote_path, checksums)
+                self.module.exit_json(
+                    changed=True,
+                    result="{0} successfully copied locally into {1}".format(
+                        self.remote_path, self.local_path
+                    ),
+                )
+
+        # No tar in the container (or check mode): list and copy files one by one.
         self.files_to_copy = self.list_remote_files()
         if self.files_to_copy == []:
             self.module.exit_json(
@@ -300,6 +649,106 @@ class K8SCopyToPod(K8SCopy):
         if self.named_temp_file:
             self.named_temp_file.close()
 
+    def local_checksums(self, src_file, dest_file):
+        if not os.path.isdir(src_file):
+            return {dest_file: file_checksum(src_file, self.chunk_size)}
+        checksums = {}
+        for root, dirs, files in os.walk(src_file):
+            for name in files:
+                path = os.path.join(root, name)
+                remote = os.path.join(dest_file, os.path.relpath(path, src_file))
+                checksums[os.path.normpath(remote)] = file_checksum(
+                    path, self.chunk_size
+                )
+        return checksums
+
+    def copy_with_tar(self, src_file, dest_file):
+        if self.no_preserve:
+            tar_command = [
+                "tar",
+                "--no-same-permissions",
+                "--no-same-owner",
+                "-xmf",
+                "-",
+            ]
+        else:
+            tar_command = ["tar", "-xmf", "-"]
+
+        if dest_file.startswith("/"):
+            tar_command.extend(["-C", "/"])
+
+        pod_exec = self.exec_stream(tar_command, stdin=True)
+        try:
+            # Stream the archive, only one chunk is held in memory at a time.
+            writer = StdinWriter(pod_exec, self.chunk_size)
+            with tarfile.open(fileobj=writer, mode="w|") as tar:
+                tar.add(src_file, dest_file)
+            writer.flush()
+            error, stderr = pod_exec.finish()
+        finally:
+            pod_exec.close()
+        if stderr or (error and error.get("status") != "Success"):
+            self.close_temp_file()
+            self.module.fail_json(
+                command=tar_command,
+                msg="Failed to copy local file/directory into Pod due to: {0}".format(
+                    stderr or error.get("message")
+                ),
+            )
+
+    def resume_to_pod(self, src_file, dest_file):
+        """Copy a single file, continuing from the size of the remote file."""
+        size = os.path.getsize(src_file)
+        transferred = 0
+        for attempt in range(self.retries + 1):
+            offset = self.remote_file_size(dest_file) or 0
+            if offset > size:
+                offset = 0
+            if offset == size:
+                break
+            command = [
+                "sh",
+                "-c",
+                'mkdir -p "$(dirname "$1")" && cat %s "$1"' % (">>" if offset else ">"),
+                "sh",
+                dest_file,
+            ]
+            pod_exec = self.exec_stream(command, stdin=True)
+            try:
+                writer = StdinWriter(pod_exec, self.chunk_size)
+                with open(src_file, "rb") as fh:
+                    fh.seek(offset)
+                    for block in iter(lambda: fh.read(self.chunk_size), b""):
+                        writer.write(block)
+                writer.flush()
+                pod_exec.finish()
+                if not pod_exec.stdin_closed:
+                    self.wait_remote_size(dest_file, size)
+                transferred += writer.written
+            except Exception as e:
+                self.module.warn(
+                    "Copy to {0} interrupted at attempt {1}: {2}".format(
+                        dest_file, attempt + 1, to_native(e)
+                    )
+                )
+            finally:
+                pod_exec.close()
+        if self.remote_file_size(dest_file) != size:
+            self.module.fail_json(
+                msg="Failed to copy {0} into Pod after {1} attempts".format(
+                    src_file, self.retries + 1
+                )
+            )
+        return transferred
+
+    def wait_remote_size(self, path, size, timeout=30):
+        """Without the v5 protocol, wait until the container flushed the file."""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.remote_file_size(path) == size:
+                return
+            time.sleep(1)
+
     def run(self):
         # remove trailing slash from destination path
         dest_file = self.remote_path.rstrip("/")
@@ -331,76 +780,26 @@ class K8SCopyToPod(K8SCopy):
             else:
                 dest_file = os.path.join(dest_file, os.path.basename(src_file))
 
+        changed = True
         if not self.check_mode:
-            if self.no_preserve:
-                tar_command = [
-                    "tar",
-                    "--no-same-permissions",
-                    "--no-same-owner",
-                    "-xmf",
-                    "-",
-                ]
+            if self.resume and not self.content and os.path.isfile(src_file):
+                changed = self.resume_to_pod(src_file, dest_file) > 0
             else:
-                tar_command = ["tar", "-xmf", "-"]
-
-            if dest_file.startswith("/"):
-                tar_command.extend(["-C", "/"])
-
-            response = stream(
-                self.api_instance.connect_get_namespaced_pod_exec,
-                self.name,
-                self.namespace,
-                command=tar_command,
-                stderr=True,
-                stdin=True,
-                stdout=True,
-                tty=False,
-                _preload_content=False,
-                **self.container_arg,
-            )
-            with TemporaryFile() as tar_buffer:
-                with tarfile.open(fileobj=tar_buffer, mode="w") as tar:
-                    tar.add(src_file, dest_file)
-                tar_buffer.seek(0)
-                commands = []
-                # push command in chunk mode
-                size = 1024 * 1024
-                while True:
-                    data = tar_buffer.read(size)
-                    if not data:
-                        break
-                    commands.append(data)
-
-                stderr, stdout = [], []
-                while response.is_open():
-                    if response.peek_stdout():
-                        stdout.append(response.read_stdout().rstrip("\n"))
-                    if response.peek_stderr():
-                        stderr.append(response.read_stderr().rstrip("\n"))
-                    if commands:
-                        cmd = commands.pop(0)
-                        response.write_stdin(cmd)
-                    else:
-                        break
-                response.close()
-                if stderr:
-                    self.close_temp_file()
-                    self.module.fail_json(
-                        command=tar_command,
-                        msg="Failed to copy local file/directory into Pod due to: {0}".format(
-                            "".join(stderr)
-                        ),
-                    )
+                self.copy_with_tar(src_file, dest_file)
+            if self.verify_checksum:
+                self.check_integrity(
+                    dest_file, self.local_checksums(src_file, dest_file), attempts=5
+                )
             self.close_temp_file()
         if self.content:
             self.module.exit_json(
-                changed=True,
+                changed=changed,
                 result="Content successfully copied into {0} on remote Pod".format(
                     self.remote_path
                 ),
             )
         self.module.exit_json(
-            changed=True,
+            changed=changed,
             result="{0} successfully copied into remote Pod into {1}".format(
                 self.local_path, self.remote_path
             ),
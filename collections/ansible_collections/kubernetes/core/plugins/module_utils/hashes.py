@@ -65,6 +65,13 @@ def generate_hash(resource):
     raise NotImplementedError
 
 
+def generate_definition_hash(definition):
+    # generate_hash only covers the data of ConfigMaps and Secrets; this hashes
+    # a whole definition of any kind, with keys sorted at every depth
+    marshalled = json.dumps(definition, sort_keys=True, separators=(",", ":"))
+    return encode(marshalled.encode("utf-8"))
+
+
 def marshal(data, keys):
     ordered = OrderedDict()
     for key in keys:
@@ -18,6 +18,7 @@ from ansible_collections.kubernetes.core.plugins.module_utils.k8s.service import
     K8sService,
     diff_objects,
     hide_fields,
+    set_desired_hash,
 )
 from ansible_collections.kubernetes.core.plugins.module_utils.k8s.waiter import exists
 from ansible_collections.kubernetes.core.plugins.module_utils.selector import (
@@ -144,9 +145,28 @@ def perform_action(svc, definition: Dict, params: Dict) -> Dict:
     resource = svc.find_resource(kind, api_version, fail=True)
     definition["kind"] = resource.kind
     definition["apiVersion"] = resource.group_version
-    existing = svc.retrieve(resource, definition)
 
-    if state == "absent":
+    unchanged = None
+    if (
+        params.get("diff_cache")
+        and state != "absent"
+        and not params.get("append_hash")
+        and (
+            not label_selectors
+            or LabelSelectorFilter(label_selectors).isMatching(definition)
+        )
+    ):
+        unchanged = svc.unchanged(resource, definition)
+        if unchanged is None:
+            set_desired_hash(definition)
+
+    existing = svc.retrieve(resource, definition) if unchanged is None else None
+
+    if unchanged is not None:
+        # Written from this exact definition last time: no patch and no diff
+        instance = unchanged
+        result["method"] = "unchanged"
+    elif state == "absent":
         if exists(existing) and existing.kind.endswith("List"):
             instance = []
             for item in existing.items:
@@ -210,7 +230,7 @@ def perform_action(svc, definition: Dict, params: Dict) -> Dict:
             success, instance, duration = svc.wait(resource, instance)
             result["duration"] = duration
 
-    if result["method"] not in ("create", "delete"):
+    if result["method"] not in ("create", "delete", "unchanged"):
         if existing:
             existing = existing.to_dict()
         else:
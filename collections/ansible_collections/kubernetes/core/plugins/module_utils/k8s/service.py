@@ -8,6 +8,7 @@ from typing import Any, Dict, List, Optional, Tuple, Union
 
 from ansible.module_utils.common.dict_transformations import dict_merge
 from ansible_collections.kubernetes.core.plugins.module_utils.hashes import (
+    generate_definition_hash,
     generate_hash,
 )
 from ansible_collections.kubernetes.core.plugins.module_utils.k8s.core import requires
@@ -67,6 +68,9 @@ except ImportError:
     pass
 
 
+DESIRED_HASH_ANNOTATION = "kubernetes.core/desired-hash"
+
+
 class K8sService:
     """A Service class for K8S modules.
     This class has the primary purpose is to perform work on the cluster (e.g., create, apply, replace, update, delete).
@@ -75,6 +79,7 @@ class K8sService:
     def __init__(self, client, module) -> None:
         self.client = client
         self.module = module
+        self._listed = {}
 
     @property
     def _client_side_dry_run(self):
@@ -226,6 +231,42 @@ class K8sService:
 
         return definitions
 
+    def list_once(self, resource: Resource, namespace: Optional[str]) -> Dict:
+        """Live objects of a kind in a namespace by name, listed once per service."""
+        if not resource.namespaced:
+            namespace = None
+        key = (resource.group_version, resource.kind, namespace)
+        if key not in self._listed:
+            listed = {}
+            try:
+                params = dict(namespace=namespace) if namespace else {}
+                for item in self.client.get(resource, **params).to_dict()["items"]:
+                    listed[item["metadata"]["name"]] = item
+            except Exception:
+                # The listing is only a shortcut, objects are then retrieved one by one
+                pass
+            self._listed[key] = listed
+        return self._listed[key]
+
+    def unchanged(self, resource: Resource, definition: Dict) -> Optional[Dict]:
+        """Return the live object when it was last written from this very definition.
+
+        The live object is looked up in a listing of its kind and namespace,
+        and only once: a definition seen again in the same run is retrieved
+        and compared as usual.
+        """
+        name = definition["metadata"].get("name")
+        if not name:
+            return None
+        listed = self.list_once(resource, definition["metadata"].get("namespace"))
+        existing = listed.pop(name, None)
+        if existing is None:
+            return None
+        annotations = existing["metadata"].get("annotations") or {}
+        if annotations.get(DESIRED_HASH_ANNOTATION) == desired_hash(definition):
+            return existing
+        return None
+
     def find(
         self,
         kind: str,
@@ -424,8 +465,17 @@ class K8sService:
         name = definition["metadata"].get("name")
         namespace = definition["metadata"].get("namespace")
 
+        if not self.module.params.get("diff_cache"):
+            # The hash written by an earlier diff_cache run would outlive this
+            # patch and mark the object unchanged from its old definition.
+            definition = clear_desired_hash(definition, existing)
+
         if self._client_side_dry_run:
-            return dict_merge(existing.to_dict(), _encode_stringdata(definition)), []
+            merged = dict_merge(existing.to_dict(), _encode_stringdata(definition))
+            annotations = merged["metadata"].get("annotations") or {}
+            if annotations.get(DESIRED_HASH_ANNOTATION, "") is None:
+                del annotations[DESIRED_HASH_ANNOTATION]
+            return merged, []
 
         exception = None
         for merge_type in self.module.params.get("merge_type") or [
@@ -490,6 +540,43 @@ class K8sService:
         return k8s_obj
 
 
+def desired_hash(definition: Dict) -> str:
+    """Hash of a desired definition, without its own annotation or status."""
+    desired = copy.deepcopy(definition)
+    desired.pop("status", None)
+    metadata = desired.setdefault("metadata", {})
+    metadata.pop("resourceVersion", None)
+    annotations = metadata.get("annotations") or {}
+    annotations.pop(DESIRED_HASH_ANNOTATION, None)
+    if annotations:
+        metadata["annotations"] = annotations
+    else:
+        metadata.pop("annotations", None)
+    return generate_definition_hash(desired)
+
+
+def set_desired_hash(definition: Dict) -> None:
+    """Record the hash of the definition in its own annotations."""
+    value = desired_hash(definition)
+    metadata = definition.setdefault("metadata", {})
+    metadata["annotations"] = dict(metadata.get("annotations") or {})
+    metadata["annotations"][DESIRED_HASH_ANNOTATION] = value
+
+
+def clear_desired_hash(definition: Dict, existing: ResourceInstance) -> Dict:
+    """Patch that also removes the desired-hash annotation of the existing object."""
+    annotations = (existing.to_dict().get("metadata") or {}).get("annotations") or {}
+    wanted = (definition.get("metadata") or {}).get("annotations") or {}
+    if DESIRED_HASH_ANNOTATION not in annotations or DESIRED_HASH_ANNOTATION in wanted:
+        return definition
+    definition = copy.copy(definition)
+    definition["metadata"] = dict(definition["metadata"])
+    definition["metadata"]["annotations"] = dict(wanted)
+    # null deletes the key with both merge and strategic-merge patches
+    definition["metadata"]["annotations"][DESIRED_HASH_ANNOTATION] = None
+    return definition
+
+
 def diff_objects(
     existing: Dict, new: Dict, hidden_fields: Optional[list] = None
 ) -> Tuple[bool, Dict]:
@@ -193,6 +193,19 @@ options:
     type: list
     elements: str
     version_added: 3.0.0
+  diff_cache:
+    description:
+    - When set to C(true), every object created or updated records a hash of its desired definition in the
+      C(kubernetes.core/desired-hash) annotation.
+    - Objects whose annotation already matches the hash of their definition are not patched, applied or diffed,
+      and are reported unchanged with C(method=unchanged). Their live state is looked up by listing each kind once
+      per namespace instead of getting every object.
+    - Changes made to such objects by other clients are not detected. Remove the annotation to force an update.
+    - When set to C(false), an update of an object that carries the annotation removes it, so that a later run
+      with I(diff_cache=true) does not skip the object based on an outdated hash.
+    - Ignored when I(state=absent) or when I(append_hash) is set.
+    type: bool
+    default: False
 
 requirements:
   - "python >= 3.9"
@@ -481,6 +494,7 @@ def argspec():
     )
     argument_spec["delete_all"] = dict(type="bool", default=False, aliases=["all"])
     argument_spec["hidden_fields"] = dict(type="list", elements="str")
+    argument_spec["diff_cache"] = dict(type="bool", default=False)
 
     return argument_spec
 
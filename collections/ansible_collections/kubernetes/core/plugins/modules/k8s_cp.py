@@ -76,9 +76,36 @@ options:
     - This option is ignored when I(content) is set or when I(state) is set to C(from_pod).
     type: bool
     default: False
+  chunk_size:
+    description:
+    - Size in bytes of the blocks streamed to or from the container.
+    - The archive is streamed, memory use is bounded by a few blocks whatever the size of the copied files.
+    type: int
+    default: 1048576
+  verify_checksum:
+    description:
+    - Compare the SHA-256 of every copied file with the output of C(sha256sum) in the container.
+    - A warning is emitted and the check is skipped when C(sha256sum) is not available in the container.
+    type: bool
+    default: False
+  resume:
+    description:
+    - When I(remote_path) and I(local_path) are single files, continue an interrupted copy from the size of the
+      destination file instead of starting again from zero.
+    - The destination is written with C(cat)/C(tail), ownership and permissions are not preserved.
+    - Use together with I(verify_checksum) to make sure the existing part of the destination matches the source.
+    type: bool
+    default: False
+  retries:
+    description:
+    - Number of times an interrupted copy is resumed when I(resume=true).
+    type: int
+    default: 3
 
 notes:
     - the tar binary is required on the container when copying from local filesystem to pod.
+    - When copying from a pod, files are streamed in a single C(tar) exec. Containers without tar fall back to
+      copying the files one by one with C(cat).
 """
 
 EXAMPLES = r"""
@@ -126,6 +153,18 @@ EXAMPLES = r"""
     pod: some-pod
     remote_path: /tmp/foo.txt
     content: "This content will be copied into remote file"
+
+# Large single files: resume an interrupted copy and verify it
+- name: Fetch a model checkpoint from a pod
+  kubernetes.core.k8s_cp:
+    namespace: some-namespace
+    pod: some-pod
+    remote_path: /models/checkpoint_000052/model.safetensors
+    local_path: /data/model.safetensors
+    state: from_pod
+    chunk_size: 16777216
+    resume: true
+    verify_checksum: true
 """
 
 
@@ -179,6 +218,10 @@ def argspec():
         "choices": ["to_pod", "from_pod"],
     }
     argument_spec["no_preserve"] = {"type": "bool", "default": False}
+    argument_spec["chunk_size"] = {"type": "int", "default": 1024 * 1024}
+    argument_spec["verify_checksum"] = {"type": "bool", "default": False}
+    argument_spec["resume"] = {"type": "bool", "default": False}
+    argument_spec["retries"] = {"type": "int", "default": 3}
     return argument_spec
 
 
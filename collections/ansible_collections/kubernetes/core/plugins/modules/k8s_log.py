@@ -81,6 +81,42 @@ options:
     - mutually exclusive with C(container).
     type: bool
     version_added: 2.4.0
+  all_pods:
+    description:
+    - If set to C(true), retrieve the logs of every Pod matching I(label_selectors) or the selector of the
+      resource, instead of only the first one.
+    - The logs are fetched concurrently, see I(max_workers).
+    type: bool
+    default: False
+  max_workers:
+    description:
+    - Number of Pod/container logs fetched at the same time.
+    type: int
+    default: 4
+  since_time:
+    description:
+    - An RFC3339 timestamp from which to show logs, for example C(2025-01-31T08:00:00Z).
+    - Ignored for a Pod/container that has an entry in I(checkpoint_file).
+    - mutually exclusive with C(since_seconds).
+    type: str
+  checkpoint_file:
+    description:
+    - Path of a JSON file recording, for every Pod/container, the timestamp of the last log line fetched.
+    - When set, each log is requested from its recorded timestamp and lines already seen are dropped, so
+      repeated runs only return new lines. The file is updated at the end of the run, except in check mode.
+    type: path
+  log_dir:
+    description:
+    - Directory where each Pod/container log is streamed to a C(<namespace>_<pod>[_<container>].log) file
+      while it is read, instead of being returned.
+    - Files are appended to when I(checkpoint_file) has an entry for the Pod/container, and overwritten otherwise.
+    - When set, I(log) and I(log_lines) are not returned.
+    type: path
+  timestamps:
+    description:
+    - If C(true), keep the RFC3339 timestamp the kubelet adds at the beginning of every line.
+    type: bool
+    default: False
 
 requirements:
   - "python >= 3.9"
@@ -129,6 +165,18 @@ EXAMPLES = r"""
     namespace: testing
     name: some-pod
     all_containers: true
+
+# Stream the logs of every replica to files, only new lines on later runs
+- name: Collect the logs of every NIM replica
+  kubernetes.core.k8s_log:
+    namespace: nim
+    label_selectors:
+      - app=meta-llama3-8b-instruct
+    all_pods: true
+    max_workers: 8
+    log_dir: /tmp/nim-logs
+    checkpoint_file: /tmp/nim-logs/checkpoint.json
+  register: nim_logs
 """
 
 RETURN = r"""
@@ -142,11 +190,23 @@ log_lines:
   description:
   - The log of the object, split on newlines
   returned: success
+logs:
+  type: list
+  elements: dict
+  description:
+  - One entry per Pod/container with C(pod), C(container), the number of C(lines) fetched,
+    the C(since_time) used and the C(last_timestamp) seen.
+  - Contains C(file) when I(log_dir) is set and C(log) otherwise.
+  returned: success
+  version_added: 5.4.0
 """
 
 
 import copy
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 
 from ansible_collections.kubernetes.core.plugins.module_utils.ansiblemodule import (
     AnsibleModule,
@@ -187,6 +247,12 @@ def argspec():
             previous=dict(type="bool", default=False),
             tail_lines=dict(type="int"),
             all_containers=dict(type="bool"),
+            all_pods=dict(type="bool", default=False),
+            max_workers=dict(type="int", default=4),
+            since_time=dict(type="str"),
+            checkpoint_file=dict(type="path"),
+            log_dir=dict(type="path"),
+            timestamps=dict(type="bool", default=False),
         )
     )
     return args
@@ -215,7 +281,86 @@ def list_containers_in_pod(svc, resource, namespace, name):
         )
 
 
-def execute_module(svc, params):
+def parse_timestamp(value):
+    """Return a sortable (datetime, nanoseconds) tuple for an RFC3339Nano timestamp."""
+    if isinstance(value, bytes):
+        value = value.decode("ascii")
+    base, dummy, fraction = value.rstrip("Z").partition(".")
+    return (
+        datetime.strptime(base, "%Y-%m-%dT%H:%M:%S"),
+        int((fraction + "000000000")[:9]),
+    )
+
+
+def load_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except ValueError:
+        raise CoreException("Unable to parse checkpoint file {0}".format(path))
+
+
+def save_checkpoint(path, checkpoint):
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as fh:
+        json.dump(checkpoint, fh, indent=2, sort_keys=True)
+    os.rename(tmp, path)
+
+
+def checkpoint_key(namespace, name, container):
+    return "/".join([namespace or "", name, container or ""])
+
+
+def stream_log(resource, namespace, name, query_params, sink, last_seen, strip):
+    """Stream one log, passing complete lines to sink.
+
+    When the log is requested with timestamps, lines at or before ``last_seen``
+    are dropped and the last timestamp read is returned with the line count.
+    """
+    timestamps = query_params.get("timestamps")
+    response = resource.log.get(
+        name=name, namespace=namespace, serialize=False, query_params=query_params
+    )
+    if hasattr(response, "stream"):
+        chunks = response.stream(64 * 1024)
+    else:
+        chunks = [response.data]
+
+    state = dict(lines=0, last_timestamp=None)
+
+    def emit(line):
+        if timestamps:
+            stamp, dummy, text = line.partition(b" ")
+            try:
+                if last_seen and parse_timestamp(stamp) <= last_seen:
+                    return
+                state["last_timestamp"] = stamp.decode("ascii")
+            except ValueError:
+                # Not a timestamped line, e.g. the rotation message of the kubelet.
+                text = line
+            if strip:
+                line = text
+        sink(line)
+        state["lines"] += 1
+
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        lines = pending.split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            emit(line + b"\n")
+    if pending:
+        emit(pending)
+    return state
+
+
+def execute_module(svc, params, check_mode=False):
     name = params.get("name")
     namespace = params.get("namespace")
     label_selector = ",".join(params.get("label_selectors", {}))
@@ -234,6 +379,7 @@ def execute_module(svc, params):
         label_selector = ",".join(extract_selectors(instance))
         resource = v1_pods
 
+    names = [name]
     if label_selector:
         instances = v1_pods.get(namespace=namespace, label_selector=label_selector)
         if not instances.items:
@@ -243,7 +389,10 @@ def execute_module(svc, params):
                 )
             )
         # This matches the behavior of kubectl when logging pods via a selector
-        name = instances.items[0].metadata.name
+        names = [item.metadata.name for item in instances.items]
+        if not params.get("all_pods"):
+            names = names[:1]
+        name = names[0]
         resource = v1_pods
 
     if "base" not in resource.log.urls and not name:
@@ -251,46 +400,112 @@ def execute_module(svc, params):
             "name must be provided for resources that do not support namespaced base url"
         )
 
-    kwargs = {}
+    query_params = {}
     if params.get("container"):
-        kwargs["query_params"] = {"container": params["container"]}
+        query_params["container"] = params["container"]
 
     if params.get("since_seconds"):
-        kwargs.setdefault("query_params", {}).update(
-            {"sinceSeconds": params["since_seconds"]}
-        )
+        query_params["sinceSeconds"] = params["since_seconds"]
+
+    if params.get("since_time"):
+        query_params["sinceTime"] = params["since_time"]
 
     if params.get("previous"):
-        kwargs.setdefault("query_params", {}).update({"previous": params["previous"]})
+        query_params["previous"] = params["previous"]
 
     if params.get("tail_lines"):
-        kwargs.setdefault("query_params", {}).update(
-            {"tailLines": params["tail_lines"]}
+        query_params["tailLines"] = params["tail_lines"]
+
+    checkpoint_file = params.get("checkpoint_file")
+    checkpoint = load_checkpoint(checkpoint_file)
+    if params.get("timestamps") or checkpoint_file:
+        query_params["timestamps"] = True
+
+    log_dir = params.get("log_dir")
+    if log_dir and not check_mode and not os.path.isdir(log_dir):
+        os.makedirs(log_dir)
+
+    def containers_of(pod_name):
+        if params.get("all_containers"):
+            return list_containers_in_pod(svc, resource, namespace, pod_name)
+        return [params.get("container")]
+
+    def fetch(pod_name, container):
+        key = checkpoint_key(namespace, pod_name, container)
+        query = dict(query_params)
+        if container is not None:
+            query["container"] = container
+        last_seen = None
+        if checkpoint.get(key):
+            last_seen = parse_timestamp(checkpoint[key])
+            # sinceTime has a one second resolution, lines already seen are dropped.
+            query["sinceTime"] = checkpoint[key].split(".")[0].rstrip("Z") + "Z"
+            query.pop("sinceSeconds", None)
+
+        entry = dict(
+            pod=pod_name, container=container, since_time=query.get("sinceTime")
         )
-
-    pod_containers = [None]
-    if params.get("all_containers"):
-        pod_containers = list_containers_in_pod(svc, resource, namespace, name)
-
-    log = ""
-    try:
-        for container in pod_containers:
-            if container is not None:
-                kwargs.setdefault("query_params", {}).update({"container": container})
-            response = resource.log.get(
-                name=name, namespace=namespace, serialize=False, **kwargs
+        chunks = []
+        out = None
+        if log_dir:
+            filename = "_".join(p for p in (namespace, pod_name, container) if p)
+            entry["file"] = os.path.join(log_dir, filename + ".log")
+            if not check_mode:
+                out = open(entry["file"], "ab" if last_seen else "wb")
+        try:
+            state = stream_log(
+                resource,
+                namespace,
+                pod_name,
+                query,
+                out.write if out else chunks.append,
+                last_seen,
+                strip=not params.get("timestamps"),
             )
-            log += response.data.decode("utf8")
-    except ApiException as exc:
-        if exc.reason == "Not Found":
-            raise CoreException("Pod {0}/{1} not found.".format(namespace, name))
-        raise CoreException(
-            "Unable to retrieve log from Pod due to: {0}".format(
-                get_exception_message(exc)
+        except ApiException as exc:
+            if exc.reason == "Not Found":
+                raise CoreException(
+                    "Pod {0}/{1} not found.".format(namespace, pod_name)
+                )
+            raise CoreException(
+                "Unable to retrieve log from Pod due to: {0}".format(
+                    get_exception_message(exc)
+                )
             )
-        )
+        finally:
+            if out:
+                out.close()
+        entry.update(state)
+        if not log_dir:
+            entry["log"] = b"".join(chunks).decode("utf8", "replace")
+        return key, entry
+
+    workers = max(1, params.get("max_workers") or 1)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        targets = [
+            (pod_name, container)
+            for pod_name, containers in zip(names, executor.map(containers_of, names))
+            for container in containers
+        ]
+        results = list(executor.map(lambda target: fetch(*target), targets))
+
+    logs = [entry for key, entry in results]
+    updated = dict(
+        (key, entry["last_timestamp"])
+        for key, entry in results
+        if entry["last_timestamp"]
+    )
+    if checkpoint_file and updated and not check_mode:
+        checkpoint.update(updated)
+        save_checkpoint(checkpoint_file, checkpoint)
 
-    return {"changed": False, "log": log, "log_lines": log.split("\n")}
+    result = {"changed": False, "logs": logs}
+    if log_dir:
+        result["changed"] = any(entry["lines"] for entry in logs)
+    else:
+        log = "".join(entry["log"] for entry in logs)
+        result.update(log=log, log_lines=log.split("\n"))
+    return result
 
 
 def extract_selectors(instance):
@@ -347,13 +562,16 @@ def main():
         module_class=AnsibleModule,
         argument_spec=argspec(),
         supports_check_mode=True,
-        mutually_exclusive=[("container", "all_containers")],
+        mutually_exclusive=[
+            ("container", "all_containers"),
+            ("since_seconds", "since_time"),
+        ],
     )
 
     try:
         client = get_api_client(module=module)
         svc = K8sService(client, module)
-        result = execute_module(svc, module.params)
+        result = execute_module(svc, module.params, check_mode=module.check_mode)
         module.exit_json(**result)
     except CoreException as e:
         module.fail_from_exception(e)
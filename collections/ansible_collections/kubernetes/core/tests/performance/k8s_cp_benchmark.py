@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""
+Throughput and memory benchmark for module_utils/copy.py.
+
+The copy classes run against the fake exec endpoint from the unit tests, so
+the numbers measure the module side of the transfer (framing, tar streaming,
+hashing) without a cluster. Run from the repository root:
+
+    PYTHONPATH=collections python \\
+        collections/ansible_collections/kubernetes/core/tests/performance/k8s_cp_benchmark.py
+"""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from unittest.mock import MagicMock
+
+from ansible_collections.kubernetes.core.plugins.module_utils.copy import (
+    K8SCopyFromPod,
+    K8SCopyToPod,
+)
+from ansible_collections.kubernetes.core.tests.unit.utils.fake_exec import (
+    FakeExecEndpoint,
+)
+
+MIB = 1024 * 1024
+
+
+class Done(Exception):
+    pass
+
+
+class BenchModule(object):
+    check_mode = False
+
+    def __init__(self, **params):
+        self.params = dict(
+            pod="bench",
+            namespace="bench",
+            container=None,
+            content=None,
+            no_preserve=False,
+            verify_checksum=False,
+            resume=False,
+            retries=0,
+        )
+        self.params.update(params)
+
+    def warn(self, msg):
+        pass
+
+    def exit_json(self, **kwargs):
+        raise Done(kwargs)
+
+    def fail_json(self, **kwargs):
+        raise RuntimeError(kwargs)
+
+
+def run(cls, measure_memory, **params):
+    copier = cls(BenchModule(**params), MagicMock())
+    copier.exec_stream = FakeExecEndpoint(frame_size=64 * 1024)
+    if measure_memory:
+        tracemalloc.start()
+    started = time.time()
+    try:
+        copier.run()
+    except Done:
+        pass
+    elapsed = time.time() - started
+    peak = 0
+    if measure_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return elapsed, peak
+
+
+def make_payload(root, size_mib, files):
+    os.makedirs(root)
+    block = os.urandom(MIB)
+    per_file = size_mib // files
+    for index in range(files):
+        with open(os.path.join(root, "part-%04d.bin" % index), "wb") as fh:
+            for dummy in range(per_file):
+                fh.write(block)
+    return per_file * files
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=512, help="payload in MiB")
+    parser.add_argument(
+        "--chunk-sizes", default="1,4,16", help="comma separated chunk sizes in MiB"
+    )
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="k8s_cp_bench_")
+    try:
+        cases = [("1 file", 1), ("64 files", 64)]
+        print(
+            "| direction | layout | chunk | verify | MiB/s | peak Python memory |\n"
+            "|---|---|---|---|---|---|"
+        )
+        for label, files in cases:
+            source = os.path.join(workdir, "source-%d" % files)
+            size = make_payload(source, args.size, files)
+            if files == 1:
+                source = os.path.join(source, "part-0000.bin")
+            for chunk in [int(c) for c in args.chunk_sizes.split(",")]:
+                for verify in (False, True):
+                    for direction, cls in (
+                        ("to_pod", K8SCopyToPod),
+                        ("from_pod", K8SCopyFromPod),
+                    ):
+                        results = []
+                        for measure_memory in (False, True):
+                            target = os.path.join(workdir, "target")
+                            params = dict(
+                                chunk_size=chunk * MIB, verify_checksum=verify
+                            )
+                            if direction == "to_pod":
+                                params.update(local_path=source, remote_path=target)
+                            else:
+                                params.update(
+                                    remote_path=source,
+                                    local_path=target,
+                                    state="from_pod",
+                                )
+                            results.append(run(cls, measure_memory, **params))
+                            if os.path.isdir(target):
+                                shutil.rmtree(target)
+                            elif os.path.exists(target):
+                                os.remove(target)
+                        elapsed, peak = results[0][0], results[1][1]
+                        print(
+                            "| %s | %s | %d MiB | %s | %.0f | %.1f MiB |"
+                            % (
+                                direction,
+                                label,
+                                chunk,
+                                "yes" if verify else "no",
+                                size / elapsed,
+                                peak / MIB,
+                            )
+                        )
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import os
+import shutil
+import sys
+
+import pytest
+import yaml
+from ansible.errors import AnsibleError
+from ansible.playbook.play_context import PlayContext
+from ansible_collections.kubernetes.core.plugins.connection.kubectl import (
+    DOCUMENTATION,
+    Connection,
+)
+
+# Stand-in for kubectl: drop everything up to "--" and run the remaining command
+# locally, recording each invocation so the tests can count exec sessions.
+FAKE_KUBECTL = """#!{python}
+import os
+import sys
+
+with open(os.environ["FAKE_KUBECTL_LOG"], "a") as log:
+    log.write(" ".join(sys.argv[1:]) + "\\n")
+# Noise on stderr before the command reads its stdin, as a verbose kubectl would.
+noise = int(os.environ.get("FAKE_KUBECTL_STDERR", "0"))
+if noise:
+    os.write(2, b"w" * noise)
+argv = sys.argv[sys.argv.index("--") + 1 :]
+os.execvp(argv[0], argv)
+"""
+
+pytestmark = pytest.mark.skipif(
+    not (shutil.which("tar") and shutil.which("base64")),
+    reason="tar and base64 are required",
+)
+
+
+@pytest.fixture
+def kubectl(tmp_path, monkeypatch):
+    script = tmp_path / "kubectl"
+    script.write_text(FAKE_KUBECTL.format(python=sys.executable))
+    script.chmod(0o755)
+    log = tmp_path / "kubectl.log"
+    log.write_text("")
+    monkeypatch.setenv("FAKE_KUBECTL_LOG", str(log))
+    return str(script), log
+
+
+def exec_count(log):
+    return len(log.read_text().splitlines())
+
+
+def get_connection(kubectl_command, **options):
+    connection = Connection(PlayContext(), None, kubectl_command=kubectl_command)
+    # Resolve the options from the documented defaults, without the plugin loader.
+    documented = yaml.safe_load(DOCUMENTATION)["options"]
+    connection._options = dict(
+        (name, spec.get("default")) for name, spec in documented.items()
+    )
+    connection._options.update(kubectl_pod="nim-0", **options)
+    return connection
+
+
+def test_put_files_uses_a_single_exec(kubectl, tmp_path):
+    command, log = kubectl
+    local = tmp_path / "local"
+    local.mkdir()
+    remote = tmp_path / "remote"
+    files = []
+    for index in range(5):
+        source = local / ("config-%d.yaml" % index)
+        source.write_bytes(b"value: %d\n" % index)
+        files.append((str(source), str(remote / "conf.d" / source.name)))
+
+    connection = get_connection(command)
+    connection.put_files(files)
+
+    assert exec_count(log) == 1
+    for index in range(5):
+        target = remote / "conf.d" / ("config-%d.yaml" % index)
+        assert target.read_bytes() == b"value: %d\n" % index
+
+
+def test_put_files_rejects_missing_source(kubectl, tmp_path):
+    command, log = kubectl
+    connection = get_connection(command)
+    with pytest.raises(AnsibleError, match="does not exist"):
+        connection.put_files([(str(tmp_path / "missing"), str(tmp_path / "x"))])
+    assert exec_count(log) == 0
+
+
+def test_fetch_files_uses_a_single_exec(kubectl, tmp_path):
+    command, log = kubectl
+    remote = tmp_path / "remote"
+    remote.mkdir()
+    local = tmp_path / "local"
+    local.mkdir()
+    files = []
+    for name in ("a.log", "b.log", "c.bin"):
+        (remote / name).write_bytes(os.urandom(64 * 1024))
+        files.append((str(remote / name), str(local / name)))
+
+    connection = get_connection(command)
+    connection.fetch_files(files)
+
+    assert exec_count(log) == 1
+    for in_path, out_path in files:
+        with open(in_path, "rb") as expected, open(out_path, "rb") as actual:
+            assert expected.read() == actual.read()
+
+
+def test_fetch_files_reports_missing_files(kubectl, tmp_path):
+    command, log = kubectl
+    present = tmp_path / "present"
+    present.write_text("ok")
+    connection = get_connection(command)
+    with pytest.raises(AnsibleError, match="absent"):
+        connection.fetch_files(
+            [
+                (str(present), str(tmp_path / "present.out")),
+                (str(tmp_path / "absent"), str(tmp_path / "absent.out")),
+            ]
+        )
+
+
+def test_persistent_session_is_reused(kubectl):
+    command, log = kubectl
+    connection = get_connection(command, kubectl_persistent_session=True)
+    try:
+        assert connection.exec_command("echo hello") == (0, b"hello\n", b"")
+        rc, stdout, stderr = connection.exec_command("printf out; echo err >&2; exit 3")
+        assert (rc, stdout, stderr) == (3, b"out", b"err\n")
+        payload = bytes(bytearray(range(256))) * 1024
+        assert connection.exec_command("cat", in_data=payload) == (0, payload, b"")
+    finally:
+        connection.close()
+    assert exec_count(log) == 1
+
+
+def test_exec_without_session_spawns_per_command(kubectl):
+    command, log = kubectl
+    connection = get_connection(command)
+    connection.exec_command("true")
+    assert connection.exec_command("echo again") == (0, b"again\n", b"")
+    assert exec_count(log) == 2
+
+
+def test_put_files_drains_stderr(kubectl, tmp_path, monkeypatch):
+    command, log = kubectl
+    # More than a pipe buffer on both stderr and stdin.
+    monkeypatch.setenv("FAKE_KUBECTL_STDERR", str(1024 * 1024))
+    source = tmp_path / "big.bin"
+    source.write_bytes(os.urandom(1024 * 1024))
+    target = tmp_path / "remote" / "big.bin"
+
+    connection = get_connection(command)
+    connection.put_files([(str(source), str(target))])
+
+    assert target.read_bytes() == source.read_bytes()
+
+
+def test_fetch_files_drains_stderr(kubectl, tmp_path, monkeypatch):
+    command, log = kubectl
+    monkeypatch.setenv("FAKE_KUBECTL_STDERR", str(1024 * 1024))
+    source = tmp_path / "big.bin"
+    source.write_bytes(os.urandom(1024 * 1024))
+    target = tmp_path / "big.out"
+
+    connection = get_connection(command)
+    connection.fetch_files([(str(source), str(target))])
+
+    assert target.read_bytes() == source.read_bytes()
+
+
+def test_session_keeps_kubeconfig_until_closed(kubectl):
+    command, log = kubectl
+    connection = get_connection(
+        command,
+        kubectl_persistent_session=True,
+        kubectl_kubeconfig={"apiVersion": "v1", "kind": "Config"},
+    )
+    try:
+        connection.exec_command("true")
+        kubeconfig = connection._session.temporary_file
+        assert "--kubeconfig %s" % kubeconfig in log.read_text()
+        # Still there for the running session.
+        assert connection.exec_command("test -f %s" % kubeconfig)[0] == 0
+    finally:
+        connection.close()
+    assert not os.path.exists(kubeconfig)
+    assert exec_count(log) == 1
+
+
+def test_start_failure_blames_local_kubectl(tmp_path):
+    connection = get_connection(str(tmp_path / "missing-kubectl"))
+    with pytest.raises(AnsibleError, match="failed to start the local kubectl"):
+        connection.fetch_files([("/etc/hostname", str(tmp_path / "out"))])
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import os
+import shutil
+from unittest.mock import MagicMock
+
+import pytest
+from ansible_collections.kubernetes.core.plugins.module_utils import copy as k8s_copy
+from ansible_collections.kubernetes.core.plugins.module_utils.copy import (
+    K8SCopyFromPod,
+    K8SCopyToPod,
+)
+from ansible_collections.kubernetes.core.tests.unit.utils.ansible_module_mock import (
+    AnsibleExitJson,
+    AnsibleFailJson,
+    exit_json,
+    fail_json,
+)
+from ansible_collections.kubernetes.core.tests.unit.utils.fake_exec import (
+    FakeExecEndpoint,
+)
+
+pytestmark = pytest.mark.skipif(
+    not all(shutil.which(tool) for tool in ("tar", "sha256sum", "tail")),
+    reason="tar, sha256sum and tail are required",
+)
+
+
+class FakeModule(object):
+    check_mode = False
+
+    def __init__(self, **params):
+        self.params = dict(
+            pod="nim-0",
+            namespace="nim",
+            container=None,
+            content=None,
+            no_preserve=False,
+            chunk_size=64 * 1024,
+            verify_checksum=False,
+            resume=False,
+            retries=3,
+        )
+        self.params.update(params)
+        self.warnings = []
+
+    def warn(self, msg):
+        self.warnings.append(msg)
+
+    exit_json = staticmethod(exit_json)
+    fail_json = staticmethod(fail_json)
+
+
+def run_copy(cls, endpoint, **params):
+    copier = cls(FakeModule(**params), MagicMock())
+    copier.exec_stream = endpoint
+    with pytest.raises(AnsibleExitJson) as result:
+        copier.run()
+    return result.value.args[0]
+
+
+def make_tree(root):
+    (root / "conf" / "nested").mkdir(parents=True)
+    (root / "conf" / "a.yaml").write_text("a: 1\n")
+    (root / "conf" / "nested" / "b.yaml").write_text("b: 2\n")
+    (root / "conf" / "nested" / "model.bin").write_bytes(os.urandom(300 * 1024))
+
+
+def same_content(left, right):
+    with open(left, "rb") as lfh, open(right, "rb") as rfh:
+        return lfh.read() == rfh.read()
+
+
+def test_to_pod_directory_is_streamed_in_one_exec(tmp_path):
+    make_tree(tmp_path / "local")
+    remote = tmp_path / "pod"
+    remote.mkdir()
+    endpoint = FakeExecEndpoint()
+
+    result = run_copy(
+        K8SCopyToPod,
+        endpoint,
+        local_path=str(tmp_path / "local" / "conf"),
+        remote_path=str(remote),
+        verify_checksum=True,
+    )
+
+    assert result["changed"] is True
+    assert len(endpoint.commands("tar")) == 1
+    for name in ("a.yaml", "nested/b.yaml", "nested/model.bin"):
+        assert same_content(tmp_path / "local" / "conf" / name, remote / "conf" / name)
+
+
+def test_to_pod_content(tmp_path):
+    endpoint = FakeExecEndpoint()
+    target = tmp_path / "pod" / "app.conf"
+    target.parent.mkdir()
+    result = run_copy(
+        K8SCopyToPod,
+        endpoint,
+        local_path=None,
+        content="key=value\n",
+        remote_path=str(target),
+        verify_checksum=True,
+    )
+    assert result["changed"] is True
+    assert target.read_text() == "key=value\n"
+
+
+def test_to_pod_without_stdin_close_waits_for_the_container(tmp_path):
+    make_tree(tmp_path / "local")
+    remote = tmp_path / "pod"
+    remote.mkdir()
+    run_copy(
+        K8SCopyToPod,
+        FakeExecEndpoint(v5=False),
+        local_path=str(tmp_path / "local" / "conf"),
+        remote_path=str(remote),
+        verify_checksum=True,
+    )
+    assert same_content(
+        tmp_path / "local" / "conf" / "nested" / "model.bin",
+        remote / "conf" / "nested" / "model.bin",
+    )
+
+
+def test_from_pod_directory_is_streamed_in_one_exec(tmp_path):
+    make_tree(tmp_path / "pod")
+    local = tmp_path / "local"
+    endpoint = FakeExecEndpoint()
+
+    result = run_copy(
+        K8SCopyFromPod,
+        endpoint,
+        remote_path=str(tmp_path / "pod" / "conf"),
+        local_path=str(local),
+        state="from_pod",
+        verify_checksum=True,
+    )
+
+    assert result["changed"] is True
+    assert len(endpoint.commands("tar")) == 1
+    assert endpoint.commands("cat") == []
+    for name in ("a.yaml", "nested/b.yaml", "nested/model.bin"):
+        assert same_content(tmp_path / "pod" / "conf" / name, local / name)
+
+
+def test_from_pod_directory_into_existing_directory(tmp_path):
+    make_tree(tmp_path / "pod")
+    local = tmp_path / "local"
+    local.mkdir()
+    run_copy(
+        K8SCopyFromPod,
+        FakeExecEndpoint(),
+        remote_path=str(tmp_path / "pod" / "conf"),
+        local_path=str(local),
+        state="from_pod",
+    )
+    assert (local / "conf" / "nested" / "b.yaml").read_text() == "b: 2\n"
+
+
+def test_from_pod_falls_back_to_cat_without_tar(tmp_path):
+    make_tree(tmp_path / "pod")
+    local = tmp_path / "local"
+    endpoint = FakeExecEndpoint(missing=("tar",), cwd=str(tmp_path))
+
+    run_copy(
+        K8SCopyFromPod,
+        endpoint,
+        remote_path=str(tmp_path / "pod" / "conf"),
+        local_path=str(local),
+        state="from_pod",
+    )
+
+    assert len(endpoint.commands("cat")) == 3
+    assert same_content(
+        tmp_path / "pod" / "conf" / "nested" / "model.bin",
+        local / "nested" / "model.bin",
+    )
+
+
+def test_from_pod_resumes_after_a_dropped_stream(tmp_path):
+    remote = tmp_path / "checkpoint.bin"
+    remote.write_bytes(os.urandom(1024 * 1024))
+    local = tmp_path / "local.bin"
+    endpoint = FakeExecEndpoint(drops={"tail": [300 * 1024, 200 * 1024]})
+
+    result = run_copy(
+        K8SCopyFromPod,
+        endpoint,
+        remote_path=str(remote),
+        local_path=str(local),
+        state="from_pod",
+        resume=True,
+        verify_checksum=True,
+    )
+
+    assert result["changed"] is True
+    assert [call[2] for call in endpoint.commands("tail")] == [
+        "+1",
+        "+%d" % (300 * 1024 + 1),
+        "+%d" % (500 * 1024 + 1),
+    ]
+    assert same_content(remote, local)
+
+
+def test_from_pod_resume_continues_a_previous_run(tmp_path):
+    remote = tmp_path / "checkpoint.bin"
+    remote.write_bytes(os.urandom(512 * 1024))
+    local = tmp_path / "local.bin"
+    local.write_bytes(remote.read_bytes()[:100000])
+    endpoint = FakeExecEndpoint()
+
+    run_copy(
+        K8SCopyFromPod,
+        endpoint,
+        remote_path=str(remote),
+        local_path=str(local),
+        state="from_pod",
+        resume=True,
+    )
+    assert [call[2] for call in endpoint.commands("tail")] == ["+100001"]
+    assert same_content(remote, local)
+
+    # Nothing left to transfer: no change reported.
+    result = run_copy(
+        K8SCopyFromPod,
+        endpoint,
+        remote_path=str(remote),
+        local_path=str(local),
+        state="from_pod",
+        resume=True,
+    )
+    assert result["changed"] is False
+    assert len(endpoint.commands("tail")) == 1
+
+
+def test_from_pod_resume_gives_up_after_retries(tmp_path):
+    remote = tmp_path / "checkpoint.bin"
+    remote.write_bytes(os.urandom(256 * 1024))
+    endpoint = FakeExecEndpoint(drops={"tail": [1024, 1024, 1024]})
+
+    copier = K8SCopyFromPod(
+        FakeModule(
+            remote_path=str(remote),
+            local_path=str(tmp_path / "local.bin"),
+            state="from_pod",
+            resume=True,
+            retries=2,
+        ),
+        MagicMock(),
+    )
+    copier.exec_stream = endpoint
+    with pytest.raises(AnsibleFailJson, match="after 3 attempts"):
+        copier.run()
+
+
+def test_to_pod_resumes_after_a_dropped_stream(tmp_path):
+    local = tmp_path / "checkpoint.bin"
+    local.write_bytes(os.urandom(1024 * 1024))
+    remote = tmp_path / "pod" / "models" / "checkpoint.bin"
+    (tmp_path / "pod").mkdir()
+    endpoint = FakeExecEndpoint(drops={"cat >": [400 * 1024]})
+
+    result = run_copy(
+        K8SCopyToPod,
+        endpoint,
+        local_path=str(local),
+        remote_path=str(remote),
+        resume=True,
+        verify_checksum=True,
+    )
+
+    assert result["changed"] is True
+    scripts = [call[2] for call in endpoint.calls if "cat" in " ".join(call)]
+    assert 'cat > "$1"' in scripts[0]
+    assert 'cat >> "$1"' in scripts[1]
+    assert same_content(local, remote)
+
+
+def test_checksum_mismatch_fails(tmp_path, monkeypatch):
+    make_tree(tmp_path / "local")
+    remote = tmp_path / "pod"
+    remote.mkdir()
+    monkeypatch.setattr(
+        k8s_copy.K8SCopy, "remote_checksums", lambda self, path: {}, raising=True
+    )
+    copier = K8SCopyToPod(
+        FakeModule(
+            local_path=str(tmp_path / "local" / "conf"),
+            remote_path=str(remote),
+            verify_checksum=True,
+        ),
+        MagicMock(),
+    )
+    copier.exec_stream = FakeExecEndpoint()
+    monkeypatch.setattr(k8s_copy.time, "sleep", lambda seconds: None)
+    with pytest.raises(AnsibleFailJson, match="Checksum mismatch"):
+        copier.run()
@@ -20,6 +20,7 @@ from __future__ import absolute_import, division, print_function
 __metaclass__ = type
 
 from ansible_collections.kubernetes.core.plugins.module_utils.hashes import (
+    generate_definition_hash,
     generate_hash,
 )
 
@@ -66,3 +67,20 @@ tests = [
 def test_hashes():
     for test in tests:
         assert generate_hash(test["resource"]) == test["expected"]
+
+
+def test_definition_hashes():
+    pod = dict(
+        kind="Pod",
+        metadata=dict(name="foo", labels=dict(a="1", b="2")),
+        spec=dict(containers=[dict(name="c", image="nginx")]),
+    )
+    reordered = dict(
+        spec=dict(containers=[dict(image="nginx", name="c")]),
+        metadata=dict(labels=dict(b="2", a="1"), name="foo"),
+        kind="Pod",
+    )
+    assert generate_definition_hash(pod) == generate_definition_hash(reordered)
+    assert len(generate_definition_hash(pod)) == 10
+    pod["spec"]["containers"][0]["image"] = "nginx:1.27"
+    assert generate_definition_hash(pod) != generate_definition_hash(reordered)
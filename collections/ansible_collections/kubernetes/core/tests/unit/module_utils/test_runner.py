@@ -180,3 +180,24 @@ def test_perform_action(action, params, existing, instance_warnings, expected):
 
     result = perform_action(svc, definition, params)
     assert expected.items() <= result.items()
+
+
+def test_perform_action_diff_cache():
+    svc = Mock()
+    svc.find_resource.return_value = Mock(
+        kind=definition["kind"], group_version=definition["apiVersion"]
+    )
+    svc.unchanged.return_value = definition
+
+    result = perform_action(svc, deepcopy(definition), {"diff_cache": True})
+    assert result == {"changed": False, "method": "unchanged", "result": definition}
+    svc.retrieve.assert_not_called()
+    svc.update.assert_not_called()
+
+    svc.unchanged.return_value = None
+    svc.retrieve.return_value = ResourceInstance(None, definition)
+    svc.update.return_value = (modified_def, [])
+    result = perform_action(svc, deepcopy(modified_def), {"diff_cache": True})
+    assert result["method"] == "update"
+    sent = svc.update.call_args[0][1]
+    assert "kubernetes.core/desired-hash" in sent["metadata"]["annotations"]
@@ -1,11 +1,15 @@
+from copy import deepcopy
 from json import dumps
 from unittest.mock import Mock
 
 import pytest
 from ansible_collections.kubernetes.core.plugins.module_utils.k8s.service import (
+    DESIRED_HASH_ANNOTATION,
     K8sService,
+    desired_hash,
     diff_objects,
     parse_quoted_string,
+    set_desired_hash,
 )
 from kubernetes.dynamic.exceptions import NotFoundError
 from kubernetes.dynamic.resource import Resource, ResourceInstance
@@ -355,6 +359,49 @@ def test_service_update_existing_resource_warnings(
     assert warnings[1] == "test warning 2"
 
 
+def test_desired_hash_ignores_its_annotation_and_status():
+    definition = deepcopy(pod_definition)
+    value = desired_hash(definition)
+    set_desired_hash(definition)
+    assert definition["metadata"]["annotations"] == {DESIRED_HASH_ANNOTATION: value}
+    definition["status"] = {"phase": "Running"}
+    definition["metadata"]["resourceVersion"] = "12"
+    assert desired_hash(definition) == value
+    assert "annotations" not in pod_definition["metadata"]
+    assert desired_hash(pod_definition_updated) != value
+
+
+def test_service_unchanged_lists_each_kind_once_per_namespace():
+    written = deepcopy(pod_definition)
+    set_desired_hash(written)
+    stale = deepcopy(pod_definition)
+    stale["metadata"]["name"] = "stale"
+    stale["metadata"]["annotations"] = {DESIRED_HASH_ANNOTATION: "outdated"}
+    listing = ResourceInstance(None, {"kind": "PodList", "items": [written, stale]})
+    client = Mock(**{"get.return_value": listing})
+    resource = Mock(namespaced=True, group_version="v1", kind="Pod")
+    svc = K8sService(client, Mock())
+
+    assert svc.unchanged(resource, deepcopy(pod_definition)) == written
+    changed = deepcopy(stale)
+    changed["metadata"].pop("annotations")
+    assert svc.unchanged(resource, changed) is None
+    missing = deepcopy(pod_definition)
+    missing["metadata"]["name"] = "missing"
+    assert svc.unchanged(resource, missing) is None
+    client.get.assert_called_once_with(resource, namespace="foo")
+
+    # A definition seen again in the same run is compared as usual
+    assert svc.unchanged(resource, deepcopy(pod_definition)) is None
+
+
+def test_service_unchanged_listing_error():
+    client = Mock(**{"get.side_effect": NotFoundError(Mock())})
+    resource = Mock(namespaced=True, group_version="v1", kind="Pod")
+    svc = K8sService(client, Mock())
+    assert svc.unchanged(resource, pod_definition) is None
+
+
 def test_service_find(mock_pod_resource_instance):
     spec = {"get.side_effect": [mock_pod_resource_instance]}
     client = Mock(**spec)
@@ -404,3 +451,50 @@ def test_parse_quoted_string(quoted_string, expected_val, expected_remainder):
     val, remainder = parse_quoted_string(quoted_string)
     assert val == expected_val
     assert remainder == expected_remainder
+
+
+@pytest.mark.parametrize("diff_cache", [False, True])
+def test_service_update_clears_desired_hash(diff_cache, mock_pod_response):
+    written = deepcopy(pod_definition)
+    set_desired_hash(written)
+    client = Mock(**{"patch.return_value": mock_pod_response})
+    module = Mock(params={"diff_cache": diff_cache})
+    module.check_mode = False
+    svc = K8sService(client, module)
+    definition = deepcopy(pod_definition_updated)
+    if diff_cache:
+        set_desired_hash(definition)
+
+    svc.update(Mock(), definition, ResourceInstance(None, written))
+
+    sent = client.patch.call_args[0][1]
+    expected = desired_hash(definition) if diff_cache else None
+    assert sent["metadata"]["annotations"] == {DESIRED_HASH_ANNOTATION: expected}
+    assert (
+        DESIRED_HASH_ANNOTATION in definition["metadata"].get("annotations", {})
+    ) == diff_cache
+
+
+def test_service_update_without_desired_hash_sends_definition(mock_pod_response):
+    client = Mock(**{"patch.return_value": mock_pod_response})
+    module = Mock(params={})
+    module.check_mode = False
+    svc = K8sService(client, module)
+
+    svc.update(Mock(), pod_definition_updated, ResourceInstance(None, pod_definition))
+
+    assert client.patch.call_args[0][1] is pod_definition_updated
+
+
+def test_service_update_dry_run_drops_desired_hash():
+    written = deepcopy(pod_definition)
+    set_desired_hash(written)
+    module = Mock(params={})
+    module.check_mode = True
+    svc = K8sService(Mock(dry_run=False), module)
+
+    result, warnings = svc.update(
+        Mock(), deepcopy(pod_definition_updated), ResourceInstance(None, written)
+    )
+
+    assert DESIRED_HASH_ANNOTATION not in result["metadata"].get("annotations", {})
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import json
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+from ansible_collections.kubernetes.core.plugins.modules.k8s_log import (
+    execute_module,
+    parse_timestamp,
+)
+
+
+class FakeResponse(object):
+    def __init__(self, data):
+        self.data = data
+
+    def stream(self, amt):
+        # Small pieces so that lines are split across chunks.
+        for offset in range(0, len(self.data), 7):
+            yield self.data[offset : offset + 7]
+
+
+class FakeCluster(object):
+    """Pods and their timestamped log lines, served like the log subresource."""
+
+    def __init__(self, logs, barrier=None):
+        self.logs = logs
+        self.barrier = barrier
+        self.requests = []
+        self.lock = threading.Lock()
+
+        self.pods = MagicMock()
+        self.pods.subresources = {"log": None}
+        self.pods.log.urls = {"base": "/api/v1/namespaces/{namespace}/pods/{name}/log"}
+        self.pods.log.get.side_effect = self.get_log
+        items = []
+        for name in logs:
+            item = MagicMock()
+            item.metadata.name = name
+            items.append(item)
+        self.pods.get.return_value = MagicMock(items=items)
+
+        self.svc = MagicMock()
+        self.svc.find_resource.return_value = self.pods
+
+    def get_log(self, name, namespace, serialize, query_params):
+        with self.lock:
+            self.requests.append((name, dict(query_params)))
+        if self.barrier is not None:
+            self.barrier.wait()
+        since = query_params.get("sinceTime")
+        lines = []
+        for stamp, text in self.logs[name]:
+            if since and stamp.split(".")[0] + "Z" < since:
+                continue
+            if query_params.get("timestamps"):
+                lines.append("%s %s\n" % (stamp, text))
+            else:
+                lines.append(text + "\n")
+        return FakeResponse("".join(lines).encode())
+
+
+def params(**kwargs):
+    result = dict(
+        kind="Pod",
+        api_version="v1",
+        name=None,
+        namespace="nim",
+        label_selectors=["app=nim"],
+        container=None,
+        since_seconds=None,
+        since_time=None,
+        previous=False,
+        tail_lines=None,
+        all_containers=None,
+        all_pods=False,
+        max_workers=4,
+        checkpoint_file=None,
+        log_dir=None,
+        timestamps=False,
+    )
+    result.update(kwargs)
+    return result
+
+
+def replica_logs(count):
+    return dict(
+        (
+            "nim-%d" % index,
+            [
+                ("2025-01-31T08:00:0%d.100Z" % index, "replica %d starting" % index),
+                ("2025-01-31T08:00:0%d.200Z" % index, "replica %d ready" % index),
+            ],
+        )
+        for index in range(count)
+    )
+
+
+def test_parse_timestamp_orders_nanoseconds():
+    assert parse_timestamp("2025-01-31T08:00:00.12345Z") < parse_timestamp(
+        "2025-01-31T08:00:00.123451Z"
+    )
+    assert parse_timestamp("2025-01-31T08:00:00Z") < parse_timestamp(
+        "2025-01-31T08:00:00.000000001Z"
+    )
+
+
+def test_first_pod_only_by_default():
+    cluster = FakeCluster(replica_logs(3))
+    result = execute_module(cluster.svc, params())
+    assert [entry["pod"] for entry in result["logs"]] == ["nim-0"]
+    assert result["log_lines"] == ["replica 0 starting", "replica 0 ready", ""]
+
+
+def test_all_pods_are_fetched_concurrently():
+    # Every request waits for the others: a serial fetch would time out.
+    cluster = FakeCluster(replica_logs(3), barrier=threading.Barrier(3, timeout=5))
+    result = execute_module(cluster.svc, params(all_pods=True, max_workers=3))
+    assert [entry["pod"] for entry in result["logs"]] == ["nim-0", "nim-1", "nim-2"]
+    assert [entry["lines"] for entry in result["logs"]] == [2, 2, 2]
+    assert "replica 2 ready" in result["log_lines"]
+
+
+def test_checkpoint_only_returns_new_lines(tmp_path):
+    logs = replica_logs(2)
+    cluster = FakeCluster(logs)
+    checkpoint = tmp_path / "checkpoint.json"
+
+    first = execute_module(
+        cluster.svc, params(all_pods=True, checkpoint_file=str(checkpoint))
+    )
+    assert first["logs"][0]["log"] == "replica 0 starting\nreplica 0 ready\n"
+    assert json.loads(checkpoint.read_text()) == {
+        "nim/nim-0/": "2025-01-31T08:00:00.200Z",
+        "nim/nim-1/": "2025-01-31T08:00:01.200Z",
+    }
+
+    # A line in the same second as the checkpoint, and a later one.
+    logs["nim-0"].append(("2025-01-31T08:00:00.300Z", "request 1"))
+    logs["nim-0"].append(("2025-01-31T08:05:00.000Z", "request 2"))
+    second = execute_module(
+        cluster.svc, params(all_pods=True, checkpoint_file=str(checkpoint))
+    )
+
+    assert second["logs"][0]["since_time"] == "2025-01-31T08:00:00Z"
+    assert second["logs"][0]["log"] == "request 1\nrequest 2\n"
+    assert second["logs"][1]["lines"] == 0
+    assert json.loads(checkpoint.read_text())["nim/nim-0/"] == (
+        "2025-01-31T08:05:00.000Z"
+    )
+
+
+def test_timestamps_are_kept_on_request():
+    cluster = FakeCluster(replica_logs(1))
+    result = execute_module(cluster.svc, params(timestamps=True))
+    assert result["log_lines"][0] == "2025-01-31T08:00:00.100Z replica 0 starting"
+
+
+def test_log_dir_streams_to_files(tmp_path):
+    logs = replica_logs(2)
+    cluster = FakeCluster(logs)
+    log_dir = tmp_path / "logs"
+    checkpoint = tmp_path / "checkpoint.json"
+    options = params(
+        all_pods=True, log_dir=str(log_dir), checkpoint_file=str(checkpoint)
+    )
+
+    result = execute_module(cluster.svc, options)
+    assert result["changed"] is True
+    assert "log" not in result
+    assert result["logs"][1]["file"] == str(log_dir / "nim_nim-1.log")
+    assert (log_dir / "nim_nim-1.log").read_text() == (
+        "replica 1 starting\nreplica 1 ready\n"
+    )
+
+    logs["nim-1"].append(("2025-01-31T09:00:00.000Z", "scaled"))
+    result = execute_module(cluster.svc, options)
+    assert [entry["lines"] for entry in result["logs"]] == [0, 1]
+    assert (log_dir / "nim_nim-1.log").read_text() == (
+        "replica 1 starting\nreplica 1 ready\nscaled\n"
+    )
+
+
+def test_check_mode_does_not_write(tmp_path):
+    cluster = FakeCluster(replica_logs(1))
+    checkpoint = tmp_path / "checkpoint.json"
+    execute_module(
+        cluster.svc,
+        params(log_dir=str(tmp_path / "logs"), checkpoint_file=str(checkpoint)),
+        check_mode=True,
+    )
+    assert not checkpoint.exists()
+    assert not (tmp_path / "logs").exists()
+
+
+@pytest.mark.parametrize("since", ["since_seconds", "since_time"])
+def test_since_parameters_are_forwarded(since):
+    cluster = FakeCluster(replica_logs(1))
+    value = "3600" if since == "since_seconds" else "2025-01-31T08:00:00Z"
+    execute_module(cluster.svc, params(**{since: value}))
+    query = cluster.requests[0][1]
+    assert (
+        query[{"since_seconds": "sinceSeconds", "since_time": "sinceTime"}[since]]
+        == value
+    )
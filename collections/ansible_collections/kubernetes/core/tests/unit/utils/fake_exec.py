@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Stand-in for the pod exec API used by module_utils/copy.py. Commands run
+# locally with subprocess and their output is cut into channel frames, so the
+# "pod filesystem" is simply the local one.
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import json
+import os
+import queue
+import subprocess
+import threading
+
+from ansible_collections.kubernetes.core.plugins.module_utils.copy import (
+    ERROR_CHANNEL,
+    STDERR_CHANNEL,
+    STDOUT_CHANNEL,
+    ExecStream,
+)
+
+
+def _status(command, returncode):
+    if returncode == 0:
+        return {"metadata": {}, "status": "Success"}
+    return {
+        "metadata": {},
+        "status": "Failure",
+        "message": "command terminated with non-zero exit code: error executing command %s, exit code %d"
+        % (command, returncode),
+        "reason": "NonZeroExitCode",
+        "details": {"causes": [{"reason": "ExitCode", "message": str(returncode)}]},
+    }
+
+
+class LocalExec(ExecStream):
+    """
+    ExecStream running the command locally.
+
+    ``drop_after`` simulates a websocket drop once that many bytes went through
+    stdout or stdin. ``v5=False`` emulates the v4 protocol, stdin can then only
+    be closed together with the stream.
+    """
+
+    def __init__(
+        self,
+        command,
+        stdin=False,
+        frame_size=32 * 1024,
+        drop_after=None,
+        v5=True,
+        missing=(),
+        cwd=None,
+    ):
+        super(LocalExec, self).__init__()
+        if isinstance(command, str):
+            command = [command]
+        self.command = command
+        self.frame_size = frame_size
+        self.drop_after = drop_after
+        self.v5 = v5
+        # Bounded like a socket buffer, the command blocks when nobody reads.
+        self.frames = queue.Queue(maxsize=16)
+        self._connected = True
+        self.stdout_bytes = 0
+        self.stdin_bytes = 0
+        self.process = None
+
+        try:
+            if command[0] in missing:
+                raise OSError("not found")
+            self.process = subprocess.Popen(
+                command,
+                stdin=subprocess.PIPE if stdin else subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                cwd=cwd,
+            )
+        except OSError:
+            message = 'exec: "%s": executable file not found in $PATH' % command[0]
+            self.frames.put(
+                (
+                    ERROR_CHANNEL,
+                    json.dumps({"status": "Failure", "message": message}).encode(),
+                )
+            )
+            self.frames.put(None)
+            return
+
+        pumps = [
+            threading.Thread(
+                target=self._pump, args=(self.process.stdout, STDOUT_CHANNEL)
+            ),
+            threading.Thread(
+                target=self._pump, args=(self.process.stderr, STDERR_CHANNEL)
+            ),
+        ]
+        for pump in pumps:
+            pump.daemon = True
+            pump.start()
+        watcher = threading.Thread(target=self._watch, args=(pumps,))
+        watcher.daemon = True
+        watcher.start()
+
+    def _pump(self, pipe, channel):
+        fd = pipe.fileno()
+        while True:
+            data = os.read(fd, self.frame_size)
+            if not data:
+                return
+            if channel == STDOUT_CHANNEL and self.drop_after is not None:
+                left = self.drop_after - self.stdout_bytes
+                if left <= len(data):
+                    self.frames.put((channel, data[:left]))
+                    self.stdout_bytes += left
+                    self._drop()
+                    return
+            if channel == STDOUT_CHANNEL:
+                self.stdout_bytes += len(data)
+            self.frames.put((channel, data))
+
+    def _watch(self, pumps):
+        for pump in pumps:
+            pump.join()
+        returncode = self.process.wait()
+        if self.drop_after is None or self.stdout_bytes < self.drop_after:
+            self.frames.put(
+                (ERROR_CHANNEL, json.dumps(_status(self.command, returncode)).encode())
+            )
+        self.frames.put(None)
+
+    def _drop(self):
+        self.drop_after = -1
+        self.frames.put(None)
+        if self.process.poll() is None:
+            self.process.kill()
+
+    @property
+    def connected(self):
+        return self._connected
+
+    def _next_frame(self, timeout):
+        try:
+            frame = self.frames.get(timeout=timeout)
+        except queue.Empty:
+            return None, None
+        if frame is None:
+            self._connected = False
+            return None, None
+        return frame
+
+    def write(self, data):
+        if not self._connected or self.drop_after == -1:
+            raise ConnectionError("connection to the exec endpoint was lost")
+        if (
+            self.drop_after is not None
+            and self.stdin_bytes + len(data) >= self.drop_after
+        ):
+            self.process.stdin.write(data[: self.drop_after - self.stdin_bytes])
+            self.process.stdin.flush()
+            self.stdin_bytes = self.drop_after
+            self._drop()
+            self.close()
+            raise ConnectionError("connection to the exec endpoint was lost")
+        self.process.stdin.write(data)
+        self.stdin_bytes += len(data)
+
+    def close_stdin(self):
+        if not self.v5:
+            return False
+        self.process.stdin.close()
+        return True
+
+    def close(self):
+        self._connected = False
+        if self.process is None:
+            return
+        if self.process.stdin and not self.process.stdin.closed:
+            try:
+                self.process.stdin.close()
+            except BrokenPipeError:
+                pass
+        if self.v5 or self.drop_after == -1:
+            self.process.wait()
+
+
+class FakeExecEndpoint(object):
+    """
+    Factory handing out LocalExec streams and recording every command.
+
+    ``drops`` maps a substring of the command line to the list of byte counts
+    after which the next matching streams are dropped.
+    """
+
+    def __init__(self, drops=None, **options):
+        self.calls = []
+        self.drops = dict((key, list(value)) for key, value in (drops or {}).items())
+        self.options = options
+
+    def __call__(self, command, stdin=False):
+        self.calls.append(command)
+        drop_after = None
+        line = " ".join(command) if isinstance(command, list) else command
+        for pattern, sizes in self.drops.items():
+            if pattern in line and sizes:
+                drop_after = sizes.pop(0)
+                break
+        return LocalExec(command, stdin=stdin, drop_after=drop_after, **self.options)
+
+    def commands(self, name):
+        return [call for call in self.calls if call[0] == name]
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import os
+
+from ansible.errors import AnsibleActionFail
+from ansible.module_utils._text import to_text
+from ansible.module_utils.parsing.convert_bool import boolean
+from ansible.plugins.action import ActionBase
+from ansible_collections.smartscaler.installer.plugins.module_utils.charts import (
+    ChartStore,
+)
+
+
+def chart_dir(chart, src):
+    """Local directory of a chart item, as roles/helm_chart_install builds it."""
+    return "%s/%s" % (chart.get("local_chart_path") or src, chart["chart_ref"])
+
+
+class ActionModule(ActionBase):
+    _VALID_ARGS = frozenset(("charts", "src", "dest", "use_local_charts"))
+
+    def run(self, tmp=None, task_vars=None):
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp
+
+        args = self._task.args
+        src = args.get("src") or "files/charts"
+        dest = args.get("dest") or "output/.chart_store"
+        use_local = boolean(args.get("use_local_charts", True), strict=False)
+
+        store = ChartStore(dest)
+        charts, packaged = {}, []
+        for chart in args.get("charts") or []:
+            if not chart.get("chart_ref"):
+                raise AnsibleActionFail("every chart needs a chart_ref")
+            if not boolean(chart.get("use_local_chart", use_local), strict=False):
+                continue
+            directory = chart_dir(chart, src)
+            # Charts that are not local come from their repository.
+            if directory in charts or not os.path.isfile(
+                os.path.join(directory, "Chart.yaml")
+            ):
+                continue
+            try:
+                entry, written = store.add(directory)
+            except (IOError, OSError, ValueError) as e:
+                raise AnsibleActionFail(
+                    "Could not package %s: %s" % (directory, to_text(e))
+                )
+            charts[directory] = entry
+            if written:
+                packaged.append(directory)
+        store.save()
+
+        result.update(
+            changed=bool(packaged),
+            charts=charts,
+            packaged=packaged,
+            index=store.index_file,
+        )
+        missing = [
+            "%s needs %s" % (directory, ", ".join(entry["missing_dependencies"]))
+            for directory, entry in sorted(charts.items())
+            if entry["missing_dependencies"]
+        ]
+        if missing:
+            result["warnings"] = [
+                "Dependencies missing from charts/, helm will reject: %s"
+                % "; ".join(missing)
+            ]
+        return result
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import base64
+import json
+
+from ansible.errors import AnsibleActionFail, AnsibleError
+from ansible.module_utils._text import to_bytes, to_text
+from ansible.module_utils.six import string_types
+from ansible.plugins.action import ActionBase
+
+# Same default as kubectl create secret docker-registry
+DEFAULT_DOCKER_SERVER = "https://index.docker.io/v1/"
+OBJECT_KEYS = frozenset(
+    ("name", "type", "docker_registry", "literals", "files", "labels", "annotations")
+)
+
+
+def b64(data):
+    return to_text(base64.b64encode(to_bytes(data)))
+
+
+def docker_config(registry):
+    """.dockerconfigjson content, as written by kubectl create secret docker-registry."""
+    username = to_text(registry.get("username") or "")
+    password = to_text(registry.get("password") or "")
+    entry = dict(
+        username=username,
+        password=password,
+        auth=b64("%s:%s" % (username, password)),
+    )
+    if registry.get("email"):
+        entry["email"] = to_text(registry["email"])
+    server = registry.get("server") or DEFAULT_DOCKER_SERVER
+    return json.dumps(dict(auths={server: entry}), sort_keys=True)
+
+
+def build(kind, spec, namespace, files):
+    """Definition of a Secret or ConfigMap from its spec.
+
+    I(files) maps the keys of C(spec.files) to the bytes read from them.
+    Secret values are base64 encoded; ConfigMap values that are not UTF-8
+    go to binaryData.
+    """
+    unknown = set(spec) - OBJECT_KEYS
+    if unknown:
+        raise AnsibleActionFail(
+            "%s %s: unsupported keys %s"
+            % (kind, spec.get("name"), ", ".join(sorted(unknown)))
+        )
+    if not spec.get("name"):
+        raise AnsibleActionFail("every %s needs a name" % kind)
+
+    values = {}
+    if spec.get("docker_registry"):
+        if kind != "Secret":
+            raise AnsibleActionFail(
+                "%s %s: docker_registry is only valid for secrets"
+                % (kind, spec["name"])
+            )
+        values[".dockerconfigjson"] = to_bytes(docker_config(spec["docker_registry"]))
+    for key, value in (spec.get("literals") or {}).items():
+        values[key] = to_bytes(value if isinstance(value, string_types) else str(value))
+    for key, data in files.items():
+        if key in values:
+            raise AnsibleActionFail(
+                "%s %s: key %s is defined twice" % (kind, spec["name"], key)
+            )
+        values[key] = data
+
+    metadata = dict(name=spec["name"], namespace=namespace)
+    for field in ("labels", "annotations"):
+        if spec.get(field):
+            metadata[field] = dict(
+                (to_text(k), to_text(v)) for k, v in spec[field].items()
+            )
+    definition = dict(apiVersion="v1", kind=kind, metadata=metadata)
+
+    if kind == "Secret":
+        definition["type"] = spec.get("type") or (
+            "kubernetes.io/dockerconfigjson"
+            if spec.get("docker_registry")
+            else "Opaque"
+        )
+        definition["data"] = dict((key, b64(value)) for key, value in values.items())
+        return definition
+
+    data, binary = {}, {}
+    for key, value in values.items():
+        try:
+            data[key] = value.decode("utf-8")
+        except UnicodeDecodeError:
+            binary[key] = b64(value)
+    definition["data"] = data
+    if binary:
+        definition["binaryData"] = binary
+    return definition
+
+
+class ActionModule(ActionBase):
+    _VALID_ARGS = frozenset(("namespace", "secrets", "configmaps"))
+
+    def _read_file(self, src):
+        try:
+            source = self._find_needle("files", src)
+            real = self._loader.get_real_file(source, decrypt=True)
+        except AnsibleError as e:
+            raise AnsibleActionFail(to_text(e))
+        try:
+            with open(real, "rb") as f:
+                return f.read()
+        finally:
+            self._loader.cleanup_tmp_file(real)
+
+    def run(self, tmp=None, task_vars=None):
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp
+
+        args = self._task.args
+        namespace = args.get("namespace")
+        if not namespace:
+            raise AnsibleActionFail("namespace is required")
+
+        definitions = []
+        for kind, key in (("Secret", "secrets"), ("ConfigMap", "configmaps")):
+            for spec in args.get(key) or []:
+                if not isinstance(spec, dict):
+                    raise AnsibleActionFail("%s must be a list of dicts" % key)
+                files = dict(
+                    (name, self._read_file(src))
+                    for name, src in (spec.get("files") or {}).items()
+                )
+                definitions.append(build(kind, spec, namespace, files))
+
+        result.update(
+            changed=False,
+            definitions=definitions,
+            resources=[
+                "%s/%s/%s" % (d["kind"], namespace, d["metadata"]["name"])
+                for d in definitions
+            ],
+            keys=dict(
+                (
+                    d["metadata"]["name"],
+                    sorted(list(d["data"]) + list(d.get("binaryData") or {})),
+                )
+                for d in definitions
+            ),
+        )
+        return result
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import yaml
+from ansible.errors import AnsibleActionFail, AnsibleError
+from ansible.module_utils._text import to_text
+from ansible.plugins.action import ActionBase
+from ansible.utils.display import Display
+from ansible_collections.smartscaler.installer.plugins.module_utils.crds import (
+    CONDITIONS,
+    CRDWatch,
+    crd_names,
+)
+from ansible_collections.smartscaler.installer.plugins.module_utils.kubespray_events import (
+    format_duration,
+)
+from ansible_collections.smartscaler.installer.plugins.module_utils.watch import (
+    watch_until,
+)
+
+display = Display()
+
+# Knative's CRD bundle alone is over 400 KiB of YAML
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def wait_for_crds(resource, tracker, timeout, status_interval, show):
+    """Watch all CRDs until I(tracker) is done or I(timeout) seconds passed.
+
+    A watch without a resourceVersion starts with an ADDED event for every
+    existing CRD, so no separate list is needed and CRDs that are already
+    established are found at once. A watch that fails is shown as a status
+    line and started again, see watch_until. Returns the seconds waited.
+    """
+    return watch_until(resource, tracker, timeout, status_interval, show)
+
+
+class ActionModule(ActionBase):
+    _VALID_ARGS = frozenset(
+        (
+            "src",
+            "names",
+            "conditions",
+            "timeout",
+            "status_interval",
+            "kubeconfig",
+            "context",
+        )
+    )
+
+    def _names_in(self, src):
+        try:
+            source = self._find_needle("files", src)
+            real = self._loader.get_real_file(source)
+        except AnsibleError as e:
+            raise AnsibleActionFail(to_text(e))
+        try:
+            with open(real, "rb") as f:
+                return crd_names(yaml.load_all(f, Loader=SafeLoader))
+        except yaml.YAMLError as e:
+            raise AnsibleActionFail("%s is not valid YAML: %s" % (src, e))
+        finally:
+            self._loader.cleanup_tmp_file(real)
+
+    def _resource(self, args):
+        try:
+            from ansible_collections.kubernetes.core.plugins.module_utils.k8s.client import (
+                get_api_client,
+            )
+
+            client = get_api_client(
+                kubeconfig=args.get("kubeconfig"), context=args.get("context")
+            )
+            return client.resource(
+                "CustomResourceDefinition", "apiextensions.k8s.io/v1"
+            )
+        except Exception as e:
+            raise AnsibleActionFail(
+                "Failed to look up CustomResourceDefinitions: %s" % e
+            )
+
+    def run(self, tmp=None, task_vars=None):
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp
+
+        args = self._task.args
+        names = list(args.get("names") or [])
+        for src in (
+            args.get("src") if isinstance(args.get("src"), list) else [args.get("src")]
+        ):
+            if src:
+                names.extend(name for name in self._names_in(src) if name not in names)
+        if not names:
+            raise AnsibleActionFail("no CustomResourceDefinition found in src or names")
+
+        timeout = float(args.get("timeout", 300))
+        tracker = CRDWatch(names, args.get("conditions") or CONDITIONS)
+
+        def show(lines):
+            for line in lines:
+                display.display("CRDs | %s" % line)
+
+        waited = wait_for_crds(
+            self._resource(args),
+            tracker,
+            timeout,
+            float(args.get("status_interval", 30)),
+            show,
+        )
+
+        result.update(tracker.result())
+        result.update(changed=False, elapsed=round(waited, 1))
+        if not tracker.done:
+            result.update(
+                failed=True,
+                msg="CRDs not established after %s: %s"
+                % (format_duration(timeout), tracker.status_line()),
+            )
+        return result
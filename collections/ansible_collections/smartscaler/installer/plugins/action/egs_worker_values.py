@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import time
+
+from ansible.errors import AnsibleActionFail
+from ansible.plugins.action import ActionBase
+from ansible.utils.display import Display
+from ansible_collections.smartscaler.installer.plugins.module_utils.egs_workers import (
+    CONTROLLER_SECRET_KEYS,
+    SecretCollector,
+    agent_endpoint,
+    agent_key,
+    worker_secret_name,
+    worker_values,
+)
+from ansible_collections.smartscaler.installer.plugins.module_utils.kubespray_events import (
+    format_duration,
+)
+
+display = Display()
+
+
+def collect_secrets(resource, namespace, collector, timeout, status_interval, show):
+    """Read the Secrets of I(collector) from I(namespace).
+
+    One list of the namespace reads every Secret that exists already. The
+    ones the controller has not created or filled in yet are taken from a
+    watch that starts at the version of that list, so nothing is read
+    twice. Returns the seconds waited.
+    """
+    started = time.time()
+    listing = resource.get(namespace=namespace).to_dict()
+    for obj in listing.get("items") or []:
+        show(collector.feed("ADDED", obj))
+    version = (listing.get("metadata") or {}).get("resourceVersion")
+    while not collector.done:
+        remaining = timeout - (time.time() - started)
+        if remaining <= 0:
+            break
+        for event in resource.watch(
+            namespace=namespace,
+            resource_version=version,
+            timeout=max(1, int(min(remaining, status_interval))),
+        ):
+            obj = event["raw_object"]
+            version = (obj.get("metadata") or {}).get("resourceVersion") or version
+            show(collector.feed(event["type"], obj))
+            if collector.done:
+                break
+        if not collector.done and time.time() - started < timeout:
+            show(
+                [
+                    "%s elapsed, %s"
+                    % (format_duration(time.time() - started), collector.status_line())
+                ]
+            )
+    return time.time() - started
+
+
+class ActionModule(ActionBase):
+    _VALID_ARGS = frozenset(
+        (
+            "namespace",
+            "clusters",
+            "admin_secret",
+            "agent_secret_name",
+            "ui_proxy_service",
+            "ui_proxy_namespace",
+            "timeout",
+            "status_interval",
+            "kubeconfig",
+            "context",
+        )
+    )
+
+    def _client(self, args):
+        try:
+            from ansible_collections.kubernetes.core.plugins.module_utils.k8s.client import (
+                get_api_client,
+            )
+
+            return get_api_client(
+                kubeconfig=args.get("kubeconfig"), context=args.get("context")
+            )
+        except Exception as e:
+            raise AnsibleActionFail(
+                "Failed to connect to the controller cluster: %s" % e
+            )
+
+    def run(self, tmp=None, task_vars=None):
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp
+
+        args = self._task.args
+        namespace = args.get("namespace")
+        clusters = list(args.get("clusters") or [])
+        if not namespace or not clusters:
+            raise AnsibleActionFail("namespace and clusters are required")
+        admin_secret = args.get("admin_secret") or "kubeslice-rbac-rw-admin"
+        proxy_service = args.get("ui_proxy_service") or "kubeslice-ui-proxy"
+        proxy_namespace = args.get("ui_proxy_namespace") or "kubeslice-controller"
+
+        required = dict(
+            (
+                worker_secret_name(cluster),
+                [source for _, source in CONTROLLER_SECRET_KEYS],
+            )
+            for cluster in clusters
+        )
+        required[admin_secret] = ["token"]
+        collector = SecretCollector(required)
+
+        def show(lines):
+            for line in lines:
+                display.display("EGS workers | %s" % line)
+
+        client = self._client(args)
+        timeout = float(args.get("timeout", 300))
+        try:
+            service = (
+                client.resource("Service", "v1")
+                .get(name=proxy_service, namespace=proxy_namespace)
+                .to_dict()
+            )
+            waited = collect_secrets(
+                client.resource("Secret", "v1"),
+                namespace,
+                collector,
+                timeout,
+                float(args.get("status_interval", 30)),
+                show,
+            )
+        except Exception as e:
+            raise AnsibleActionFail("Failed to read the EGS controller Secrets: %s" % e)
+
+        result.update(changed=False, elapsed=round(waited, 1))
+        if not collector.done:
+            result.update(
+                failed=True,
+                missing=collector.missing,
+                msg="Secrets not ready after %s: %s"
+                % (format_duration(timeout), collector.status_line()),
+            )
+            return result
+
+        agent_secret_name = args.get("agent_secret_name") or "egs-agent-access"
+        try:
+            endpoint = agent_endpoint(service, proxy_namespace)
+            key = agent_key(collector.secrets[admin_secret])
+            values = dict(
+                (
+                    cluster,
+                    worker_values(
+                        collector.secrets[worker_secret_name(cluster)],
+                        endpoint,
+                        key,
+                        agent_secret_name,
+                    ),
+                )
+                for cluster in clusters
+            )
+        except ValueError as e:
+            raise AnsibleActionFail(str(e))
+        result.update(
+            agent_endpoint=endpoint, secrets=sorted(collector.secrets), values=values
+        )
+        return result
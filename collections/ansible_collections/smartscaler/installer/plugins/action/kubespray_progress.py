@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import time
+
+from ansible.errors import AnsibleActionFail
+from ansible.module_utils.parsing.convert_bool import boolean
+from ansible.plugins.action import ActionBase
+from ansible.utils.display import Display
+from ansible_collections.smartscaler.installer.plugins.module_utils.kubespray_events import (
+    ProgressTracker,
+    format_duration,
+    read_events,
+)
+
+display = Display()
+
+
+class ActionModule(ActionBase):
+    _VALID_ARGS = frozenset(
+        (
+            "jid",
+            "events_file",
+            "poll_interval",
+            "status_interval",
+            "slow_task_threshold",
+            "slowest",
+            "show_hosts",
+        )
+    )
+
+    def _async_status(self, jid, task_vars):
+        async_dir = self._remote_expand_user(
+            self.get_shell_option("async_dir", default="~/.ansible_async")
+        )
+        return self._execute_module(
+            module_name="ansible.builtin.async_status",
+            module_args=dict(jid=jid, mode="status", _async_dir=async_dir),
+            task_vars=task_vars,
+        )
+
+    def _show(self, lines):
+        for line in lines:
+            display.display("kubespray | %s" % line)
+
+    def run(self, tmp=None, task_vars=None):
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp
+
+        args = self._task.args
+        jid = args.get("jid")
+        events_file = args.get("events_file")
+        if not jid or not events_file:
+            raise AnsibleActionFail("jid and events_file are required")
+        poll_interval = float(args.get("poll_interval", 5))
+        status_interval = float(args.get("status_interval", 60))
+        slowest = int(args.get("slowest", 10))
+        show_hosts = boolean(args.get("show_hosts", True), strict=False)
+        tracker = ProgressTracker(
+            slow_task_threshold=float(args.get("slow_task_threshold", 60))
+        )
+
+        offset = 0
+        last_status = time.time()
+        while True:
+            status = self._async_status(jid, task_vars)
+            events, offset = read_events(events_file, offset)
+            for event in events:
+                self._show(tracker.feed(event))
+            if status.get("finished") or status.get("failed"):
+                break
+            if time.time() - last_status >= status_interval:
+                last_status = time.time()
+                self._show([tracker.status_line()])
+                if show_hosts:
+                    self._show(tracker.host_lines())
+            time.sleep(poll_interval)
+
+        progress = tracker.result(slowest)
+        self._show(
+            [
+                "finished after %s, slowest tasks:"
+                % format_duration(progress["duration"])
+            ]
+            + [
+                "  %s  %s (%s)"
+                % (format_duration(timing["duration"]), timing["task"], timing["host"])
+                for timing in progress["slowest_tasks"]
+            ]
+        )
+
+        status.pop("ansible_job_id", None)
+        status.pop("started", None)
+        result.update(status)
+        result.update(
+            ansible_job_id=jid,
+            progress=progress,
+            slowest_tasks=progress["slowest_tasks"],
+        )
+        return result
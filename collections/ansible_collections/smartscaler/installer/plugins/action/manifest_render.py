@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import hashlib
+import json
+import os
+
+import yaml
+from ansible.errors import AnsibleActionFail, AnsibleError
+from ansible.module_utils._text import to_bytes, to_text
+from ansible.module_utils.parsing.convert_bool import boolean
+from ansible.plugins.action import ActionBase
+from ansible.template import AnsibleEnvironment
+from ansible.utils.display import Display
+
+display = Display()
+
+
+def digest(data):
+    """sha256 of I(data), serialized as sorted JSON unless it is bytes."""
+    if not isinstance(data, bytes):
+        data = to_bytes(json.dumps(data, sort_keys=True, default=to_text))
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_digest(path):
+    """sha256 of the content of I(path), None when it is gone."""
+    try:
+        with open(path, "rb") as f:
+            return digest(f.read())
+    except (IOError, OSError):
+        return None
+
+
+def cache_key(template, variables, context, inputs=None):
+    """Key of a render: what is templated, with what, and for which cluster.
+
+    I(inputs) maps the files declared as inputs of the template to their
+    digests.
+    """
+    parts = [digest(template), digest(variables), digest(context)]
+    if inputs:
+        parts.append(digest(inputs))
+    return digest("\n".join(parts).encode())
+
+
+def changed_inputs(recorded):
+    """Files read by the last render whose content is no longer the same."""
+    return sorted(path for path, sha in recorded.items() if file_digest(path) != sha)
+
+
+class RecordingLoader(object):
+    """DataLoader proxy recording the files that lookups read."""
+
+    def __init__(self, loader):
+        self.loader = loader
+        self.files = set()
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+    def _get_file_contents(self, file_name):
+        self.files.add(to_text(file_name, errors="surrogate_or_strict"))
+        return self.loader._get_file_contents(file_name)
+
+    def get_real_file(self, file_path, decrypt=True):
+        self.files.add(to_text(file_path, errors="surrogate_or_strict"))
+        return self.loader.get_real_file(file_path, decrypt=decrypt)
+
+
+def load_definitions(data):
+    """Definitions from inline content or a rendered multi-document YAML."""
+    if isinstance(data, dict):
+        return [data]
+    if isinstance(data, list):
+        return [definition for definition in data if definition]
+    try:
+        return [definition for definition in yaml.safe_load_all(data) if definition]
+    except yaml.YAMLError as e:
+        raise AnsibleActionFail("Rendered manifest is not valid YAML: %s" % e)
+
+
+def references(definitions):
+    """apiVersion, kind, namespace and name of each definition."""
+    return [
+        dict(
+            api_version=definition.get("apiVersion"),
+            kind=definition.get("kind"),
+            namespace=(definition.get("metadata") or {}).get("namespace"),
+            name=(definition.get("metadata") or {}).get("name"),
+        )
+        for definition in definitions
+    ]
+
+
+def missing_objects(client, objects, namespace=None):
+    """Objects of I(objects) that are not in the cluster any more.
+
+    Namespaced objects without a namespace are looked up in I(namespace), as
+    kubernetes.core.k8s applies them there.
+    """
+    from kubernetes.dynamic.exceptions import NotFoundError
+
+    missing = []
+    for obj in objects:
+        resource = client.resource(obj["kind"], obj["api_version"])
+        params = dict(name=obj["name"])
+        if resource.namespaced:
+            params["namespace"] = obj.get("namespace") or namespace or "default"
+        try:
+            resource.get(**params)
+        except NotFoundError:
+            missing.append(obj)
+    return missing
+
+
+def describe(definitions):
+    return [
+        "/".join(
+            part
+            for part in (
+                definition.get("kind"),
+                (definition.get("metadata") or {}).get("namespace"),
+                (definition.get("metadata") or {}).get("name"),
+            )
+            if part
+        )
+        for definition in definitions
+    ]
+
+
+class ActionModule(ActionBase):
+    _VALID_ARGS = frozenset(
+        (
+            "src",
+            "content",
+            "variables",
+            "inputs",
+            "cache_dir",
+            "cache_context",
+            "cache_verify",
+            "kubeconfig",
+            "context",
+            "namespace",
+        )
+    )
+
+    def _inputs(self, paths):
+        """Digests of the declared input files, by path."""
+        inputs = {}
+        for path in paths:
+            try:
+                found = self._find_needle("files", path)
+            except AnsibleError as e:
+                raise AnsibleActionFail(to_text(e))
+            inputs[path] = file_digest(found)
+        return inputs
+
+    def _read_template(self, src):
+        try:
+            source = self._find_needle("templates", src)
+            real = self._loader.get_real_file(source)
+        except AnsibleError as e:
+            raise AnsibleActionFail(to_text(e))
+        try:
+            with open(real, "rb") as f:
+                return source, f.read()
+        finally:
+            self._loader.cleanup_tmp_file(real)
+
+    def _render(self, source, data, variables, task_vars):
+        searchpath = list(task_vars.get("ansible_search_path", []))
+        searchpath.extend([self._loader._basedir, os.path.dirname(source)])
+        temp_vars = task_vars.copy()
+        temp_vars["manifest_vars"] = variables
+        # Lookups are bound to the task templar, record what they read there.
+        recorder = RecordingLoader(self._templar._loader)
+        templar = self._templar.copy_with_new_env(
+            environment_class=AnsibleEnvironment,
+            searchpath=[
+                path
+                for base in searchpath
+                for path in (os.path.join(base, "templates"), base)
+            ],
+            available_variables=temp_vars,
+        )
+        self._templar._loader = recorder
+        try:
+            rendered = templar.do_template(
+                to_text(data, errors="surrogate_or_strict"),
+                preserve_trailing_newlines=True,
+                escape_backslashes=False,
+            )
+        except Exception as e:
+            raise AnsibleActionFail("%s: %s" % (type(e).__name__, to_text(e)))
+        finally:
+            self._templar._loader = recorder.loader
+        return rendered, recorder.files
+
+    def _cache_hit(self, entry, args):
+        """Whether the applied render of I(entry) is still current.
+
+        The files the render read must be unchanged, and with I(cache_verify)
+        every object it applied must still exist in the cluster.
+        """
+        changed = changed_inputs(entry.get("inputs") or {})
+        if changed:
+            display.vvv("manifest_render: changed inputs %s" % ", ".join(changed))
+            return False
+        if not boolean(args.get("cache_verify", True)):
+            return True
+        if "objects" not in entry:
+            return False
+        try:
+            from ansible_collections.kubernetes.core.plugins.module_utils.k8s.client import (
+                get_api_client,
+            )
+
+            client = get_api_client(
+                kubeconfig=args.get("kubeconfig"), context=args.get("context")
+            )
+            missing = missing_objects(client, entry["objects"], args.get("namespace"))
+        except Exception as e:
+            display.vvv("manifest_render: cannot verify the cached objects: %s" % e)
+            return False
+        if missing:
+            display.vvv(
+                "manifest_render: %s gone from the cluster"
+                % ", ".join("%s/%s" % (obj["kind"], obj["name"]) for obj in missing)
+            )
+        return not missing
+
+    def run(self, tmp=None, task_vars=None):
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp
+
+        args = self._task.args
+        src = args.get("src")
+        content = args.get("content")
+        if (src is None) == (content is None):
+            raise AnsibleActionFail("exactly one of src and content is required")
+        variables = args.get("variables") or {}
+
+        if src is not None:
+            source, template = self._read_template(src)
+        else:
+            source, template = None, content
+
+        result.update(
+            changed=False,
+            cached=False,
+            definitions=[],
+            resources=[],
+            objects=[],
+            inputs={},
+        )
+        cache_dir = args.get("cache_dir")
+        if cache_dir:
+            context = dict(args.get("cache_context") or {})
+            kubeconfig = args.get("kubeconfig")
+            if kubeconfig and os.path.isfile(kubeconfig):
+                # A rebuilt cluster comes with new credentials.
+                with open(kubeconfig, "rb") as f:
+                    context["kubeconfig"] = digest(f.read())
+            key = cache_key(
+                template, variables, context, self._inputs(args.get("inputs") or [])
+            )
+            cache_file = os.path.join(cache_dir, key + ".json")
+            result.update(cache_key=key, cache_file=cache_file)
+            if os.path.exists(cache_file):
+                with open(cache_file) as f:
+                    entry = json.load(f)
+                if self._cache_hit(entry, args):
+                    result.update(
+                        cached=True,
+                        resources=entry.get("resources", []),
+                        objects=entry.get("objects", []),
+                        inputs=entry.get("inputs", {}),
+                    )
+                    return result
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir)
+
+        files = set()
+        if source is not None:
+            rendered, files = self._render(source, template, variables, task_vars)
+            definitions = load_definitions(rendered)
+        else:
+            definitions = load_definitions(content)
+        result.update(
+            definitions=definitions,
+            resources=describe(definitions),
+            objects=references(definitions),
+            inputs=dict((path, file_digest(path)) for path in sorted(files)),
+        )
+        return result
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+from ansible.errors import AnsibleActionFail
+from ansible.plugins.action import ActionBase
+from ansible.utils.display import Display
+from ansible_collections.smartscaler.installer.plugins.module_utils.kubespray_events import (
+    format_duration,
+)
+from ansible_collections.smartscaler.installer.plugins.module_utils.nimcache import (
+    NIMCacheWatch,
+)
+from ansible_collections.smartscaler.installer.plugins.module_utils.watch import (
+    watch_until,
+)
+
+display = Display()
+
+
+def wait_for_cache(resource, name, namespace, tracker, timeout, status_interval, show):
+    """Watch one object until I(tracker) is done or I(timeout) seconds passed.
+
+    A watch that fails, for example on an API server restart during a long
+    model download, is shown as a status line and started again, see
+    watch_until. Returns the seconds waited.
+    """
+    return watch_until(
+        resource,
+        tracker,
+        timeout,
+        status_interval,
+        show,
+        namespace=namespace,
+        name=name,
+    )
+
+
+class ActionModule(ActionBase):
+    _VALID_ARGS = frozenset(
+        (
+            "name",
+            "namespace",
+            "api_version",
+            "kind",
+            "condition",
+            "timeout",
+            "status_interval",
+            "percent_step",
+            "kubeconfig",
+            "context",
+        )
+    )
+
+    def _resource(self, args):
+        try:
+            from ansible_collections.kubernetes.core.plugins.module_utils.k8s.client import (
+                get_api_client,
+            )
+
+            client = get_api_client(
+                kubeconfig=args.get("kubeconfig"), context=args.get("context")
+            )
+            return client.resource(
+                args.get("kind", "NIMCache"),
+                args.get("api_version", "apps.nvidia.com/v1alpha1"),
+            )
+        except Exception as e:
+            raise AnsibleActionFail(
+                "Failed to look up %s: %s" % (args.get("kind", "NIMCache"), e)
+            )
+
+    def run(self, tmp=None, task_vars=None):
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp
+
+        args = self._task.args
+        name = args.get("name")
+        namespace = args.get("namespace")
+        if not name or not namespace:
+            raise AnsibleActionFail("name and namespace are required")
+        kind = args.get("kind", "NIMCache")
+        timeout = float(args.get("timeout", 1200))
+        tracker = NIMCacheWatch(
+            condition=args.get("condition", "Ready"),
+            percent_step=float(args.get("percent_step", 5)),
+        )
+        label = "%s %s/%s" % (kind, namespace, name)
+
+        def show(lines):
+            for line in lines:
+                display.display("%s | %s" % (label, line))
+
+        waited = wait_for_cache(
+            self._resource(args),
+            name,
+            namespace,
+            tracker,
+            timeout,
+            float(args.get("status_interval", 30)),
+            show,
+        )
+
+        result.update(tracker.result())
+        result.update(changed=False, elapsed=round(waited, 1))
+        if tracker.phase == "failed":
+            result.update(
+                failed=True, msg="%s failed: %s" % (label, tracker.status_line())
+            )
+        elif tracker.phase != "ready":
+            result.update(
+                failed=True,
+                msg="%s not ready after %s: %s"
+                % (label, format_duration(timeout), tracker.status_line()),
+            )
+        return result
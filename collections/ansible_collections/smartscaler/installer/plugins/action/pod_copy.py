@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import os
+
+from ansible.errors import AnsibleActionFail
+from ansible.module_utils._text import to_text
+from ansible.module_utils.parsing.convert_bool import boolean
+from ansible.plugins.action import ActionBase
+
+
+def collect_files(src, dest):
+    """Return the (local, remote) pairs for a file or a directory tree.
+
+    Like ``ansible.builtin.copy``, a directory ending with ``/`` copies its
+    content into I(dest), otherwise the directory itself is created in I(dest).
+    """
+    if os.path.isfile(src):
+        if dest.endswith("/"):
+            dest = os.path.join(dest, os.path.basename(src))
+        return [(src, dest)]
+    if not os.path.isdir(src):
+        raise AnsibleActionFail("src %s does not exist" % src)
+
+    root = dest if src.endswith("/") else os.path.join(dest, os.path.basename(src))
+    pairs = []
+    for directory, dirnames, filenames in os.walk(src):
+        dirnames.sort()
+        relative = os.path.relpath(directory, src)
+        for filename in sorted(filenames):
+            pairs.append(
+                (
+                    os.path.join(directory, filename),
+                    os.path.normpath(os.path.join(root, relative, filename)),
+                )
+            )
+    return pairs
+
+
+class ActionModule(ActionBase):
+    TRANSFERS_FILES = True
+
+    def run(self, tmp=None, task_vars=None):
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp
+
+        src = self._task.args.get("src")
+        dest = self._task.args.get("dest")
+        batch = boolean(self._task.args.get("batch", True), strict=False)
+        if not src or not dest:
+            raise AnsibleActionFail("src and dest are required")
+
+        src = self._find_needle("files", to_text(src))
+        if self._task.args["src"].endswith("/") and not src.endswith("/"):
+            src += "/"
+        pairs = collect_files(src, dest)
+
+        if self._play_context.check_mode:
+            result.update(changed=True, files=[remote for _, remote in pairs])
+            return result
+
+        if batch and hasattr(self._connection, "put_files"):
+            # kubernetes.core.kubectl packs every file into one tar stream and exec.
+            self._connection.put_files(pairs)
+            transfers = 1
+        else:
+            for local, remote in pairs:
+                self._connection.put_file(local, remote)
+            transfers = len(pairs)
+
+        result.update(
+            changed=bool(pairs),
+            files=[remote for _, remote in pairs],
+            transfers=transfers,
+        )
+        return result
@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+DOCUMENTATION = r"""
+name: item_profile
+type: notification
+short_description: Time every task and aggregate the timings per execution_order item
+description:
+  - Times tasks the way C(ansible.posix.profile_tasks) does, from the start of a task to the start of
+    the next one, and attributes each task to the execution_order item it runs for. A task belongs
+    to an item when it is included, at any depth, by the O(item_include) task file; the item is the
+    loop variable of that include. Other tasks are attributed to their play.
+  - Time spent in waiting tasks (C(async_status), C(wait_for), C(pause), readiness watches, C(k8s)
+    with C(wait), and tasks retried with C(until)) is reported as wait, the rest as apply.
+  - Writes O(path) as JSON at the end of the run, at the start of every play after the first one,
+    at most every O(write_interval) seconds, and once a task named in O(write_after) succeeds, so
+    that the installation summary written at the end of a play can include it. The previous profile of
+    the same playbook is kept as a baseline, so that the report shows the change run over run.
+  - Does nothing when O(path) is not set.
+requirements:
+  - Enable in configuration, for example with E(ANSIBLE_CALLBACKS_ENABLED=smartscaler.installer.item_profile).
+options:
+  path:
+    description: JSON file the profile is written to.
+    type: path
+    env:
+      - name: SMARTSCALER_ITEM_PROFILE
+    ini:
+      - section: callback_item_profile
+        key: path
+  item_include:
+    description: Task file including one execution_order item per loop iteration.
+    type: str
+    default: process_execution_item.yml
+    env:
+      - name: SMARTSCALER_ITEM_INCLUDE
+    ini:
+      - section: callback_item_profile
+        key: item_include
+  slowest_tasks:
+    description: Number of slowest tasks kept per segment.
+    type: int
+    default: 3
+    ini:
+      - section: callback_item_profile
+        key: slowest_tasks
+  write_interval:
+    description:
+      - Seconds between two writes of O(path) while tasks start, so that a killed run leaves a recent
+        profile. C(0) only writes at the end of plays and of the run, and after O(write_after).
+    type: float
+    default: 60
+    ini:
+      - section: callback_item_profile
+        key: write_interval
+  write_after:
+    description:
+      - Names of the tasks after which O(path) is read. The profile is written when one of them
+        succeeds on a host, and when one starts while O(path) does not exist yet.
+    type: list
+    elements: str
+    default: [Check for the item timing profile]
+    ini:
+      - section: callback_item_profile
+        key: write_after
+"""
+
+import json
+import os
+import time
+
+from ansible.playbook.task_include import TaskInclude
+from ansible.plugins.callback import CallbackBase
+
+WAIT_ACTIONS = frozenset(
+    (
+        "async_status",
+        "wait_for",
+        "wait_for_connection",
+        "pause",
+        "nimcache_wait",
+        "k8s_drain",
+        "kubespray_progress",
+    )
+)
+WAIT_ARG_ACTIONS = frozenset(("k8s", "helm", "k8s_scale", "k8s_rollback"))
+TRUE = (True, "true", "True", "yes", "on", "1")
+
+
+def short_action(action):
+    return (action or "").rsplit(".", 1)[-1]
+
+
+def is_wait(action, args=None, until=None):
+    """Whether a task mostly waits on something else rather than applying."""
+    action = short_action(action)
+    if action in WAIT_ACTIONS or until:
+        return True
+    return action in WAIT_ARG_ACTIONS and (args or {}).get("wait") in TRUE
+
+
+def item_of(task, include_file):
+    """execution_order item a task runs for, None outside of the item include."""
+    parent = task._parent
+    while parent is not None:
+        if isinstance(parent, TaskInclude) and str(
+            parent.args.get("_raw_params", "")
+        ).endswith(include_file):
+            loop_var = parent.loop_control.loop_var if parent.loop_control else "item"
+            value = (parent.vars or {}).get(loop_var or "item")
+            return str(value) if value is not None else None
+        parent = parent._parent
+    return None
+
+
+class Profile(object):
+    """Task timings grouped in segments, in run order.
+
+    A segment is one execution_order item, or a stretch of a play outside of
+    the items. Consecutive tasks of the same segment extend it.
+    """
+
+    def __init__(self, playbook=None, started=None, previous=None, slowest_tasks=3):
+        self.playbook = playbook
+        self.started = started if started is not None else time.time()
+        self.previous = previous or {}
+        self.slowest_tasks = slowest_tasks
+        self.timeline = []
+        self.current = None
+
+    def start_task(self, segment, kind, name, action, wait, now=None):
+        now = now if now is not None else time.time()
+        self.finish(now)
+        self.current = dict(
+            segment=segment,
+            kind=kind,
+            task=name,
+            action=short_action(action),
+            wait=bool(wait),
+            started=round(now - self.started, 3),
+            duration=None,
+        )
+        self.timeline.append(self.current)
+
+    def finish(self, now=None):
+        if self.current is not None:
+            now = now if now is not None else time.time()
+            self.current["duration"] = round(
+                now - self.started - self.current["started"], 3
+            )
+            self.current = None
+
+    def segments(self, now=None):
+        now = now if now is not None else time.time()
+        segments = []
+        for entry in self.timeline:
+            duration = entry["duration"]
+            if duration is None:
+                duration = round(now - self.started - entry["started"], 3)
+            last = segments[-1] if segments else None
+            if (
+                last is None
+                or last["name"] != entry["segment"]
+                or last["kind"] != entry["kind"]
+            ):
+                last = dict(
+                    name=entry["segment"],
+                    kind=entry["kind"],
+                    started=entry["started"],
+                    duration=0.0,
+                    wait=0.0,
+                    apply=0.0,
+                    tasks=0,
+                    slowest=[],
+                )
+                segments.append(last)
+            last["duration"] += duration
+            last["wait" if entry["wait"] else "apply"] += duration
+            last["tasks"] += 1
+            last["slowest"].append(dict(task=entry["task"], duration=duration))
+        for segment in segments:
+            segment["slowest"] = sorted(
+                segment["slowest"], key=lambda task: -task["duration"]
+            )[: self.slowest_tasks]
+            for key in ("duration", "wait", "apply"):
+                segment[key] = round(segment[key], 3)
+        return segments
+
+    def report(self, now=None):
+        now = now if now is not None else time.time()
+        segments = self.segments(now)
+        total = round(now - self.started, 3)
+        items = {}
+        for segment in segments:
+            if segment["kind"] == "item":
+                items[segment["name"]] = round(
+                    items.get(segment["name"], 0.0) + segment["duration"], 3
+                )
+        critical_path = []
+        for segment in segments:
+            entry = dict(
+                name=segment["name"],
+                kind=segment["kind"],
+                started=segment["started"],
+                duration=segment["duration"],
+                share=round(segment["duration"] / total, 4) if total else 0.0,
+                wait=segment["wait"],
+                apply=segment["apply"],
+                slowest_task=segment["slowest"][0] if segment["slowest"] else None,
+            )
+            baseline = self.previous.get("items", {}).get(segment["name"])
+            if segment["kind"] == "item" and baseline is not None:
+                entry["previous"] = baseline
+            critical_path.append(entry)
+        report = dict(
+            version=1,
+            playbook=self.playbook,
+            started=round(self.started, 3),
+            total=total,
+            wait=round(sum(s["wait"] for s in segments), 3),
+            apply=round(sum(s["apply"] for s in segments), 3),
+            items=items,
+            critical_path=critical_path,
+            segments=segments,
+            timeline=self.timeline,
+        )
+        if "total" in self.previous:
+            report["previous"] = dict(
+                started=self.previous.get("started"),
+                total=self.previous["total"],
+                items=self.previous.get("items", {}),
+            )
+        return report
+
+
+def load_previous(path, playbook):
+    """Baseline from the profile of the last run of the same playbook."""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("playbook") != playbook:
+        return {}
+    return dict(
+        started=data.get("started"),
+        total=data.get("total"),
+        items=data.get("items") or {},
+    )
+
+
+class CallbackModule(CallbackBase):
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = "notification"
+    CALLBACK_NAME = "smartscaler.installer.item_profile"
+    CALLBACK_NEEDS_ENABLED = True
+
+    def __init__(self, display=None):
+        super(CallbackModule, self).__init__(display=display)
+        self._path = None
+        self._item_include = "process_execution_item.yml"
+        self._slowest_tasks = 3
+        self._write_interval = 60.0
+        self._write_after = frozenset()
+        self._written = 0.0
+        self._play = None
+        self._profile = None
+
+    def set_options(self, task_keys=None, var_options=None, direct=None):
+        super(CallbackModule, self).set_options(
+            task_keys=task_keys, var_options=var_options, direct=direct
+        )
+        self._path = self.get_option("path")
+        self._item_include = self.get_option("item_include")
+        self._slowest_tasks = self.get_option("slowest_tasks")
+        self._write_interval = self.get_option("write_interval")
+        self._write_after = frozenset(self.get_option("write_after") or [])
+
+    def _write(self):
+        if self._path is None or self._profile is None:
+            return
+        directory = os.path.dirname(self._path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        tmp = "%s.%d.tmp" % (self._path, os.getpid())
+        with open(tmp, "w") as f:
+            json.dump(self._profile.report(), f, sort_keys=True)
+        os.rename(tmp, self._path)
+        self._written = time.time()
+
+    def v2_playbook_on_start(self, playbook):
+        if self._path is None:
+            return
+        name = os.path.basename(playbook._file_name)
+        self._profile = Profile(
+            playbook=name,
+            previous=load_previous(self._path, name),
+            slowest_tasks=self._slowest_tasks,
+        )
+        self._written = time.time()
+
+    def v2_playbook_on_play_start(self, play):
+        # The previous play, if any, is over
+        if self._profile is not None and self._profile.timeline:
+            self._write()
+        self._play = play.get_name().strip()
+
+    def _record(self, task):
+        if self._profile is None:
+            return
+        item = item_of(task, self._item_include)
+        name = task.get_name().strip()
+        self._profile.start_task(
+            item if item is not None else self._play,
+            "item" if item is not None else "play",
+            name,
+            task.action,
+            is_wait(task.action, task.args, task.until),
+        )
+        # Writing serializes the whole timeline: not at every task
+        if (name in self._write_after and not os.path.exists(self._path)) or (
+            self._write_interval and time.time() - self._written >= self._write_interval
+        ):
+            self._write()
+
+    def v2_playbook_on_task_start(self, task, is_conditional):
+        self._record(task)
+
+    def v2_playbook_on_handler_task_start(self, task):
+        self._record(task)
+
+    def v2_runner_on_ok(self, result):
+        if self._profile is not None and (
+            result._task.get_name().strip() in self._write_after
+        ):
+            self._write()
+
+    def v2_playbook_on_stats(self, stats):
+        if self._profile is None:
+            return
+        self._profile.finish()
+        self._write()
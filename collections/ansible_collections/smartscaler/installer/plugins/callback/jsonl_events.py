@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+DOCUMENTATION = r"""
+name: jsonl_events
+type: notification
+short_description: Write play, task and host result events as JSON lines
+description:
+  - Appends one JSON object per line to O(path) for every play start, task start, host result and
+    for the final stats, flushing after each event so that another process can follow the run.
+  - Used by C(roles/kubernetes) to follow the nested Kubespray run with
+    M(smartscaler.installer.kubespray_progress).
+  - Does nothing when O(path) is not set.
+requirements:
+  - Enable in configuration, for example with E(ANSIBLE_CALLBACKS_ENABLED=smartscaler.installer.jsonl_events).
+options:
+  path:
+    description: File the events are appended to.
+    type: path
+    env:
+      - name: SMARTSCALER_EVENTS_FILE
+    ini:
+      - section: callback_jsonl_events
+        key: path
+  msg_length:
+    description: Failure messages are cut to this many characters.
+    type: int
+    default: 500
+    env:
+      - name: SMARTSCALER_EVENTS_MSG_LENGTH
+    ini:
+      - section: callback_jsonl_events
+        key: msg_length
+"""
+
+import json
+import os
+import time
+
+from ansible.plugins.callback import CallbackBase
+
+
+class CallbackModule(CallbackBase):
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = "notification"
+    CALLBACK_NAME = "smartscaler.installer.jsonl_events"
+    CALLBACK_NEEDS_ENABLED = True
+
+    def __init__(self, display=None):
+        super(CallbackModule, self).__init__(display=display)
+        self._fh = None
+        self._msg_length = 500
+        self._play = None
+        # (host, task uuid) -> start time
+        self._started = {}
+
+    def set_options(self, task_keys=None, var_options=None, direct=None):
+        super(CallbackModule, self).set_options(
+            task_keys=task_keys, var_options=var_options, direct=direct
+        )
+        path = self.get_option("path")
+        self._msg_length = self.get_option("msg_length")
+        if path:
+            directory = os.path.dirname(path)
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory)
+            self._fh = open(path, "a")
+
+    def _emit(self, event, **data):
+        if self._fh is None:
+            return
+        data["event"] = event
+        data["time"] = round(time.time(), 3)
+        self._fh.write(json.dumps(data, sort_keys=True) + "\n")
+        self._fh.flush()
+
+    def v2_playbook_on_start(self, playbook):
+        self._emit("playbook_start", playbook=os.path.basename(playbook._file_name))
+
+    def v2_playbook_on_play_start(self, play):
+        self._play = play.get_name().strip()
+        self._emit(
+            "play_start",
+            play=self._play,
+            hosts=play.hosts if isinstance(play.hosts, list) else [play.hosts],
+        )
+
+    def v2_playbook_on_task_start(self, task, is_conditional):
+        self._emit(
+            "task_start", play=self._play, task=task.get_name().strip(), uuid=task._uuid
+        )
+
+    def v2_playbook_on_handler_task_start(self, task):
+        self._emit(
+            "task_start",
+            play=self._play,
+            task=task.get_name().strip(),
+            uuid=task._uuid,
+            handler=True,
+        )
+
+    def v2_runner_on_start(self, host, task):
+        self._started[(host.get_name(), task._uuid)] = time.time()
+
+    def _result(self, result, status):
+        host = result._host.get_name()
+        task = result._task
+        started = self._started.pop((host, task._uuid), None)
+        data = dict(
+            play=self._play,
+            task=task.get_name().strip(),
+            uuid=task._uuid,
+            host=host,
+            status=status,
+            changed=bool(result._result.get("changed", False)),
+            duration=round(time.time() - started, 3) if started else None,
+        )
+        if status in ("failed", "unreachable"):
+            data["msg"] = str(
+                result._result.get("msg") or result._result.get("stderr") or ""
+            )[: self._msg_length]
+            data["ignore_errors"] = bool(task.ignore_errors)
+        self._emit("result", **data)
+
+    def v2_runner_on_ok(self, result):
+        self._result(result, "ok")
+
+    def v2_runner_on_failed(self, result, ignore_errors=False):
+        self._result(result, "failed")
+
+    def v2_runner_on_skipped(self, result):
+        self._result(result, "skipped")
+
+    def v2_runner_on_unreachable(self, result):
+        self._result(result, "unreachable")
+
+    def v2_playbook_on_stats(self, stats):
+        hosts = {}
+        for host in sorted(stats.processed.keys()):
+            hosts[host] = stats.summarize(host)
+        self._emit("stats", hosts=hosts)
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
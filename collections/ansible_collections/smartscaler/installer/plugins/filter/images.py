@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+
+def normalize_image(image):
+    """Spell an image reference the way the kubelet reports it.
+
+    ``nginx:1.25`` becomes ``docker.io/library/nginx:1.25`` and a reference
+    without tag or digest gets ``:latest``.
+    """
+    name, digest = image, ""
+    if "@" in name:
+        name, digest = name.split("@", 1)
+        digest = "@" + digest
+    first, _, rest = name.partition("/")
+    if not rest or ("." not in first and ":" not in first and first != "localhost"):
+        name = "docker.io/" + (name if rest else "library/" + name)
+    if not digest and ":" not in name.rsplit("/", 1)[-1]:
+        name += ":latest"
+    return name + digest
+
+
+def missing_images(nodes, images):
+    """Map each node name to the I(images) missing from its C(status.images)."""
+    wanted = [(image, normalize_image(image)) for image in images]
+    missing = {}
+    for node in nodes:
+        present = set()
+        for entry in (node.get("status") or {}).get("images") or []:
+            for name in entry.get("names") or []:
+                present.add(normalize_image(name))
+        absent = [image for image, name in wanted if name not in present]
+        if absent:
+            missing[node["metadata"]["name"]] = absent
+    return missing
+
+
+class FilterModule(object):
+    def filters(self):
+        return {"missing_images": missing_images}
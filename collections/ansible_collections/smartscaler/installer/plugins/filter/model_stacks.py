@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Expansion of a model_stacks item: every model is a compact spec (model,
+# puller image, profile, tensor parallelism, replicas, KEDA bounds, labels) that
+# becomes the NIMCache, NIMService, KEDA ScaledObject, inference ConfigMap
+# and Deployment, locust ConfigMap and Deployment items of that model.
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import copy
+
+from ansible.errors import AnsibleFilterError
+from ansible_collections.smartscaler.installer.plugins.filter.recording_rules import (
+    recommendation_query,
+)
+
+# Items of one stack, in rollout order: (item prefix, type, group of variables)
+STEPS = (
+    ("nim_cache_manifest", "manifest", "nim_cache"),
+    ("nim_service_manifest", "manifest", "nim_service"),
+    ("keda_scaled_object_manifest", "manifest", "keda"),
+    ("create_inference_pod_configmap", "config", None),
+    ("smart_scaler_inference", "manifest", "inference"),
+    ("create_locust_configmap", "config", None),
+    ("locust_manifest", "manifest", "locust"),
+)
+# Template and variable prefix of each group
+TEMPLATES = {
+    "nim_cache": ("files/nim-cache.yaml.j2", "nim_cache"),
+    "nim_service": ("files/nim-service.yaml.j2", "nim_service"),
+    "keda": ("files/keda-scaled-object.yaml.j2", "keda_scaled_object"),
+    "inference": ("files/smart-scaler-inference.yaml.j2", "smart_scaler"),
+    "locust": ("files/locust-deploy.yaml.j2", "locust"),
+}
+WAITS = {
+    "nim_cache": {"condition": "Ready", "timeout": 1200},
+    "nim_service": {"condition": "Ready", "timeout": 600},
+    "keda": {"condition": "Ready", "timeout": 300},
+    "inference": {"condition": "Available", "timeout": 600},
+    "locust": {"condition": "Available", "timeout": 300},
+}
+NAMESPACES = {"nim": "nim", "inference": "smart-scaler", "load_test": "nim-load-test"}
+# Template variable holding the image of a group; NIM images are the model image
+IMAGE_VARIABLES = {"inference": "smart_scaler_image", "locust": "locust_image"}
+
+
+def merged(*dicts):
+    """Recursive merge of I(dicts), later ones winning."""
+    result = {}
+    for value in dicts:
+        for key, item in (value or {}).items():
+            if isinstance(item, dict) and isinstance(result.get(key), dict):
+                result[key] = merged(result[key], item)
+            else:
+                result[key] = copy.deepcopy(item)
+    return result
+
+
+def split_image(image):
+    """(repository, tag) of an image reference, tag C(latest) when absent."""
+    repository, _, last = image.rpartition("/")
+    if ":" in last:
+        last, tag = last.split(":", 1)
+    else:
+        tag = "latest"
+    return ("%s/%s" % (repository, last) if repository else last), tag
+
+
+def served_model(image):
+    """Model name a NIM serves, from its image: C(meta/llama-3.1-8b-instruct)."""
+    repository, _ = split_image(image)
+    parts = repository.split("/")
+    if len(parts) > 1 and ("." in parts[0] or ":" in parts[0]):
+        parts = parts[1:]
+    if len(parts) > 2 and parts[0] == "nim":
+        parts = parts[1:]
+    return "/".join(parts)
+
+
+def _variables(key, spec, namespaces):
+    """Template variables each group gets from the compact spec of a model."""
+    model = spec["model"]
+    repository, tag = split_image(spec["image"])
+    tensor_parallelism = spec.get("tensor_parallelism", 1)
+    replicas = spec.get("replicas", 1)
+    port = (spec.get("nim_service") or {}).get("nim_service_expose_port", 8000)
+    nim_cache = dict(
+        nim_cache_name=model,
+        nim_cache_namespace=namespaces["nim"],
+        nim_cache_model_puller=spec["image"],
+        nim_cache_tensor_parallelism=str(tensor_parallelism),
+    )
+    if spec.get("engine"):
+        nim_cache["nim_cache_model_engine"] = spec["engine"]
+    if spec.get("profile"):
+        nim_cache["nim_cache_model_profiles"] = [spec["profile"]]
+    if spec.get("pvc_size"):
+        nim_cache["nim_cache_pvc_size"] = spec["pvc_size"]
+    return dict(
+        nim_cache=nim_cache,
+        nim_service=dict(
+            nim_service_name=model,
+            nim_service_namespace=namespaces["nim"],
+            nim_service_image_repository=repository,
+            nim_service_image_tag=tag,
+            nim_service_storage_cache_name=model,
+            nim_service_storage_cache_profile=spec.get("profile") or "",
+            nim_service_replicas=replicas,
+            nim_service_resources={
+                "limits": {"nvidia.com/gpu": spec.get("gpus", tensor_parallelism)}
+            },
+        ),
+        keda=dict(
+            keda_scaled_object_name="llm-demo-keda-%s" % key,
+            keda_scaled_object_namespace=namespaces["nim"],
+            keda_scaled_object_target_name=model,
+            keda_scaled_object_min_replicas=spec.get("min_replicas", 1),
+            keda_scaled_object_max_replicas=spec.get("max_replicas", replicas),
+            keda_scaled_object_query=recommendation_query(model),
+        ),
+        inference=dict(
+            smart_scaler_name="smart-scaler-llm-inf-%s" % key,
+            smart_scaler_namespace=namespaces["inference"],
+            smart_scaler_labels=merged(
+                {"service": "inference-tenant-app-%s" % key}, spec.get("labels")
+            ),
+            smart_scaler_config_map_name="mesh-config-%s" % key,
+        ),
+        locust=dict(
+            locust_name="locust-load-%s" % key,
+            locust_namespace=namespaces["load_test"],
+            locust_replicas=spec.get("load_test_replicas", 0),
+            locust_target_host="http://%s.%s.svc.cluster.local:%s"
+            % (model, namespaces["nim"], port),
+            locust_configmap_name="locustfile-%s" % key,
+        ),
+    )
+
+
+def model_stack_items(stacks):
+    """Items of every enabled model of a model_stacks item, in rollout order.
+
+    Each item is a dict with C(stack), C(item) (the name it has in the
+    summary, like C(nim_cache_manifest_70b)), C(type) (C(manifest) or
+    C(config)), C(namespace), C(after) (the previous item of the same
+    stack), and C(manifest_file), C(variables), C(wait) or C(configmaps).
+    With C(warmup.enabled), the NIMService item also gets C(warmup): the
+    arguments of smartscaler.installer.nim_warmup for its replicas.
+    Values of C(defaults) apply to every model; the groups C(nim_cache),
+    C(nim_service), C(keda), C(inference), C(locust), C(waits) and
+    C(namespaces) are merged key by key, the model winning.
+    """
+    defaults = stacks.get("defaults") or {}
+    items = []
+    for key, model in (stacks.get("models") or {}).items():
+        spec = merged(defaults, model)
+        if not spec.get("enabled", True):
+            continue
+        missing = [field for field in ("model", "image") if not spec.get(field)]
+        if missing:
+            raise AnsibleFilterError(
+                "model stack %s: %s required" % (key, " and ".join(missing))
+            )
+        namespaces = merged(NAMESPACES, spec.get("namespaces"))
+        waits = merged(WAITS, spec.get("waits"))
+        derived = _variables(key, spec, namespaces)
+        configmaps = dict(
+            create_inference_pod_configmap=(
+                namespaces["inference"],
+                "mesh-config-%s" % key,
+                "config.json",
+                spec.get("inference_config") or "files/config-inference-%s.json" % key,
+            ),
+            create_locust_configmap=(
+                namespaces["load_test"],
+                "locustfile-%s" % key,
+                "locustfile.py",
+                spec.get("locustfile") or "files/locust-%s.py" % key,
+            ),
+        )
+        after = None
+        for prefix, item_type, group in STEPS:
+            name = "%s_%s" % (prefix, key)
+            step = dict(stack=key, item=name, type=item_type, after=after)
+            if item_type == "config":
+                namespace, configmap, file_key, src = configmaps[prefix]
+                step.update(
+                    namespace=namespace,
+                    configmaps=[dict(name=configmap, files={file_key: src})],
+                )
+            else:
+                template, var_prefix = TEMPLATES[group]
+                variables = merged(spec.get(group), derived[group], model.get(group))
+                step.update(
+                    namespace=variables["%s_namespace" % var_prefix],
+                    manifest_file=template,
+                    variables=variables,
+                    wait=waits.get(group),
+                )
+                warmup = dict(spec.get("warmup") or {})
+                if group == "nim_service" and warmup.pop("enabled", False):
+                    warmup.update(
+                        service=variables["nim_service_name"],
+                        namespace=variables["nim_service_namespace"],
+                        model=spec.get("served_model") or served_model(spec["image"]),
+                    )
+                    step["warmup"] = warmup
+            items.append(step)
+            after = name
+    return items
+
+
+def model_stack_images(stacks, group="nim"):
+    """Images run by the enabled models of a model_stacks item, in model order.
+
+    I(group) is C(nim) for the NIM images of the models, or C(inference) or
+    C(locust) for the image their Deployment of that group runs. Each image
+    is listed once.
+    """
+    if group != "nim" and group not in IMAGE_VARIABLES:
+        raise AnsibleFilterError(
+            "model stack images: %s is not one of nim, %s"
+            % (group, ", ".join(sorted(IMAGE_VARIABLES)))
+        )
+    defaults = stacks.get("defaults") or {}
+    images = []
+    for model in (stacks.get("models") or {}).values():
+        spec = merged(defaults, model)
+        if not spec.get("enabled", True):
+            continue
+        if group == "nim":
+            image = spec.get("image")
+        else:
+            image = (spec.get(group) or {}).get(IMAGE_VARIABLES[group])
+        if image and image not in images:
+            images.append(image)
+    return images
+
+
+def model_stack_operations(items, builds):
+    """smartscaler.installer.k8s_batch operations rolling out I(items).
+
+    I(builds) are the results of the loops that rendered the manifests and
+    built the ConfigMaps, with the item as loop variable C(step). Every
+    namespace is applied first; the objects of an item wait for the ones of
+    the previous item of the same stack, so stacks progress independently.
+    """
+    definitions = dict(
+        (build["step"]["item"], build.get("definitions") or []) for build in builds
+    )
+    operations = []
+    namespaces = []
+    for item in items:
+        if item["namespace"] not in namespaces:
+            namespaces.append(item["namespace"])
+            operations.append(
+                dict(
+                    id="namespace/%s" % item["namespace"],
+                    op="apply",
+                    definition=dict(
+                        apiVersion="v1",
+                        kind="Namespace",
+                        metadata=dict(
+                            name=item["namespace"], labels=dict(name=item["namespace"])
+                        ),
+                    ),
+                )
+            )
+    ids = {}
+    for item in items:
+        if not definitions.get(item["item"]):
+            raise AnsibleFilterError("%s has no objects to apply" % item["item"])
+        after = ["namespace/%s" % item["namespace"]] + ids.get(item["after"], [])
+        objects = definitions[item["item"]]
+        ids[item["item"]] = []
+        for index, definition in enumerate(objects):
+            operation = dict(
+                id=item["item"]
+                if len(objects) == 1
+                else "%s/%d" % (item["item"], index + 1),
+                op="apply",
+                definition=definition,
+                after=after,
+            )
+            if item.get("wait"):
+                operation["wait"] = item["wait"]
+            ids[item["item"]].append(operation["id"])
+            operations.append(operation)
+    return operations
+
+
+def model_stack_outcomes(items, results):
+    """Outcome of each item from the RV(results) of its operations.
+
+    A dict per item with C(item), C(type), C(namespace), C(failed),
+    C(changed), C(waited) and, when it failed, C(msg).
+    """
+    outcomes = []
+    for item in items:
+        mine = [
+            result
+            for result in results or []
+            if result["id"] == item["item"]
+            or result["id"].startswith(item["item"] + "/")
+        ]
+        failed = [result for result in mine if result.get("failed")]
+        outcome = dict(
+            item=item["item"],
+            type=item["type"],
+            namespace=item["namespace"],
+            failed=bool(failed) or not mine,
+            changed=any(result.get("changed") for result in mine),
+            waited=max([result.get("waited", 0) for result in mine] or [0]),
+        )
+        if failed:
+            outcome["msg"] = failed[0].get("msg")
+        elif not mine:
+            outcome["msg"] = "not applied"
+        outcomes.append(outcome)
+    return outcomes
+
+
+class FilterModule(object):
+    def filters(self):
+        return {
+            "model_stack_items": model_stack_items,
+            "model_stack_images": model_stack_images,
+            "model_stack_operations": model_stack_operations,
+            "model_stack_outcomes": model_stack_outcomes,
+        }
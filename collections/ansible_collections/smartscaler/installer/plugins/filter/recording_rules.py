@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Recording rules for the metrics KEDA and the NIM dashboard read: the Smart
+# Scaler recommendation per deployment, and the NIM counters, histograms and
+# gauges per namespace and model. Prometheus evaluates them once per interval,
+# so ScaledObjects and dashboard panels read a precomputed series instead of
+# running rate() and histogram_quantile() over the raw series on every poll.
+# Record names leave out the rate window, so that the dashboard and queries
+# written against them keep working when the window changes.
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+from ansible.errors import AnsibleFilterError
+
+# Recommendation of Smart Scaler, pushed to the Pushgateway per deployment
+RECOMMENDATION = "ss_deployment:smartscaler_hpa_num_pods:max"
+NIM_LEVEL = "namespace_model"
+NIM_BY = ("namespace", "model_name")
+DEFAULTS = dict(
+    interval="15s",
+    rate_window="1m",
+    quantiles=[0.5, 0.9, 0.99],
+    counters=[
+        "generation_tokens_total",
+        "prompt_tokens_total",
+        "request_success_total",
+    ],
+    histograms=[
+        "time_to_first_token_seconds",
+        "time_per_output_token_seconds",
+        "e2e_request_latency_seconds",
+        "request_prompt_tokens",
+        "request_generation_tokens",
+    ],
+    gauges={
+        "num_requests_running": "sum",
+        "num_requests_waiting": "sum",
+        "gpu_cache_usage_perc": "avg",
+    },
+)
+AGGREGATIONS = ("sum", "avg", "max", "min")
+
+
+def recommendation_query(deployment):
+    """KEDA query of the recorded recommendation of one deployment."""
+    return '%s{ss_deployment_name="%s"}' % (RECOMMENDATION, deployment)
+
+
+def quantile_name(quantile):
+    """C(p50) for 0.5, C(p999) for 0.999."""
+    digits = ("%g" % (quantile * 100)).replace(".", "")
+    return "p%s" % digits
+
+
+def _rule(record, expr):
+    return dict(record=record, expr=expr)
+
+
+def nim_rules(spec):
+    """Recording rules of the NIM metrics, aggregated per namespace and model."""
+    window = spec["rate_window"]
+    by = ", ".join(NIM_BY)
+    rules = []
+    for counter in spec["counters"]:
+        name = counter[: -len("_total")] if counter.endswith("_total") else counter
+        rules.append(
+            _rule(
+                "%s:%s:rate" % (NIM_LEVEL, name),
+                "sum by (%s) (rate(%s[%s]))" % (by, counter, window),
+            )
+        )
+    for histogram in spec["histograms"]:
+        buckets = "%s:%s_bucket:rate" % (NIM_LEVEL, histogram)
+        rules.append(
+            _rule(
+                buckets,
+                "sum by (%s, le) (rate(%s_bucket[%s]))" % (by, histogram, window),
+            )
+        )
+        for quantile in spec["quantiles"]:
+            rules.append(
+                _rule(
+                    "%s:%s:%s" % (NIM_LEVEL, histogram, quantile_name(quantile)),
+                    "histogram_quantile(%g, %s)" % (quantile, buckets),
+                )
+            )
+        rules.append(
+            _rule(
+                "%s:%s:mean" % (NIM_LEVEL, histogram),
+                "sum by (%s) (rate(%s_sum[%s])) / sum by (%s) (rate(%s_count[%s]))"
+                % (by, histogram, window, by, histogram, window),
+            )
+        )
+    for gauge, aggregation in sorted(spec["gauges"].items()):
+        if aggregation not in AGGREGATIONS:
+            raise AnsibleFilterError(
+                "recording rules: %s of gauge %s is not one of %s"
+                % (aggregation, gauge, ", ".join(AGGREGATIONS))
+            )
+        rules.append(
+            _rule(
+                "%s:%s:%s" % (NIM_LEVEL, gauge, aggregation),
+                "%s by (%s) (%s)" % (aggregation, by, gauge),
+            )
+        )
+    return rules
+
+
+def recording_rules(spec=None):
+    """Rule groups of a PrometheusRule, from I(spec) over the defaults.
+
+    I(spec) may set C(interval), C(rate_window), C(quantiles), C(counters),
+    C(histograms) and C(gauges) (metric to aggregation).
+    """
+    spec = dict(DEFAULTS, **(spec or {}))
+    return [
+        dict(
+            name="smart-scaler.rules",
+            interval=spec["interval"],
+            rules=[
+                _rule(
+                    RECOMMENDATION,
+                    "max by (ss_namespace, ss_deployment_name) "
+                    '(smartscaler_hpa_num_pods{job="pushgateway"})',
+                )
+            ],
+        ),
+        dict(name="nim.rules", interval=spec["interval"], rules=nim_rules(spec)),
+    ]
+
+
+class FilterModule(object):
+    def filters(self):
+        return {
+            "recording_rules": recording_rules,
+            "recommendation_query": recommendation_query,
+        }
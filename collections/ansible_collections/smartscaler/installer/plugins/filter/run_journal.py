@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Filters of the run journal of site.yml (output/.run_journal.json), see
+# module_utils/journal.py: the fingerprint and witnesses of an item when it
+# is recorded, and the items a resumed run may skip. Witnesses are checked on
+# the cluster of their item, or on their own C(kubeconfig) and C(context)
+# when they have them, such as the releases of EGS worker charts.
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+from ansible_collections.smartscaler.installer.plugins.module_utils.journal import (
+    fingerprint,
+)
+
+
+def item_fingerprint(item, item_type, base_dir=".", derived=None, digests=None):
+    return fingerprint(item, item_type, base_dir, derived, digests)
+
+
+def release_witness(chart):
+    """The deployed release of the Helm chart I(chart), a helm item or chart."""
+    return dict(
+        kind="Secret",
+        api_version="v1",
+        namespace=chart.get("release_namespace") or "default",
+        labels=dict(owner="helm", name=chart["release_name"], status="deployed"),
+    )
+
+
+def item_witnesses(item, item_type, resources=None, kubeconfig=None, context=None):
+    """Objects that show an item is still installed.
+
+    A Helm chart is installed while its deployed release exists; other items
+    while the objects they applied, I(resources), exist. EGS workers are
+    installed while their registrations, I(resources), exist on the
+    controller and the release of the worker chart on each worker cluster,
+    with I(kubeconfig) and I(context) for workers that do not name theirs.
+    """
+    if item_type == "helm":
+        return [release_witness(item)]
+    witnesses = list(resources or [])
+    if item_type == "egs_workers":
+        witnesses.extend(
+            dict(
+                release_witness(item["chart"]),
+                kubeconfig=worker.get("kubeconfig", kubeconfig),
+                context=worker.get("kubecontext", context),
+            )
+            for worker in item.get("workers") or []
+        )
+    return witnesses
+
+
+def _cluster(entry):
+    return (entry.get("kubeconfig") or "", entry.get("context") or "")
+
+
+def _witness_cluster(witness, entry):
+    """Cluster of I(witness), that of its item unless it names its own."""
+    if isinstance(witness, dict) and ("kubeconfig" in witness or "context" in witness):
+        return witness.get("kubeconfig"), witness.get("context")
+    return entry.get("kubeconfig"), entry.get("context")
+
+
+def _completed(journal):
+    return sorted(
+        (name, entry)
+        for name, entry in ((journal or {}).get("items") or {}).items()
+        if entry.get("status") == "success"
+    )
+
+
+def journal_clusters(journal):
+    """Witnesses of the completed items of I(journal), grouped by cluster.
+
+    Each group is one call of journal_drift. An item whose witnesses are on
+    several clusters is in each of their groups.
+    """
+    clusters = {}
+    for name, entry in _completed(journal):
+        for witness in entry.get("witnesses") or []:
+            kubeconfig, context = _witness_cluster(witness, entry)
+            cluster = clusters.setdefault(
+                _cluster(dict(kubeconfig=kubeconfig, context=context)),
+                dict(kubeconfig=kubeconfig, context=context, witnesses={}),
+            )
+            if isinstance(witness, dict):
+                witness = dict(
+                    (key, value)
+                    for key, value in witness.items()
+                    if key not in ("kubeconfig", "context")
+                )
+            cluster["witnesses"].setdefault(name, []).append(witness)
+    return [clusters[key] for key in sorted(clusters)]
+
+
+def journal_resumable(journal, checks):
+    """Names of the completed items whose witnesses were all found.
+
+    I(checks) are the registered results of journal_drift looped over
+    journal_clusters, with loop_var C(cluster). Items without witnesses need
+    no check, and are only resumed when they opt in (tasks/process_execution_item.yml);
+    items with witnesses on a cluster that could not be checked are not
+    resumable.
+    """
+    found, missing = set(), set()
+    for check in checks or []:
+        names = check["cluster"]["witnesses"]
+        if check.get("failed") or check.get("skipped"):
+            missing.update(names)
+            continue
+        drifted = check.get("drifted") or {}
+        found.update(name for name in names if name not in drifted)
+        missing.update(name for name in names if name in drifted)
+    return [
+        name
+        for name, entry in _completed(journal)
+        if (name in found and name not in missing) or not entry.get("witnesses")
+    ]
+
+
+class FilterModule(object):
+    def filters(self):
+        return {
+            "item_fingerprint": item_fingerprint,
+            "item_witnesses": item_witnesses,
+            "journal_clusters": journal_clusters,
+            "journal_resumable": journal_resumable,
+        }
@@ -0,0 +1,475 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Kubernetes operations run in-process by smartscaler.installer.k8s_batch, in
+# place of kubectl calls in shell commands. An operation is a dict:
+# {"id": ..., "op": get|apply|create|patch|delete, "kind", "api_version",
+#  "name", "namespace", "definition", "patch", "after": [ids],
+#  "capture": {variable: jsonpath}, "wait": {"condition", "status", "timeout"},
+#  "ignore_errors": bool}.
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import copy
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from ansible_collections.smartscaler.installer.plugins.module_utils.kubespray_events import (
+    format_duration,
+)
+from ansible_collections.smartscaler.installer.plugins.module_utils.nimcache import (
+    FAILED_STATES,
+    find_condition,
+)
+from ansible_collections.smartscaler.installer.plugins.module_utils.preflight import (
+    error_message,
+)
+
+try:
+    from kubernetes.dynamic.exceptions import ResourceNotFoundError
+except ImportError:
+    # The module reports the missing library through kubernetes.core.
+
+    class ResourceNotFoundError(Exception):
+        pass
+
+
+OPERATIONS = ("get", "apply", "create", "patch", "delete")
+PATCH_TYPES = {
+    "merge": "application/merge-patch+json",
+    "strategic": "application/strategic-merge-patch+json",
+    "json": "application/json-patch+json",
+}
+# Fields the API server changes on every write, left out when comparing
+VOLATILE_METADATA = ("resourceVersion", "managedFields", "generation")
+
+_TOKEN = re.compile(r"\.((?:[^.\[\\]|\\.)+)|\[(\*|-?\d+|'[^']*'|\"[^\"]*\")\]")
+
+
+def parse_path(expr):
+    """Steps of a kubectl-style jsonpath such as C({.data.ca\\.crt}).
+
+    Supports field names with escaped dots, C([n]) indexes, C([*]) and
+    quoted keys. A step is a key, an int index or C("*").
+    """
+    path = (expr or "").strip()
+    if path.startswith("{") and path.endswith("}"):
+        path = path[1:-1]
+    if path and not path.startswith((".", "[")):
+        path = "." + path
+    steps = []
+    position = 0
+    while position < len(path):
+        match = _TOKEN.match(path, position)
+        if not match:
+            raise ValueError("invalid jsonpath %s at %r" % (expr, path[position:]))
+        if match.group(1) is not None:
+            steps.append(re.sub(r"\\(.)", r"\1", match.group(1)))
+        else:
+            token = match.group(2)
+            if token == "*":
+                steps.append("*")
+            elif token[0] in "'\"":
+                steps.append(token[1:-1])
+            else:
+                steps.append(int(token))
+        position = match.end()
+    return steps
+
+
+def extract(obj, expr):
+    """Value at a jsonpath of I(obj), a list after C([*]), None if absent."""
+
+    def walk(value, steps):
+        for index, step in enumerate(steps):
+            if step == "*":
+                items = value.values() if isinstance(value, dict) else value or []
+                return [walk(item, steps[index + 1 :]) for item in items]
+            if isinstance(step, int):
+                if not isinstance(value, list) or not -len(value) <= step < len(value):
+                    return None
+                value = value[step]
+            elif isinstance(value, dict):
+                value = value.get(step)
+            else:
+                return None
+        return value
+
+    return walk(obj, parse_path(expr))
+
+
+def comparable(obj):
+    """I(obj) without status and the metadata every write changes."""
+    if not obj:
+        return obj
+    obj = copy.deepcopy(obj)
+    obj.pop("status", None)
+    for key in VOLATILE_METADATA:
+        (obj.get("metadata") or {}).pop(key, None)
+    return obj
+
+
+def as_dict(obj):
+    return obj.to_dict() if hasattr(obj, "to_dict") else obj
+
+
+def not_found(error):
+    return getattr(error, "status", None) == 404
+
+
+def normalize(operations):
+    """Operations with an id, their kind and a validated C(after).
+
+    An operation may only wait for operations listed before it, so the
+    order can never form a cycle.
+    """
+    normalized = []
+    ids = set()
+    for index, operation in enumerate(operations):
+        operation = dict(operation)
+        operation.setdefault("id", "op%d" % (index + 1))
+        op = operation.get("op")
+        if op not in OPERATIONS:
+            raise ValueError(
+                "operation %s: op must be one of %s, not %s"
+                % (operation["id"], ", ".join(OPERATIONS), op)
+            )
+        if operation["id"] in ids:
+            raise ValueError("operation id %s is used twice" % operation["id"])
+        definition = operation.get("definition")
+        if op in ("apply", "create"):
+            if not isinstance(definition, dict):
+                raise ValueError(
+                    "operation %s: %s needs a definition" % (operation["id"], op)
+                )
+            metadata = definition.get("metadata") or {}
+            operation.setdefault("kind", definition.get("kind"))
+            operation.setdefault("api_version", definition.get("apiVersion"))
+            operation.setdefault("name", metadata.get("name"))
+            operation.setdefault("namespace", metadata.get("namespace"))
+        if op == "patch" and operation.get("patch") is None:
+            raise ValueError("operation %s: patch needs a patch" % operation["id"])
+        if op in ("patch", "delete") and not operation.get("name"):
+            raise ValueError("operation %s: %s needs a name" % (operation["id"], op))
+        if not operation.get("kind"):
+            raise ValueError("operation %s needs a kind" % operation["id"])
+        if operation.get("wait") is not None:
+            if op not in ("apply", "create", "patch"):
+                raise ValueError(
+                    "operation %s: %s cannot wait for a condition"
+                    % (operation["id"], op)
+                )
+            if not (operation["wait"] or {}).get("condition"):
+                raise ValueError(
+                    "operation %s: wait needs a condition" % operation["id"]
+                )
+        operation["api_version"] = operation.get("api_version") or "v1"
+        after = operation.get("after") or []
+        operation["after"] = [after] if isinstance(after, str) else list(after)
+        unknown = [dep for dep in operation["after"] if dep not in ids]
+        if unknown:
+            raise ValueError(
+                "operation %s: after must name earlier operations, not %s"
+                % (operation["id"], ", ".join(unknown))
+            )
+        ids.add(operation["id"])
+        normalized.append(operation)
+    return normalized
+
+
+def after_crd_writes(operations):
+    """Ids of the operations that wait, directly or not, for an apply or
+    create of a CustomResourceDefinition."""
+    writes = set()
+    waiting = set()
+    for operation in operations:
+        if any(dep in writes or dep in waiting for dep in operation["after"]):
+            waiting.add(operation["id"])
+        if (
+            operation["op"] in ("apply", "create")
+            and operation["kind"] == "CustomResourceDefinition"
+        ):
+            writes.add(operation["id"])
+    return waiting
+
+
+class Batch(object):
+    """Run operations over one client, independent ones concurrently.
+
+    An operation starts as soon as every operation it waits for is done, so
+    a chain of operations never waits for an unrelated slow one. An
+    operation whose dependency failed is skipped. In check mode writes are
+    sent with dryRun=All and conditions are not waited for.
+
+    Kinds are looked up once, before anything runs. A kind that is not
+    served then is looked up again by operations that wait for a
+    CustomResourceDefinition to be written, until it is served or
+    I(discovery_timeout) seconds passed.
+    """
+
+    def __init__(
+        self,
+        client,
+        field_manager="smartscaler-installer",
+        max_workers=8,
+        check_mode=False,
+        wait_sleep=5,
+        discovery_timeout=60,
+    ):
+        self.client = client
+        self.field_manager = field_manager
+        self.max_workers = max_workers
+        self.dry_run = "All" if check_mode else None
+        self.wait_sleep = wait_sleep
+        self.discovery_timeout = discovery_timeout
+        self._discovery = threading.Lock()
+
+    def _resources(self, operations):
+        # Discovery is resolved up front, outside of the worker threads.
+        resources = {}
+        for operation in operations:
+            key = (operation["kind"], operation["api_version"])
+            if key not in resources:
+                try:
+                    resources[key] = self.client.resource(*key)
+                except ResourceNotFoundError:
+                    resources[key] = None
+        return resources
+
+    def _discover(self, operation):
+        """Resource of a kind whose CRD was just written, None if not served.
+
+        A lookup that misses refreshes the discovery cache of the client, so
+        every try sees the API groups the cluster serves at that time.
+        """
+        started = time.time()
+        while True:
+            with self._discovery:
+                try:
+                    return self.client.resource(
+                        operation["kind"], operation["api_version"]
+                    )
+                except ResourceNotFoundError:
+                    pass
+            remaining = self.discovery_timeout - (time.time() - started)
+            if remaining <= 0:
+                return None
+            time.sleep(min(self.wait_sleep, remaining))
+
+    def _get(self, resource, operation, namespace):
+        try:
+            return as_dict(
+                self.client.client.get(
+                    resource, name=operation.get("name"), namespace=namespace
+                )
+            )
+        except Exception as e:
+            if not_found(e):
+                return None
+            raise
+
+    def _write(self, resource, operation, namespace):
+        """(changed, object) of a write operation."""
+        dynamic = self.client.client
+        op = operation["op"]
+        name = operation.get("name")
+        if op == "create":
+            try:
+                return True, as_dict(
+                    dynamic.create(
+                        resource,
+                        body=operation["definition"],
+                        namespace=namespace,
+                        dry_run=self.dry_run,
+                    )
+                )
+            except Exception as e:
+                if getattr(e, "status", None) == 409:
+                    return False, self._get(resource, operation, namespace)
+                raise
+        if op == "delete":
+            try:
+                dynamic.delete(
+                    resource, name=name, namespace=namespace, dry_run=self.dry_run
+                )
+            except Exception as e:
+                if not_found(e):
+                    return False, None
+                raise
+            return True, None
+
+        before = self._get(resource, operation, namespace)
+        if op == "apply":
+            after = dynamic.server_side_apply(
+                resource,
+                body=operation["definition"],
+                name=name,
+                namespace=namespace,
+                field_manager=self.field_manager,
+                force_conflicts=True,
+                dry_run=self.dry_run,
+            )
+        else:
+            if before is None:
+                raise ValueError("%s %s not found" % (operation["kind"], name))
+            after = dynamic.patch(
+                resource,
+                body=operation["patch"],
+                name=name,
+                namespace=namespace,
+                content_type=PATCH_TYPES[operation.get("patch_type") or "merge"],
+                dry_run=self.dry_run,
+            )
+        after = as_dict(after)
+        return comparable(before) != comparable(after), after
+
+    def _wait(self, resource, operation, namespace):
+        """(object, seconds waited) once the condition of C(wait) is met."""
+        spec = operation["wait"]
+        status = str(spec.get("status", "True"))
+        timeout = float(spec.get("timeout", 300))
+        started = time.time()
+        while True:
+            obj = self._get(resource, operation, namespace) or {}
+            condition = find_condition(obj, spec["condition"])
+            if condition and str(condition.get("status")) == status:
+                return obj, time.time() - started
+            state = (obj.get("status") or {}).get("state")
+            if state in FAILED_STATES:
+                raise ValueError(
+                    "%s %s is %s" % (operation["kind"], operation.get("name"), state)
+                )
+            remaining = timeout - (time.time() - started)
+            if remaining <= 0:
+                detail = (condition or {}).get("message")
+                raise ValueError(
+                    "%s %s: %s is not %s after %s%s"
+                    % (
+                        operation["kind"],
+                        operation.get("name"),
+                        spec["condition"],
+                        status,
+                        format_duration(timeout),
+                        ": %s" % detail if detail else "",
+                    )
+                )
+            time.sleep(min(self.wait_sleep, remaining))
+
+    def _run(self, operation, resource, rediscover=False):
+        entry = dict(
+            id=operation["id"],
+            op=operation["op"],
+            kind=operation["kind"],
+            name=operation.get("name"),
+            namespace=operation.get("namespace"),
+            changed=False,
+        )
+        if resource is None and rediscover:
+            if self.dry_run:
+                # The CRD was only written with dryRun, the kind cannot exist
+                return dict(
+                    entry,
+                    failed=False,
+                    skipped=True,
+                    msg="%s %s is served once its CustomResourceDefinition is created"
+                    % (operation["api_version"], operation["kind"]),
+                )
+            resource = self._discover(operation)
+        if resource is None:
+            return dict(
+                entry,
+                failed=True,
+                msg="%s %s is not served by the cluster"
+                % (operation["api_version"], operation["kind"]),
+            )
+        namespace = operation.get("namespace") if resource.namespaced else None
+        entry["namespace"] = namespace
+        try:
+            if operation["op"] == "get":
+                obj = as_dict(
+                    self.client.client.get(
+                        resource,
+                        name=operation.get("name"),
+                        namespace=namespace,
+                        label_selector=",".join(operation.get("label_selectors") or [])
+                        or None,
+                    )
+                )
+            else:
+                entry["changed"], obj = self._write(resource, operation, namespace)
+                if operation.get("wait") and not self.dry_run:
+                    obj, waited = self._wait(resource, operation, namespace)
+                    entry["waited"] = round(waited, 1)
+        except Exception as e:
+            return dict(entry, failed=True, msg=error_message(e))
+        captured = {}
+        for variable, expr in (operation.get("capture") or {}).items():
+            try:
+                captured[variable] = extract(obj or {}, expr)
+            except ValueError as e:
+                return dict(entry, failed=True, msg=str(e))
+        return dict(entry, failed=False, captured=captured)
+
+    def run(self, operations):
+        operations = normalize(operations)
+        resources = self._resources(operations)
+        rediscover = after_crd_writes(operations)
+        outcomes = {}
+        pending = list(operations)
+        running = {}
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as pool:
+            while pending or running:
+                # Dependencies come earlier in the list, so one pass in order
+                # starts every operation whose dependencies are done.
+                for operation in list(pending):
+                    if any(dep not in outcomes for dep in operation["after"]):
+                        continue
+                    pending.remove(operation)
+                    blocked = [
+                        dep for dep in operation["after"] if outcomes[dep]["failed"]
+                    ]
+                    if blocked:
+                        outcomes[operation["id"]] = dict(
+                            id=operation["id"],
+                            op=operation["op"],
+                            kind=operation["kind"],
+                            name=operation.get("name"),
+                            namespace=operation.get("namespace"),
+                            changed=False,
+                            failed=True,
+                            skipped=True,
+                            msg="skipped, %s failed" % ", ".join(blocked),
+                        )
+                        continue
+                    future = pool.submit(
+                        self._run,
+                        operation,
+                        resources[(operation["kind"], operation["api_version"])],
+                        operation["id"] in rediscover,
+                    )
+                    running[future] = operation["id"]
+                if not running:
+                    continue
+                done, dummy = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    outcomes[running.pop(future)] = future.result()
+
+        results = []
+        captured = {}
+        errors = []
+        for operation in operations:
+            outcome = outcomes[operation["id"]]
+            results.append(outcome)
+            captured.update(outcome.get("captured") or {})
+            if outcome["failed"] and not operation.get("ignore_errors"):
+                errors.append(outcome)
+        return dict(
+            changed=any(outcome["changed"] for outcome in results),
+            results=results,
+            captured=captured,
+            errors=errors,
+        )
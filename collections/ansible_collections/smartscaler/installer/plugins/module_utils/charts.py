@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Local chart store: every chart directory of files/charts is packaged once
+# into <name>-<version>-<digest>.tgz, with the subcharts of its charts/
+# directory inside, and recorded in index.json by its directory. Helm then
+# installs the package, one archive, instead of loading the directory tree
+# and checking its dependencies on every install. An entry is reused while
+# the stat signature of the directory (paths, sizes and mtimes) is unchanged;
+# a changed signature with the same content digest only updates the entry.
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import fnmatch
+import gzip
+import hashlib
+import json
+import os
+import tarfile
+
+import yaml
+
+INDEX_VERSION = 1
+INDEX_FILE = "index.json"
+IGNORE_FILE = ".helmignore"
+
+
+def load_ignore(chart_dir):
+    """Patterns of the .helmignore of a chart; negations are not supported."""
+    path = os.path.join(chart_dir, IGNORE_FILE)
+    if not os.path.isfile(path):
+        return []
+    with open(path) as f:
+        lines = [line.strip() for line in f]
+    return [line for line in lines if line and not line.startswith(("#", "!"))]
+
+
+def ignored(path, is_dir, patterns):
+    """Whether I(path), relative to the chart, matches a .helmignore pattern.
+
+    Patterns with a slash match the whole path, others its base name; a
+    trailing slash only matches directories.
+    """
+    for pattern in patterns:
+        if pattern.endswith("/"):
+            if not is_dir:
+                continue
+            pattern = pattern.rstrip("/")
+        target = path if "/" in pattern else os.path.basename(path)
+        if fnmatch.fnmatchcase(target, pattern.lstrip("/")):
+            return True
+    return False
+
+
+def chart_files(chart_dir):
+    """Sorted (relative path, full path) of the files a package holds.
+
+    The .helmignore of the chart applies to all of its files, and the one of
+    each subchart under charts/, at any depth, to the files of that subchart,
+    relative to the subchart root. The Chart.yaml of a chart is never ignored.
+    """
+    # (path prefix of a chart, its patterns), the chart itself first
+    scopes = [("", load_ignore(chart_dir))]
+
+    def skip(rel, is_dir):
+        for prefix, patterns in scopes:
+            if rel.startswith(prefix):
+                sub = rel[len(prefix) :]
+                if sub == "Chart.yaml":
+                    return False
+                if ignored(sub, is_dir, patterns):
+                    return True
+        return False
+
+    files = []
+    for root, dirs, names in os.walk(chart_dir):
+        rel_root = os.path.relpath(root, chart_dir)
+        rel_root = "" if rel_root == "." else rel_root.replace(os.sep, "/")
+        parts = rel_root.split("/")
+        if (
+            len(parts) >= 2
+            and parts[-2] == "charts"
+            and os.path.isfile(os.path.join(root, "Chart.yaml"))
+            and any(
+                rel_root == prefix + "charts/" + parts[-1] for prefix, dummy in scopes
+            )
+        ):
+            scopes.append((rel_root + "/", load_ignore(root)))
+        dirs[:] = sorted(
+            name
+            for name in dirs
+            if not skip(rel_root + "/" + name if rel_root else name, True)
+        )
+        for name in names:
+            rel = rel_root + "/" + name if rel_root else name
+            if not skip(rel, False):
+                files.append((rel, os.path.join(root, name)))
+    return sorted(files)
+
+
+def signature(files):
+    """sha256 of the paths, sizes and mtimes of I(files); reads no content."""
+    digest = hashlib.sha256()
+    for rel, full in files:
+        stat = os.stat(full)
+        digest.update(("%s\0%d\0%d\n" % (rel, stat.st_size, stat.st_mtime_ns)).encode())
+    return digest.hexdigest()
+
+
+def content_digest(files):
+    """sha256 of the paths and contents of I(files)."""
+    digest = hashlib.sha256()
+    for rel, full in files:
+        digest.update(b"\0" + rel.encode("utf-8") + b"\0")
+        with open(full, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_chart(chart_dir):
+    with open(os.path.join(chart_dir, "Chart.yaml")) as f:
+        chart = yaml.safe_load(f) or {}
+    if not chart.get("name") or not chart.get("version"):
+        raise ValueError("%s/Chart.yaml has no name or version" % chart_dir)
+    return chart
+
+
+def missing_dependencies(chart, files):
+    """Dependencies of Chart.yaml that are not vendored under charts/."""
+    vendored = set()
+    for rel, dummy in files:
+        parts = rel.split("/")
+        if len(parts) > 2 and parts[0] == "charts":
+            vendored.add(parts[1])
+        elif len(parts) == 2 and parts[0] == "charts" and rel.endswith(".tgz"):
+            vendored.add(parts[1][: -len(".tgz")])
+    missing = []
+    for dependency in chart.get("dependencies") or []:
+        name = dependency.get("name")
+        if name in vendored or any(
+            archive.startswith(name + "-") for archive in vendored
+        ):
+            continue
+        missing.append(name)
+    return missing
+
+
+def package(chart, files, dest):
+    """Write I(files) to the archive I(dest) as helm package would.
+
+    Entries are under a directory named after the chart, with fixed owners
+    and mtimes, so that the same content always gives the same archive.
+    """
+    tmp = dest + ".tmp"
+    with open(tmp, "wb") as raw:
+        with gzip.GzipFile(filename="", mode="wb", fileobj=raw, mtime=0) as gz:
+            with tarfile.open(fileobj=gz, mode="w", format=tarfile.PAX_FORMAT) as tar:
+                for rel, full in files:
+                    info = tar.gettarinfo(full, arcname="%s/%s" % (chart["name"], rel))
+                    info.uid = info.gid = 0
+                    info.uname = info.gname = ""
+                    info.mtime = 0
+                    with open(full, "rb") as f:
+                        tar.addfile(info, f)
+    os.replace(tmp, dest)
+
+
+class ChartStore(object):
+    """Packages of local charts under I(path), indexed by chart directory."""
+
+    def __init__(self, path):
+        self.path = path
+        self.index_file = os.path.join(path, INDEX_FILE)
+        self.index = dict(version=INDEX_VERSION, charts={})
+        if os.path.isfile(self.index_file):
+            with open(self.index_file) as f:
+                index = json.load(f)
+            if index.get("version") == INDEX_VERSION:
+                self.index = index
+
+    def _remove(self, entry):
+        if entry and os.path.isfile(entry.get("package") or ""):
+            os.remove(entry["package"])
+
+    def add(self, chart_dir):
+        """Index entry of I(chart_dir), packaged when its content changed.
+
+        Returns the entry and whether the package was written.
+        """
+        key = os.path.normpath(chart_dir)
+        files = chart_files(chart_dir)
+        current = signature(files)
+        entry = self.index["charts"].get(key)
+        if entry and entry["signature"] == current and os.path.isfile(entry["package"]):
+            return entry, False
+        digest = content_digest(files)
+        if entry and entry["digest"] == digest and os.path.isfile(entry["package"]):
+            entry["signature"] = current
+            return entry, False
+        chart = read_chart(chart_dir)
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        dest = os.path.join(
+            self.path, "%s-%s-%s.tgz" % (chart["name"], chart["version"], digest[:12])
+        )
+        if not os.path.isfile(dest):
+            package(chart, files, dest)
+        if entry and entry["package"] != dest:
+            self._remove(entry)
+        entry = dict(
+            name=chart["name"],
+            version=str(chart["version"]),
+            digest=digest,
+            signature=current,
+            package=dest,
+            missing_dependencies=missing_dependencies(chart, files),
+        )
+        self.index["charts"][key] = entry
+        return entry, True
+
+    def save(self):
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        tmp = self.index_file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.index, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.index_file)
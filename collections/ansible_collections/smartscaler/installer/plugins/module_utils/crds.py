@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Status handling for smartscaler.installer.crd_wait: decide from the watch
+# events of CustomResourceDefinitions which of the expected ones the API
+# server has accepted and serves.
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+CONDITIONS = ("Established", "NamesAccepted")
+
+
+def crd_names(definitions):
+    """Names of the CustomResourceDefinitions among I(definitions), in order."""
+    names = []
+    for definition in definitions:
+        if not isinstance(definition, dict):
+            continue
+        if definition.get("kind") != "CustomResourceDefinition":
+            continue
+        name = (definition.get("metadata") or {}).get("name")
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def missing_conditions(obj, conditions=CONDITIONS):
+    """Conditions of I(conditions) that are not C(True) on a CRD object."""
+    status = dict(
+        (condition.get("type"), str(condition.get("status")))
+        for condition in (obj.get("status") or {}).get("conditions") or []
+    )
+    return [condition for condition in conditions if status.get(condition) != "True"]
+
+
+class CRDWatch(object):
+    """Follow the watch events of every CRD until I(names) are all ready.
+
+    Events of other CRDs are ignored, so a single watch over the whole
+    CustomResourceDefinition collection serves any number of names.
+    ``feed()`` returns the lines worth showing.
+    """
+
+    def __init__(self, names, conditions=CONDITIONS):
+        self.names = list(names)
+        self.conditions = tuple(conditions)
+        self.missing = dict((name, ["not created"]) for name in self.names)
+        self.ready = []
+
+    @property
+    def done(self):
+        return not self.missing
+
+    def _pending(self, name, missing):
+        self.missing[name] = missing
+        if name in self.ready:
+            self.ready.remove(name)
+
+    def feed(self, event_type, obj):
+        name = (obj.get("metadata") or {}).get("name")
+        if name not in self.names:
+            return []
+        if event_type == "DELETED":
+            self._pending(name, ["not created"])
+            return ["%s deleted, waiting for it to be created again" % name]
+        missing = missing_conditions(obj, self.conditions)
+        if missing:
+            self._pending(name, missing)
+            return []
+        if name in self.missing:
+            del self.missing[name]
+            self.ready.append(name)
+            return ["%s established (%d/%d)" % (name, len(self.ready), len(self.names))]
+        return []
+
+    def status_line(self):
+        if self.done:
+            return "all %d CRDs established" % len(self.names)
+        pending = sorted(self.missing)
+        shown = ", ".join(
+            "%s (%s)" % (name, "/".join(self.missing[name])) for name in pending[:3]
+        )
+        if len(pending) > 3:
+            shown += " and %d more" % (len(pending) - 3)
+        return "%d/%d CRDs established, waiting for %s" % (
+            len(self.ready),
+            len(self.names),
+            shown,
+        )
+
+    def result(self):
+        return dict(
+            crds=self.names,
+            established=self.ready,
+            pending=dict(
+                (name, self.missing[name])
+                for name in self.names
+                if name in self.missing
+            ),
+        )
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Values of the kubeslice-worker-egs chart for smartscaler.installer.egs_worker_values,
+# built from the Secrets the EGS controller creates for each registered cluster.
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import base64
+
+from ansible.module_utils._text import to_text
+
+# Keys of the kubeslice-rbac-worker-<cluster> Secret, by name in the chart values
+CONTROLLER_SECRET_KEYS = (
+    ("namespace", "namespace"),
+    ("endpoint", "controllerEndpoint"),
+    ("ca.crt", "ca.crt"),
+    ("token", "token"),
+)
+
+
+def worker_secret_name(cluster):
+    return "kubeslice-rbac-worker-%s" % cluster
+
+
+def object_name(obj):
+    return (obj.get("metadata") or {}).get("name")
+
+
+def missing_keys(secret, keys):
+    """Keys of I(keys) that are absent or empty in a Secret object."""
+    data = secret.get("data") or {}
+    return [key for key in keys if not data.get(key)]
+
+
+def agent_endpoint(service, namespace):
+    """In-cluster URL of the first port of a Service object."""
+    ports = (service.get("spec") or {}).get("ports") or []
+    if not ports:
+        raise ValueError(
+            "Service %s/%s has no ports" % (namespace, object_name(service))
+        )
+    return "http://%s.%s.svc.cluster.local:%s" % (
+        object_name(service),
+        namespace,
+        ports[0]["port"],
+    )
+
+
+def agent_key(secret):
+    """Decoded token of the admin Secret the EGS agent authenticates with."""
+    if missing_keys(secret, ["token"]):
+        raise ValueError("Secret %s has no token" % object_name(secret))
+    return to_text(base64.b64decode(secret["data"]["token"]))
+
+
+def worker_values(secret, endpoint, key, agent_secret_name="egs-agent-access"):
+    """Chart values of one worker cluster.
+
+    The controllerSecret values stay base64 encoded, as stored in the
+    Secret; the chart writes them into a Secret of the worker as they are.
+    """
+    missing = missing_keys(secret, [source for _, source in CONTROLLER_SECRET_KEYS])
+    if missing:
+        raise ValueError(
+            "Secret %s has no %s" % (object_name(secret), ", ".join(missing))
+        )
+    return dict(
+        controllerSecret=dict(
+            (name, secret["data"][source]) for name, source in CONTROLLER_SECRET_KEYS
+        ),
+        egsAgent=dict(
+            secretName=agent_secret_name,
+            agentSecret=dict(endpoint=endpoint, key=key),
+        ),
+    )
+
+
+class SecretCollector(object):
+    """Keep the Secrets of I(required) once all their keys are filled in.
+
+    I(required) maps Secret names to the data keys they need. The token of
+    a service account Secret is added after the Secret is created, so a
+    Secret only counts once every key has a value. Secrets come from a
+    single list of the namespace and from the watch events that follow it;
+    ``feed()`` returns the lines worth showing.
+    """
+
+    def __init__(self, required):
+        self.required = dict(required)
+        self.secrets = {}
+
+    @property
+    def done(self):
+        return not self.missing
+
+    @property
+    def missing(self):
+        return sorted(name for name in self.required if name not in self.secrets)
+
+    def feed(self, event_type, obj):
+        name = object_name(obj)
+        if name not in self.required:
+            return []
+        if event_type == "DELETED" or missing_keys(obj, self.required[name]):
+            self.secrets.pop(name, None)
+            return []
+        known = name in self.secrets
+        self.secrets[name] = obj
+        if known:
+            return []
+        return ["%s read (%d/%d)" % (name, len(self.secrets), len(self.required))]
+
+    def status_line(self):
+        missing = self.missing
+        shown = ", ".join(missing[:3])
+        if len(missing) > 3:
+            shown += " and %d more" % (len(missing) - 3)
+        return "%d/%d Secrets read, waiting for %s" % (
+            len(self.secrets),
+            len(self.required),
+            shown,
+        )
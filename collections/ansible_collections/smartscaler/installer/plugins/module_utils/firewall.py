@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# UFW rule sets for smartscaler.installer.ufw_rules. A rule is compared on
+# what it matches (action, direction, addresses, ports and protocol); its
+# comment is only carried along when the rule is added.
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import shlex
+
+ACTIONS = ("allow", "deny", "reject", "limit")
+ANY = "any"
+
+
+def _port(port):
+    return str(port).replace("-", ":") if port not in (None, "") else ANY
+
+
+def rule_key(rule):
+    """Identity of a desired rule, comparable with parsed ufw rules."""
+    return (
+        rule.get("rule") or "allow",
+        rule.get("direction") or "in",
+        rule.get("from_ip") or ANY,
+        _port(rule.get("from_port")),
+        rule.get("to_ip") or ANY,
+        _port(rule.get("port")),
+        rule.get("proto") or ANY,
+    )
+
+
+def parse_rule(line):
+    """Key of one line of C(ufw show added), or None for other lines."""
+    try:
+        tokens = shlex.split(line)
+    except ValueError:
+        return None
+    if len(tokens) < 3 or tokens[0] != "ufw" or tokens[1] not in ACTIONS:
+        return None
+    action = tokens[1]
+    tokens = tokens[2:]
+    if "comment" in tokens:
+        tokens = tokens[: tokens.index("comment")]
+    direction = "in"
+    if tokens and tokens[0] in ("in", "out"):
+        direction = tokens.pop(0)
+    if len(tokens) == 1:
+        # Simple syntax: PORT[/PROTO]
+        port, dummy, proto = tokens[0].partition("/")
+        return (action, direction, ANY, ANY, ANY, _port(port), proto or ANY)
+    fields = dict(zip(tokens[::2], tokens[1::2]))
+    # "port" follows "from" and/or "to"; tell them apart by position.
+    src_port = dst_port = ANY
+    for index, token in enumerate(tokens[:-1]):
+        if token == "port":
+            if "to" in tokens and index > tokens.index("to"):
+                dst_port = _port(tokens[index + 1])
+            else:
+                src_port = _port(tokens[index + 1])
+    return (
+        action,
+        direction,
+        fields.get("from", ANY),
+        src_port,
+        fields.get("to", ANY),
+        dst_port,
+        fields.get("proto", ANY),
+    )
+
+
+def parse_added(output):
+    """Keys of every rule listed by C(ufw show added)."""
+    keys = []
+    for line in output.splitlines():
+        key = parse_rule(line.strip())
+        if key is not None:
+            keys.append(key)
+    return keys
+
+
+def rule_args(key, comment=None):
+    """ufw arguments adding the rule identified by I(key)."""
+    action, direction, src, src_port, dst, dst_port, proto = key
+    args = [action]
+    if direction != "in":
+        args.append(direction)
+    if src == ANY and src_port == ANY and dst == ANY and dst_port != ANY:
+        args.append(dst_port if proto == ANY else "%s/%s" % (dst_port, proto))
+    else:
+        args += ["from", src]
+        if src_port != ANY:
+            args += ["port", src_port]
+        args += ["to", dst]
+        if dst_port != ANY:
+            args += ["port", dst_port]
+        if proto != ANY:
+            args += ["proto", proto]
+    if comment:
+        args += ["comment", comment]
+    return args
+
+
+def delta(rules, current):
+    """Desired rules missing from I(current), deduplicated, in order."""
+    present = set(current)
+    missing = []
+    for rule in rules:
+        key = rule_key(rule)
+        if key not in present:
+            present.add(key)
+            missing.append((key, rule.get("comment")))
+    return missing
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Run journal of site.yml: every execution_order item that ran is recorded
+# in output/.run_journal.json with the fingerprint of its inputs, its result,
+# its duration and the objects that show it is still installed (witnesses).
+# With -e resume=true, an item whose last run succeeded, whose fingerprint
+# is unchanged and whose witnesses all still exist is skipped. A witness is
+# "Kind/namespace/name" as manifest_render reports its resources, or a dict
+# {"kind", "api_version", "namespace", "name"} or with "labels" instead of a
+# name to match any object with those labels.
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from ansible_collections.smartscaler.installer.plugins.module_utils.preflight import (
+    error_message,
+)
+
+try:
+    from kubernetes.dynamic.exceptions import ResourceNotFoundError
+except ImportError:
+    # The module reports the missing library through kubernetes.core.
+
+    class ResourceNotFoundError(Exception):
+        pass
+
+
+JOURNAL_VERSION = 1
+# Item settings that name local files whose content is part of the fingerprint
+FILE_KEYS = (
+    "manifest_file",
+    "values_files",
+    "files",
+    "inputs",
+    "src",
+    "inference_config",
+    "locustfile",
+)
+
+
+def _files(value, named=False):
+    """Local file paths named by the settings of an item, recursively."""
+    if isinstance(value, dict):
+        for key, child in sorted(value.items()):
+            for path in _files(child, named or key in FILE_KEYS):
+                yield path
+    elif isinstance(value, (list, tuple)):
+        for child in value:
+            for path in _files(child, named):
+                yield path
+    elif named and isinstance(value, str):
+        yield value
+
+
+def fingerprint(item, item_type, base_dir=".", derived=None, digests=None):
+    """sha256 of the settings of an item and of the local files it names.
+
+    Settings are hashed as canonical JSON, so the fingerprint does not depend
+    on the order of keys. I(derived) are settings expanded from the item, such
+    as the items of a model stack, whose files count as well. A file that does
+    not exist is hashed by its name. I(digests) are digests of inputs hashed
+    elsewhere, such as the content digest of a packaged local chart.
+    """
+    settings = dict(type=item_type, item=item)
+    if digests:
+        settings["digests"] = digests
+    digest = hashlib.sha256()
+    digest.update(json.dumps(settings, sort_keys=True, default=str).encode("utf-8"))
+    for path in sorted(set(_files([item, derived]))):
+        full = path if os.path.isabs(path) else os.path.join(base_dir, path)
+        digest.update(b"\0" + path.encode("utf-8") + b"\0")
+        if os.path.isfile(full):
+            with open(full, "rb") as f:
+                for chunk in iter(lambda: f.read(65536), b""):
+                    digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_witness(witness):
+    """A witness as a dict with kind, api_version, namespace, name, labels."""
+    if isinstance(witness, dict):
+        parsed = dict(witness)
+    else:
+        parts = str(witness).split("/")
+        if len(parts) == 3:
+            parsed = dict(kind=parts[0], namespace=parts[1], name=parts[2])
+        elif len(parts) == 2:
+            parsed = dict(kind=parts[0], name=parts[1])
+        else:
+            raise ValueError("witness %s is not Kind/namespace/name" % witness)
+    parsed.setdefault("api_version", None)
+    parsed.setdefault("namespace", None)
+    parsed.setdefault("name", None)
+    parsed.setdefault("labels", None)
+    if not parsed.get("kind") or not (parsed["name"] or parsed["labels"]):
+        raise ValueError("witness %s needs a kind and a name or labels" % witness)
+    return parsed
+
+
+def selector_of(witness):
+    """Label selector of a witness found by its labels, or an empty string."""
+    if witness["name"]:
+        return ""
+    return ",".join("%s=%s" % label for label in sorted(witness["labels"].items()))
+
+
+def describe(witness):
+    parts = [
+        witness["kind"],
+        witness["namespace"],
+        witness["name"] or selector_of(witness),
+    ]
+    return "/".join(part for part in parts if part)
+
+
+def matches(witness, obj):
+    metadata = obj.get("metadata") or {}
+    if witness["name"]:
+        return metadata.get("name") == witness["name"]
+    labels = metadata.get("labels") or {}
+    return all(labels.get(key) == value for key, value in witness["labels"].items())
+
+
+def group_of(witness):
+    """(kind, api_version, namespace, label selector) listed to find a witness."""
+    return (
+        witness["kind"],
+        witness["api_version"],
+        witness["namespace"],
+        selector_of(witness),
+    )
+
+
+class DriftCheck(object):
+    """Tell which items lost objects since they were recorded.
+
+    Each kind is listed once per namespace, however many items and witnesses
+    refer to it by name, and the lists run concurrently. Witnesses found by
+    their labels, such as the release of a Helm chart, are listed with their
+    label selector, so only the matching objects are read.
+    """
+
+    def __init__(self, client, max_workers=8):
+        self.client = client
+        self.max_workers = max_workers
+
+    def _list(self, group, resource):
+        kind, dummy, namespace, selector = group
+        if resource is None:
+            return None, "%s is not served by the cluster" % kind
+        kwargs = dict(label_selector=selector) if selector else {}
+        try:
+            objs = self.client.client.get(
+                resource, namespace=namespace if resource.namespaced else None, **kwargs
+            )
+        except Exception as e:
+            return None, error_message(e)
+        objs = objs.to_dict() if hasattr(objs, "to_dict") else objs
+        return objs.get("items") or [], None
+
+    def run(self, witnesses):
+        """Missing witnesses of every item of I(witnesses), name to list."""
+        parsed = dict(
+            (name, [parse_witness(witness) for witness in item_witnesses or []])
+            for name, item_witnesses in witnesses.items()
+        )
+        groups = sorted(
+            set(
+                group_of(witness)
+                for item_witnesses in parsed.values()
+                for witness in item_witnesses
+            ),
+            key=lambda group: tuple(part or "" for part in group),
+        )
+        # Discovery is resolved up front, outside of the worker threads.
+        resources = {}
+        for kind, api_version, dummy, dummy in groups:
+            if (kind, api_version) not in resources:
+                try:
+                    resources[(kind, api_version)] = self.client.resource(
+                        kind, api_version
+                    )
+                except ResourceNotFoundError:
+                    resources[(kind, api_version)] = None
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as pool:
+            listed = dict(
+                zip(
+                    groups,
+                    pool.map(
+                        lambda group: self._list(group, resources[group[:2]]),
+                        groups,
+                    ),
+                )
+            )
+        drifted = {}
+        for name, item_witnesses in parsed.items():
+            missing = []
+            for witness in item_witnesses:
+                objs, error = listed[group_of(witness)]
+                if error:
+                    missing.append("%s: %s" % (describe(witness), error))
+                elif not any(matches(witness, obj) for obj in objs):
+                    missing.append("%s is missing" % describe(witness))
+            if missing:
+                drifted[name] = missing
+        return dict(drifted=drifted, lists=len(groups))
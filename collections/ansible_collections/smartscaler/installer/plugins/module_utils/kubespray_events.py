@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Reading side of the smartscaler.installer.jsonl_events callback: follow the
+# events file of a running playbook and turn it into progress lines and a
+# task timing profile.
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import json
+import os
+import time
+
+HOST_COUNTERS = ("ok", "changed", "failed", "skipped", "unreachable")
+
+
+def read_events(path, offset=0):
+    """Return (events, offset) for the complete lines written after I(offset).
+
+    A line still being written is left for the next call.
+    """
+    if not os.path.exists(path):
+        return [], offset
+    with open(path, "rb") as fh:
+        fh.seek(offset)
+        data = fh.read()
+    end = data.rfind(b"\n")
+    if end < 0:
+        return [], offset
+    events = []
+    for line in data[: end + 1].splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            events.append(json.loads(line.decode("utf-8")))
+        except ValueError:
+            continue
+    return events, offset + end + 1
+
+
+def format_duration(seconds):
+    seconds = int(round(seconds or 0))
+    if seconds < 60:
+        return "%ds" % seconds
+    if seconds < 3600:
+        return "%dm%02ds" % divmod(seconds, 60)
+    hours, rest = divmod(seconds, 3600)
+    return "%dh%02dm" % (hours, rest // 60)
+
+
+class ProgressTracker(object):
+    """Aggregate jsonl_events events.
+
+    ``feed()`` returns the lines worth showing right away (play starts,
+    failures, slow tasks); ``status_line()`` and ``host_lines()`` describe the
+    current state for periodic display.
+    """
+
+    def __init__(self, slow_task_threshold=60):
+        self.slow_task_threshold = slow_task_threshold
+        self.started = None
+        self.last_event = None
+        self.plays = []
+        self.task = None
+        self.tasks_started = 0
+        self.hosts = {}
+        # (play, task) -> {"play", "task", "duration", "host", "hosts"}
+        self.timings = {}
+        self.failures = []
+        self.stats = None
+
+    @property
+    def finished(self):
+        return self.stats is not None
+
+    def _host(self, name):
+        if name not in self.hosts:
+            self.hosts[name] = dict((key, 0) for key in HOST_COUNTERS)
+        return self.hosts[name]
+
+    def feed(self, event):
+        kind = event.get("event")
+        now = event.get("time")
+        if self.started is None and now is not None:
+            self.started = now
+        if now is not None:
+            self.last_event = now
+        lines = []
+
+        if kind == "play_start":
+            self.plays.append(event.get("play") or "")
+            lines.append(
+                "PLAY %d [%s] on %s"
+                % (
+                    len(self.plays),
+                    event.get("play"),
+                    ", ".join(event.get("hosts") or []),
+                )
+            )
+        elif kind == "task_start":
+            self.task = event.get("task")
+            self.tasks_started += 1
+        elif kind == "result":
+            lines.extend(self._result(event))
+        elif kind == "stats":
+            self.stats = event.get("hosts") or {}
+        return lines
+
+    def _result(self, event):
+        host = event.get("host")
+        status = event.get("status")
+        counters = self._host(host)
+        if status == "ok" and event.get("changed"):
+            counters["changed"] += 1
+        if status in counters:
+            counters[status] += 1
+
+        lines = []
+        duration = event.get("duration")
+        if duration is not None and status != "skipped":
+            key = (event.get("play"), event.get("task"))
+            timing = self.timings.get(key)
+            if timing is None:
+                timing = self.timings[key] = dict(
+                    play=event.get("play"),
+                    task=event.get("task"),
+                    duration=0.0,
+                    host=host,
+                    hosts=0,
+                )
+            timing["hosts"] += 1
+            if duration > timing["duration"]:
+                timing["duration"] = duration
+                timing["host"] = host
+            if duration >= self.slow_task_threshold:
+                lines.append(
+                    "  slow: [%s] %s took %s"
+                    % (host, event.get("task"), format_duration(duration))
+                )
+        if status in ("failed", "unreachable"):
+            failure = dict(
+                host=host,
+                task=event.get("task"),
+                status=status,
+                msg=event.get("msg", ""),
+                ignored=bool(event.get("ignore_errors")),
+            )
+            self.failures.append(failure)
+            lines.append(
+                "  %s: [%s] %s%s: %s"
+                % (
+                    status,
+                    host,
+                    event.get("task"),
+                    " (ignored)" if failure["ignored"] else "",
+                    failure["msg"],
+                )
+            )
+        return lines
+
+    def elapsed(self, now=None):
+        if self.started is None:
+            return 0
+        return (now or time.time()) - self.started
+
+    def status_line(self, now=None):
+        if self.started is None:
+            return "waiting for the first event"
+        return "%s elapsed, play %d [%s], %d tasks, current: %s" % (
+            format_duration(self.elapsed(now)),
+            len(self.plays),
+            self.plays[-1] if self.plays else "",
+            self.tasks_started,
+            self.task or "-",
+        )
+
+    def host_lines(self):
+        return [
+            "  %s: %s"
+            % (host, " ".join("%s=%d" % (key, counters[key]) for key in HOST_COUNTERS))
+            for host, counters in sorted(self.hosts.items())
+        ]
+
+    def slowest(self, count=10):
+        """Tasks sorted by their longest run on any host."""
+        timings = sorted(
+            self.timings.values(), key=lambda timing: timing["duration"], reverse=True
+        )
+        return [
+            dict(timing, duration=round(timing["duration"], 1))
+            for timing in timings[:count]
+        ]
+
+    def result(self, slowest=10):
+        return dict(
+            plays=len(self.plays),
+            tasks=self.tasks_started,
+            duration=round(self.elapsed(self.last_event), 1),
+            hosts=self.stats if self.stats is not None else self.hosts,
+            failures=self.failures,
+            slowest_tasks=self.slowest(slowest),
+        )
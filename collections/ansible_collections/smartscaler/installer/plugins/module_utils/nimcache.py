@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Status handling for smartscaler.installer.nimcache_wait: decide from the
+# watched NIMCache object whether the cache is ready, failed or still
+# downloading, and describe how far the model download got.
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import re
+
+FAILED_STATES = ("Failed",)
+
+# Fields the NIM operator (or a newer release of it) may report the download
+# progress with; the first one present wins.
+PERCENT_FIELDS = ("progress", "downloadProgress", "percentComplete", "percentage")
+DOWNLOADED_FIELDS = ("downloadedBytes", "bytesDownloaded", "currentBytes")
+TOTAL_FIELDS = ("totalBytes", "bytesTotal", "sizeBytes")
+
+PERCENT_RE = re.compile(r"(\d+(?:\.\d+)?)\s*%")
+
+
+def find_condition(obj, condition_type):
+    for condition in (obj.get("status") or {}).get("conditions") or []:
+        if condition.get("type") == condition_type:
+            return condition
+    return None
+
+
+def format_bytes(value):
+    value = float(value)
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if value < 1024:
+            return "%.1f %s" % (value, unit) if unit != "B" else "%d B" % value
+        value /= 1024
+    return "%.1f TiB" % value
+
+
+def _first(status, fields):
+    for field in fields:
+        if status.get(field) not in (None, ""):
+            return status[field]
+    return None
+
+
+def _percent(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = PERCENT_RE.search(str(value))
+    if match:
+        return float(match.group(1))
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def download_progress(obj):
+    """Return a dict with C(percent), C(downloaded) and C(total), where known.
+
+    Fields missing from the status are left out; a percentage found in a
+    condition message is used when the status has none of its own.
+    """
+    status = obj.get("status") or {}
+    progress = {}
+    percent = _percent(_first(status, PERCENT_FIELDS))
+    downloaded = _first(status, DOWNLOADED_FIELDS)
+    total = _first(status, TOTAL_FIELDS)
+    if downloaded is not None:
+        progress["downloaded"] = int(downloaded)
+    if total is not None:
+        progress["total"] = int(total)
+    if percent is None and progress.get("total"):
+        percent = 100.0 * progress.get("downloaded", 0) / progress["total"]
+    if percent is None:
+        for condition in status.get("conditions") or []:
+            percent = _percent(condition.get("message"))
+            if percent is not None:
+                break
+    if percent is not None:
+        progress["percent"] = round(percent, 1)
+    return progress
+
+
+def describe(obj, condition_type="Ready"):
+    """One line summary of the cache state and its download progress."""
+    status = obj.get("status") or {}
+    parts = ["state=%s" % (status.get("state") or "Pending")]
+    progress = download_progress(obj)
+    if "percent" in progress:
+        parts.append("%s%%" % progress["percent"])
+    if "downloaded" in progress:
+        if "total" in progress:
+            parts.append(
+                "%s / %s"
+                % (
+                    format_bytes(progress["downloaded"]),
+                    format_bytes(progress["total"]),
+                )
+            )
+        else:
+            parts.append(format_bytes(progress["downloaded"]))
+    condition = find_condition(obj, condition_type)
+    if condition is not None and condition.get("message"):
+        parts.append(condition["message"])
+    return ", ".join(parts)
+
+
+def evaluate(obj, condition_type="Ready"):
+    """Return C(ready), C(failed) or C(pending) for a NIMCache object."""
+    status = obj.get("status") or {}
+    condition = find_condition(obj, condition_type)
+    if condition is not None and str(condition.get("status")) == "True":
+        return "ready"
+    if condition is None and status.get("state") == condition_type:
+        return "ready"
+    failed = find_condition(obj, "Failed")
+    if status.get("state") in FAILED_STATES or (
+        failed is not None and str(failed.get("status")) == "True"
+    ):
+        return "failed"
+    return "pending"
+
+
+class NIMCacheWatch(object):
+    """Follow the watch events of one NIMCache.
+
+    ``feed()`` returns the lines worth showing: a new state, a new condition
+    message or a progress step of at least I(percent_step) percent.
+    """
+
+    def __init__(self, condition="Ready", percent_step=5):
+        self.condition = condition
+        self.percent_step = percent_step
+        self.obj = None
+        self.phase = "pending"
+        self.deleted = False
+        self.history = []
+        self._last_key = None
+        self._last_percent = None
+
+    @property
+    def done(self):
+        return self.phase in ("ready", "failed")
+
+    def feed(self, event_type, obj):
+        self.obj = obj
+        if event_type == "DELETED":
+            self.deleted = True
+            self.phase = "pending"
+            self._last_key = None
+            return ["deleted, waiting for it to be created again"]
+        self.deleted = False
+        self.phase = evaluate(obj, self.condition)
+        condition = find_condition(obj, self.condition) or {}
+        key = ((obj.get("status") or {}).get("state"), condition.get("message"))
+        percent = download_progress(obj).get("percent")
+        if key == self._last_key and not self.done:
+            if percent is None or (
+                self._last_percent is not None
+                and abs(percent - self._last_percent) < self.percent_step
+            ):
+                return []
+        self._last_key = key
+        self._last_percent = percent
+        line = describe(obj, self.condition)
+        self.history.append(line)
+        return [line]
+
+    def status_line(self):
+        if self.obj is None:
+            return "not created yet"
+        if self.deleted:
+            return "deleted"
+        return describe(self.obj, self.condition)
+
+    def result(self):
+        status = (self.obj or {}).get("status") or {}
+        return dict(
+            ready=self.phase == "ready",
+            state=status.get("state"),
+            conditions=status.get("conditions") or [],
+            progress=download_progress(self.obj or {}),
+            history=self.history,
+        )
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Server-side dry-run of a whole install plan, used by
+# smartscaler.installer.k8s_dry_run. A render is one execution_order item:
+# {"item": name, "namespace": default namespace, "definitions": [...]}, or
+# with "content" holding the rendered YAML instead of "definitions".
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import yaml
+
+try:
+    from kubernetes.dynamic.exceptions import ResourceNotFoundError
+except ImportError:
+    # The module reports the missing library through kubernetes.core.
+
+    class ResourceNotFoundError(Exception):
+        pass
+
+
+def group_of(api_version):
+    return api_version.split("/", 1)[0] if "/" in (api_version or "") else ""
+
+
+def definitions_of(render):
+    if render.get("definitions") is not None:
+        return render["definitions"]
+    return [
+        definition
+        for definition in yaml.safe_load_all(render.get("content") or "")
+        if definition
+    ]
+
+
+def load(renders):
+    """Renders with their C(content) parsed into C(definitions)."""
+    return [
+        dict(
+            item=render.get("item"),
+            namespace=render.get("namespace"),
+            definitions=definitions_of(render),
+        )
+        for render in renders
+    ]
+
+
+def planned(renders):
+    """Kinds and namespaces the plan creates, as ((group, kind) set, set)."""
+    kinds = set()
+    namespaces = set()
+    for render in renders:
+        if render.get("namespace"):
+            namespaces.add(render["namespace"])
+        for definition in render.get("definitions") or []:
+            kind = definition.get("kind")
+            metadata = definition.get("metadata") or {}
+            if kind == "Namespace":
+                namespaces.add(metadata.get("name"))
+            elif kind == "CustomResourceDefinition":
+                spec = definition.get("spec") or {}
+                kinds.add((spec.get("group"), (spec.get("names") or {}).get("kind")))
+    return kinds, namespaces
+
+
+def batches(renders):
+    """Definitions grouped by target namespace, in plan order.
+
+    Definitions without a namespace go to the namespace of their render; the
+    key of cluster-scoped ones only matters for batching.
+    """
+    grouped = {}
+    for render in renders:
+        for definition in render.get("definitions") or []:
+            if not isinstance(definition, dict) or not definition.get("kind"):
+                continue
+            namespace = (definition.get("metadata") or {}).get(
+                "namespace"
+            ) or render.get("namespace")
+            grouped.setdefault(namespace or "", []).append(
+                (render.get("item"), definition)
+            )
+    return grouped
+
+
+def error_message(error):
+    body = getattr(error, "body", None)
+    if body:
+        try:
+            return json.loads(body).get("message") or str(error)
+        except (TypeError, ValueError):
+            pass
+    summary = getattr(error, "summary", None)
+    return summary() if callable(summary) else str(error)
+
+
+def missing_namespace(error):
+    """Name of the namespace an API error complains about, if any."""
+    if getattr(error, "status", None) != 404:
+        return None
+    try:
+        details = json.loads(getattr(error, "body", None) or "{}").get("details") or {}
+    except (TypeError, ValueError):
+        return None
+    if details.get("kind") == "namespaces":
+        return details.get("name")
+    return None
+
+
+class DryRun(object):
+    """Submit every definition as a server-side apply with dryRun=All.
+
+    One worker per namespace batch; every failure is collected. Failures the
+    plan itself resolves later (a kind whose CRD or a namespace that an earlier
+    item creates) are reported as deferred rather than as errors.
+    """
+
+    def __init__(self, client, field_manager="smartscaler-installer", max_workers=8):
+        self.client = client
+        self.field_manager = field_manager
+        self.max_workers = max_workers
+
+    def _resources(self, grouped):
+        # Discovery is resolved up front, outside of the worker threads.
+        resources = {}
+        for definitions in grouped.values():
+            for dummy, definition in definitions:
+                key = (definition.get("kind"), definition.get("apiVersion"))
+                if key not in resources:
+                    try:
+                        resources[key] = self.client.resource(*key)
+                    except ResourceNotFoundError:
+                        resources[key] = None
+        return resources
+
+    def _check(self, item, namespace, definition, resource, kinds, namespaces):
+        kind = definition.get("kind")
+        api_version = definition.get("apiVersion")
+        metadata = definition.get("metadata") or {}
+        entry = dict(
+            item=item,
+            kind=kind,
+            api_version=api_version,
+            name=metadata.get("name"),
+            namespace=namespace or None,
+        )
+        if resource is None:
+            if (group_of(api_version), kind) in kinds:
+                return "deferred", dict(entry, reason="CRD installed by the plan")
+            return "error", dict(
+                entry,
+                message="%s %s is not served by the cluster" % (api_version, kind),
+            )
+        if not resource.namespaced:
+            entry["namespace"] = None
+        try:
+            self.client.client.server_side_apply(
+                resource,
+                body=definition,
+                name=metadata.get("name"),
+                namespace=entry["namespace"],
+                field_manager=self.field_manager,
+                force_conflicts=True,
+                dry_run="All",
+            )
+        except Exception as e:
+            missing = missing_namespace(e)
+            if missing and missing in namespaces:
+                return "deferred", dict(entry, reason="namespace created by the plan")
+            return "error", dict(entry, message=error_message(e))
+        return "ok", entry
+
+    def _batch(self, namespace, definitions, resources, kinds, namespaces):
+        return [
+            self._check(
+                item,
+                namespace,
+                definition,
+                resources[(definition.get("kind"), definition.get("apiVersion"))],
+                kinds,
+                namespaces,
+            )
+            for item, definition in definitions
+        ]
+
+    def run(self, renders):
+        renders = load(renders)
+        kinds, namespaces = planned(renders)
+        grouped = batches(renders)
+        resources = self._resources(grouped)
+        result = dict(checked=0, errors=[], deferred=[], namespaces={})
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as pool:
+            futures = [
+                (
+                    namespace,
+                    pool.submit(
+                        self._batch,
+                        namespace,
+                        definitions,
+                        resources,
+                        kinds,
+                        namespaces,
+                    ),
+                )
+                for namespace, definitions in grouped.items()
+            ]
+            for namespace, future in futures:
+                outcomes = future.result()
+                result["namespaces"][namespace or "(cluster)"] = len(outcomes)
+                for status, entry in outcomes:
+                    result["checked"] += 1
+                    if status == "error":
+                        result["errors"].append(entry)
+                    elif status == "deferred":
+                        result["deferred"].append(entry)
+        return result
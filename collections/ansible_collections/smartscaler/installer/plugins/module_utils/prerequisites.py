@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Helpers for the prerequisites_check module. Everything that does not need an
+# AnsibleModule lives here so it can be unit tested in isolation.
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from importlib import metadata as importlib_metadata
+except ImportError:  # pragma: no cover - python < 3.8
+    importlib_metadata = None
+
+try:
+    from packaging.requirements import InvalidRequirement, Requirement
+    from packaging.version import InvalidVersion, Version
+
+    HAS_PACKAGING = True
+except ImportError:
+    HAS_PACKAGING = False
+
+from ansible.module_utils.compat.version import LooseVersion
+
+CACHE_FORMAT_VERSION = 1
+
+_SIMPLE_REQUIREMENT = re.compile(
+    r"^\s*(?P<name>[A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:\[[^\]]*\])?\s*(?P<spec>.*?)\s*$"
+)
+_SPEC_CLAUSE = re.compile(r"^\s*(===|==|!=|~=|>=|<=|>|<)\s*(\S+)\s*$")
+
+
+def parse_requirements(text):
+    """Return a list of (name, specifier, line) tuples from a requirements.txt body.
+
+    Comments, blank lines and pip options (``-r``, ``--index-url``...) are skipped.
+    """
+    requirements = []
+    for raw in text.splitlines():
+        line = raw.split("#", 1)[0].strip()
+        if not line or line.startswith("-"):
+            continue
+        # Environment markers are not evaluated; the installer targets one interpreter.
+        line = line.split(";", 1)[0].strip()
+        match = _SIMPLE_REQUIREMENT.match(line)
+        if not match:
+            continue
+        requirements.append((match.group("name"), match.group("spec"), line))
+    return requirements
+
+
+def _loose_satisfies(installed, specifier):
+    for clause in [c for c in specifier.split(",") if c.strip()]:
+        match = _SPEC_CLAUSE.match(clause)
+        if not match:
+            return False
+        op, wanted = match.groups()
+        have, want = LooseVersion(installed), LooseVersion(wanted.rstrip(".*"))
+        if op in ("==", "==="):
+            ok = have == want or (
+                wanted.endswith(".*") and installed.startswith(wanted[:-1])
+            )
+        elif op == "!=":
+            ok = have != want
+        elif op == ">=":
+            ok = have >= want
+        elif op == "<=":
+            ok = have <= want
+        elif op == ">":
+            ok = have > want
+        elif op == "<":
+            ok = have < want
+        else:  # ~=
+            prefix = wanted.split(".")[:-1] or [wanted]
+            ok = have >= want and installed.split(".")[: len(prefix)] == prefix
+        if not ok:
+            return False
+    return True
+
+
+def version_satisfies(installed, specifier):
+    """Check an installed version string against a PEP 440 style specifier."""
+    if not specifier:
+        return True
+    if HAS_PACKAGING:
+        try:
+            requirement = Requirement("x" + specifier)
+            return requirement.specifier.contains(Version(installed), prereleases=True)
+        except (InvalidRequirement, InvalidVersion):
+            pass
+    return _loose_satisfies(installed, specifier)
+
+
+def installed_version(name):
+    """Return the installed version of a distribution or None when it is missing."""
+    if importlib_metadata is None:
+        return None
+    try:
+        return importlib_metadata.version(name)
+    except importlib_metadata.PackageNotFoundError:
+        return None
+
+
+def check_distributions(requirements, lookup=installed_version):
+    """Resolve every requirement in-process and return (results, missing)."""
+    results, missing = [], []
+    for name, specifier, line in requirements:
+        version = lookup(name)
+        ok = version is not None and version_satisfies(version, specifier)
+        result = dict(name=name, required=line, installed=version, ok=ok)
+        results.append(result)
+        if not ok:
+            missing.append(line)
+    return results, missing
+
+
+def parse_collection_list(output):
+    """Return the set of collection names from ``ansible-galaxy collection list``.
+
+    Both the ``--format json`` output and the default table output are accepted.
+    """
+    names = set()
+    try:
+        data = json.loads(output)
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        for collections in data.values():
+            names.update(collections or {})
+        return names
+    for line in output.splitlines():
+        fields = line.split()
+        if len(fields) >= 2 and re.match(r"^[a-z0-9_]+\.[a-z0-9_]+$", fields[0]):
+            names.add(fields[0])
+    return names
+
+
+def probe_tools(tools, run, max_workers=4):
+    """Run every tool probe concurrently.
+
+    ``tools`` is a list of dicts with ``name``, ``command`` and optionally
+    ``version_regex`` and ``min_version``. ``run`` is a callable taking the
+    command and returning ``(rc, stdout, stderr)``, usually ``module.run_command``.
+    """
+
+    def probe(tool):
+        started = time.time()
+        try:
+            rc, out, err = run(tool["command"])
+        except Exception as exc:  # missing binary, permission error...
+            rc, out, err = 127, "", str(exc)
+        result = dict(
+            name=tool["name"],
+            rc=rc,
+            version=None,
+            ok=rc == 0,
+            duration=round(time.time() - started, 3),
+        )
+        if rc == 0 and tool.get("version_regex"):
+            match = re.search(tool["version_regex"], out + err)
+            result["version"] = match.group(1) if match else None
+            if tool.get("min_version"):
+                result["ok"] = result["version"] is not None and LooseVersion(
+                    result["version"]
+                ) >= LooseVersion(str(tool["min_version"]))
+        if not result["ok"]:
+            result["error"] = (err or out).strip()[:500]
+        return result
+
+    if not tools:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tools)))) as pool:
+        return list(pool.map(probe, tools))
+
+
+def fingerprint(paths, extra=None):
+    """Hash the content of the requirement files together with any extra data."""
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(path.encode("utf-8"))
+        try:
+            with open(path, "rb") as handle:
+                digest.update(hashlib.sha256(handle.read()).digest())
+        except (IOError, OSError):
+            digest.update(b"<missing>")
+    digest.update(json.dumps(extra or {}, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_cache(path, key, ttl, now=None):
+    """Return the cached result for ``key`` if it is still valid, else None."""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path) as handle:
+            cache = json.load(handle)
+    except (IOError, OSError, ValueError):
+        return None
+    if cache.get("format") != CACHE_FORMAT_VERSION or cache.get("key") != key:
+        return None
+    now = time.time() if now is None else now
+    if ttl and now - cache.get("timestamp", 0) > ttl:
+        return None
+    return cache.get("result")
+
+
+def save_cache(path, key, result, now=None):
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as handle:
+        json.dump(
+            dict(
+                format=CACHE_FORMAT_VERSION,
+                key=key,
+                timestamp=time.time() if now is None else now,
+                result=result,
+            ),
+            handle,
+            indent=2,
+            sort_keys=True,
+        )
+    os.rename(tmp, path)
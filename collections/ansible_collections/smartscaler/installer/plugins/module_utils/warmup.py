@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Warm-up of NIM replicas for smartscaler.installer.nim_warmup: representative
+# chat completions are sent to each pod, round after round, until the latency
+# of a round stops changing. A replica that reports Ready still captures CUDA
+# graphs, loads the tokenizer and fills its prefix cache on the first requests
+# it serves. Pod IPs are rarely routable from the controller, so requests go
+# through the pod proxy of the API server unless told otherwise. The in-cluster
+# warm-up controller (files/nim-warmup-controller.py) runs this file as well,
+# for the replicas a scale-out adds, so it only needs the standard library
+# there.
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from ansible.module_utils.urls import open_url
+except ImportError:
+    # In the warm-up controller, next to nim-warmup-controller.py
+    from urllib.request import Request, urlopen
+
+    def open_url(url, data=None, headers=None, method=None, timeout=10):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        return urlopen(
+            Request(url, data=data, headers=headers or {}, method=method),
+            timeout=timeout,
+        )
+
+
+DEFAULT_PROMPTS = (
+    "Summarize the benefits of autoscaling inference workloads in two sentences.",
+    "Write a Python function that returns the n-th Fibonacci number.",
+    "Explain the difference between latency and throughput.",
+    "List three ways to reduce GPU memory usage when serving large language models.",
+)
+WARMED_ANNOTATION = "smartscaler.io/warmed-up"
+CHAT_PATH = "/v1/chat/completions"
+
+
+def chat_body(model, prompt, max_tokens):
+    return dict(
+        model=model,
+        messages=[dict(role="user", content=prompt)],
+        max_tokens=max_tokens,
+        stream=False,
+    )
+
+
+def post_chat(url, body, timeout):
+    """Seconds one chat completion took; raises on HTTP or connection errors."""
+    started = time.time()
+    response = open_url(
+        url.rstrip("/") + CHAT_PATH,
+        data=json.dumps(body),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+        timeout=timeout,
+    )
+    try:
+        json.loads(response.read())
+    finally:
+        response.close()
+    return time.time() - started
+
+
+def proxy_post(client):
+    """A C(post) for warm_pod that goes through the API server pod proxy.
+
+    I(client) is the client of kubernetes.core; the URL of a target is the
+    proxy path of its pod, as pod_targets builds it with I(proxy).
+    """
+
+    def post(path, body, timeout):
+        started = time.time()
+        client.client.request(
+            "POST",
+            path + CHAT_PATH,
+            body=body,
+            serialize=False,
+            _request_timeout=timeout,
+        )
+        return time.time() - started
+
+    return post
+
+
+def median(values):
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[middle]
+    return (ordered[middle - 1] + ordered[middle]) / 2.0
+
+
+class LatencyWindow(object):
+    """Tell when the median latency of the last rounds has settled.
+
+    Latency has settled once the medians of the last I(window) rounds are
+    within I(tolerance) of each other, relative to the fastest of them. A
+    round with errors resets the window.
+    """
+
+    def __init__(self, window=3, tolerance=0.15):
+        self.window = max(2, window)
+        self.tolerance = tolerance
+        self.medians = []
+
+    def add(self, latencies, errors=0):
+        if errors or not latencies:
+            self.medians = []
+        else:
+            self.medians.append(median(latencies))
+
+    @property
+    def settled(self):
+        last = self.medians[-self.window :]
+        if len(last) < self.window:
+            return False
+        return (max(last) - min(last)) <= self.tolerance * min(last)
+
+
+def warm_pod(
+    url,
+    model,
+    prompts=DEFAULT_PROMPTS,
+    max_tokens=64,
+    concurrency=4,
+    max_rounds=10,
+    window=3,
+    tolerance=0.15,
+    timeout=120,
+    post=post_chat,
+):
+    """Warm one replica at I(url) and return what was measured.
+
+    Every round sends each of I(prompts) once, at most I(concurrency) at a
+    time. Rounds stop once the latency settles or after I(max_rounds).
+    """
+    latency = LatencyWindow(window, tolerance)
+    rounds = []
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        while len(rounds) < max_rounds and not latency.settled:
+            futures = [
+                pool.submit(post, url, chat_body(model, prompt, max_tokens), timeout)
+                for prompt in prompts
+            ]
+            latencies = []
+            errors = []
+            for future in futures:
+                try:
+                    latencies.append(future.result())
+                except Exception as e:
+                    errors.append(str(e))
+            latency.add(latencies, len(errors))
+            rounds.append(
+                dict(
+                    p50_ms=round(1000 * median(latencies), 1) if latencies else None,
+                    max_ms=round(1000 * max(latencies), 1) if latencies else None,
+                    errors=errors,
+                )
+            )
+    return dict(
+        url=url,
+        settled=latency.settled,
+        requests=len(rounds) * len(prompts),
+        rounds=rounds,
+        p50_ms=rounds[-1]["p50_ms"] if rounds else None,
+    )
+
+
+def warm_pods(targets, parallel=4, **kwargs):
+    """Warm I(targets), dicts with C(name) and C(url), I(parallel) at a time.
+
+    Results come back in the order of I(targets).
+    """
+    if not targets:
+        return []
+
+    def warm(target):
+        return dict(warm_pod(target["url"], **kwargs), name=target.get("name"))
+
+    with ThreadPoolExecutor(max_workers=max(1, min(parallel, len(targets)))) as pool:
+        return list(pool.map(warm, targets))
+
+
+def service_port(service):
+    """Port of the OpenAI compatible API behind a NIM Service, 8000 by default."""
+    ports = (service.get("spec") or {}).get("ports") or []
+    if ports and isinstance(ports[0].get("targetPort"), int):
+        return ports[0]["targetPort"]
+    return ports[0]["port"] if ports else 8000
+
+
+def pod_targets(pods, port, skip_warmed=False, proxy=False):
+    """Ready pods of a Service as warm-up targets, from a pod list.
+
+    With I(proxy), the URL of a target is the API server path of its pod
+    proxy instead of the pod IP.
+    """
+    targets = []
+    for pod in pods:
+        metadata = pod.get("metadata") or {}
+        status = pod.get("status") or {}
+        ready = any(
+            condition.get("type") == "Ready" and condition.get("status") == "True"
+            for condition in status.get("conditions") or []
+        )
+        if not ready or not status.get("podIP") or metadata.get("deletionTimestamp"):
+            continue
+        if skip_warmed and WARMED_ANNOTATION in (metadata.get("annotations") or {}):
+            continue
+        if proxy:
+            url = "/api/v1/namespaces/%s/pods/%s:%s/proxy" % (
+                metadata.get("namespace") or "default",
+                metadata["name"],
+                port,
+            )
+        else:
+            address = status["podIP"]
+            if ":" in address:
+                address = "[%s]" % address
+            url = "http://%s:%s" % (address, port)
+        targets.append(dict(name=metadata["name"], url=url))
+    return targets
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Watch loop of the wait action plugins (nimcache_wait, crd_wait): feed the
+# events of a kubernetes dynamic client watch to a tracker until it is done,
+# watching again whenever the stream closes or breaks.
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import time
+from http.client import HTTPException
+
+from ansible_collections.smartscaler.installer.plugins.module_utils.kubespray_events import (
+    format_duration,
+)
+
+try:
+    from kubernetes.client.rest import ApiException
+    from urllib3.exceptions import HTTPError
+except ImportError:
+    # The action plugins report the missing library when they build the client.
+
+    class ApiException(Exception):
+        pass
+
+    class HTTPError(Exception):
+        pass
+
+
+# Errors of a single watch: the API server refusing or expiring it, and the
+# connection timing out, resetting or ending in the middle of a chunk.
+WATCH_ERRORS = (ApiException, HTTPError, HTTPException, OSError)
+
+
+def describe_error(error):
+    if isinstance(error, ApiException):
+        return "%s %s" % (error.status, error.reason)
+    return "%s: %s" % (type(error).__name__, error)
+
+
+def watch_until(
+    resource, tracker, timeout, status_interval, show, retry_delay=5, **kwargs
+):
+    """Feed the events of I(resource).watch(**kwargs) to I(tracker).
+
+    Every watch asks the API server to close the stream after
+    I(status_interval) seconds; the next one starts with the current objects,
+    so a dropped connection or a failed watch costs nothing more than a
+    status line. A failed watch is retried after I(retry_delay) seconds, until
+    I(tracker) is done or I(timeout) seconds passed. Returns the seconds
+    waited.
+    """
+    started = time.time()
+    while True:
+        remaining = timeout - (time.time() - started)
+        if remaining <= 0:
+            break
+        error = None
+        try:
+            for event in resource.watch(
+                timeout=max(1, int(min(remaining, status_interval))), **kwargs
+            ):
+                show(tracker.feed(event["type"], event["raw_object"]))
+                if tracker.done:
+                    return time.time() - started
+        except WATCH_ERRORS as e:
+            error = e
+        elapsed = time.time() - started
+        if elapsed < timeout:
+            line = "%s elapsed, %s" % (format_duration(elapsed), tracker.status_line())
+            if error is not None:
+                line += " (watch failed: %s, watching again)" % describe_error(error)
+            show([line])
+            if error is not None:
+                time.sleep(min(retry_delay, timeout - elapsed))
+    return time.time() - started
@@ -0,0 +1,93 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+
+DOCUMENTATION = r"""
+module: chart_store
+
+short_description: Package local Helm charts once and index them by digest
+
+description:
+  - Packages the local directory of every chart of I(charts) into
+    C(<dest>/<name>-<version>-<digest>.tgz), with the subcharts vendored in
+    its C(charts/) directory, and records it in C(<dest>/index.json). Helm
+    installs the package, a single archive, instead of loading the chart
+    directory and checking its dependencies on each install.
+  - A chart is packaged again only when its content changed. An entry is
+    reused as long as the paths, sizes and mtimes of the chart files are
+    unchanged, so checking the store reads no chart content.
+  - Files matching the C(.helmignore) of the chart are left out, like
+    C(helm package) does; negated patterns are not supported.
+  - Charts that are not local, or whose C(Chart.yaml) does not exist, are
+    left out of RV(charts) and installed from their repository.
+  - Dependencies of C(Chart.yaml) that are not vendored under C(charts/)
+    are reported as a warning.
+  - Runs as an action plugin on the controller; does not need helm.
+
+options:
+  charts:
+    description:
+      - Chart settings as in C(helm_charts), with C(chart_ref) and
+        optionally C(local_chart_path) and C(use_local_chart).
+    type: list
+    elements: dict
+    required: true
+  src:
+    description: Directory of the local charts, for charts without C(local_chart_path).
+    type: path
+    default: files/charts
+  dest:
+    description: Directory of the packages and of the index.
+    type: path
+    default: output/.chart_store
+  use_local_charts:
+    description: Default of C(use_local_chart) of the charts.
+    type: bool
+    default: true
+"""
+
+EXAMPLES = r"""
+- name: Package the local charts of the execution order
+  smartscaler.installer.chart_store:
+    charts: "{{ execution_order | select('in', helm_charts) | map('extract', helm_charts) | list }}"
+    src: files/charts
+    dest: output/.chart_store
+  register: chart_store_result
+
+- name: Install a chart from its package
+  kubernetes.core.helm:
+    name: prometheus
+    chart_ref: "{{ chart_store_result.charts['files/charts/kube-prometheus-stack'].package }}"
+    release_namespace: monitoring
+"""
+
+RETURN = r"""
+charts:
+  description:
+    - Index entry of each local chart, by chart directory
+      (C(<local_chart_path>/<chart_ref>)).
+  type: dict
+  returned: always
+  sample:
+    files/charts/kube-prometheus-stack:
+      name: kube-prometheus-stack
+      version: 55.5.0
+      digest: 3f0c1d0e9b7a...
+      signature: 9a8e2c...
+      package: output/.chart_store/kube-prometheus-stack-55.5.0-3f0c1d0e9b7a.tgz
+      missing_dependencies: []
+packaged:
+  description: Chart directories packaged by this call.
+  type: list
+  elements: str
+  returned: always
+index:
+  description: Path of the index.
+  type: str
+  returned: always
+"""
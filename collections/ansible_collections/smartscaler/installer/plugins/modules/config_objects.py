@@ -0,0 +1,95 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+
+DOCUMENTATION = r"""
+module: config_objects
+
+short_description: Build Secrets and ConfigMaps in memory from literals and files
+
+description:
+  - Builds the definitions of Secrets and ConfigMaps the way C(kubectl create
+    secret) and C(kubectl create configmap) would. Nothing is run on the
+    cluster and nothing is written to disk.
+  - The definitions are meant to be passed to C(kubernetes.core.k8s) as
+    C(definition), with C(diff_cache) so that an object whose content did not
+    change is not written again.
+  - Runs as an action plugin on the controller.
+
+options:
+  namespace:
+    description: Namespace of every object.
+    type: str
+    required: true
+  secrets:
+    description:
+      - Secrets to build.
+      - Each entry has a C(name) and any of C(docker_registry) (C(server),
+        C(username), C(password), C(email)), C(literals) (key to value),
+        C(files) (key to file, looked up like the C(src) of
+        C(ansible.builtin.copy)), C(type), C(labels) and C(annotations).
+      - C(type) defaults to C(kubernetes.io/dockerconfigjson) with
+        C(docker_registry) and to C(Opaque) otherwise. C(server) defaults to
+        C(https://index.docker.io/v1/), as with kubectl.
+    type: list
+    elements: dict
+    default: []
+  configmaps:
+    description:
+      - ConfigMaps to build, with the same keys as I(secrets) except
+        C(docker_registry) and C(type).
+      - File content that is not UTF-8 is stored in C(binaryData).
+    type: list
+    elements: dict
+    default: []
+"""
+
+EXAMPLES = r"""
+- name: Build the inference configuration
+  smartscaler.installer.config_objects:
+    namespace: smart-scaler
+    configmaps:
+      - name: mesh-config-70b
+        files:
+          config.json: files/config-inference-70b.json
+    secrets:
+      - name: avesha-systems
+        docker_registry:
+          username: "{{ avesha_docker_username }}"
+          password: "{{ avesha_docker_password }}"
+  register: built
+  no_log: true
+
+- name: Apply the objects that changed
+  kubernetes.core.k8s:
+    definition: "{{ built.definitions }}"
+    apply: true
+    server_side_apply:
+      field_manager: smartscaler-installer
+    diff_cache: true
+  no_log: true
+"""
+
+RETURN = r"""
+definitions:
+  description: Secret and ConfigMap definitions, Secrets first.
+  type: list
+  elements: dict
+  returned: always
+resources:
+  description: C(kind/namespace/name) of each definition.
+  type: list
+  elements: str
+  returned: always
+  sample: ["ConfigMap/smart-scaler/mesh-config-70b"]
+keys:
+  description: Data keys of each object by name, without their values.
+  type: dict
+  returned: always
+  sample: {"mesh-config-70b": ["config.json"]}
+"""
@@ -0,0 +1,103 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+
+DOCUMENTATION = r"""
+module: crd_wait
+
+short_description: Wait for CustomResourceDefinitions to be established
+
+description:
+  - Waits until every CustomResourceDefinition of I(src) and I(names) has all
+    of its I(conditions) C(True), so that resources of those kinds can be
+    created right away instead of after a fixed sleep.
+  - All CRDs are followed with a single watch stream over the
+    CustomResourceDefinition collection. The stream starts with the CRDs
+    that already exist, so CRDs established earlier are found at once.
+  - A CRD that is deleted while waiting is waited for again. A status line
+    is shown every I(status_interval) seconds.
+  - A watch that fails, for example because the API server restarted or the
+    connection broke, is shown in a status line and started again a few
+    seconds later, until I(timeout) runs out.
+  - Runs as an action plugin on the controller, using the
+    C(kubernetes.core) client configuration.
+
+options:
+  src:
+    description:
+      - Manifest, or list of manifests, whose CustomResourceDefinitions are
+        waited for. Looked up like the C(src) of C(ansible.builtin.copy).
+      - Other kinds in the manifest are ignored.
+    type: raw
+  names:
+    description:
+      - Names of further CustomResourceDefinitions to wait for, such as
+        C(services.serving.knative.dev).
+    type: list
+    elements: str
+  conditions:
+    description:
+      - Conditions that must all be C(True).
+    type: list
+    elements: str
+    default: [Established, NamesAccepted]
+  timeout:
+    description:
+      - Seconds to wait before failing.
+    type: int
+    default: 300
+  status_interval:
+    description:
+      - Seconds between status lines.
+    type: int
+    default: 30
+  kubeconfig:
+    description:
+      - Kubeconfig of the cluster.
+    type: path
+  context:
+    description:
+      - Context of I(kubeconfig) to use.
+    type: str
+
+requirements:
+  - kubernetes
+"""
+
+EXAMPLES = r"""
+- name: Apply the Knative Serving CRDs
+  ansible.builtin.command: kubectl apply -f files/serving-crds.yaml
+
+- name: Wait until the API serves them
+  smartscaler.installer.crd_wait:
+    src: files/serving-crds.yaml
+    timeout: 120
+    kubeconfig: output/kubeconfig
+"""
+
+RETURN = r"""
+crds:
+  description: Names of the CRDs waited for.
+  type: list
+  elements: str
+  returned: always
+established:
+  description: CRDs established, in the order they were seen ready.
+  type: list
+  elements: str
+  returned: always
+pending:
+  description: Conditions still missing for each CRD that is not established.
+  type: dict
+  returned: always
+  sample: {"routes.serving.knative.dev": ["Established"]}
+elapsed:
+  description: Seconds waited.
+  type: float
+  returned: always
+"""
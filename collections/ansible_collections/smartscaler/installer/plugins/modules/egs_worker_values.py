@@ -0,0 +1,103 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+
+DOCUMENTATION = r"""
+module: egs_worker_values
+
+short_description: Build the EGS worker chart values of many clusters from one read
+
+description:
+  - Reads the C(kubeslice-rbac-worker-<cluster>) Secret of every registered
+    worker cluster, the admin token Secret and the UI proxy Service from the
+    EGS controller cluster, and builds the C(controllerSecret) and
+    C(egsAgent) values of the C(kubeslice-worker-egs) chart for each worker.
+  - All Secrets are read with a single list of I(namespace). Secrets the
+    controller has not created or filled in yet are waited for with a watch
+    that starts where the list ended.
+  - The values are returned in memory; nothing is written to disk. Use
+    C(no_log) on the task, the values hold the worker tokens.
+  - Runs as an action plugin on the controller.
+
+options:
+  namespace:
+    description: Project namespace of the EGS controller, C(kubeslice-<project>).
+    type: str
+    required: true
+  clusters:
+    description: Names of the registered worker clusters.
+    type: list
+    elements: str
+    required: true
+  admin_secret:
+    description: Secret in I(namespace) whose token the EGS agent uses.
+    type: str
+    default: kubeslice-rbac-rw-admin
+  agent_secret_name:
+    description: Name of the Secret the chart creates for the agent on the worker.
+    type: str
+    default: egs-agent-access
+  ui_proxy_service:
+    description: Service whose first port the agent endpoint points to.
+    type: str
+    default: kubeslice-ui-proxy
+  ui_proxy_namespace:
+    description: Namespace of I(ui_proxy_service).
+    type: str
+    default: kubeslice-controller
+  timeout:
+    description: Seconds to wait for missing Secrets.
+    type: int
+    default: 300
+  status_interval:
+    description: Seconds between progress lines while waiting.
+    type: int
+    default: 30
+  kubeconfig:
+    description: Kubeconfig of the EGS controller cluster.
+    type: raw
+  context:
+    description: Context of the EGS controller cluster.
+    type: str
+"""
+
+EXAMPLES = r"""
+- name: Read the worker Secrets
+  smartscaler.installer.egs_worker_values:
+    namespace: kubeslice-avesha
+    clusters: [worker-1, worker-2]
+    kubeconfig: output/kubeconfig
+  register: worker_values
+  no_log: true
+"""
+
+RETURN = r"""
+values:
+  description: Chart values by cluster name.
+  type: dict
+  returned: success
+agent_endpoint:
+  description: In-cluster URL of the UI proxy used by every agent.
+  type: str
+  returned: success
+  sample: http://kubeslice-ui-proxy.kubeslice-controller.svc.cluster.local:443
+secrets:
+  description: Names of the Secrets read.
+  type: list
+  elements: str
+  returned: success
+missing:
+  description: Secrets that were not ready before I(timeout).
+  type: list
+  elements: str
+  returned: failure
+elapsed:
+  description: Seconds spent reading and waiting.
+  type: float
+  returned: always
+"""
@@ -0,0 +1,123 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+
+DOCUMENTATION = r"""
+module: journal_drift
+
+short_description: Check that items of the run journal are still installed
+
+description:
+  - Checks the witnesses of the items that a previous run of C(site.yml)
+    completed, the objects recorded in C(output/.run_journal.json), against
+    the cluster before a resumed run skips those items.
+  - Each kind is listed once per namespace, however many items refer to it,
+    and the lists run concurrently, so checking every completed item takes
+    about as long as one list call. Witnesses with C(labels) are listed with
+    that label selector, so only the matching objects are read.
+  - Never changes the cluster.
+extends_documentation_fragment:
+  - kubernetes.core.k8s_auth_options
+options:
+  witnesses:
+    description:
+      - Witnesses of each item, by item name. A witness is
+        C(Kind/namespace/name), C(Kind/name) for cluster scoped objects, or
+        a dict with C(kind), C(api_version), C(namespace) and either C(name)
+        or C(labels), which matches any object with those labels.
+    type: dict
+    required: true
+  max_workers:
+    description: Number of list calls sent at the same time.
+    type: int
+    default: 8
+
+requirements:
+  - kubernetes >= 24.2.0
+"""
+
+EXAMPLES = r"""
+- name: Check completed items against the cluster
+  smartscaler.installer.journal_drift:
+    witnesses:
+      prometheus_stack:
+        - kind: Secret
+          namespace: monitoring
+          labels: {owner: helm, name: prometheus, status: deployed}
+      nim_cache_manifest_70b:
+        - NIMCache/nim/meta-llama3-70b-instruct
+    kubeconfig: output/kubeconfig
+  register: journal_check
+"""
+
+RETURN = r"""
+drifted:
+  description: Items with witnesses that are gone, with what is missing.
+  type: dict
+  returned: always
+  sample:
+    nim_cache_manifest_70b:
+      - NIMCache/nim/meta-llama3-70b-instruct is missing
+lists:
+  description: Number of list calls sent.
+  type: int
+  returned: always
+"""
+
+import copy
+
+from ansible_collections.kubernetes.core.plugins.module_utils.ansiblemodule import (
+    AnsibleModule,
+)
+from ansible_collections.kubernetes.core.plugins.module_utils.args_common import (
+    AUTH_ARG_SPEC,
+)
+from ansible_collections.kubernetes.core.plugins.module_utils.k8s.client import (
+    get_api_client,
+)
+from ansible_collections.kubernetes.core.plugins.module_utils.k8s.core import (
+    AnsibleK8SModule,
+)
+from ansible_collections.kubernetes.core.plugins.module_utils.k8s.exceptions import (
+    CoreException,
+)
+from ansible_collections.smartscaler.installer.plugins.module_utils.journal import (
+    DriftCheck,
+)
+
+
+def argspec():
+    args = copy.deepcopy(AUTH_ARG_SPEC)
+    args.update(
+        witnesses=dict(type="dict", required=True),
+        max_workers=dict(type="int", default=8),
+    )
+    return args
+
+
+def main():
+    module = AnsibleK8SModule(
+        module_class=AnsibleModule,
+        argument_spec=argspec(),
+        supports_check_mode=True,
+    )
+
+    try:
+        client = get_api_client(module=module)
+        result = DriftCheck(client, max_workers=module.params["max_workers"]).run(
+            module.params["witnesses"]
+        )
+    except CoreException as e:
+        module.fail_from_exception(e)
+    except ValueError as e:
+        module.fail_json(msg=str(e))
+    module.exit_json(changed=False, **result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+
+DOCUMENTATION = r"""
+module: k8s_batch
+
+short_description: Run a batch of Kubernetes operations in-process
+
+description:
+  - Runs a list of get, apply, create, patch and delete operations over one
+    authenticated client, instead of one C(kubectl) process per operation
+    that parses the kubeconfig, sets up TLS and runs discovery again.
+  - Discovery of all kinds is done once, before any operation runs. A kind
+    that is not served yet is looked up again, for up to
+    I(discovery_timeout) seconds, by the operations that wait through
+    I(operations[].after) for an C(apply) or C(create) of a
+    CustomResourceDefinition, so that one batch can create a CRD and
+    resources of its kind. In check mode such operations are skipped.
+  - Operations without I(operations[].after) run concurrently. An operation
+    with I(after) starts as soon as those operations are done, and is
+    skipped when one of them failed; chains of operations that do not wait
+    for each other make progress independently.
+  - A write can wait for a status condition of its object, such as C(Ready)
+    of a NIMCache, before the operations waiting for it start.
+  - Values of the returned objects can be captured with kubectl-style
+    jsonpath expressions and are returned in RV(captured). Operations of the
+    same batch cannot use them; register the result and set them as facts
+    for later tasks.
+  - In check mode, writes are sent with C(dryRun=All) and conditions are not
+    waited for.
+extends_documentation_fragment:
+  - kubernetes.core.k8s_auth_options
+options:
+  operations:
+    description: Operations to run, in order.
+    type: list
+    elements: dict
+    required: true
+    suboptions:
+      id:
+        description:
+          - Name of the operation, used by I(after) and in RV(results).
+          - Defaults to C(op<n>), with n the position in the list from 1.
+        type: str
+      op:
+        description:
+          - C(get) reads an object, or lists them when I(name) is not set.
+          - C(apply) is a server-side apply of I(definition).
+          - C(create) creates I(definition); an object that exists already
+            is left alone and reported unchanged.
+          - C(patch) patches an existing object with I(patch).
+          - C(delete) deletes an object; a missing one is reported unchanged.
+        type: str
+        required: true
+        choices: [get, apply, create, patch, delete]
+      kind:
+        description: Kind of the object, taken from I(definition) when set.
+        type: str
+      api_version:
+        description: API version of the object, taken from I(definition) when set.
+        type: str
+        default: v1
+      name:
+        description: Name of the object, taken from I(definition) when set.
+        type: str
+      namespace:
+        description: Namespace of the object; ignored for cluster-scoped kinds.
+        type: str
+      label_selectors:
+        description: Label selectors of a C(get) without I(name).
+        type: list
+        elements: str
+      definition:
+        description: Object to C(apply) or C(create).
+        type: dict
+      patch:
+        description: Patch of a C(patch) operation.
+        type: raw
+      patch_type:
+        description: Type of I(patch).
+        type: str
+        choices: [merge, strategic, json]
+        default: merge
+      after:
+        description: Ids of earlier operations this one waits for.
+        type: list
+        elements: str
+      capture:
+        description:
+          - Variables to capture from the object the operation returns, as
+            variable name to jsonpath, like C({.data.tls\.crt}) or
+            C(.items[*].metadata.name).
+        type: dict
+      wait:
+        description:
+          - Condition the object of an C(apply), C(create) or C(patch) must
+            report before the operation is done. A NIMCache that reports the
+            C(Failed) state fails the operation right away.
+        type: dict
+        suboptions:
+          condition:
+            description: Type of the status condition.
+            type: str
+            required: true
+          status:
+            description: Status the condition must have.
+            type: str
+            default: "True"
+          timeout:
+            description: Seconds to wait before the operation fails.
+            type: int
+            default: 300
+      ignore_errors:
+        description: Do not fail the task when this operation fails.
+        type: bool
+        default: false
+  max_workers:
+    description: Number of operations run at the same time.
+    type: int
+    default: 8
+  field_manager:
+    description: Field manager of C(apply) operations.
+    type: str
+    default: smartscaler-installer
+  wait_sleep:
+    description: Seconds between two reads of an object that is waited for.
+    type: int
+    default: 5
+  discovery_timeout:
+    description:
+      - Seconds an operation that waits for a CustomResourceDefinition
+        keeps looking up a kind that is not served yet.
+    type: int
+    default: 60
+requirements:
+  - kubernetes >= 24.2.0
+"""
+
+EXAMPLES = r"""
+- name: Create the namespaces, then their certificates
+  smartscaler.installer.k8s_batch:
+    kubeconfig: output/kubeconfig
+    operations:
+      - id: backend
+        op: apply
+        definition: {apiVersion: v1, kind: Namespace, metadata: {name: smartai-backend}}
+      - id: smartai
+        op: apply
+        definition: {apiVersion: v1, kind: Namespace, metadata: {name: smartai}}
+      - op: apply
+        after: [backend]
+        definition: "{{ lookup('file', 'files/backend-certificate.yaml') | from_yaml }}"
+
+- name: Read the CA certificate
+  smartscaler.installer.k8s_batch:
+    kubeconfig: output/kubeconfig
+    operations:
+      - op: get
+        kind: Secret
+        name: root-secret
+        namespace: cert-manager
+        capture:
+          ca_crt: "{.data.ca\\.crt}"
+  register: ca
+
+- name: Set the captured variables as facts
+  ansible.builtin.set_fact:
+    "{{ item.key }}": "{{ item.value }}"
+  loop: "{{ ca.captured | dict2items }}"
+
+- name: Download two models at once, starting each service once its cache is ready
+  smartscaler.installer.k8s_batch:
+    kubeconfig: output/kubeconfig
+    operations:
+      - id: cache_8b
+        op: apply
+        definition: "{{ cache_8b }}"
+        wait: {condition: Ready, timeout: 1200}
+      - id: cache_70b
+        op: apply
+        definition: "{{ cache_70b }}"
+        wait: {condition: Ready, timeout: 1200}
+      - op: apply
+        after: [cache_8b]
+        definition: "{{ service_8b }}"
+      - op: apply
+        after: [cache_70b]
+        definition: "{{ service_70b }}"
+"""
+
+RETURN = r"""
+results:
+  description: Outcome of every operation, in order.
+  type: list
+  elements: dict
+  returned: always
+  sample:
+    - id: op1
+      op: get
+      kind: Secret
+      name: ngc-secret
+      namespace: nim
+      changed: false
+      failed: false
+      captured: {}
+    - id: cache_70b
+      op: apply
+      kind: NIMCache
+      name: meta-llama3-70b-instruct
+      namespace: nim
+      changed: true
+      failed: false
+      waited: 812.4
+      captured: {}
+captured:
+  description: Captured variables of all operations.
+  type: dict
+  returned: always
+  sample: {"ca_crt": "LS0tLS1CRUdJTi..."}
+errors:
+  description: Failed operations without I(ignore_errors).
+  type: list
+  elements: dict
+  returned: always
+"""
+
+import copy
+
+from ansible_collections.kubernetes.core.plugins.module_utils.ansiblemodule import (
+    AnsibleModule,
+)
+from ansible_collections.kubernetes.core.plugins.module_utils.args_common import (
+    AUTH_ARG_SPEC,
+)
+from ansible_collections.kubernetes.core.plugins.module_utils.k8s.client import (
+    get_api_client,
+)
+from ansible_collections.kubernetes.core.plugins.module_utils.k8s.core import (
+    AnsibleK8SModule,
+)
+from ansible_collections.kubernetes.core.plugins.module_utils.k8s.exceptions import (
+    CoreException,
+)
+from ansible_collections.smartscaler.installer.plugins.module_utils.batch import (
+    Batch,
+    normalize,
+)
+
+
+def argspec():
+    args = copy.deepcopy(AUTH_ARG_SPEC)
+    args.update(
+        operations=dict(type="list", elements="dict", required=True),
+        max_workers=dict(type="int", default=8),
+        field_manager=dict(type="str", default="smartscaler-installer"),
+        wait_sleep=dict(type="int", default=5),
+        discovery_timeout=dict(type="int", default=60),
+    )
+    return args
+
+
+def main():
+    module = AnsibleK8SModule(
+        module_class=AnsibleModule,
+        argument_spec=argspec(),
+        supports_check_mode=True,
+    )
+    try:
+        # Mistakes in the operations are reported before connecting
+        operations = normalize(module.params["operations"])
+    except ValueError as e:
+        module.fail_json(msg=str(e))
+    try:
+        client = get_api_client(module=module)
+        result = Batch(
+            client,
+            field_manager=module.params["field_manager"],
+            max_workers=module.params["max_workers"],
+            check_mode=module.check_mode,
+            wait_sleep=module.params["wait_sleep"],
+            discovery_timeout=module.params["discovery_timeout"],
+        ).run(operations)
+    except CoreException as e:
+        module.fail_from_exception(e)
+    if result["errors"]:
+        module.fail_json(
+            msg="; ".join(
+                "%s: %s" % (error["id"], error["msg"]) for error in result["errors"]
+            ),
+            **result
+        )
+    module.exit_json(**result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+
+DOCUMENTATION = r"""
+module: k8s_dry_run
+
+short_description: Server-side dry-run of every resource an install plan applies
+
+description:
+  - Submits each definition of I(renders) as a server-side apply with
+    C(dryRun=All), so that admission, schema and conflict errors show up
+    before anything is applied.
+  - Definitions are batched per namespace and the batches are checked
+    concurrently. Every failure is collected instead of stopping at the
+    first one.
+  - A definition whose kind is only served once a CRD of the plan is
+    installed, or whose namespace an item of the plan creates, cannot be
+    checked yet and is returned in RV(deferred) instead of RV(errors).
+  - Never changes the cluster.
+
+extends_documentation_fragment:
+  - kubernetes.core.k8s_auth_options
+
+options:
+  renders:
+    description:
+      - Rendered items of the plan, in execution order.
+    type: list
+    elements: dict
+    required: true
+    suboptions:
+      item:
+        description: Name of the execution_order item, used in the report.
+        type: str
+      namespace:
+        description: Namespace of the definitions that do not set one.
+        type: str
+      definitions:
+        description: Rendered definitions of the item.
+        type: list
+        elements: dict
+      content:
+        description:
+          - Rendered multi-document YAML of the item, such as the output of
+            C(kubernetes.core.helm_template), used when I(definitions) is not
+            set.
+        type: str
+  max_workers:
+    description:
+      - Number of namespace batches checked at the same time.
+    type: int
+    default: 8
+  field_manager:
+    description:
+      - Field manager of the dry-run applies.
+    type: str
+    default: smartscaler-installer
+
+requirements:
+  - kubernetes >= 24.2.0
+"""
+
+EXAMPLES = r"""
+- name: Dry-run the rendered plan
+  smartscaler.installer.k8s_dry_run:
+    renders:
+      - item: nim_cache_manifest_70b
+        namespace: nim
+        definitions: "{{ nim_cache.definitions }}"
+    kubeconfig: output/kubeconfig
+  register: preflight
+"""
+
+RETURN = r"""
+checked:
+  description: Number of definitions submitted or deferred.
+  type: int
+  returned: always
+errors:
+  description: Definitions the API server rejected.
+  type: list
+  elements: dict
+  returned: always
+  sample:
+    - item: nim_service_manifest_70b
+      kind: NIMService
+      api_version: apps.nvidia.com/v1alpha1
+      name: meta-llama3-70b-instruct
+      namespace: nim
+      message: 'NIMService.apps.nvidia.com "meta-llama3-70b-instruct" is invalid: spec.replicas: Invalid value: "string"'
+deferred:
+  description: Definitions that can only be checked once earlier items are applied.
+  type: list
+  elements: dict
+  returned: always
+namespaces:
+  description: Number of definitions per namespace batch.
+  type: dict
+  returned: always
+"""
+
+import copy
+
+from ansible_collections.kubernetes.core.plugins.module_utils.ansiblemodule import (
+    AnsibleModule,
+)
+from ansible_collections.kubernetes.core.plugins.module_utils.args_common import (
+    AUTH_ARG_SPEC,
+)
+from ansible_collections.kubernetes.core.plugins.module_utils.k8s.client import (
+    get_api_client,
+)
+from ansible_collections.kubernetes.core.plugins.module_utils.k8s.core import (
+    AnsibleK8SModule,
+)
+from ansible_collections.kubernetes.core.plugins.module_utils.k8s.exceptions import (
+    CoreException,
+)
+from ansible_collections.smartscaler.installer.plugins.module_utils.preflight import (
+    DryRun,
+)
+
+
+def argspec():
+    args = copy.deepcopy(AUTH_ARG_SPEC)
+    args.update(
+        renders=dict(type="list", elements="dict", required=True),
+        max_workers=dict(type="int", default=8),
+        field_manager=dict(type="str", default="smartscaler-installer"),
+    )
+    return args
+
+
+def main():
+    module = AnsibleK8SModule(
+        module_class=AnsibleModule,
+        argument_spec=argspec(),
+        supports_check_mode=True,
+    )
+
+    try:
+        client = get_api_client(module=module)
+        result = DryRun(
+            client,
+            field_manager=module.params["field_manager"],
+            max_workers=module.params["max_workers"],
+        ).run(module.params["renders"])
+    except CoreException as e:
+        module.fail_from_exception(e)
+    module.exit_json(changed=False, **result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+
+DOCUMENTATION = r"""
+module: kubespray_progress
+
+short_description: Follow a backgrounded ansible-playbook run and report its progress
+
+description:
+  - Waits for an async job started with C(async) and C(poll=0), like
+    C(ansible.builtin.async_status) in an C(until) loop would, and follows
+    the events file written by the C(smartscaler.installer.jsonl_events)
+    callback of the nested playbook while it runs.
+  - Play starts, failures and slow tasks are shown as they happen. A status
+    line with per-host counters is shown every I(status_interval) seconds.
+  - The result of the job (C(rc), C(stdout), C(stderr)...) is returned as
+    C(ansible.builtin.async_status) returns it, together with a timing profile
+    of the nested run.
+  - Runs as an action plugin on the controller; the job itself is polled on
+    the target host.
+
+options:
+  jid:
+    description:
+      - Job id returned by the task started with C(async).
+    type: str
+    required: true
+  events_file:
+    description:
+      - Events file the nested playbook writes, on the controller.
+      - Set with E(SMARTSCALER_EVENTS_FILE) in the environment of the nested
+        run, together with
+        E(ANSIBLE_CALLBACKS_ENABLED=smartscaler.installer.jsonl_events).
+    type: path
+    required: true
+  poll_interval:
+    description:
+      - Seconds between two checks of the job and the events file.
+    type: float
+    default: 5
+  status_interval:
+    description:
+      - Seconds between two status lines.
+    type: float
+    default: 60
+  slow_task_threshold:
+    description:
+      - Host results taking at least this many seconds are shown when they
+        arrive.
+    type: float
+    default: 60
+  slowest:
+    description:
+      - Number of tasks returned in RV(slowest_tasks).
+    type: int
+    default: 10
+  show_hosts:
+    description:
+      - Show the per-host counters with every status line.
+    type: bool
+    default: true
+"""
+
+EXAMPLES = r"""
+- name: Run Kubespray in the background
+  ansible.builtin.shell: >-
+    ansible-playbook -i inventory.ini cluster.yml > output/kubespray.log 2>&1
+  environment:
+    ANSIBLE_CALLBACKS_ENABLED: smartscaler.installer.jsonl_events
+    SMARTSCALER_EVENTS_FILE: "{{ playbook_dir }}/output/kubespray_events.jsonl"
+  async: 3600
+  poll: 0
+  register: kubespray_job
+
+- name: Follow Kubespray
+  smartscaler.installer.kubespray_progress:
+    jid: "{{ kubespray_job.ansible_job_id }}"
+    events_file: "{{ playbook_dir }}/output/kubespray_events.jsonl"
+  register: kubespray_result
+"""
+
+RETURN = r"""
+rc:
+  description: Exit code of the job, as returned by C(ansible.builtin.async_status).
+  type: int
+  returned: when the job finished
+progress:
+  description: Timing profile of the nested run.
+  type: dict
+  returned: always
+  contains:
+    plays:
+      description: Number of plays started.
+      type: int
+    tasks:
+      description: Number of tasks started.
+      type: int
+    duration:
+      description: Seconds between the first and the last event.
+      type: float
+    hosts:
+      description: Final per-host counters from the play recap.
+      type: dict
+    failures:
+      description: Failed or unreachable host results, including ignored ones.
+      type: list
+      elements: dict
+slowest_tasks:
+  description: Tasks sorted by their longest run on a single host.
+  type: list
+  elements: dict
+  returned: always
+  sample:
+    - play: Install the control plane
+      task: "kubernetes/control-plane : Kubeadm | Initialize first control plane node"
+      duration: 312.4
+      host: master-1
+      hosts: 1
+"""
@@ -0,0 +1,155 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+
+DOCUMENTATION = r"""
+module: manifest_render
+
+short_description: Render a manifest template in memory, skipping unchanged ones
+
+description:
+  - Renders I(src) like C(ansible.builtin.template) would, with I(variables)
+    available as C(manifest_vars), and returns the resulting definitions
+    ready to be passed to C(kubernetes.core.k8s) as C(definition). Nothing is
+    written to the target.
+  - With I(cache_dir), a render is identified by the hash of the template,
+    the hash of I(variables), of the I(inputs) files and of I(cache_context)
+    and of the I(kubeconfig) file. When C(<cache_dir>/<cache_key>.json)
+    exists, the files the last render read through lookups are unchanged and,
+    with I(cache_verify), the objects it applied all exist in the cluster,
+    the template is not rendered and RV(cached) is C(true), so that the
+    caller can skip applying it too.
+  - The cache entry is written by the caller once the definitions are
+    applied, to the path returned in RV(cache_file). It holds no rendered
+    content, only RV(resources), RV(objects) and RV(inputs).
+  - Runs as an action plugin on the controller.
+
+options:
+  src:
+    description:
+      - Template to render, looked up like the C(src) of
+        C(ansible.builtin.template).
+      - Mutually exclusive with I(content).
+    type: path
+  content:
+    description:
+      - Inline manifest, as a definition, a list of definitions or a YAML
+        string.
+      - Mutually exclusive with I(src).
+    type: raw
+  variables:
+    description:
+      - Variables available to the template as C(manifest_vars).
+    type: dict
+    default: {}
+  inputs:
+    description:
+      - Files the template depends on, such as the ones it reads with
+        C(lookup('file')), looked up like the C(src) of
+        C(ansible.builtin.copy). Their content is part of the cache key.
+      - Files read through lookups are also recorded during the render, see
+        RV(inputs); declare them here when their content must change the key
+        itself.
+    type: list
+    elements: path
+  cache_dir:
+    description:
+      - Directory of the render cache on the controller. No caching when not
+        set.
+    type: path
+  cache_context:
+    description:
+      - Extra data the cache key depends on, such as the target namespace and
+        context.
+    type: dict
+  cache_verify:
+    description:
+      - Only report a cached render when every object in its entry still
+        exists in the cluster. When the objects cannot be looked up, the
+        manifest is rendered again.
+    type: bool
+    default: true
+  kubeconfig:
+    description:
+      - Kubeconfig of the target cluster; its content is part of the cache
+        key, so that a rebuilt cluster gets every manifest again.
+    type: path
+  context:
+    description:
+      - Kubeconfig context used to look up the objects of a cached render.
+    type: str
+  namespace:
+    description:
+      - Namespace of the cached objects that have none, as passed to
+        C(kubernetes.core.k8s).
+    type: str
+"""
+
+EXAMPLES = r"""
+- name: Render the NIM cache manifest
+  smartscaler.installer.manifest_render:
+    src: files/nim-cache.yaml.j2
+    variables:
+      nim_cache_name: meta-llama3-8b-instruct
+    cache_dir: output/.render_cache
+    cache_context:
+      namespace: nim
+    kubeconfig: output/kubeconfig
+    namespace: nim
+  register: rendered
+
+- name: Apply it unless nothing changed since the last apply
+  kubernetes.core.k8s:
+    definition: "{{ rendered.definitions }}"
+    kubeconfig: output/kubeconfig
+  when: not rendered.cached
+  register: applied
+
+- name: Remember the apply
+  ansible.builtin.copy:
+    content: "{{ {'resources': rendered.resources, 'objects': rendered.objects, 'inputs': rendered.inputs} | to_json }}"
+    dest: "{{ rendered.cache_file }}"
+  when: rendered.cache_file is defined and applied is changed
+"""
+
+RETURN = r"""
+definitions:
+  description: Rendered definitions; empty when RV(cached) is C(true).
+  type: list
+  elements: dict
+  returned: always
+resources:
+  description: C(kind/namespace/name) of each definition.
+  type: list
+  elements: str
+  returned: always
+  sample: ["NIMCache/nim/meta-llama3-8b-instruct"]
+objects:
+  description: C(api_version), C(kind), C(namespace) and C(name) of each definition.
+  type: list
+  elements: dict
+  returned: always
+inputs:
+  description:
+    - sha256 of each file read through lookups during the render, by path.
+    - From the cache entry when RV(cached) is C(true).
+  type: dict
+  returned: always
+cached:
+  description: Whether the same render was applied before.
+  type: bool
+  returned: always
+cache_key:
+  description: Key of the render in the cache.
+  type: str
+  returned: when I(cache_dir) is set
+cache_file:
+  description: Cache entry to write once the definitions are applied.
+  type: str
+  returned: when I(cache_dir) is set
+"""
@@ -0,0 +1,303 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+
+DOCUMENTATION = r"""
+module: nim_warmup
+
+short_description: Warm up NIM replicas until their latency settles
+
+description:
+  - Sends representative chat completions to every ready pod of a NIM
+    Service, instead of through the Service, so that each replica captures
+    its CUDA graphs, loads its tokenizer and fills its prefix cache before
+    real traffic reaches it.
+  - Requests go through the pod proxy of the API server, with the
+    credentials of the task, so the pods do not need to be reachable from
+    where the task runs. With I(direct), they are sent to the pod IPs.
+  - Requests are sent in rounds, each round sending every prompt once with
+    at most I(concurrency) requests in flight per pod. A pod is done once
+    the median latency of the last I(window) rounds is within I(tolerance)
+    of each other; the task fails when a pod has not settled after
+    I(max_rounds) rounds.
+  - Warmed pods get the C(smartscaler.io/warmed-up) annotation. With
+    I(skip_warmed), pods that have it are left alone, so running the task
+    again after a scale-out only warms the new replicas. The in-cluster
+    warm-up controller (files/nim-warmup-controller.py) skips them the same
+    way and annotates the replicas it warms.
+  - With I(endpoints), the given URLs are warmed and the cluster is not
+    read.
+extends_documentation_fragment:
+  - kubernetes.core.k8s_auth_options
+options:
+  service:
+    description:
+      - Service of the NIM replicas; its selector finds the pods. The
+        NIMService operator names it after the NIMService.
+      - Required unless I(endpoints) is set.
+    type: str
+  namespace:
+    description: Namespace of I(service).
+    type: str
+    default: nim
+  port:
+    description:
+      - Port of the OpenAI compatible API on the pods. Defaults to the
+        target port of the first port of I(service), or 8000.
+    type: int
+  direct:
+    description:
+      - Send requests to the pod IPs instead of through the API server, for
+        a controller that can route to the pod network.
+    type: bool
+    default: false
+  endpoints:
+    description:
+      - Base URLs to warm instead of the pods of I(service), such as
+        C(http://10.0.0.12:8000).
+    type: list
+    elements: str
+  model:
+    description: Served model name sent with every request.
+    type: str
+    required: true
+  prompts:
+    description:
+      - User prompts of one round. Defaults to a small set of summarizing,
+        coding and explanation prompts.
+    type: list
+    elements: str
+  max_tokens:
+    description: Completion tokens requested per prompt.
+    type: int
+    default: 64
+  concurrency:
+    description: Requests in flight at the same time, per pod.
+    type: int
+    default: 4
+  parallel:
+    description: Pods warmed at the same time.
+    type: int
+    default: 4
+  max_rounds:
+    description: Rounds after which a pod that has not settled fails.
+    type: int
+    default: 10
+  window:
+    description: Number of consecutive rounds that must agree.
+    type: int
+    default: 3
+  tolerance:
+    description: Largest spread of the round medians, relative to the fastest.
+    type: float
+    default: 0.15
+  request_timeout:
+    description: Seconds one request may take.
+    type: int
+    default: 120
+  skip_warmed:
+    description: Leave pods that were warmed before alone.
+    type: bool
+    default: true
+requirements:
+  - kubernetes >= 24.2.0
+"""
+
+EXAMPLES = r"""
+- name: Warm up the 70B NIM replicas
+  smartscaler.installer.nim_warmup:
+    service: meta-llama3-70b-instruct
+    namespace: nim
+    model: meta/llama-3.1-70b-instruct
+    kubeconfig: output/kubeconfig
+
+- name: Warm a replica by URL
+  smartscaler.installer.nim_warmup:
+    endpoints:
+      - http://10.233.64.21:8000
+    model: meta/llama-3.1-8b-instruct
+    prompts:
+      - "What is Kubernetes?"
+"""
+
+RETURN = r"""
+pods:
+  description: Warm-up of every pod, in the order they were found.
+  type: list
+  elements: dict
+  returned: always
+  sample:
+    - name: meta-llama3-70b-instruct-7c9f8d-x2l4q
+      url: /api/v1/namespaces/nim/pods/meta-llama3-70b-instruct-7c9f8d-x2l4q:8000/proxy
+      settled: true
+      requests: 16
+      p50_ms: 412.3
+      rounds:
+        - {p50_ms: 2210.4, max_ms: 3015.2, errors: []}
+        - {p50_ms: 455.1, max_ms: 520.8, errors: []}
+skipped:
+  description: Ready pods left alone because they were warmed before.
+  type: list
+  elements: str
+  returned: always
+"""
+
+import copy
+import datetime
+
+from ansible_collections.kubernetes.core.plugins.module_utils.ansiblemodule import (
+    AnsibleModule,
+)
+from ansible_collections.kubernetes.core.plugins.module_utils.args_common import (
+    AUTH_ARG_SPEC,
+)
+from ansible_collections.kubernetes.core.plugins.module_utils.k8s.client import (
+    get_api_client,
+)
+from ansible_collections.kubernetes.core.plugins.module_utils.k8s.core import (
+    AnsibleK8SModule,
+)
+from ansible_collections.smartscaler.installer.plugins.module_utils.warmup import (
+    DEFAULT_PROMPTS,
+    WARMED_ANNOTATION,
+    pod_targets,
+    proxy_post,
+    service_port,
+    warm_pods,
+)
+
+
+def argspec():
+    args = copy.deepcopy(AUTH_ARG_SPEC)
+    args.update(
+        service=dict(type="str"),
+        namespace=dict(type="str", default="nim"),
+        port=dict(type="int"),
+        direct=dict(type="bool", default=False),
+        endpoints=dict(type="list", elements="str"),
+        model=dict(type="str", required=True),
+        prompts=dict(type="list", elements="str"),
+        max_tokens=dict(type="int", default=64),
+        concurrency=dict(type="int", default=4),
+        parallel=dict(type="int", default=4),
+        max_rounds=dict(type="int", default=10),
+        window=dict(type="int", default=3),
+        tolerance=dict(type="float", default=0.15),
+        request_timeout=dict(type="int", default=120),
+        skip_warmed=dict(type="bool", default=True),
+    )
+    return args
+
+
+def discover(module, client):
+    """(pod resource, targets, skipped pod names) of the pods of the Service."""
+    params = module.params
+    service = (
+        client.resource("Service", "v1")
+        .get(name=params["service"], namespace=params["namespace"])
+        .to_dict()
+    )
+    selector = (service.get("spec") or {}).get("selector") or {}
+    if not selector:
+        module.fail_json(
+            msg="Service %s/%s has no selector"
+            % (params["namespace"], params["service"])
+        )
+    pods = client.resource("Pod", "v1")
+    items = (
+        pods.get(
+            namespace=params["namespace"],
+            label_selector=",".join(
+                "%s=%s" % item for item in sorted(selector.items())
+            ),
+        ).to_dict()
+    ).get("items") or []
+    port = params["port"] or service_port(service)
+    proxy = not params["direct"]
+    everything = pod_targets(items, port, proxy=proxy)
+    targets = pod_targets(items, port, skip_warmed=params["skip_warmed"], proxy=proxy)
+    wanted = set(target["name"] for target in targets)
+    skipped = [target["name"] for target in everything if target["name"] not in wanted]
+    return pods, targets, skipped
+
+
+def main():
+    module = AnsibleK8SModule(
+        module_class=AnsibleModule,
+        argument_spec=argspec(),
+        required_one_of=[("service", "endpoints")],
+        supports_check_mode=True,
+    )
+    params = module.params
+
+    pods = None
+    skipped = []
+    post = {}
+    if params["endpoints"]:
+        targets = [dict(name=url, url=url) for url in params["endpoints"]]
+    else:
+        try:
+            client = get_api_client(module=module)
+            pods, targets, skipped = discover(module, client)
+        except Exception as e:
+            module.fail_json(msg="Failed to find the NIM pods: %s" % e)
+        if not params["direct"]:
+            post = dict(post=proxy_post(client))
+
+    if module.check_mode:
+        module.exit_json(
+            changed=bool(targets),
+            pods=[dict(target, settled=None) for target in targets],
+            skipped=skipped,
+        )
+
+    results = warm_pods(
+        targets,
+        parallel=params["parallel"],
+        model=params["model"],
+        prompts=params["prompts"] or list(DEFAULT_PROMPTS),
+        max_tokens=params["max_tokens"],
+        concurrency=params["concurrency"],
+        max_rounds=params["max_rounds"],
+        window=params["window"],
+        tolerance=params["tolerance"],
+        timeout=params["request_timeout"],
+        **post
+    )
+
+    if pods is not None:
+        warmed_at = datetime.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+        for result in results:
+            if not result["settled"]:
+                continue
+            try:
+                pods.patch(
+                    name=result["name"],
+                    namespace=params["namespace"],
+                    body={"metadata": {"annotations": {WARMED_ANNOTATION: warmed_at}}},
+                    content_type="application/merge-patch+json",
+                )
+            except Exception as e:
+                module.warn("Could not annotate pod %s: %s" % (result["name"], e))
+
+    unsettled = [result for result in results if not result["settled"]]
+    if unsettled:
+        module.fail_json(
+            msg="Latency of %s did not settle after %d rounds"
+            % (
+                ", ".join(result["name"] for result in unsettled),
+                params["max_rounds"],
+            ),
+            pods=results,
+            skipped=skipped,
+        )
+    module.exit_json(changed=bool(results), pods=results, skipped=skipped)
+
+
+if __name__ == "__main__":
+    main()
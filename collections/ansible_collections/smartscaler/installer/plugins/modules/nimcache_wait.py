@@ -0,0 +1,126 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+
+DOCUMENTATION = r"""
+module: nimcache_wait
+
+short_description: Wait for a NIMCache to be ready by watching its status
+
+description:
+  - Watches a NIMCache from the controller until its I(condition) is C(True),
+    without creating a Job, ServiceAccount or Role in the cluster.
+  - State changes and the model download progress (percentage and bytes, when
+    the operator reports them in the status or a condition message) are shown
+    as they arrive; a status line is shown every I(status_interval) seconds.
+  - Fails as soon as the cache reports a C(Failed) state or condition, and
+    when I(timeout) runs out.
+  - A watch that fails, for example because the API server restarted or the
+    connection broke, is shown in a status line and started again a few
+    seconds later, until I(timeout) runs out.
+  - Runs as an action plugin on the controller, using the
+    C(kubernetes.core) client configuration.
+
+options:
+  name:
+    description:
+      - Name of the NIMCache.
+    type: str
+    required: true
+  namespace:
+    description:
+      - Namespace of the NIMCache.
+    type: str
+    required: true
+  api_version:
+    description:
+      - API version of the watched resource.
+    type: str
+    default: apps.nvidia.com/v1alpha1
+  kind:
+    description:
+      - Kind of the watched resource.
+    type: str
+    default: NIMCache
+  condition:
+    description:
+      - Condition type that marks the cache as ready. A C(status.state) equal
+        to it counts as well when the operator sets no such condition.
+    type: str
+    default: Ready
+  timeout:
+    description:
+      - Seconds to wait for the cache.
+    type: float
+    default: 1200
+  status_interval:
+    description:
+      - Seconds between two status lines while nothing changes.
+    type: float
+    default: 30
+  percent_step:
+    description:
+      - Download progress is shown again once it moved by this many percent.
+    type: float
+    default: 5
+  kubeconfig:
+    description:
+      - Path to the kubeconfig file, as for C(kubernetes.core.k8s).
+    type: path
+  context:
+    description:
+      - Kubeconfig context to use.
+    type: str
+
+requirements:
+  - kubernetes >= 24.2.0
+"""
+
+EXAMPLES = r"""
+- name: Wait for the 70B model cache
+  smartscaler.installer.nimcache_wait:
+    name: meta-llama3-70b-instruct
+    namespace: nim
+    timeout: 1200
+    kubeconfig: "{{ global_kubeconfig }}"
+    context: "{{ global_kubecontext }}"
+"""
+
+RETURN = r"""
+ready:
+  description: Whether the cache reached the condition.
+  type: bool
+  returned: always
+state:
+  description: Last C(status.state) of the cache.
+  type: str
+  returned: always
+  sample: Ready
+conditions:
+  description: Last C(status.conditions) of the cache.
+  type: list
+  elements: dict
+  returned: always
+progress:
+  description: Last known download progress.
+  type: dict
+  returned: always
+  sample:
+    percent: 42.0
+    downloaded: 59055800320
+    total: 140660178944
+history:
+  description: Status lines shown while waiting.
+  type: list
+  elements: str
+  returned: always
+elapsed:
+  description: Seconds waited.
+  type: float
+  returned: always
+"""
@@ -0,0 +1,70 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+
+DOCUMENTATION = r"""
+module: pod_copy
+
+short_description: Push a file or a directory tree into a pod in one transfer
+
+description:
+  - Copies local files to a host reached through the C(kubernetes.core.kubectl)
+    connection plugin.
+  - Every file is packed into a single tar stream and unpacked by one
+    C(kubectl exec), instead of one C(kubectl exec) per file as
+    C(ansible.builtin.copy) does.
+  - With any other connection plugin, or with I(batch=false), the files are
+    transferred one by one with C(put_file).
+  - The action always reports a change when it transferred files; it does not
+    compare checksums with the remote side.
+
+options:
+  src:
+    description:
+      - Local file or directory, looked up like C(ansible.builtin.copy) does.
+      - When a directory ends with C(/), its content is copied into I(dest),
+        otherwise the directory itself is created inside I(dest).
+    type: path
+    required: true
+  dest:
+    description:
+      - Absolute remote path. Missing parent directories are created.
+    type: path
+    required: true
+  batch:
+    description:
+      - Use the single tar stream transfer when the connection supports it.
+    type: bool
+    default: true
+
+requirements:
+  - C(tar) in the container when I(batch=true)
+"""
+
+EXAMPLES = r"""
+- name: Push the NIM runtime configuration into the pod
+  smartscaler.installer.pod_copy:
+    src: files/nim-config/
+    dest: /opt/nim/config
+  vars:
+    ansible_connection: kubernetes.core.kubectl
+    ansible_kubectl_namespace: nim
+    ansible_kubectl_pod: "{{ nim_pod_name }}"
+    ansible_kubectl_persistent_session: true
+"""
+
+RETURN = r"""
+files:
+  description: Remote paths written.
+  type: list
+  returned: always
+transfers:
+  description: Number of transfers made, C(1) when the files were batched.
+  type: int
+  returned: success
+"""
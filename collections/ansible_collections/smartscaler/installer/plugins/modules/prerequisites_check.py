@@ -0,0 +1,309 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+
+DOCUMENTATION = r"""
+module: prerequisites_check
+
+short_description: Validate installer prerequisites in a single pass
+
+description:
+  - Checks every Python distribution listed in one or more requirements files
+    in-process with C(importlib.metadata), instead of running C(pip) once per line.
+  - Runs C(ansible-galaxy collection list) once and checks every collection from
+    an Ansible C(requirements.yml) against that single listing.
+  - Probes the configured command line tools concurrently.
+  - A passing result is cached on disk, keyed on the content of the requirement
+    files, the tool definitions and the Python interpreter. Later runs return the
+    cached result without probing anything until one of those changes or the
+    cache expires.
+  - Distributions are resolved for the interpreter running the module; set
+    C(ansible_python_interpreter) on the task to check a virtualenv.
+
+options:
+  requirements_files:
+    description:
+      - Paths to pip style requirements files.
+    type: list
+    elements: path
+    default: []
+  collections_file:
+    description:
+      - Path to an Ansible Galaxy C(requirements.yml) listing required collections.
+    type: path
+  collections_paths:
+    description:
+      - Extra collection search paths passed to C(ansible-galaxy collection list).
+    type: list
+    elements: path
+    default: []
+  tools:
+    description:
+      - Command line tools to probe.
+    type: list
+    elements: dict
+    default: []
+    suboptions:
+      name:
+        description: Name reported in the result.
+        type: str
+        required: true
+      command:
+        description: Command to run, split like a shell command line.
+        type: str
+        required: true
+      version_regex:
+        description: Regex with one group extracting the version from the output.
+        type: str
+      min_version:
+        description: Minimum accepted version, requires I(version_regex).
+        type: str
+  min_python_version:
+    description:
+      - Minimum version of the interpreter running the module.
+    type: str
+    default: "3.10"
+  cache_path:
+    description:
+      - File used to cache a passing result. Caching is disabled when omitted.
+    type: path
+  cache_ttl:
+    description:
+      - Seconds a cached passing result stays valid. C(0) never expires.
+    type: int
+    default: 86400
+  force:
+    description:
+      - Ignore any cached result and probe everything again.
+    type: bool
+    default: false
+  max_workers:
+    description:
+      - Number of tool probes run at the same time.
+    type: int
+    default: 8
+
+requirements:
+  - "python >= 3.8"
+"""
+
+EXAMPLES = r"""
+- name: Validate local prerequisites
+  smartscaler.installer.prerequisites_check:
+    requirements_files:
+      - "{{ playbook_dir }}/requirements.txt"
+    collections_file: "{{ playbook_dir }}/requirements.yml"
+    collections_paths:
+      - "{{ playbook_dir }}/collections"
+    tools:
+      - name: kubectl
+        command: kubectl version --client -o json
+        version_regex: '"gitVersion":\s*"v([0-9.]+)'
+      - name: helm
+        command: helm version --short
+        version_regex: 'v([0-9.]+)'
+    cache_path: "{{ playbook_dir }}/output/.prerequisites_cache.json"
+  register: prereqs
+"""
+
+RETURN = r"""
+passed:
+  description: Whether every check passed.
+  type: bool
+  returned: always
+cached:
+  description: Whether the result was served from the cache.
+  type: bool
+  returned: always
+fingerprint:
+  description: Cache key computed for this run.
+  type: str
+  returned: always
+python:
+  description: Interpreter executable, version and whether it satisfies I(min_python_version).
+  type: dict
+  returned: always
+distributions:
+  description: Per requirement result with the installed version.
+  type: list
+  returned: always
+missing_distributions:
+  description: Requirement lines that are not installed or have the wrong version.
+  type: list
+  returned: always
+missing_collections:
+  description: Collections from I(collections_file) that are not installed.
+  type: list
+  returned: always
+tools:
+  description: Per tool probe result with return code, version and duration.
+  type: list
+  returned: always
+failed_tools:
+  description: Names of the tools that are missing or too old.
+  type: list
+  returned: always
+"""
+
+import platform
+import shlex
+import sys
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.compat.version import LooseVersion
+from ansible_collections.smartscaler.installer.plugins.module_utils.prerequisites import (
+    check_distributions,
+    fingerprint,
+    load_cache,
+    parse_collection_list,
+    parse_requirements,
+    probe_tools,
+    save_cache,
+)
+
+try:
+    import yaml
+
+    HAS_YAML = True
+except ImportError:
+    HAS_YAML = False
+
+
+def argspec():
+    return dict(
+        requirements_files=dict(type="list", elements="path", default=[]),
+        collections_file=dict(type="path"),
+        collections_paths=dict(type="list", elements="path", default=[]),
+        tools=dict(
+            type="list",
+            elements="dict",
+            default=[],
+            options=dict(
+                name=dict(type="str", required=True),
+                command=dict(type="str", required=True),
+                version_regex=dict(type="str"),
+                min_version=dict(type="str"),
+            ),
+        ),
+        min_python_version=dict(type="str", default="3.10"),
+        cache_path=dict(type="path"),
+        cache_ttl=dict(type="int", default=86400),
+        force=dict(type="bool", default=False),
+        max_workers=dict(type="int", default=8),
+    )
+
+
+def required_collections(path):
+    with open(path) as handle:
+        content = yaml.safe_load(handle) or {}
+    names = []
+    for entry in content.get("collections", []) or []:
+        name = entry.get("name") if isinstance(entry, dict) else entry
+        if name:
+            names.append(name)
+    return names
+
+
+def installed_collections(module, search_paths):
+    galaxy = module.get_bin_path("ansible-galaxy", required=True)
+    command = [galaxy, "collection", "list", "--format", "json"]
+    for path in search_paths:
+        command += ["-p", path]
+    rc, out, err = module.run_command(command)
+    if rc != 0:
+        # Older ansible-galaxy releases do not know --format, fall back to the table.
+        rc, out, err = module.run_command(command[:3] + command[5:])
+    if rc != 0:
+        module.fail_json(msg="ansible-galaxy collection list failed", stderr=err)
+    return parse_collection_list(out)
+
+
+def execute_module(module):
+    params = module.params
+    python_version = platform.python_version()
+    key = fingerprint(
+        list(params["requirements_files"])
+        + ([params["collections_file"]] if params["collections_file"] else []),
+        extra=dict(
+            tools=params["tools"],
+            collections_paths=params["collections_paths"],
+            python=sys.executable,
+            python_version=python_version,
+            min_python_version=params["min_python_version"],
+        ),
+    )
+
+    if params["cache_path"] and not params["force"]:
+        cached = load_cache(params["cache_path"], key, params["cache_ttl"])
+        if cached is not None:
+            cached.update(cached=True, fingerprint=key)
+            return cached
+
+    requirements = []
+    for path in params["requirements_files"]:
+        with open(path) as handle:
+            requirements.extend(parse_requirements(handle.read()))
+    distributions, missing_distributions = check_distributions(requirements)
+
+    missing_collections = []
+    if params["collections_file"]:
+        wanted = required_collections(params["collections_file"])
+        if wanted:
+            available = installed_collections(module, params["collections_paths"])
+            missing_collections = [name for name in wanted if name not in available]
+
+    def run(command):
+        argv = shlex.split(command)
+        # run_command fails the whole module on a missing binary, report it instead.
+        executable = module.get_bin_path(argv[0])
+        if executable is None:
+            return 127, "", "%s: command not found" % argv[0]
+        return module.run_command([executable] + argv[1:])
+
+    tools = probe_tools(params["tools"], run, max_workers=params["max_workers"])
+    failed_tools = [tool["name"] for tool in tools if not tool["ok"]]
+
+    python = dict(
+        executable=sys.executable,
+        version=python_version,
+        ok=LooseVersion(python_version) >= LooseVersion(params["min_python_version"]),
+    )
+
+    result = dict(
+        passed=python["ok"]
+        and not missing_distributions
+        and not missing_collections
+        and not failed_tools,
+        python=python,
+        distributions=distributions,
+        missing_distributions=missing_distributions,
+        missing_collections=missing_collections,
+        tools=tools,
+        failed_tools=failed_tools,
+    )
+
+    if result["passed"] and params["cache_path"] and not module.check_mode:
+        save_cache(params["cache_path"], key, result)
+
+    result.update(cached=False, fingerprint=key)
+    return result
+
+
+def main():
+    module = AnsibleModule(argument_spec=argspec(), supports_check_mode=True)
+    if not HAS_YAML and module.params["collections_file"]:
+        module.fail_json(msg="PyYAML is required to read collections_file")
+    try:
+        result = execute_module(module)
+    except (IOError, OSError) as exc:
+        module.fail_json(msg="Unable to read prerequisite definitions: %s" % exc)
+    module.exit_json(changed=False, **result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+
+DOCUMENTATION = r"""
+module: ufw_rules
+
+short_description: Apply a complete UFW rule set to a node in one pass
+
+description:
+  - Takes the complete set of rules a node needs, reads the rules UFW already
+    has once with C(ufw show added), and adds only the missing ones, all
+    within a single module run on the node.
+  - Rules are compared on action, direction, addresses, ports and protocol.
+    Comments are not compared, and rules not listed in I(rules) are left
+    untouched.
+  - Each missing rule is added with its own C(ufw) command, which applies it
+    to the running firewall, so no reload is needed afterwards.
+  - When UFW rejects a rule, the module fails after a best-effort rollback
+    that deletes the rules this run already added, in reverse order. Rules
+    whose delete fails as well stay in place and are reported in
+    RV(added) and RV(rollback_failed).
+  - Supports check mode, which reports the rules that would be added.
+
+options:
+  rules:
+    description:
+      - Complete desired rule set of the node.
+    type: list
+    elements: dict
+    required: true
+    suboptions:
+      rule:
+        description: Action of the rule.
+        type: str
+        choices: [allow, deny, reject, limit]
+        default: allow
+      direction:
+        description: Direction of the traffic.
+        type: str
+        choices: [in, out]
+        default: in
+      from_ip:
+        description: Source address or network, any when omitted.
+        type: str
+      from_port:
+        description: Source port or range.
+        type: str
+      to_ip:
+        description: Destination address or network, any when omitted.
+        type: str
+      port:
+        description: Destination port, or range such as C(2379:2380).
+        type: str
+      proto:
+        description: Protocol, any when omitted. Required by UFW for ranges.
+        type: str
+        choices: [tcp, udp]
+      comment:
+        description: Comment stored with the rule when it is added.
+        type: str
+
+requirements:
+  - ufw
+"""
+
+EXAMPLES = r"""
+- name: Open the Kubernetes ports
+  smartscaler.installer.ufw_rules:
+    rules:
+      - port: "6443"
+        proto: tcp
+        comment: Kubernetes API Server
+      - port: "2379:2380"
+        proto: tcp
+        comment: etcd
+      - from_ip: 10.0.0.11
+        port: "8080"
+        proto: tcp
+  become: true
+"""
+
+RETURN = r"""
+added:
+  description:
+    - Commands of the rules added, or to be added in check mode.
+    - On failure, the rules this run added that are still in place.
+  type: list
+  elements: str
+  returned: always
+  sample: ["ufw allow 6443/tcp comment 'Kubernetes API Server'"]
+rollback_failed:
+  description: Deletes of the rollback that UFW refused, with their output.
+  type: list
+  elements: dict
+  returned: when a rule was rejected
+  sample: [{"command": "ufw delete allow 10250/tcp", "rc": 1, "stderr": "ERROR: ..."}]
+existing:
+  description: Number of rules UFW had before the run.
+  type: int
+  returned: always
+"""
+
+import shlex
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.smartscaler.installer.plugins.module_utils.firewall import (
+    delta,
+    parse_added,
+    rule_args,
+)
+
+
+def argspec():
+    return dict(
+        rules=dict(
+            type="list",
+            elements="dict",
+            required=True,
+            options=dict(
+                rule=dict(
+                    type="str",
+                    default="allow",
+                    choices=["allow", "deny", "reject", "limit"],
+                ),
+                direction=dict(type="str", default="in", choices=["in", "out"]),
+                from_ip=dict(type="str"),
+                from_port=dict(type="str"),
+                to_ip=dict(type="str"),
+                port=dict(type="str"),
+                proto=dict(type="str", choices=["tcp", "udp"]),
+                comment=dict(type="str"),
+            ),
+        ),
+    )
+
+
+def command(args):
+    return " ".join(["ufw"] + [shlex.quote(arg) for arg in args])
+
+
+def main():
+    module = AnsibleModule(argument_spec=argspec(), supports_check_mode=True)
+    ufw = module.get_bin_path("ufw", required=True)
+
+    rc, out, err = module.run_command([ufw, "show", "added"])
+    if rc != 0:
+        module.fail_json(msg="ufw show added failed", stdout=out, stderr=err)
+    current = parse_added(out)
+    missing = delta(module.params["rules"], current)
+    added = [command(rule_args(key, comment)) for key, comment in missing]
+
+    if module.check_mode or not missing:
+        module.exit_json(changed=bool(missing), added=added, existing=len(current))
+
+    applied = []
+    for key, comment in missing:
+        rc, out, err = module.run_command([ufw] + rule_args(key, comment))
+        if rc != 0:
+            # Best effort: delete what this run added, newest first.
+            kept, rollback_failed = [], []
+            for done, done_comment in reversed(applied):
+                delete = ["delete"] + rule_args(done)
+                delete_rc, delete_out, delete_err = module.run_command([ufw] + delete)
+                if delete_rc != 0:
+                    kept.insert(0, command(rule_args(done, done_comment)))
+                    rollback_failed.append(
+                        dict(
+                            command=command(delete),
+                            rc=delete_rc,
+                            stdout=delete_out,
+                            stderr=delete_err,
+                        )
+                    )
+            msg = "ufw rejected %s, rolled back %d of %d added rules" % (
+                command(rule_args(key, comment)),
+                len(applied) - len(kept),
+                len(applied),
+            )
+            if kept:
+                msg += "; still in place: %s" % ", ".join(kept)
+            module.fail_json(
+                msg=msg,
+                stdout=out,
+                stderr=err,
+                added=kept,
+                rollback_failed=rollback_failed,
+                existing=len(current),
+            )
+        applied.append((key, comment))
+
+    module.exit_json(changed=True, added=added, existing=len(current))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,476 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import copy
+import json
+import threading
+
+import pytest
+from ansible_collections.smartscaler.installer.plugins.module_utils.batch import (
+    Batch,
+    ResourceNotFoundError,
+    after_crd_writes,
+    extract,
+    normalize,
+    parse_path,
+)
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super(ApiError, self).__init__("(%s)" % status)
+        self.status = status
+        self.body = json.dumps({"message": message})
+
+
+class Resource(object):
+    def __init__(self, kind, namespaced=True):
+        self.kind = kind
+        self.namespaced = namespaced
+
+
+class Dynamic(object):
+    """In-memory objects by (kind, namespace, name); records every call."""
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.calls = []
+        self.lock = threading.Lock()
+        # Lets a test check that independent operations overlap
+        self.barrier = None
+        # Statuses an object reports on successive gets, by key
+        self.statuses = {}
+
+    def _call(self, verb, resource, name, namespace, kwargs):
+        with self.lock:
+            self.calls.append((verb, resource.kind, name, namespace, kwargs))
+        if self.barrier is not None and verb != "get":
+            self.barrier.wait(timeout=5)
+
+    def _key(self, resource, name, namespace):
+        return (resource.kind, namespace, name)
+
+    def get(self, resource, name=None, namespace=None, **kwargs):
+        self._call("get", resource, name, namespace, kwargs)
+        if name is None:
+            return {
+                "items": [
+                    o for (k, n, dummy), o in self.objects.items() if k == resource.kind
+                ]
+            }
+        key = self._key(resource, name, namespace)
+        if key not in self.objects:
+            raise ApiError(404, "%s %s not found" % (resource.kind, name))
+        obj = copy.deepcopy(self.objects[key])
+        with self.lock:
+            statuses = self.statuses.get(key)
+            if statuses:
+                obj["status"] = statuses.pop(0) if len(statuses) > 1 else statuses[0]
+        return obj
+
+    def create(self, resource, body, namespace=None, **kwargs):
+        name = body["metadata"]["name"]
+        self._call("create", resource, name, namespace, kwargs)
+        if self._key(resource, name, namespace) in self.objects:
+            raise ApiError(409, "already exists")
+        self.objects[self._key(resource, name, namespace)] = body
+        return body
+
+    def server_side_apply(self, resource, body, name, namespace, **kwargs):
+        self._call("apply", resource, name, namespace, kwargs)
+        self.objects[self._key(resource, name, namespace)] = body
+        return body
+
+    def patch(self, resource, body, name, namespace, **kwargs):
+        self._call("patch", resource, name, namespace, kwargs)
+        obj = self.objects[self._key(resource, name, namespace)]
+        obj.setdefault("data", {}).update(body.get("data") or {})
+        return obj
+
+    def delete(self, resource, name, namespace, **kwargs):
+        self._call("delete", resource, name, namespace, kwargs)
+        if self.objects.pop(self._key(resource, name, namespace), None) is None:
+            raise ApiError(404, "not found")
+
+
+SERVED = {
+    "ConfigMap": Resource("ConfigMap"),
+    "Secret": Resource("Secret"),
+    "Namespace": Resource("Namespace", namespaced=False),
+    "NIMCache": Resource("NIMCache"),
+}
+
+
+class Client(object):
+    def __init__(self, objects=None):
+        self.client = Dynamic(objects or {})
+        self.discovered = []
+
+    def resource(self, kind, api_version):
+        self.discovered.append(kind)
+        if kind not in SERVED:
+            raise ResourceNotFoundError(kind)
+        return SERVED[kind]
+
+
+def configmap(name, namespace="nim", **data):
+    return {
+        "apiVersion": "v1",
+        "kind": "ConfigMap",
+        "metadata": {"name": name, "namespace": namespace},
+        "data": data,
+    }
+
+
+def namespace(name):
+    return {"apiVersion": "v1", "kind": "Namespace", "metadata": {"name": name}}
+
+
+SECRET = {
+    "metadata": {"name": "root-secret"},
+    "data": {"ca.crt": "Q0E=", "tls.crt": "VExT"},
+    "items": [{"metadata": {"name": "a"}}, {"metadata": {"name": "b"}}],
+}
+
+
+@pytest.mark.parametrize(
+    "expr, value",
+    [
+        ("{.data.ca\\.crt}", "Q0E="),
+        (".data['tls.crt']", "VExT"),
+        ("metadata.name", "root-secret"),
+        ("{.items[*].metadata.name}", ["a", "b"]),
+        ("{.items[-1].metadata.name}", "b"),
+        ("{.items[5].metadata.name}", None),
+        ("{.spec.missing}", None),
+    ],
+)
+def test_extract(expr, value):
+    assert extract(SECRET, expr) == value
+
+
+def test_parse_path_rejects_garbage():
+    assert parse_path("{.a[0]}") == ["a", 0]
+    with pytest.raises(ValueError, match="invalid jsonpath"):
+        parse_path("{.a[x]}")
+
+
+def nimcache(name):
+    return {
+        "apiVersion": "apps.nvidia.com/v1alpha1",
+        "kind": "NIMCache",
+        "metadata": {"name": name, "namespace": "nim"},
+    }
+
+
+def ready(status="True", **fields):
+    return dict(fields, conditions=[{"type": "Ready", "status": status}])
+
+
+def test_normalize():
+    operations = normalize(
+        [
+            dict(op="apply", definition=namespace("smartai")),
+            dict(id="cm", op="apply", definition=configmap("a"), after="op1"),
+            dict(op="get", kind="Secret", name="s", namespace="nim"),
+            dict(op="delete", kind="ConfigMap", name="a", after=["cm", "op3"]),
+        ]
+    )
+    assert operations[0]["kind"] == "Namespace"
+    assert operations[1]["namespace"] == "nim"
+    assert operations[1]["after"] == ["op1"]
+    assert operations[3]["after"] == ["cm", "op3"]
+
+
+@pytest.mark.parametrize(
+    "operation, message",
+    [
+        (dict(op="scale"), "op must be one of"),
+        (dict(op="apply"), "needs a definition"),
+        (dict(op="patch", kind="ConfigMap", name="a"), "needs a patch"),
+        (dict(op="delete", kind="ConfigMap"), "needs a name"),
+        (dict(op="get", name="a"), "needs a kind"),
+        (dict(op="get", kind="Secret", after=["later"]), "earlier operations"),
+        (
+            dict(op="get", kind="Secret", wait={"condition": "Ready"}),
+            "cannot wait",
+        ),
+        (dict(op="apply", definition=configmap("a"), wait={}), "needs a condition"),
+    ],
+)
+def test_normalize_rejects(operation, message):
+    with pytest.raises(ValueError, match=message):
+        normalize([operation])
+
+
+def test_independent_operations_run_concurrently():
+    client = Client()
+    # Both applies must be in flight at once to get past the barrier
+    client.client.barrier = threading.Barrier(2)
+    result = Batch(client, max_workers=4).run(
+        [
+            dict(op="apply", definition=namespace("smartai")),
+            dict(op="apply", definition=namespace("smartai-backend")),
+        ]
+    )
+    assert result["errors"] == []
+    assert result["changed"]
+    assert client.discovered == ["Namespace"]
+    applies = [call for call in client.client.calls if call[0] == "apply"]
+    assert {call[2] for call in applies} == {"smartai", "smartai-backend"}
+    # Cluster-scoped: no namespace, however the operation was written
+    assert {call[3] for call in applies} == {None}
+
+
+def test_writes_report_changes_and_capture_values():
+    client = Client(
+        {
+            ("ConfigMap", "nim", "same"): configmap("same", a="1"),
+            ("ConfigMap", "nim", "dns"): configmap("dns", Corefile="old"),
+            ("Secret", "cert-manager", "root-secret"): dict(
+                SECRET, metadata={"name": "root-secret"}
+            ),
+        }
+    )
+    result = Batch(client).run(
+        [
+            dict(op="apply", definition=configmap("same", a="1")),
+            dict(op="create", definition=configmap("same", a="2")),
+            dict(
+                op="patch",
+                kind="ConfigMap",
+                name="dns",
+                namespace="nim",
+                patch={"data": {"Corefile": "new"}},
+            ),
+            dict(op="delete", kind="ConfigMap", name="gone", namespace="nim"),
+            dict(
+                op="get",
+                kind="Secret",
+                name="root-secret",
+                namespace="cert-manager",
+                capture={"ca_crt": "{.data.ca\\.crt}"},
+            ),
+        ]
+    )
+    assert [r["changed"] for r in result["results"]] == [
+        False,
+        False,
+        True,
+        False,
+        False,
+    ]
+    assert result["captured"] == {"ca_crt": "Q0E="}
+    patch = [call for call in client.client.calls if call[0] == "patch"][0]
+    assert patch[4]["content_type"] == "application/merge-patch+json"
+
+
+def test_failures_skip_dependents_and_honour_ignore_errors():
+    client = Client()
+    result = Batch(client).run(
+        [
+            dict(id="ngc", op="get", kind="Secret", name="ngc", namespace="nim"),
+            dict(
+                op="get",
+                kind="Secret",
+                name="avesha",
+                namespace="nim",
+                ignore_errors=True,
+            ),
+            dict(op="apply", definition=configmap("a"), after=["ngc"]),
+            dict(op="get", kind="Widget", name="w"),
+        ]
+    )
+    outcomes = result["results"]
+    assert outcomes[0]["failed"] and "ngc not found" in outcomes[0]["msg"]
+    assert outcomes[2]["skipped"] and outcomes[2]["msg"] == "skipped, ngc failed"
+    assert "not served" in outcomes[3]["msg"]
+    assert [e["id"] for e in result["errors"]] == ["ngc", "op3", "op4"]
+    assert not any(call[0] == "apply" for call in client.client.calls)
+
+
+def test_check_mode_sends_dry_run():
+    client = Client({("ConfigMap", "nim", "a"): configmap("a")})
+    Batch(client, check_mode=True).run(
+        [
+            dict(op="apply", definition=configmap("b")),
+            dict(op="delete", kind="ConfigMap", name="a", namespace="nim"),
+        ]
+    )
+    writes = [call for call in client.client.calls if call[0] != "get"]
+    assert writes and all(call[4]["dry_run"] == "All" for call in writes)
+
+
+def test_chains_do_not_wait_for_unrelated_operations():
+    client = Client()
+    key = ("NIMCache", "nim", "slow")
+    # The slow cache only gets ready once the other chain is done
+    client.client.statuses[key] = [ready("False")]
+    result = {}
+
+    def run():
+        result.update(
+            Batch(client, max_workers=4, wait_sleep=0.01).run(
+                [
+                    dict(
+                        id="slow",
+                        op="apply",
+                        definition=nimcache("slow"),
+                        wait={"condition": "Ready", "timeout": 5},
+                    ),
+                    dict(
+                        id="fast",
+                        op="apply",
+                        definition=nimcache("fast"),
+                        wait={"condition": "Ready"},
+                    ),
+                    dict(
+                        id="fast-cm",
+                        op="apply",
+                        definition=configmap("b"),
+                        after="fast",
+                    ),
+                ]
+            )
+        )
+
+    client.client.statuses[("NIMCache", "nim", "fast")] = [ready()]
+    worker = threading.Thread(target=run)
+    worker.start()
+    for dummy in range(500):
+        if any(call[2] == "b" for call in client.client.calls):
+            break
+        threading.Event().wait(0.01)
+    client.client.statuses[key] = [ready()]
+    worker.join(10)
+    assert result["errors"] == []
+    assert [r["id"] for r in result["results"]] == ["slow", "fast", "fast-cm"]
+    assert "waited" in result["results"][0]
+
+
+def test_wait_reports_failures_and_timeouts():
+    client = Client()
+    client.client.statuses[("NIMCache", "nim", "broken")] = [
+        ready("False", state="Failed")
+    ]
+    client.client.statuses[("NIMCache", "nim", "late")] = [
+        {"conditions": [{"type": "Ready", "status": "False", "message": "pulling"}]}
+    ]
+    result = Batch(client, wait_sleep=0.01).run(
+        [
+            dict(
+                op="apply",
+                definition=nimcache("broken"),
+                wait={"condition": "Ready", "timeout": 5},
+            ),
+            dict(
+                op="apply",
+                definition=nimcache("late"),
+                wait={"condition": "Ready", "timeout": 0.05},
+            ),
+        ]
+    )
+    assert result["results"][0]["msg"] == "NIMCache broken is Failed"
+    assert result["results"][1]["msg"].startswith("NIMCache late: Ready is not True")
+    assert result["results"][1]["msg"].endswith(": pulling")
+
+
+def test_check_mode_does_not_wait():
+    client = Client()
+    result = Batch(client, check_mode=True).run(
+        [dict(op="apply", definition=nimcache("a"), wait={"condition": "Ready"})]
+    )
+    assert result["errors"] == []
+    assert "waited" not in result["results"][0]
+
+
+def crd(kind):
+    return {
+        "apiVersion": "apiextensions.k8s.io/v1",
+        "kind": "CustomResourceDefinition",
+        "metadata": {"name": "%ss.example.com" % kind.lower()},
+    }
+
+
+def widget(name):
+    return {
+        "apiVersion": "example.com/v1",
+        "kind": "Widget",
+        "metadata": {"name": name, "namespace": "nim"},
+    }
+
+
+class CRDClient(Client):
+    """Serves Widget once its CRD exists and was looked up I(delay) times."""
+
+    def __init__(self, delay=0):
+        super(CRDClient, self).__init__()
+        self.delay = delay
+
+    def resource(self, kind, api_version):
+        if kind == "CustomResourceDefinition":
+            self.discovered.append(kind)
+            return Resource(kind, namespaced=False)
+        if kind == "Widget" and any(
+            key[0] == "CustomResourceDefinition" for key in self.client.objects
+        ):
+            self.discovered.append(kind)
+            if self.delay:
+                self.delay -= 1
+                raise ResourceNotFoundError(kind)
+            return Resource(kind)
+        return super(CRDClient, self).resource(kind, api_version)
+
+
+def test_after_crd_writes():
+    operations = normalize(
+        [
+            dict(id="crd", op="apply", definition=crd("Widget")),
+            dict(id="w", op="apply", definition=widget("a"), after="crd"),
+            dict(op="get", kind="Widget", name="a", namespace="nim", after="w"),
+            dict(op="apply", definition=widget("b")),
+        ]
+    )
+    assert after_crd_writes(operations) == {"w", "op3"}
+
+
+def test_kinds_of_a_crd_written_earlier_are_looked_up_again():
+    client = CRDClient(delay=2)
+    result = Batch(client, wait_sleep=0.01).run(
+        [
+            dict(id="crd", op="apply", definition=crd("Widget")),
+            dict(id="w", op="apply", definition=widget("a"), after="crd"),
+            # Does not wait for the CRD, so it is not looked up again
+            dict(op="get", kind="Widget", name="a", namespace="nim"),
+        ]
+    )
+    assert [r["failed"] for r in result["results"]] == [False, False, True]
+    assert "not served" in result["results"][2]["msg"]
+    assert ("Widget", "nim", "a") in client.client.objects
+
+
+def test_kinds_of_a_crd_that_is_never_served_fail():
+    client = CRDClient(delay=1000)
+    result = Batch(client, wait_sleep=0.01, discovery_timeout=0.05).run(
+        [
+            dict(id="crd", op="apply", definition=crd("Widget")),
+            dict(op="apply", definition=widget("a"), after="crd"),
+        ]
+    )
+    assert "not served" in result["errors"][0]["msg"]
+
+
+def test_check_mode_skips_kinds_of_a_new_crd():
+    client = CRDClient()
+    result = Batch(client, check_mode=True).run(
+        [
+            dict(id="crd", op="apply", definition=crd("Widget")),
+            dict(op="apply", definition=widget("a"), after="crd"),
+        ]
+    )
+    assert result["results"][1]["skipped"]
+    assert result["errors"] == []
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import os
+import tarfile
+
+from ansible_collections.smartscaler.installer.plugins.module_utils.charts import (
+    ChartStore,
+    chart_files,
+    ignored,
+)
+
+
+def make_chart(root, name="web", dependencies=""):
+    chart = root / name
+    (chart / "templates").mkdir(parents=True)
+    (chart / "charts" / "redis" / "templates").mkdir(parents=True)
+    (chart / "Chart.yaml").write_text(
+        "apiVersion: v2\nname: %s\nversion: 1.2.0\n%s" % (name, dependencies)
+    )
+    (chart / "values.yaml").write_text("replicas: 1\n")
+    (chart / "templates" / "deployment.yaml").write_text("kind: Deployment\n")
+    (chart / "charts" / "redis" / "Chart.yaml").write_text(
+        "apiVersion: v2\nname: redis\nversion: 0.1.0\n"
+    )
+    (chart / ".helmignore").write_text("# VCS\n.git/\n*.swp\n!keep.swp\n")
+    (chart / "values.yaml.swp").write_text("")
+    (chart / ".git").mkdir()
+    (chart / ".git" / "HEAD").write_text("ref")
+    return chart
+
+
+def test_ignored():
+    patterns = [".git/", "*.swp", "templates/NOTES.txt"]
+    assert ignored(".git", True, patterns)
+    assert not ignored(".git", False, patterns)
+    assert ignored("templates/a.swp", False, patterns)
+    assert ignored("templates/NOTES.txt", False, patterns)
+    assert not ignored("NOTES.txt", False, patterns)
+
+
+def test_chart_files_follow_helmignore(tmp_path):
+    chart = make_chart(tmp_path)
+    assert [rel for rel, dummy in chart_files(str(chart))] == [
+        ".helmignore",
+        "Chart.yaml",
+        "charts/redis/Chart.yaml",
+        "templates/deployment.yaml",
+        "values.yaml",
+    ]
+
+
+def test_subcharts_follow_their_own_helmignore(tmp_path):
+    chart = make_chart(tmp_path)
+    redis = chart / "charts" / "redis"
+    (redis / ".helmignore").write_text("ci/\n/README.md\nChart.yaml\n")
+    (redis / "ci").mkdir()
+    (redis / "ci" / "values.yaml").write_text("")
+    (redis / "README.md").write_text("")
+    (redis / "templates" / "README.md").write_text("")
+    (redis / "values.yaml.swp").write_text("")
+    # Relative to the parent chart, the subchart patterns match nothing
+    (chart / "ci").mkdir()
+    (chart / "ci" / "values.yaml").write_text("")
+    (chart / "README.md").write_text("")
+    assert [rel for rel, dummy in chart_files(str(chart))] == [
+        ".helmignore",
+        "Chart.yaml",
+        "README.md",
+        "charts/redis/.helmignore",
+        "charts/redis/Chart.yaml",
+        "charts/redis/templates/README.md",
+        "ci/values.yaml",
+        "templates/deployment.yaml",
+        "values.yaml",
+    ]
+
+
+def test_store_packages_once(tmp_path):
+    chart = make_chart(
+        tmp_path,
+        dependencies="dependencies:\n- name: redis\n  version: 0.1.0\n"
+        "- name: postgresql\n  version: 12.0.0\n",
+    )
+    store_dir = str(tmp_path / "store")
+    store = ChartStore(store_dir)
+    entry, written = store.add(str(chart))
+    store.save()
+    assert written
+    assert entry["missing_dependencies"] == ["postgresql"]
+    assert (
+        os.path.basename(entry["package"]) == "web-1.2.0-%s.tgz" % entry["digest"][:12]
+    )
+    with tarfile.open(entry["package"]) as tar:
+        names = tar.getnames()
+    assert "web/charts/redis/Chart.yaml" in names
+    assert "web/values.yaml.swp" not in names
+
+    # Same files: reused from the index, without reading them
+    store = ChartStore(store_dir)
+    assert store.add(str(chart) + "/") == (entry, False)
+
+    # Touched but unchanged: same package
+    os.utime(str(chart / "values.yaml"), (0, 0))
+    touched, written = store.add(str(chart))
+    assert not written
+    assert touched["package"] == entry["package"]
+    assert touched["signature"] != entry["signature"]
+
+    # Changed: packaged again, the old package is removed
+    (chart / "values.yaml").write_text("replicas: 2\n")
+    changed, written = store.add(str(chart))
+    assert written
+    assert changed["digest"] != entry["digest"]
+    assert os.path.isfile(changed["package"])
+    assert not os.path.exists(entry["package"])
+
+
+def test_packages_are_reproducible(tmp_path):
+    first = ChartStore(str(tmp_path / "a")).add(str(make_chart(tmp_path / "x")))[0]
+    second = ChartStore(str(tmp_path / "b")).add(str(make_chart(tmp_path / "y")))[0]
+    assert first["digest"] == second["digest"]
+    with open(first["package"], "rb") as a, open(second["package"], "rb") as b:
+        assert a.read() == b.read()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+from ansible_collections.smartscaler.installer.plugins.module_utils.crds import (
+    CRDWatch,
+    crd_names,
+    missing_conditions,
+)
+
+
+def crd(name, *true):
+    conditions = [
+        {"type": condition, "status": "True" if condition in true else "False"}
+        for condition in ("NamesAccepted", "Established")
+    ]
+    return {"metadata": {"name": name}, "status": {"conditions": conditions}}
+
+
+def test_crd_names():
+    definitions = [
+        {"kind": "CustomResourceDefinition", "metadata": {"name": "a.x.dev"}},
+        None,
+        {"kind": "Namespace", "metadata": {"name": "knative-serving"}},
+        {"kind": "CustomResourceDefinition", "metadata": {"name": "b.x.dev"}},
+        {"kind": "CustomResourceDefinition", "metadata": {"name": "a.x.dev"}},
+    ]
+    assert crd_names(definitions) == ["a.x.dev", "b.x.dev"]
+
+
+def test_missing_conditions():
+    assert missing_conditions(crd("a")) == ["Established", "NamesAccepted"]
+    assert missing_conditions(crd("a", "NamesAccepted")) == ["Established"]
+    assert missing_conditions(crd("a", "NamesAccepted", "Established")) == []
+    assert missing_conditions({"metadata": {"name": "a"}}) == [
+        "Established",
+        "NamesAccepted",
+    ]
+
+
+def test_watch_until_all_established():
+    watch = CRDWatch(["a", "b"])
+    assert watch.feed("ADDED", crd("other", "Established", "NamesAccepted")) == []
+    assert watch.feed("ADDED", crd("a", "NamesAccepted")) == []
+    assert watch.status_line() == (
+        "0/2 CRDs established, waiting for a (Established), b (not created)"
+    )
+    assert watch.feed("MODIFIED", crd("a", "NamesAccepted", "Established")) == [
+        "a established (1/2)"
+    ]
+    assert watch.feed("MODIFIED", crd("a", "NamesAccepted", "Established")) == []
+    assert not watch.done
+    assert watch.feed("ADDED", crd("b", "NamesAccepted", "Established")) == [
+        "b established (2/2)"
+    ]
+    assert watch.done
+    assert watch.result() == dict(crds=["a", "b"], established=["a", "b"], pending={})
+
+
+def test_deleted_crd_is_waited_for_again():
+    watch = CRDWatch(["a"])
+    watch.feed("ADDED", crd("a", "NamesAccepted", "Established"))
+    assert watch.feed("DELETED", crd("a")) == [
+        "a deleted, waiting for it to be created again"
+    ]
+    assert not watch.done
+    assert watch.result()["established"] == []
+    assert watch.result()["pending"] == {"a": ["not created"]}
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import base64
+
+import pytest
+from ansible_collections.smartscaler.installer.plugins.module_utils.egs_workers import (
+    SecretCollector,
+    agent_endpoint,
+    agent_key,
+    worker_values,
+)
+
+
+def secret(name, **data):
+    return {"metadata": {"name": name}, "data": data}
+
+
+WORKER = secret(
+    "kubeslice-rbac-worker-worker-1",
+    **{
+        "namespace": "bnM=",
+        "controllerEndpoint": "ZXA=",
+        "ca.crt": "Y2E=",
+        "token": "dG9r",
+    }
+)
+
+
+def test_worker_values_keep_the_secret_encoding():
+    values = worker_values(WORKER, "http://proxy:443", "admin-token")
+    assert values == {
+        "controllerSecret": {
+            "namespace": "bnM=",
+            "endpoint": "ZXA=",
+            "ca.crt": "Y2E=",
+            "token": "dG9r",
+        },
+        "egsAgent": {
+            "secretName": "egs-agent-access",
+            "agentSecret": {"endpoint": "http://proxy:443", "key": "admin-token"},
+        },
+    }
+
+
+def test_worker_values_need_every_key():
+    with pytest.raises(ValueError, match="has no controllerEndpoint, token"):
+        worker_values(secret("w", namespace="a", **{"ca.crt": "b"}), "e", "k")
+
+
+def test_agent_endpoint_and_key():
+    service = {
+        "metadata": {"name": "kubeslice-ui-proxy"},
+        "spec": {"ports": [{"port": 443}]},
+    }
+    assert (
+        agent_endpoint(service, "kubeslice-controller")
+        == "http://kubeslice-ui-proxy.kubeslice-controller.svc.cluster.local:443"
+    )
+    token = base64.b64encode(b"admin-token").decode()
+    assert agent_key(secret("kubeslice-rbac-rw-admin", token=token)) == "admin-token"
+    with pytest.raises(ValueError, match="no ports"):
+        agent_endpoint({"metadata": {"name": "x"}, "spec": {}}, "ns")
+
+
+def test_collector_waits_for_the_token():
+    collector = SecretCollector({"a": ["token"], "b": ["token"]})
+    assert collector.feed("ADDED", secret("other", token="x")) == []
+    assert collector.feed("ADDED", secret("a")) == []
+    assert collector.missing == ["a", "b"]
+    assert collector.feed("MODIFIED", secret("a", token="x")) == ["a read (1/2)"]
+    assert collector.feed("MODIFIED", secret("a", token="y")) == []
+    assert collector.status_line() == "1/2 Secrets read, waiting for b"
+    collector.feed("DELETED", secret("a", token="y"))
+    assert collector.missing == ["a", "b"]
+    collector.feed("ADDED", secret("a", token="y"))
+    collector.feed("ADDED", secret("b", token="z"))
+    assert collector.done
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+from ansible_collections.smartscaler.installer.plugins.module_utils.firewall import (
+    delta,
+    parse_added,
+    parse_rule,
+    rule_args,
+    rule_key,
+)
+
+SHOW_ADDED = """Added user rules (see 'ufw status' for running firewall):
+ufw allow 22/tcp
+ufw allow 6443/tcp comment 'Kubernetes API Server'
+ufw allow from 10.0.0.1 to any port 8080 proto tcp comment 'NVIDIA Container Runtime'
+ufw allow 2379:2380/tcp
+ufw deny out to 10.0.0.9
+"""
+
+
+def test_parse_added():
+    assert parse_added(SHOW_ADDED) == [
+        ("allow", "in", "any", "any", "any", "22", "tcp"),
+        ("allow", "in", "any", "any", "any", "6443", "tcp"),
+        ("allow", "in", "10.0.0.1", "any", "any", "8080", "tcp"),
+        ("allow", "in", "any", "any", "any", "2379:2380", "tcp"),
+        ("deny", "out", "any", "any", "10.0.0.9", "any", "any"),
+    ]
+    assert parse_added("Added user rules (see 'ufw status'):\n(None)\n") == []
+
+
+def test_source_and_destination_ports():
+    key = parse_rule("ufw allow from 10.0.0.0/24 port 53 to any port 5353 proto udp")
+    assert key == ("allow", "in", "10.0.0.0/24", "53", "any", "5353", "udp")
+    assert parse_rule("ufw allow 80") == (
+        "allow",
+        "in",
+        "any",
+        "any",
+        "any",
+        "80",
+        "any",
+    )
+
+
+def test_rule_args_round_trip():
+    rules = [
+        dict(port="6443", proto="tcp"),
+        dict(port="2379-2380", proto="tcp"),
+        dict(from_ip="10.0.0.1", port="8080", proto="tcp"),
+        dict(rule="limit", port="22"),
+        dict(direction="out", to_ip="10.0.0.9", rule="deny"),
+    ]
+    for rule in rules:
+        key = rule_key(rule)
+        assert parse_rule(" ".join(["ufw"] + rule_args(key))) == key
+
+
+def test_rule_args():
+    key = rule_key(dict(port="6443", proto="tcp"))
+    assert rule_args(key, "Kubernetes API Server") == [
+        "allow",
+        "6443/tcp",
+        "comment",
+        "Kubernetes API Server",
+    ]
+    key = rule_key(dict(from_ip="10.0.0.1", port="8080", proto="tcp"))
+    assert rule_args(key) == [
+        "allow",
+        "from",
+        "10.0.0.1",
+        "to",
+        "any",
+        "port",
+        "8080",
+        "proto",
+        "tcp",
+    ]
+
+
+def test_delta_ignores_comments_and_duplicates():
+    missing = delta(
+        [
+            dict(port="6443", proto="tcp", comment="renamed"),
+            dict(from_ip="10.0.0.2", port="8080", proto="tcp", comment="nvidia"),
+            dict(from_ip="10.0.0.2", port="8080", proto="tcp"),
+            dict(port="10250", proto="tcp"),
+        ],
+        parse_added(SHOW_ADDED),
+    )
+    assert missing == [
+        (("allow", "in", "10.0.0.2", "any", "any", "8080", "tcp"), "nvidia"),
+        (("allow", "in", "any", "any", "any", "10250", "tcp"), None),
+    ]
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import threading
+
+import pytest
+from ansible_collections.smartscaler.installer.plugins.module_utils.journal import (
+    DriftCheck,
+    ResourceNotFoundError,
+    fingerprint,
+    parse_witness,
+)
+
+
+def test_fingerprint_covers_settings_and_files(tmp_path):
+    (tmp_path / "files").mkdir()
+    template = tmp_path / "files" / "cache.yaml.j2"
+    template.write_text("kind: NIMCache\n")
+    item = {"name": "cache", "manifest_file": "files/cache.yaml.j2", "b": 1, "a": 2}
+    first = fingerprint(item, "manifest", str(tmp_path))
+    assert first == fingerprint(
+        dict(reversed(list(item.items()))), "manifest", str(tmp_path)
+    )
+    assert first != fingerprint(item, "helm", str(tmp_path))
+    assert first != fingerprint(dict(item, b=2), "manifest", str(tmp_path))
+    template.write_text("kind: NIMCache\nspec: {}\n")
+    assert first != fingerprint(item, "manifest", str(tmp_path))
+
+
+def test_fingerprint_covers_manifest_inputs(tmp_path):
+    script = tmp_path / "janitor.py"
+    script.write_text("print(1)\n")
+    item = {"manifest_file": "files/pushgateway.yaml.j2", "inputs": ["janitor.py"]}
+    first = fingerprint(item, "manifest", str(tmp_path))
+    script.write_text("print(2)\n")
+    assert first != fingerprint(item, "manifest", str(tmp_path))
+
+
+def test_fingerprint_follows_files_of_derived_settings(tmp_path):
+    config = tmp_path / "config.json"
+    config.write_text("{}")
+    item = {"models": {"8b": {"model": "m"}}}
+    derived = [{"configmaps": [{"name": "c", "files": {"config.json": "config.json"}}]}]
+    first = fingerprint(item, "model_stacks", str(tmp_path), derived)
+    config.write_text('{"a": 1}')
+    assert first != fingerprint(item, "model_stacks", str(tmp_path), derived)
+
+
+def test_fingerprint_covers_digests():
+    item = {"chart_ref": "keda"}
+    first = fingerprint(item, "helm")
+    assert first == fingerprint(item, "helm", digests={})
+    assert first != fingerprint(item, "helm", digests={"chart": "a"})
+    assert fingerprint(item, "helm", digests={"chart": "a"}) != fingerprint(
+        item, "helm", digests={"chart": "b"}
+    )
+
+
+def test_parse_witness():
+    assert parse_witness("NIMCache/nim/llama") == dict(
+        kind="NIMCache", namespace="nim", name="llama", api_version=None, labels=None
+    )
+    assert parse_witness("Namespace/nim")["name"] == "nim"
+    assert parse_witness({"kind": "Secret", "labels": {"owner": "helm"}})["labels"]
+    with pytest.raises(ValueError, match="Kind/namespace/name"):
+        parse_witness("a/b/c/d")
+    with pytest.raises(ValueError, match="a name or labels"):
+        parse_witness({"kind": "Secret"})
+
+
+class Resource(object):
+    def __init__(self, kind, namespaced=True):
+        self.kind = kind
+        self.namespaced = namespaced
+
+
+class Dynamic(object):
+    def __init__(self, objects):
+        self.objects = objects
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def get(self, resource, namespace=None, label_selector=None):
+        with self.lock:
+            self.calls.append((resource.kind, namespace, label_selector))
+        if namespace == "forbidden":
+            raise Exception("secrets is forbidden")
+        labels = dict(
+            pair.split("=") for pair in (label_selector or "").split(",") if pair
+        )
+        return {
+            "items": [
+                obj
+                for obj in self.objects
+                if obj["kind"] == resource.kind
+                and obj["metadata"].get("namespace") == namespace
+                and all(
+                    obj["metadata"]["labels"].get(k) == v for k, v in labels.items()
+                )
+            ]
+        }
+
+
+class Client(object):
+    def __init__(self, objects):
+        self.client = Dynamic(objects)
+
+    def resource(self, kind, api_version):
+        if kind == "NIMCache":
+            raise ResourceNotFoundError(kind)
+        return Resource(kind, namespaced=kind != "Namespace")
+
+
+def obj(kind, name, namespace=None, labels=None):
+    metadata = {"name": name, "labels": labels or {}}
+    if namespace:
+        metadata["namespace"] = namespace
+    return {"kind": kind, "metadata": metadata}
+
+
+def test_drift_check_lists_each_kind_once_per_namespace_and_selector():
+    client = Client(
+        [
+            obj("ConfigMap", "a", "nim"),
+            obj("ConfigMap", "b", "nim"),
+            obj("Namespace", "nim"),
+            obj(
+                "Secret",
+                "sh.helm.release.v1.prometheus.v3",
+                "monitoring",
+                {"owner": "helm", "name": "prometheus", "status": "deployed"},
+            ),
+            obj("Secret", "grafana-admin", "monitoring"),
+        ]
+    )
+    helm = {
+        "kind": "Secret",
+        "api_version": "v1",
+        "namespace": "monitoring",
+        "labels": {"owner": "helm", "name": "prometheus", "status": "deployed"},
+    }
+    result = DriftCheck(client).run(
+        {
+            "prometheus_stack": [helm],
+            "keda_chart": [dict(helm, labels=dict(helm["labels"], name="keda"))],
+            "configs": ["ConfigMap/nim/a", "ConfigMap/nim/b", "Namespace/nim"],
+            "grafana": ["Secret/monitoring/grafana-admin"],
+            "gone": ["ConfigMap/nim/c"],
+            "cache": ["NIMCache/nim/llama"],
+            "private": ["Secret/forbidden/x"],
+            "commands": [],
+        }
+    )
+    # Helm releases are listed by their labels, not with every Secret
+    assert sorted(
+        client.client.calls, key=lambda call: [part or "" for part in call]
+    ) == [
+        ("ConfigMap", "nim", None),
+        ("Namespace", None, None),
+        ("Secret", "forbidden", None),
+        ("Secret", "monitoring", None),
+        ("Secret", "monitoring", "name=keda,owner=helm,status=deployed"),
+        ("Secret", "monitoring", "name=prometheus,owner=helm,status=deployed"),
+    ]
+    assert result["lists"] == 7
+    assert result["drifted"] == {
+        "keda_chart": [
+            "Secret/monitoring/name=keda,owner=helm,status=deployed is missing"
+        ],
+        "gone": ["ConfigMap/nim/c is missing"],
+        "cache": ["NIMCache/nim/llama: NIMCache is not served by the cluster"],
+        "private": ["Secret/forbidden/x: secrets is forbidden"],
+    }
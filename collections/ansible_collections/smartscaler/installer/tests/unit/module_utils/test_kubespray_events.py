@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import json
+
+from ansible_collections.smartscaler.installer.plugins.module_utils.kubespray_events import (
+    ProgressTracker,
+    format_duration,
+    read_events,
+)
+
+
+def result(host, task, duration, status="ok", changed=False, **extra):
+    event = dict(
+        event="result",
+        play="Install etcd",
+        task=task,
+        host=host,
+        status=status,
+        changed=changed,
+        duration=duration,
+        time=1000 + duration,
+    )
+    event.update(extra)
+    return event
+
+
+def test_read_events_leaves_partial_lines(tmp_path):
+    path = tmp_path / "events.jsonl"
+    assert read_events(str(path)) == ([], 0)
+
+    path.write_text(json.dumps({"event": "play_start"}) + "\n" + '{"event": "ta')
+    events, offset = read_events(str(path))
+    assert events == [{"event": "play_start"}]
+
+    with open(str(path), "a") as fh:
+        fh.write('sk_start"}\n')
+    events, offset = read_events(str(path), offset)
+    assert events == [{"event": "task_start"}]
+    assert read_events(str(path), offset) == ([], offset)
+
+
+def test_tracker_counts_hosts_and_times_tasks():
+    tracker = ProgressTracker(slow_task_threshold=100)
+    assert tracker.feed(
+        dict(event="play_start", play="Install etcd", hosts=["etcd"], time=1000)
+    ) == ["PLAY 1 [Install etcd] on etcd"]
+    tracker.feed(dict(event="task_start", task="etcd : Configure", time=1000))
+    tracker.feed(result("node1", "etcd : Configure", 12.0, changed=True))
+    tracker.feed(result("node2", "etcd : Configure", 30.5))
+    tracker.feed(dict(event="task_start", task="etcd : Install", time=1031))
+    slow = tracker.feed(result("node1", "etcd : Install", 140.0))
+    tracker.feed(result("node2", "etcd : Install", 0.1, status="skipped"))
+
+    assert slow == ["  slow: [node1] etcd : Install took 2m20s"]
+    assert tracker.hosts["node1"] == dict(
+        ok=2, changed=1, failed=0, skipped=0, unreachable=0
+    )
+    assert tracker.hosts["node2"]["skipped"] == 1
+    assert [(t["task"], t["duration"], t["host"]) for t in tracker.slowest(2)] == [
+        ("etcd : Install", 140.0, "node1"),
+        ("etcd : Configure", 30.5, "node2"),
+    ]
+    assert tracker.status_line(now=1140).startswith("2m20s elapsed, play 1")
+    assert not tracker.finished
+
+
+def test_tracker_reports_failures_and_stats():
+    tracker = ProgressTracker()
+    lines = tracker.feed(
+        result(
+            "node3",
+            "Gather facts",
+            2,
+            status="unreachable",
+            msg="ssh: connect to host",
+        )
+    )
+    assert lines == ["  unreachable: [node3] Gather facts: ssh: connect to host"]
+    tracker.feed(dict(event="stats", hosts={"node3": {"unreachable": 1}}, time=1003))
+
+    summary = tracker.result()
+    assert tracker.finished
+    assert summary["failures"][0]["host"] == "node3"
+    assert summary["hosts"] == {"node3": {"unreachable": 1}}
+
+
+def test_format_duration():
+    assert format_duration(59.4) == "59s"
+    assert format_duration(61) == "1m01s"
+    assert format_duration(3720) == "1h02m"
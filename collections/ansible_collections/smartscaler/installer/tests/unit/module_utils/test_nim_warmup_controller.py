@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import importlib.util
+import os
+
+from ansible_collections.smartscaler.installer.plugins.module_utils.warmup import (
+    WARMED_ANNOTATION,
+)
+
+SCRIPT = os.path.join(
+    os.path.dirname(__file__), *([".."] * 7 + ["files", "nim-warmup-controller.py"])
+)
+spec = importlib.util.spec_from_file_location("nim_warmup_controller", SCRIPT)
+controller_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(controller_module)
+Controller = controller_module.Controller
+
+
+def pod(name, ip, ready=True, annotations=None):
+    return {
+        "metadata": {
+            "name": name,
+            "namespace": "nim",
+            "annotations": annotations or {},
+        },
+        "status": {
+            "podIP": ip,
+            "conditions": [{"type": "Ready", "status": "True" if ready else "False"}],
+        },
+    }
+
+
+class FakeCluster(object):
+    def __init__(self, pods):
+        self.items = pods
+        self.selectors = []
+        self.annotated = []
+
+    def service(self, namespace, name):
+        return {
+            "spec": {
+                "selector": {"app": name},
+                "ports": [{"port": 8000, "targetPort": 8000}],
+            }
+        }
+
+    def pods(self, namespace, selector):
+        self.selectors.append((namespace, selector))
+        return self.items
+
+    def annotate(self, namespace, name, annotations):
+        self.annotated.append((namespace, name, sorted(annotations)))
+
+
+class FakeNIM(object):
+    """post for warm_pod: pods in I(failing) return errors."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.urls = []
+
+    def __call__(self, url, body, timeout):
+        self.urls.append(url)
+        if url in self.failing:
+            raise IOError("503 Service Unavailable")
+        return 0.01
+
+
+SERVICES = [
+    dict(service="llama-8b", namespace="nim", model="meta/llama-3.1-8b-instruct"),
+]
+
+
+def test_warms_and_annotates_new_replicas():
+    cluster = FakeCluster(
+        [
+            pod("new", "10.0.0.1"),
+            pod("old", "10.0.0.2", annotations={WARMED_ANNOTATION: "2026-01-01"}),
+            pod("starting", "10.0.0.3", ready=False),
+        ]
+    )
+    nim = FakeNIM()
+    results = Controller(cluster, SERVICES, post=nim).run(now=0, log=lambda line: None)
+    assert cluster.selectors == [("nim", {"app": "llama-8b"})]
+    assert [(result["service"], result["name"]) for result in results] == [
+        ("nim/llama-8b", "new")
+    ]
+    assert set(nim.urls) == set(["http://10.0.0.1:8000"])
+    assert cluster.annotated == [("nim", "new", [WARMED_ANNOTATION])]
+
+
+def test_retries_replicas_that_did_not_settle_later():
+    cluster = FakeCluster([pod("a", "10.0.0.1")])
+    nim = FakeNIM(failing=["http://10.0.0.1:8000"])
+    controller = Controller(
+        cluster,
+        [dict(SERVICES[0], max_rounds=2, window=2, prompts=["x"])],
+        retry_after=300,
+        post=nim,
+    )
+    lines = []
+    assert not controller.run(now=0, log=lines.append)[0]["settled"]
+    assert lines == ["nim/llama-8b: a did not settle after 2 requests, p50 None ms"]
+    assert controller.run(now=100, log=lines.append) == []
+    nim.failing.clear()
+    assert controller.run(now=300, log=lines.append)[0]["settled"]
+    assert cluster.annotated == [("nim", "a", [WARMED_ANNOTATION])]
+
+
+def test_failed_check_is_logged():
+    class Broken(FakeCluster):
+        def service(self, namespace, name):
+            raise IOError("connection refused")
+
+    lines = []
+    assert Controller(Broken([]), SERVICES).run(now=0, log=lines.append) == []
+    assert lines == ["nim/llama-8b: check failed: connection refused"]
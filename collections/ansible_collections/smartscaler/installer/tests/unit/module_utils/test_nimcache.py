@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+from ansible_collections.smartscaler.installer.plugins.module_utils.nimcache import (
+    NIMCacheWatch,
+    describe,
+    download_progress,
+    evaluate,
+)
+
+
+def cache(state=None, conditions=None, **status):
+    status.update(state=state, conditions=conditions or [])
+    return {"metadata": {"name": "llama"}, "status": status}
+
+
+def test_ready_condition():
+    obj = cache("Ready", [{"type": "Ready", "status": "True"}])
+    assert evaluate(obj) == "ready"
+
+
+def test_ready_state_without_conditions():
+    assert evaluate(cache("Ready")) == "ready"
+    assert evaluate(cache("InProgress")) == "pending"
+    assert evaluate({"metadata": {}}) == "pending"
+
+
+def test_false_ready_condition_wins_over_state():
+    obj = cache("Ready", [{"type": "Ready", "status": "False"}])
+    assert evaluate(obj) == "pending"
+
+
+def test_failed():
+    assert evaluate(cache("Failed")) == "failed"
+    obj = cache("InProgress", [{"type": "Failed", "status": "True"}])
+    assert evaluate(obj) == "failed"
+
+
+def test_progress_from_bytes():
+    obj = cache(
+        "InProgress", downloadedBytes=25 * 1024**3, totalBytes=100 * 1024**3
+    )
+    assert download_progress(obj) == {
+        "downloaded": 25 * 1024**3,
+        "total": 100 * 1024**3,
+        "percent": 25.0,
+    }
+    assert describe(obj) == "state=InProgress, 25.0%, 25.0 GiB / 100.0 GiB"
+
+
+def test_progress_from_status_field_and_message():
+    assert download_progress(cache("InProgress", progress="42%")) == {"percent": 42.0}
+    obj = cache(
+        "InProgress",
+        [{"type": "Ready", "status": "False", "message": "downloading 17.5% done"}],
+    )
+    assert download_progress(obj) == {"percent": 17.5}
+    assert describe(obj) == "state=InProgress, 17.5%, downloading 17.5% done"
+    assert download_progress(cache("InProgress")) == {}
+
+
+def test_watch_shows_changes_and_progress_steps():
+    watch = NIMCacheWatch(percent_step=10)
+    assert watch.status_line() == "not created yet"
+    assert watch.feed("ADDED", cache("Pending")) == ["state=Pending"]
+    assert watch.feed("MODIFIED", cache("Pending")) == []
+    assert watch.feed("MODIFIED", cache("InProgress", progress=1)) == [
+        "state=InProgress, 1.0%"
+    ]
+    assert watch.feed("MODIFIED", cache("InProgress", progress=5)) == []
+    assert watch.feed("MODIFIED", cache("InProgress", progress=12)) == [
+        "state=InProgress, 12.0%"
+    ]
+    assert not watch.done
+    assert watch.feed("MODIFIED", cache("Ready", progress=100)) == [
+        "state=Ready, 100.0%"
+    ]
+    assert watch.done
+    result = watch.result()
+    assert result["ready"] is True
+    assert result["state"] == "Ready"
+    assert result["progress"] == {"percent": 100.0}
+    assert result["history"] == [
+        "state=Pending",
+        "state=InProgress, 1.0%",
+        "state=InProgress, 12.0%",
+        "state=Ready, 100.0%",
+    ]
+
+
+def test_watch_deleted():
+    watch = NIMCacheWatch()
+    watch.feed("ADDED", cache("InProgress"))
+    assert watch.feed("DELETED", cache("InProgress")) == [
+        "deleted, waiting for it to be created again"
+    ]
+    assert watch.status_line() == "deleted"
+    assert watch.feed("ADDED", cache("InProgress")) == ["state=InProgress"]
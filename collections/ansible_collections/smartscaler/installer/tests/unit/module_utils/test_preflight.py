@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import json
+import threading
+
+from ansible_collections.smartscaler.installer.plugins.module_utils.preflight import (
+    DryRun,
+    ResourceNotFoundError,
+    batches,
+    load,
+    missing_namespace,
+    planned,
+)
+
+
+class ApiError(Exception):
+    def __init__(self, status, body):
+        super(ApiError, self).__init__("(%s)" % status)
+        self.status = status
+        self.body = json.dumps(body)
+
+
+class Resource(object):
+    def __init__(self, kind, namespaced=True):
+        self.kind = kind
+        self.namespaced = namespaced
+
+
+class Dynamic(object):
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def server_side_apply(self, resource, body, name, namespace, **kwargs):
+        with self.lock:
+            self.calls.append((resource.kind, name, namespace, kwargs))
+        if name in self.failures:
+            raise self.failures[name]
+
+
+class Client(object):
+    def __init__(self, served, failures=None):
+        self.served = served
+        self.client = Dynamic(failures or {})
+
+    def resource(self, kind, api_version):
+        if kind not in self.served:
+            raise ResourceNotFoundError(kind)
+        return self.served[kind]
+
+
+def obj(kind, name, namespace=None, api_version="v1", **extra):
+    metadata = {"name": name}
+    if namespace:
+        metadata["namespace"] = namespace
+    return dict(extra, apiVersion=api_version, kind=kind, metadata=metadata)
+
+
+def crd(group, kind):
+    return obj(
+        "CustomResourceDefinition",
+        "%ss.%s" % (kind.lower(), group),
+        api_version="apiextensions.k8s.io/v1",
+        spec={"group": group, "names": {"kind": kind}},
+    )
+
+
+SERVED = {
+    "ConfigMap": Resource("ConfigMap"),
+    "Namespace": Resource("Namespace", namespaced=False),
+    "CustomResourceDefinition": Resource("CustomResourceDefinition", False),
+}
+
+
+def test_load_parses_content():
+    renders = load(
+        [
+            {
+                "item": "keda",
+                "namespace": "keda",
+                "content": "---\n# empty\n---\napiVersion: v1\nkind: ConfigMap\n"
+                "metadata:\n  name: a\n",
+            },
+            {"item": "cm", "definitions": [obj("ConfigMap", "b")]},
+        ]
+    )
+    assert renders[0]["definitions"] == [obj("ConfigMap", "a")]
+    assert renders[1]["definitions"] == [obj("ConfigMap", "b")]
+
+
+def test_planned_kinds_and_namespaces():
+    kinds, namespaces = planned(
+        [
+            {"namespace": "nim", "definitions": [crd("apps.nvidia.com", "NIMCache")]},
+            {"definitions": [obj("Namespace", "keda")]},
+        ]
+    )
+    assert kinds == {("apps.nvidia.com", "NIMCache")}
+    assert namespaces == {"nim", "keda"}
+
+
+def test_batches_by_namespace():
+    grouped = batches(
+        [
+            {
+                "item": "a",
+                "namespace": "nim",
+                "definitions": [obj("ConfigMap", "x"), obj("ConfigMap", "y", "keda")],
+            },
+            {"item": "b", "definitions": [obj("Namespace", "z"), None]},
+        ]
+    )
+    assert sorted(grouped) == ["", "keda", "nim"]
+    assert grouped["nim"] == [("a", obj("ConfigMap", "x"))]
+    assert grouped[""] == [("b", obj("Namespace", "z"))]
+
+
+def test_missing_namespace():
+    error = ApiError(404, {"details": {"kind": "namespaces", "name": "nim"}})
+    assert missing_namespace(error) == "nim"
+    assert missing_namespace(ApiError(404, {"details": {"kind": "pods"}})) is None
+    assert missing_namespace(ApiError(422, {})) is None
+
+
+def test_dry_run_collects_every_error():
+    client = Client(
+        SERVED,
+        failures={
+            "bad": ApiError(422, {"message": 'ConfigMap "bad" is invalid'}),
+            "worse": ApiError(422, {"message": 'ConfigMap "worse" is invalid'}),
+        },
+    )
+    result = DryRun(client, max_workers=2).run(
+        [
+            {
+                "item": "one",
+                "namespace": "nim",
+                "definitions": [obj("ConfigMap", "bad"), obj("ConfigMap", "ok")],
+            },
+            {
+                "item": "two",
+                "namespace": "keda",
+                "definitions": [obj("ConfigMap", "worse")],
+            },
+        ]
+    )
+    assert result["checked"] == 3
+    assert result["namespaces"] == {"nim": 2, "keda": 1}
+    assert sorted(e["message"] for e in result["errors"]) == [
+        'ConfigMap "bad" is invalid',
+        'ConfigMap "worse" is invalid',
+    ]
+    assert result["deferred"] == []
+    for dummy, dummy, dummy, kwargs in client.client.calls:
+        assert kwargs["dry_run"] == "All"
+        assert kwargs["field_manager"] == "smartscaler-installer"
+
+
+def test_cluster_scoped_objects_have_no_namespace():
+    client = Client(SERVED)
+    DryRun(client).run(
+        [{"item": "ns", "namespace": "nim", "definitions": [obj("Namespace", "nim")]}]
+    )
+    assert client.client.calls[0][:3] == ("Namespace", "nim", None)
+
+
+def test_kinds_of_planned_crds_are_deferred():
+    client = Client(SERVED)
+    result = DryRun(client).run(
+        [
+            {"item": "operator", "definitions": [crd("apps.nvidia.com", "NIMCache")]},
+            {
+                "item": "cache",
+                "namespace": "nim",
+                "definitions": [
+                    obj("NIMCache", "llama", api_version="apps.nvidia.com/v1alpha1"),
+                    obj("Unknown", "x", api_version="example.com/v1"),
+                ],
+            },
+        ]
+    )
+    assert [e["kind"] for e in result["deferred"]] == ["NIMCache"]
+    assert [e["kind"] for e in result["errors"]] == ["Unknown"]
+    assert "not served" in result["errors"][0]["message"]
+
+
+def test_namespaces_created_by_the_plan_are_deferred():
+    missing = {"details": {"kind": "namespaces", "name": "nim"}, "message": "nope"}
+    client = Client(
+        SERVED,
+        failures={
+            "a": ApiError(404, missing),
+            "b": ApiError(
+                404, dict(missing, details={"kind": "namespaces", "name": "other"})
+            ),
+        },
+    )
+    result = DryRun(client).run(
+        [
+            {"item": "ns", "definitions": [obj("Namespace", "nim")]},
+            {
+                "item": "cm",
+                "definitions": [
+                    obj("ConfigMap", "a", "nim"),
+                    obj("ConfigMap", "b", "other"),
+                ],
+            },
+        ]
+    )
+    assert [e["name"] for e in result["deferred"]] == ["a"]
+    assert [e["name"] for e in result["errors"]] == ["b"]
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import json
+import threading
+import time
+
+import pytest
+from ansible_collections.smartscaler.installer.plugins.module_utils.prerequisites import (
+    check_distributions,
+    fingerprint,
+    load_cache,
+    parse_collection_list,
+    parse_requirements,
+    probe_tools,
+    save_cache,
+    version_satisfies,
+)
+
+REQUIREMENTS = """\
+ansible==9.8.0
+# Needed for jinja2 json_query templating
+ansible-core==2.16.14
+jinja2>=2.11
+pbr
+kubernetes-validate>=1.28.0
+--index-url https://example.invalid/simple
+"""
+
+
+def test_parse_requirements_skips_comments_and_options():
+    parsed = parse_requirements(REQUIREMENTS)
+    assert [name for name, _, _ in parsed] == [
+        "ansible",
+        "ansible-core",
+        "jinja2",
+        "pbr",
+        "kubernetes-validate",
+    ]
+    assert parsed[0][1] == "==9.8.0"
+    assert parsed[3][1] == ""
+
+
+@pytest.mark.parametrize(
+    "installed,spec,expected",
+    [
+        ("9.8.0", "==9.8.0", True),
+        ("9.8.1", "==9.8.0", False),
+        ("3.1.4", ">=2.11", True),
+        ("2.10", ">=2.11", False),
+        ("6.0.1", ">=6.0.1,<7", True),
+        ("1.0.0", "", True),
+    ],
+)
+def test_version_satisfies(installed, spec, expected):
+    assert version_satisfies(installed, spec) is expected
+
+
+def test_check_distributions_reports_missing_and_wrong_versions():
+    installed = {"ansible": "9.8.0", "jinja2": "2.10"}
+    results, missing = check_distributions(
+        parse_requirements("ansible==9.8.0\njinja2>=2.11\npbr\n"), installed.get
+    )
+    assert [r["ok"] for r in results] == [True, False, False]
+    assert missing == ["jinja2>=2.11", "pbr"]
+
+
+def test_parse_collection_list_json_and_table():
+    as_json = json.dumps(
+        {
+            "/a/collections": {"kubernetes.core": {"version": "5.3.0"}},
+            "/b/collections": {"community.general": {"version": "10.7.0"}},
+        }
+    )
+    assert parse_collection_list(as_json) == {"kubernetes.core", "community.general"}
+
+    table = (
+        "# /a/collections\n"
+        "Collection        Version\n"
+        "----------------- -------\n"
+        "ansible.posix     2.0.0\n"
+        "community.crypto  2.26.3\n"
+    )
+    assert parse_collection_list(table) == {"ansible.posix", "community.crypto"}
+
+
+def test_probe_tools_runs_concurrently():
+    barrier = threading.Barrier(3, timeout=5)
+
+    def run(command):
+        # Every probe blocks until all three started; serial probing would time out.
+        barrier.wait()
+        return 0, "tool v1.2.3", ""
+
+    tools = [
+        dict(name=name, command=name, version_regex=r"v([0-9.]+)", min_version="1.0")
+        for name in ("kubectl", "helm", "ansible")
+    ]
+    results = probe_tools(tools, run, max_workers=3)
+    assert [r["ok"] for r in results] == [True, True, True]
+    assert results[0]["version"] == "1.2.3"
+
+
+def test_probe_tools_flags_missing_and_old_tools():
+    def run(command):
+        if command == "missing":
+            raise OSError("No such file or directory")
+        return 0, "v0.9", ""
+
+    results = probe_tools(
+        [
+            dict(name="missing", command="missing"),
+            dict(
+                name="old",
+                command="old",
+                version_regex=r"v([0-9.]+)",
+                min_version="1.0",
+            ),
+        ],
+        run,
+    )
+    assert [r["ok"] for r in results] == [False, False]
+    assert "No such file" in results[0]["error"]
+
+
+def test_cache_roundtrip_and_invalidation(tmp_path):
+    requirements = tmp_path / "requirements.txt"
+    requirements.write_text("ansible==9.8.0\n")
+    cache = str(tmp_path / "cache" / "prereqs.json")
+
+    key = fingerprint([str(requirements)])
+    save_cache(cache, key, {"passed": True}, now=1000)
+    assert load_cache(cache, key, ttl=60, now=1030) == {"passed": True}
+    assert load_cache(cache, key, ttl=60, now=1100) is None
+    assert load_cache(cache, key, ttl=0, now=time.time()) == {"passed": True}
+
+    requirements.write_text("ansible==9.9.0\n")
+    assert fingerprint([str(requirements)]) != key
+    assert load_cache(cache, fingerprint([str(requirements)]), ttl=0) is None
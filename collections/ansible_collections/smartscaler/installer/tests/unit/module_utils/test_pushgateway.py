@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import base64
+import importlib.util
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+from urllib.request import urlopen
+
+import pytest
+
+SCRIPT = os.path.join(
+    os.path.dirname(__file__), *([".."] * 7 + ["files", "pushgateway-janitor.py"])
+)
+spec = importlib.util.spec_from_file_location("pushgateway_janitor", SCRIPT)
+pushgateway = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(pushgateway)
+Janitor = pushgateway.Janitor
+eviction_reason = pushgateway.eviction_reason
+group_path = pushgateway.group_path
+parse_groups = pushgateway.parse_groups
+seconds = pushgateway.seconds
+serve = pushgateway.serve
+
+NOW = 1700000000.0
+
+
+def decode_path(path):
+    """Grouping key of a /metrics/... path, as the Pushgateway reads it."""
+    parts = path.split("/")[2:]
+    labels = {}
+    for name, value in zip(parts[::2], parts[1::2]):
+        if name.endswith("@base64"):
+            name = name[: -len("@base64")]
+            value = base64.urlsafe_b64decode(value if value != "=" else "").decode()
+        else:
+            value = unquote(value)
+        labels[name] = value
+    return labels
+
+
+class StubPushgateway(object):
+    """Pushgateway stand-in: serves its groups and deletes them by path."""
+
+    def __init__(self, groups, delete_status=202):
+        self.groups = groups
+        self.delete_status = delete_status
+        self.deleted = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, payload=b""):
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                if self.path != "/api/v1/metrics":
+                    return self._reply(404)
+                self._reply(
+                    200, json.dumps({"status": "success", "data": stub.groups}).encode()
+                )
+
+            def do_DELETE(self):
+                if stub.delete_status >= 400:
+                    return self._reply(stub.delete_status)
+                labels = decode_path(self.path)
+                stub.deleted.append(labels)
+                stub.groups = [g for g in stub.groups if g["labels"] != labels]
+                self._reply(stub.delete_status)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = "http://127.0.0.1:%d" % self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def group(labels, pushed, series=None):
+    data = {
+        "labels": labels,
+        "last_push_successful": True,
+        "push_time_seconds": {
+            "type": "GAUGE",
+            "metrics": [{"labels": labels, "value": "%f" % pushed}],
+        },
+        "push_failure_time_seconds": {
+            "type": "GAUGE",
+            "metrics": [{"labels": labels, "value": "0"}],
+        },
+    }
+    if series is not None:
+        data["smartscaler_hpa_num_pods"] = {
+            "type": "GAUGE",
+            "metrics": [
+                {"labels": dict(labels, **extra), "value": "2"} for extra in series
+            ],
+        }
+    return data
+
+
+@pytest.fixture
+def groups():
+    return [
+        # Fresh, deployment exists
+        group(
+            {"job": "ss", "ss_deployment_name": "llama", "ss_namespace": "nim"},
+            NOW - 60,
+            [{}],
+        ),
+        # Older than the TTL
+        group(
+            {"job": "ss", "ss_deployment_name": "old", "ss_namespace": "nim"},
+            NOW - 2 * 86400,
+            [{}],
+        ),
+        # Deployment deleted, name with a slash
+        group(
+            {"job": "ss", "ss_deployment_name": "gone/v1", "ss_namespace": "nim"},
+            NOW - 3600,
+            [{}],
+        ),
+        # Deployments only in series labels, one of them still exists
+        group(
+            {"job": "batch", "instance": ""},
+            NOW - 3600,
+            [
+                {"ss_deployment_name": "llama", "ss_namespace": "nim"},
+                {"ss_deployment_name": "gone", "ss_namespace": "nim"},
+            ],
+        ),
+        # Deleted, but pushed within the grace period
+        group(
+            {"job": "ss", "ss_deployment_name": "new", "ss_namespace": "nim"},
+            NOW - 30,
+            [{}],
+        ),
+    ]
+
+
+def test_seconds():
+    assert seconds(90) == seconds("90s") == 90
+    assert seconds("10m") == 600
+    assert seconds("24h") == seconds("1d") == 86400
+
+
+def test_group_path():
+    assert (
+        group_path({"job": "ss", "b": "x y", "a": "1"}) == "/metrics/job/ss/a/1/b/x%20y"
+    )
+    path = group_path({"job": "a/b", "instance": ""})
+    assert path == "/metrics/job@base64/YS9i/instance@base64/="
+    assert decode_path(path) == {"job": "a/b", "instance": ""}
+
+
+def test_parse_groups(groups):
+    parsed = parse_groups({"data": groups})
+    assert parsed[0]["pushed"] == NOW - 60
+    assert parsed[0]["series"] == 1
+    assert parsed[0]["deployments"] == [("nim", "llama")]
+    assert parsed[3]["deployments"] == [("nim", "gone"), ("nim", "llama")]
+
+
+def test_eviction_reason(groups):
+    parsed = parse_groups({"data": groups})
+    existing = {("nim", "llama"), ("nim", "old")}
+    reasons = [eviction_reason(g, NOW, 86400, existing, grace=300) for g in parsed]
+    assert reasons == [None, "ttl", "deleted", None, None]
+    # Without the deployments, only the TTL applies
+    reasons = [eviction_reason(g, NOW, 86400, None) for g in parsed]
+    assert reasons == [None, "ttl", None, None, None]
+    # No TTL
+    assert eviction_reason(parsed[1], NOW, 0, None) is None
+    # A deployment matches in any namespace when the group names none
+    unlabelled = dict(parsed[0], deployments=[(None, "llama")])
+    assert eviction_reason(unlabelled, NOW + 3600, 0, {("other", "llama")}) is None
+
+
+def test_janitor_against_stub_pushgateway(groups):
+    stub = StubPushgateway(groups)
+    try:
+        janitor = Janitor(
+            stub.url,
+            ttl=86400,
+            grace=300,
+            deployments=lambda: {("nim", "llama"), ("nim", "old")},
+        )
+        evicted = janitor.run(now=NOW)
+        assert [e["reason"] for e in evicted] == ["ttl", "deleted"]
+        assert stub.deleted == [
+            {"job": "ss", "ss_deployment_name": "old", "ss_namespace": "nim"},
+            {"job": "ss", "ss_deployment_name": "gone/v1", "ss_namespace": "nim"},
+        ]
+        assert len(stub.groups) == 3
+        # Nothing left to delete
+        assert janitor.run(now=NOW) == []
+
+        metrics = janitor.metrics()
+        assert "pushgateway_janitor_runs_total 2" in metrics
+        assert 'pushgateway_janitor_evictions_total{reason="ttl"} 1' in metrics
+        assert 'pushgateway_janitor_evictions_total{reason="deleted"} 1' in metrics
+        assert "pushgateway_janitor_groups 3" in metrics
+        assert "pushgateway_janitor_series 4" in metrics
+        assert "pushgateway_janitor_oldest_push_age_seconds 3600.000" in metrics
+        assert "pushgateway_janitor_errors_total 0" in metrics
+    finally:
+        stub.close()
+
+
+def test_janitor_dry_run_and_errors(groups):
+    stub = StubPushgateway(groups, delete_status=500)
+
+    def deployments():
+        raise IOError("forbidden")
+
+    try:
+        dry = Janitor(stub.url, ttl=86400, dry_run=True)
+        assert [e["reason"] for e in dry.run(now=NOW)] == ["ttl"]
+        assert stub.deleted == []
+
+        janitor = Janitor(stub.url, ttl=86400, deployments=deployments)
+        # The list failed: only the TTL applies, and the delete fails too
+        assert janitor.run(now=NOW) == []
+        assert janitor.errors == 2
+        assert janitor.groups == 5
+    finally:
+        stub.close()
+
+
+def test_serve_metrics():
+    janitor = Janitor("http://127.0.0.1:1")
+    server = serve(janitor, 0, host="127.0.0.1")
+    try:
+        url = "http://127.0.0.1:%d" % server.server_address[1]
+        body = urlopen(url + "/metrics").read().decode()
+        assert "pushgateway_janitor_runs_total 0" in body
+        assert urlopen(url + "/-/healthy").read() == b"OK\n"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from ansible_collections.smartscaler.installer.plugins.module_utils.warmup import (
+    WARMED_ANNOTATION,
+    LatencyWindow,
+    pod_targets,
+    proxy_post,
+    service_port,
+    warm_pod,
+    warm_pods,
+)
+
+
+class StubNIM(object):
+    """OpenAI compatible stub: the first I(cold) requests are slow."""
+
+    def __init__(self, cold=4, cold_delay=0.08, delay=0.01, status=200):
+        self.cold = cold
+        self.cold_delay = cold_delay
+        self.delay = delay
+        self.status = status
+        self.bodies = []
+        self.in_flight = 0
+        self.most_in_flight = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub.lock:
+                    stub.bodies.append((self.path, body))
+                    stub.in_flight += 1
+                    stub.most_in_flight = max(stub.most_in_flight, stub.in_flight)
+                    cold = len(stub.bodies) <= stub.cold
+                time.sleep(stub.cold_delay if cold else stub.delay)
+                with stub.lock:
+                    stub.in_flight -= 1
+                payload = json.dumps(
+                    {"choices": [{"message": {"role": "assistant", "content": "ok"}}]}
+                ).encode()
+                self.send_response(stub.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = "http://127.0.0.1:%d" % self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubNIM()
+    yield server
+    server.close()
+
+
+def test_latency_window():
+    window = LatencyWindow(window=3, tolerance=0.2)
+    for latencies in ([3.0, 2.0], [1.0], [1.1, 0.9], [1.05]):
+        window.add(latencies)
+    assert window.settled
+    window.add([1.0], errors=1)
+    assert not window.settled and window.medians == []
+    for latencies in ([1.0], [1.0], [2.0]):
+        window.add(latencies)
+    assert not window.settled
+
+
+def test_warm_pod_settles_against_stub_server(stub):
+    result = warm_pod(
+        stub.url,
+        "meta/llama-3.1-8b-instruct",
+        prompts=["a", "b", "c", "d"],
+        concurrency=2,
+        max_rounds=8,
+        window=3,
+        tolerance=1.0,
+    )
+    assert result["settled"]
+    # The cold first round is slower than the rest
+    assert result["rounds"][0]["p50_ms"] > result["rounds"][-1]["p50_ms"]
+    assert result["requests"] == len(result["rounds"]) * 4 == len(stub.bodies)
+    assert stub.most_in_flight <= 2
+    path, body = stub.bodies[0]
+    assert path == "/v1/chat/completions"
+    assert body["model"] == "meta/llama-3.1-8b-instruct"
+    assert body["messages"][0]["role"] == "user"
+
+
+def test_warm_pod_errors_never_settle():
+    server = StubNIM(status=503)
+    try:
+        result = warm_pod(server.url, "m", prompts=["a"], max_rounds=3, tolerance=1.0)
+    finally:
+        server.close()
+    assert not result["settled"]
+    assert len(result["rounds"]) == 3
+    assert all(round_["errors"] for round_ in result["rounds"])
+
+
+def test_warm_pods_runs_pods_side_by_side():
+    servers = [StubNIM(cold=0), StubNIM(cold=0)]
+    try:
+        results = warm_pods(
+            [dict(name="a", url=servers[0].url), dict(name="b", url=servers[1].url)],
+            model="m",
+            prompts=["x"],
+            tolerance=10.0,
+        )
+    finally:
+        for server in servers:
+            server.close()
+    assert [result["name"] for result in results] == ["a", "b"]
+    assert all(result["settled"] for result in results)
+
+
+def pod(name, ip, ready=True, annotations=None):
+    return {
+        "metadata": {"name": name, "annotations": annotations or {}},
+        "status": {
+            "podIP": ip,
+            "conditions": [{"type": "Ready", "status": "True" if ready else "False"}],
+        },
+    }
+
+
+def test_pod_targets():
+    pods = [
+        pod("a", "10.0.0.1"),
+        pod("b", "10.0.0.2", ready=False),
+        pod("c", "fd00::3"),
+        pod("d", "10.0.0.4", annotations={WARMED_ANNOTATION: "2026-01-01T00:00:00Z"}),
+    ]
+    assert pod_targets(pods, 8000, skip_warmed=True) == [
+        {"name": "a", "url": "http://10.0.0.1:8000"},
+        {"name": "c", "url": "http://[fd00::3]:8000"},
+    ]
+    assert [target["name"] for target in pod_targets(pods, 8000)] == ["a", "c", "d"]
+    pods[0]["metadata"]["namespace"] = "nim"
+    assert pod_targets(pods, 8000, proxy=True)[0] == {
+        "name": "a",
+        "url": "/api/v1/namespaces/nim/pods/a:8000/proxy",
+    }
+
+
+def test_service_port():
+    assert (
+        service_port({"spec": {"ports": [{"port": 8000, "targetPort": 8080}]}}) == 8080
+    )
+    assert (
+        service_port({"spec": {"ports": [{"port": 8000, "targetPort": "api"}]}}) == 8000
+    )
+    assert service_port({"spec": {}}) == 8000
+
+
+class ProxyClient(object):
+    """Client of kubernetes.core that records the requests of the pod proxy."""
+
+    def __init__(self):
+        self.client = self
+        self.requests = []
+
+    def request(self, method, path, body=None, **params):
+        self.requests.append((method, path, body, params))
+
+
+def test_warm_pod_through_the_pod_proxy():
+    client = ProxyClient()
+    result = warm_pod(
+        "/api/v1/namespaces/nim/pods/a:8000/proxy",
+        "m",
+        prompts=["x"],
+        max_rounds=3,
+        tolerance=10.0,
+        timeout=30,
+        post=proxy_post(client),
+    )
+    assert result["settled"]
+    method, path, body, params = client.requests[0]
+    assert (method, path) == (
+        "POST",
+        "/api/v1/namespaces/nim/pods/a:8000/proxy/v1/chat/completions",
+    )
+    assert body["model"] == "m"
+    assert params == {"serialize": False, "_request_timeout": 30}
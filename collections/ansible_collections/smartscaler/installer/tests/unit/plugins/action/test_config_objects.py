@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import base64
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from ansible.errors import AnsibleActionFail
+from ansible_collections.smartscaler.installer.plugins.action.config_objects import (
+    build,
+)
+
+COLLECTIONS = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "..", "..")
+)
+
+PLAYBOOK = """
+- hosts: localhost
+  gather_facts: false
+  tasks:
+    - name: Build
+      smartscaler.installer.config_objects:
+        namespace: smart-scaler
+        secrets:
+          - name: avesha-systems
+            docker_registry:
+              username: "{{ user }}"
+              password: secret
+        configmaps:
+          - name: mesh-config
+            files:
+              config.json: files/config-inference.json
+            labels:
+              app: inference
+      register: built
+
+    - name: Save the result
+      copy:
+        content: "{{ built | to_json }}"
+        dest: "{{ playbook_dir }}/result.json"
+"""
+
+
+def decode(value):
+    return base64.b64decode(value).decode()
+
+
+def test_docker_registry_secret_matches_kubectl():
+    definition = build(
+        "Secret",
+        dict(
+            name="ngc-secret",
+            docker_registry=dict(
+                server="nvcr.io", username="$oauthtoken", password="key", email="a@b.c"
+            ),
+        ),
+        "nim",
+        {},
+    )
+    assert definition["type"] == "kubernetes.io/dockerconfigjson"
+    assert definition["metadata"] == dict(name="ngc-secret", namespace="nim")
+    config = json.loads(decode(definition["data"][".dockerconfigjson"]))
+    assert config == dict(
+        auths={
+            "nvcr.io": dict(
+                username="$oauthtoken",
+                password="key",
+                email="a@b.c",
+                auth=base64.b64encode(b"$oauthtoken:key").decode(),
+            )
+        }
+    )
+
+    definition = build(
+        "Secret",
+        dict(name="a", docker_registry=dict(username="u", password="p")),
+        "x",
+        {},
+    )
+    config = json.loads(decode(definition["data"][".dockerconfigjson"]))
+    assert list(config["auths"]) == ["https://index.docker.io/v1/"]
+
+
+def test_generic_secret_and_configmap():
+    secret = build(
+        "Secret", dict(name="ngc-api-secret", literals=dict(NGC_API_KEY="k")), "nim", {}
+    )
+    assert secret["type"] == "Opaque"
+    assert decode(secret["data"]["NGC_API_KEY"]) == "k"
+
+    configmap = build(
+        "ConfigMap",
+        dict(name="locustfile", literals=dict(port=8089)),
+        "nim-load-test",
+        {"locustfile.py": b"print('hi')\n", "blob": b"\xff\x00"},
+    )
+    assert configmap["data"] == {"port": "8089", "locustfile.py": "print('hi')\n"}
+    assert configmap["binaryData"] == {"blob": "/wA="}
+    assert "type" not in configmap
+
+
+@pytest.mark.parametrize(
+    "kind, spec, files, message",
+    [
+        ("ConfigMap", dict(name="a", extra=1), {}, "unsupported keys extra"),
+        (
+            "ConfigMap",
+            dict(name="a", docker_registry={"username": "u"}),
+            {},
+            "only valid",
+        ),
+        ("Secret", dict(literals={}), {}, "needs a name"),
+        ("Secret", dict(name="a", literals=dict(k="v")), {"k": b"v"}, "defined twice"),
+        ("Secret", dict(name="a", from_file="x"), {}, "unsupported keys from_file"),
+    ],
+)
+def test_invalid_specs(kind, spec, files, message):
+    with pytest.raises(AnsibleActionFail, match=message):
+        build(kind, spec, "ns", files)
+
+
+@pytest.fixture
+def ansible_playbook():
+    path = os.path.join(os.path.dirname(sys.executable), "ansible-playbook")
+    if not os.path.exists(path):
+        pytest.skip("ansible-playbook is not installed next to the interpreter")
+    return path
+
+
+def test_files_are_read_on_the_controller(tmp_path, ansible_playbook):
+    (tmp_path / "files").mkdir()
+    (tmp_path / "files" / "config-inference.json").write_bytes(b'{"a": 1}\n\n')
+    (tmp_path / "play.yml").write_text(PLAYBOOK)
+    (tmp_path / "ansible.cfg").write_text("")
+    env = dict(
+        os.environ,
+        ANSIBLE_CONFIG=str(tmp_path / "ansible.cfg"),
+        ANSIBLE_COLLECTIONS_PATH=COLLECTIONS,
+    )
+    subprocess.run(
+        [
+            ansible_playbook,
+            "-i",
+            "localhost,",
+            "-c",
+            "local",
+            "-e",
+            "ansible_python_interpreter=%s" % sys.executable,
+            "-e",
+            "user=robot",
+            str(tmp_path / "play.yml"),
+        ],
+        env=env,
+        check=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+    result = json.loads((tmp_path / "result.json").read_text())
+    assert result["resources"] == [
+        "Secret/smart-scaler/avesha-systems",
+        "ConfigMap/smart-scaler/mesh-config",
+    ]
+    assert result["keys"] == {
+        "avesha-systems": [".dockerconfigjson"],
+        "mesh-config": ["config.json"],
+    }
+    configmap = result["definitions"][1]
+    # Trailing newlines are kept, as with kubectl --from-file
+    assert configmap["data"]["config.json"] == '{"a": 1}\n\n'
+    assert configmap["metadata"]["labels"] == {"app": "inference"}
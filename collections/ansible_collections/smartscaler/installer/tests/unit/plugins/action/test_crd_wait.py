@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+from kubernetes.client.rest import ApiException
+from urllib3.exceptions import ReadTimeoutError
+from ansible_collections.smartscaler.installer.plugins.action.crd_wait import (
+    wait_for_crds,
+)
+from ansible_collections.smartscaler.installer.plugins.module_utils.crds import (
+    CRDWatch,
+)
+
+
+class FakeResource(object):
+    """Replays one list of (event type, name, established) per watch call.
+
+    An exception in the list is raised instead.
+    """
+
+    def __init__(self, *streams):
+        self.streams = list(streams)
+        self.calls = []
+
+    def watch(self, timeout=None):
+        self.calls.append(dict(timeout=timeout))
+        for event in self.streams.pop(0) if self.streams else []:
+            if isinstance(event, Exception):
+                raise event
+            event_type, name, established = event
+            status = "True" if established else "False"
+            yield {
+                "type": event_type,
+                "raw_object": {
+                    "metadata": {"name": name},
+                    "status": {
+                        "conditions": [
+                            {"type": "NamesAccepted", "status": "True"},
+                            {"type": "Established", "status": status},
+                        ]
+                    },
+                },
+            }
+
+
+def run(resource, names, timeout=60, status_interval=10):
+    tracker = CRDWatch(names)
+    lines = []
+    wait_for_crds(resource, tracker, timeout, status_interval, lines.extend)
+    return tracker, lines
+
+
+def test_one_stream_for_every_crd():
+    resource = FakeResource(
+        [
+            ("ADDED", "certificates.cert-manager.io", True),
+            ("ADDED", "routes.serving.knative.dev", True),
+            ("ADDED", "services.serving.knative.dev", False),
+            ("MODIFIED", "services.serving.knative.dev", True),
+            ("MODIFIED", "never.read", True),
+        ]
+    )
+    tracker, lines = run(
+        resource, ["routes.serving.knative.dev", "services.serving.knative.dev"]
+    )
+    assert tracker.done
+    assert lines == [
+        "routes.serving.knative.dev established (1/2)",
+        "services.serving.knative.dev established (2/2)",
+    ]
+    assert resource.calls == [dict(timeout=10)]
+
+
+def test_rewatches_after_the_stream_closes():
+    resource = FakeResource(
+        [("ADDED", "a", False)], [("ADDED", "a", False), ("MODIFIED", "a", True)]
+    )
+    tracker, lines = run(resource, ["a"])
+    assert tracker.done
+    assert len(resource.calls) == 2
+    assert lines[0].endswith(
+        "elapsed, 0/1 CRDs established, waiting for a (Established)"
+    )
+    assert lines[1] == "a established (1/1)"
+
+
+def test_gives_up_after_the_timeout():
+    tracker, lines = run(FakeResource(), ["a"], timeout=1, status_interval=1)
+    assert not tracker.done
+    assert tracker.result()["pending"] == {"a": ["not created"]}
+
+
+def test_rewatches_after_a_failed_watch(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(
+        "ansible_collections.smartscaler.installer.plugins.module_utils.watch.time.sleep",
+        sleeps.append,
+    )
+    resource = FakeResource(
+        [("ADDED", "a", True), ReadTimeoutError(None, None, "Read timed out.")],
+        [ApiException(status=500, reason="Internal Server Error")],
+        [("ADDED", "a", True), ("ADDED", "b", True)],
+    )
+    tracker, lines = run(resource, ["a", "b"])
+    assert tracker.done
+    assert len(resource.calls) == 3
+    assert lines[0] == "a established (1/2)"
+    assert "(watch failed: ReadTimeoutError: None: Read timed out.," in lines[1]
+    assert lines[2].endswith(
+        "(watch failed: 500 Internal Server Error, watching again)"
+    )
+    assert lines[3] == "b established (2/2)"
+    assert sleeps == [5, 5]
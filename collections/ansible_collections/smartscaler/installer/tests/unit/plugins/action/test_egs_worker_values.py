@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+from ansible_collections.smartscaler.installer.plugins.action.egs_worker_values import (
+    collect_secrets,
+)
+from ansible_collections.smartscaler.installer.plugins.module_utils.egs_workers import (
+    SecretCollector,
+)
+
+
+class Listing(object):
+    def __init__(self, content):
+        self.content = content
+
+    def to_dict(self):
+        return self.content
+
+
+def secret(name, version, **data):
+    return {"metadata": {"name": name, "resourceVersion": version}, "data": data}
+
+
+class FakeResource(object):
+    """One list of Secrets, then one list of watch events per watch call."""
+
+    def __init__(self, items, *streams):
+        self.items = items
+        self.streams = list(streams)
+        self.calls = []
+
+    def get(self, namespace=None):
+        self.calls.append(("list", namespace))
+        return Listing({"metadata": {"resourceVersion": "10"}, "items": self.items})
+
+    def watch(self, namespace=None, resource_version=None, timeout=None):
+        self.calls.append(("watch", resource_version, timeout))
+        for event_type, obj in self.streams.pop(0) if self.streams else []:
+            yield {"type": event_type, "raw_object": obj}
+
+
+def run(resource, names):
+    collector = SecretCollector(dict((name, ["token"]) for name in names))
+    lines = []
+    collect_secrets(resource, "kubeslice-avesha", collector, 60, 10, lines.extend)
+    return collector, lines
+
+
+def test_one_list_reads_every_secret():
+    resource = FakeResource(
+        [secret("a", "3", token="x"), secret("b", "4", token="y"), secret("c", "5")]
+    )
+    collector, lines = run(resource, ["a", "b"])
+    assert collector.done
+    assert lines == ["a read (1/2)", "b read (2/2)"]
+    assert resource.calls == [("list", "kubeslice-avesha")]
+
+
+def test_watch_resumes_where_the_list_ended():
+    resource = FakeResource(
+        [secret("a", "3", token="x"), secret("b", "4")],
+        [("MODIFIED", secret("c", "11", token="z"))],
+        [("MODIFIED", secret("b", "12", token="y"))],
+    )
+    collector, lines = run(resource, ["a", "b"])
+    assert collector.done
+    assert resource.calls == [
+        ("list", "kubeslice-avesha"),
+        ("watch", "10", 10),
+        ("watch", "11", 10),
+    ]
+    assert lines[1].endswith("elapsed, 1/2 Secrets read, waiting for b")
+    assert lines[-1] == "b read (2/2)"
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from ansible.errors import AnsibleActionFail
+from ansible_collections.smartscaler.installer.plugins.action.manifest_render import (
+    cache_key,
+    changed_inputs,
+    describe,
+    file_digest,
+    load_definitions,
+    missing_objects,
+    references,
+)
+from kubernetes.client.rest import ApiException
+from kubernetes.dynamic.exceptions import NotFoundError
+
+COLLECTIONS = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "..", "..")
+)
+
+TEMPLATE = """apiVersion: v1
+kind: ConfigMap
+metadata:
+  name: {{ manifest_vars.name }}
+  namespace: nim
+data:
+{% for key, value in manifest_vars.data.items() %}
+  {{ key }}: "{{ value }}"
+{% endfor %}
+  script: {{ lookup('file', playbook_dir + '/script.sh') | to_json }}
+---
+apiVersion: v1
+kind: Namespace
+metadata:
+  name: nim
+"""
+
+PLAYBOOK = """
+- hosts: localhost
+  gather_facts: false
+  tasks:
+    - name: Render
+      smartscaler.installer.manifest_render:
+        src: "{{ playbook_dir }}/cm.yaml.j2"
+        variables: "{{ variables }}"
+        cache_dir: "{{ playbook_dir }}/cache"
+        cache_context:
+          namespace: nim
+        cache_verify: false
+      register: rendered
+
+    - name: Remember the apply
+      copy:
+        content: "{{ {'resources': rendered.resources, 'inputs': rendered.inputs} | to_json }}"
+        dest: "{{ rendered.cache_file }}"
+      when: not rendered.cached
+
+    - name: Save the result
+      copy:
+        content: "{{ rendered | to_json }}"
+        dest: "{{ playbook_dir }}/result-{{ run }}.json"
+"""
+
+
+def test_cache_key_changes_with_each_part():
+    key = cache_key(b"template", {"a": 1}, {"namespace": "nim"})
+    assert key == cache_key(b"template", {"a": 1}, {"namespace": "nim"})
+    assert key != cache_key(b"template2", {"a": 1}, {"namespace": "nim"})
+    assert key != cache_key(b"template", {"a": 2}, {"namespace": "nim"})
+    assert key != cache_key(b"template", {"a": 1}, {"namespace": "default"})
+    with_inputs = cache_key(b"template", {"a": 1}, {"namespace": "nim"}, {"f": "1"})
+    assert with_inputs != key
+    assert with_inputs != cache_key(
+        b"template", {"a": 1}, {"namespace": "nim"}, {"f": "2"}
+    )
+
+
+def test_changed_inputs(tmp_path):
+    kept = tmp_path / "kept"
+    kept.write_text("same")
+    edited = tmp_path / "edited"
+    edited.write_text("before")
+    recorded = dict(
+        (str(path), file_digest(str(path)))
+        for path in (kept, edited, tmp_path / "deleted")
+    )
+    (tmp_path / "deleted").write_text("created")
+    edited.write_text("after")
+    assert changed_inputs(recorded) == sorted([str(edited), str(tmp_path / "deleted")])
+
+
+class FakeResource(object):
+    def __init__(self, kind, namespaced, existing):
+        self.kind = kind
+        self.namespaced = namespaced
+        self.existing = existing
+        self.calls = []
+
+    def get(self, name, namespace=None):
+        self.calls.append((namespace, name))
+        if (self.kind, namespace, name) not in self.existing:
+            raise NotFoundError(ApiException(status=404))
+        return {}
+
+
+class FakeClient(object):
+    def __init__(self, existing):
+        self.resources = dict(
+            (kind, FakeResource(kind, kind != "Namespace", existing))
+            for kind in ("ConfigMap", "Namespace")
+        )
+
+    def resource(self, kind, api_version):
+        return self.resources[kind]
+
+
+def test_missing_objects():
+    objects = references(
+        [
+            {"apiVersion": "v1", "kind": "ConfigMap", "metadata": {"name": "a"}},
+            {
+                "apiVersion": "v1",
+                "kind": "ConfigMap",
+                "metadata": {"name": "b", "namespace": "other"},
+            },
+            {"apiVersion": "v1", "kind": "Namespace", "metadata": {"name": "nim"}},
+        ]
+    )
+    assert objects[0] == dict(
+        api_version="v1", kind="ConfigMap", namespace=None, name="a"
+    )
+    client = FakeClient({("ConfigMap", "nim", "a"), ("Namespace", None, "nim")})
+    assert missing_objects(client, objects, "nim") == [objects[1]]
+    # Namespaced objects without a namespace are looked up in the default one
+    assert client.resources["ConfigMap"].calls == [("nim", "a"), ("other", "b")]
+    assert client.resources["Namespace"].calls == [(None, "nim")]
+    assert missing_objects(client, objects[:1]) == objects[:1]
+
+
+def test_load_definitions():
+    definition = {"kind": "ConfigMap", "metadata": {"name": "a"}}
+    assert load_definitions(definition) == [definition]
+    assert load_definitions([definition, None]) == [definition]
+    assert load_definitions("---\nkind: ConfigMap\nmetadata:\n  name: a\n---\n") == [
+        definition
+    ]
+    with pytest.raises(AnsibleActionFail):
+        load_definitions("kind: [")
+
+
+def test_describe():
+    assert describe(
+        [
+            {"kind": "ConfigMap", "metadata": {"name": "a", "namespace": "nim"}},
+            {"kind": "Namespace", "metadata": {"name": "nim"}},
+        ]
+    ) == ["ConfigMap/nim/a", "Namespace/nim"]
+
+
+@pytest.fixture
+def ansible_playbook():
+    path = os.path.join(os.path.dirname(sys.executable), "ansible-playbook")
+    if not os.path.exists(path):
+        pytest.skip("ansible-playbook is not installed next to the interpreter")
+    return path
+
+
+def test_render_then_cache_hit(tmp_path, ansible_playbook):
+    (tmp_path / "cm.yaml.j2").write_text(TEMPLATE)
+    (tmp_path / "script.sh").write_text("echo 1\n")
+    (tmp_path / "play.yml").write_text(PLAYBOOK)
+    (tmp_path / "ansible.cfg").write_text("")
+    env = dict(
+        os.environ,
+        ANSIBLE_CONFIG=str(tmp_path / "ansible.cfg"),
+        ANSIBLE_COLLECTIONS_PATH=COLLECTIONS,
+    )
+
+    def run(name, data):
+        subprocess.run(
+            [
+                ansible_playbook,
+                "-i",
+                "localhost,",
+                "-c",
+                "local",
+                "-e",
+                "ansible_python_interpreter=%s" % sys.executable,
+                "-e",
+                json.dumps(dict(run=name, variables=dict(name="cfg", data=data))),
+                str(tmp_path / "play.yml"),
+            ],
+            env=env,
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        return json.loads((tmp_path / ("result-%s.json" % name)).read_text())
+
+    first = run("first", {"a": "1"})
+    assert first["cached"] is False
+    assert first["definitions"][0]["data"] == {"a": "1", "script": "echo 1"}
+    assert first["resources"] == ["ConfigMap/nim/cfg", "Namespace/nim"]
+    assert os.listdir(str(tmp_path / "cache")) == [first["cache_key"] + ".json"]
+
+    second = run("second", {"a": "1"})
+    assert second["cached"] is True
+    assert second["definitions"] == []
+    assert second["resources"] == first["resources"]
+
+    third = run("third", {"a": "2"})
+    assert third["cached"] is False
+    assert third["cache_key"] != first["cache_key"]
+    assert third["definitions"][0]["data"] == {"a": "2", "script": "echo 1"}
+
+    # A file read by a lookup changed: same key, rendered again
+    (tmp_path / "script.sh").write_text("echo 2\n")
+    fourth = run("fourth", {"a": "2"})
+    assert fourth["cached"] is False
+    assert fourth["cache_key"] == third["cache_key"]
+    assert fourth["definitions"][0]["data"]["script"] == "echo 2"
+    assert fourth["inputs"] == {
+        str(tmp_path / "script.sh"): file_digest(str(tmp_path / "script.sh"))
+    }
+    assert run("fifth", {"a": "2"})["cached"] is True
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+from kubernetes.client.rest import ApiException
+from urllib3.exceptions import ProtocolError
+from ansible_collections.smartscaler.installer.plugins.action.nimcache_wait import (
+    wait_for_cache,
+)
+from ansible_collections.smartscaler.installer.plugins.module_utils.nimcache import (
+    NIMCacheWatch,
+)
+
+
+class FakeResource(object):
+    """Replays one list of events per watch call; an exception is raised."""
+
+    def __init__(self, *streams):
+        self.streams = list(streams)
+        self.calls = []
+
+    def watch(self, namespace=None, name=None, timeout=None):
+        self.calls.append(dict(namespace=namespace, name=name, timeout=timeout))
+        for event in self.streams.pop(0) if self.streams else []:
+            if isinstance(event, Exception):
+                raise event
+            event_type, state = event
+            yield {
+                "type": event_type,
+                "raw_object": {"metadata": {"name": name}, "status": {"state": state}},
+            }
+
+
+def run(resource, timeout=60, status_interval=10):
+    tracker = NIMCacheWatch()
+    lines = []
+    wait_for_cache(
+        resource, "llama", "nim", tracker, timeout, status_interval, lines.extend
+    )
+    return tracker, lines
+
+
+def test_returns_when_ready():
+    resource = FakeResource(
+        [("ADDED", "Pending"), ("MODIFIED", "InProgress"), ("MODIFIED", "Ready")],
+        [("ADDED", "Ready")],
+    )
+    tracker, lines = run(resource)
+    assert tracker.phase == "ready"
+    assert lines == ["state=Pending", "state=InProgress", "state=Ready"]
+    assert resource.calls == [dict(namespace="nim", name="llama", timeout=10)]
+
+
+def test_rewatches_after_the_stream_closes():
+    resource = FakeResource(
+        [("ADDED", "InProgress")], [("ADDED", "InProgress"), ("MODIFIED", "Ready")]
+    )
+    tracker, lines = run(resource)
+    assert tracker.phase == "ready"
+    assert len(resource.calls) == 2
+    assert lines[0] == "state=InProgress"
+    assert lines[1].endswith("elapsed, state=InProgress")
+    assert lines[2] == "state=Ready"
+
+
+def test_stops_on_failure():
+    tracker, lines = run(FakeResource([("ADDED", "Failed")], [("ADDED", "Ready")]))
+    assert tracker.phase == "failed"
+    assert lines == ["state=Failed"]
+
+
+def test_times_out(monkeypatch):
+    clock = [1000.0]
+
+    class SlowResource(FakeResource):
+        def watch(self, **kwargs):
+            for event in FakeResource.watch(self, **kwargs):
+                yield event
+            clock[0] += kwargs["timeout"]
+
+    monkeypatch.setattr(
+        "ansible_collections.smartscaler.installer.plugins.module_utils.watch.time.time",
+        lambda: clock[0],
+    )
+    resource = SlowResource([("ADDED", "InProgress")])
+    tracker, lines = run(resource, timeout=25, status_interval=10)
+    assert tracker.phase == "pending"
+    assert [call["timeout"] for call in resource.calls] == [10, 10, 5]
+    assert lines[0] == "state=InProgress"
+    assert lines[-1] == "20s elapsed, state=InProgress"
+
+
+def test_rewatches_after_a_failed_watch(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(
+        "ansible_collections.smartscaler.installer.plugins.module_utils.watch.time.sleep",
+        sleeps.append,
+    )
+    resource = FakeResource(
+        [("ADDED", "InProgress"), ProtocolError("Connection broken")],
+        [ApiException(status=410, reason="Gone")],
+        [("ADDED", "Ready")],
+    )
+    tracker, lines = run(resource)
+    assert tracker.phase == "ready"
+    assert len(resource.calls) == 3
+    assert lines[0] == "state=InProgress"
+    assert lines[1].endswith(
+        "elapsed, state=InProgress (watch failed: ProtocolError: Connection broken,"
+        " watching again)"
+    )
+    assert lines[2].endswith("(watch failed: 410 Gone, watching again)")
+    assert lines[3] == "state=Ready"
+    assert sleeps == [5, 5]
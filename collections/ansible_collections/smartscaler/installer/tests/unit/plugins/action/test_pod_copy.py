@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import pytest
+from ansible.errors import AnsibleActionFail
+from ansible_collections.smartscaler.installer.plugins.action.pod_copy import (
+    collect_files,
+)
+
+
+@pytest.fixture
+def tree(tmp_path):
+    (tmp_path / "cfg" / "sub").mkdir(parents=True)
+    (tmp_path / "cfg" / "a.yaml").write_text("a")
+    (tmp_path / "cfg" / "sub" / "b.yaml").write_text("b")
+    return tmp_path
+
+
+def test_directory_content_with_trailing_slash(tree):
+    pairs = collect_files(str(tree / "cfg") + "/", "/opt/nim")
+    assert [remote for _, remote in pairs] == ["/opt/nim/a.yaml", "/opt/nim/sub/b.yaml"]
+
+
+def test_directory_itself_without_trailing_slash(tree):
+    pairs = collect_files(str(tree / "cfg"), "/opt/nim")
+    assert [remote for _, remote in pairs] == [
+        "/opt/nim/cfg/a.yaml",
+        "/opt/nim/cfg/sub/b.yaml",
+    ]
+
+
+def test_single_file(tree):
+    source = str(tree / "cfg" / "a.yaml")
+    assert collect_files(source, "/etc/app.yaml") == [(source, "/etc/app.yaml")]
+    assert collect_files(source, "/etc/") == [(source, "/etc/a.yaml")]
+
+
+def test_missing_source(tree):
+    with pytest.raises(AnsibleActionFail):
+        collect_files(str(tree / "missing"), "/tmp")
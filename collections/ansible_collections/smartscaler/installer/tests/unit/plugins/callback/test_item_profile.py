@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+from ansible_collections.smartscaler.installer.plugins.callback.item_profile import (
+    CallbackModule,
+    Profile,
+    is_wait,
+    load_previous,
+)
+
+COLLECTIONS = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "..", "..")
+)
+
+PLAYBOOK = """
+- name: Install
+  hosts: localhost
+  gather_facts: false
+  tasks:
+    - name: Before the items
+      debug:
+        msg: setup
+    - name: Process execution items
+      include_tasks: process_execution_item.yml
+      vars:
+        execution_item: "{{ item }}"
+      loop: [first, second]
+    - name: After the items
+      debug:
+        msg: done
+    - name: Check for the item timing profile
+      stat:
+        path: "{{ lookup('env', 'SMARTSCALER_ITEM_PROFILE') }}"
+    - name: Read the profile
+      copy:
+        content: "{{ lookup('file', lookup('env', 'SMARTSCALER_ITEM_PROFILE')) }}"
+        dest: "{{ playbook_dir }}/seen.json"
+"""
+
+ITEM_TASKS = """
+- name: Apply
+  command: "true"
+- name: Apply in a role
+  include_role:
+    name: slow
+- name: Wait
+  pause:
+    seconds: 1
+  when: execution_item == 'second'
+"""
+
+
+def test_is_wait():
+    assert is_wait("ansible.builtin.async_status")
+    assert is_wait("smartscaler.installer.nimcache_wait")
+    assert is_wait("command", until="result is succeeded")
+    assert is_wait("kubernetes.core.k8s", {"wait": True})
+    assert not is_wait("kubernetes.core.k8s", {"wait": False})
+    assert not is_wait("kubernetes.core.helm", {})
+    assert not is_wait("command")
+
+
+def test_profile_segments_and_critical_path():
+    profile = Profile(
+        playbook="site.yml",
+        started=100.0,
+        previous={"total": 30.0, "items": {"keda": 12.0}},
+    )
+    profile.start_task("Install", "play", "Validate", "command", False, now=100.0)
+    profile.start_task("keda", "item", "Install chart", "helm", False, now=101.0)
+    profile.start_task("keda", "item", "Wait", "async_status", True, now=105.0)
+    profile.start_task("nim", "item", "Apply", "k8s", False, now=113.0)
+    profile.start_task("Install", "play", "Summary", "copy", False, now=114.0)
+    profile.finish(now=116.0)
+
+    report = profile.report(now=116.0)
+    assert report["total"] == 16.0
+    assert report["items"] == {"keda": 12.0, "nim": 1.0}
+    assert [(s["name"], s["kind"]) for s in report["critical_path"]] == [
+        ("Install", "play"),
+        ("keda", "item"),
+        ("nim", "item"),
+        ("Install", "play"),
+    ]
+    keda = report["critical_path"][1]
+    assert keda["started"] == 1.0
+    assert keda["wait"] == 8.0
+    assert keda["apply"] == 4.0
+    assert keda["share"] == 0.75
+    assert keda["slowest_task"] == {"task": "Wait", "duration": 8.0}
+    assert keda["previous"] == 12.0
+    assert "previous" not in report["critical_path"][2]
+    assert report["previous"]["total"] == 30.0
+    assert report["wait"] == 8.0
+    assert report["timeline"][1] == dict(
+        segment="keda",
+        kind="item",
+        task="Install chart",
+        action="helm",
+        wait=False,
+        started=1.0,
+        duration=4.0,
+    )
+
+
+def test_running_task_counts_until_now():
+    profile = Profile(started=0.0)
+    profile.start_task("a", "item", "Apply", "k8s", False, now=0.0)
+    assert profile.report(now=5.0)["items"] == {"a": 5.0}
+
+
+class FakeTask(object):
+    _parent = None
+    action = "command"
+    args = {}
+    until = None
+
+    def __init__(self, name):
+        self.name = name
+
+    def get_name(self):
+        return self.name
+
+
+class FakeResult(object):
+    def __init__(self, task):
+        self._task = task
+
+
+def test_writes_are_not_per_task(tmp_path, monkeypatch):
+    callback = CallbackModule()
+    callback._path = str(tmp_path / "profile.json")
+    callback._write_after = frozenset(["Check for the item timing profile"])
+    callback._profile = Profile(started=0.0)
+    callback._written = time.time()
+    writes = []
+    monkeypatch.setattr(callback, "_write", lambda: writes.append(1))
+
+    for index in range(100):
+        callback.v2_playbook_on_task_start(FakeTask("task %d" % index), False)
+    assert writes == []
+
+    # The profile is read after this task: written when it starts without
+    # a profile on disk, and again once it succeeded.
+    check = FakeTask("Check for the item timing profile")
+    callback.v2_playbook_on_task_start(check, False)
+    callback.v2_runner_on_ok(FakeResult(check))
+    assert len(writes) == 2
+
+    callback._written -= callback._write_interval
+    callback.v2_playbook_on_task_start(FakeTask("late"), False)
+    assert len(writes) == 3
+    callback.v2_playbook_on_stats(None)
+    assert len(writes) == 4
+    assert len(callback._profile.timeline) == 102
+
+
+def test_load_previous(tmp_path):
+    path = tmp_path / "profile.json"
+    assert load_previous(str(path), "site.yml") == {}
+    path.write_text(json.dumps(dict(playbook="site.yml", total=3.0, items={"a": 1})))
+    assert load_previous(str(path), "site.yml")["items"] == {"a": 1}
+    assert load_previous(str(path), "kubernetes.yml") == {}
+    path.write_text("{")
+    assert load_previous(str(path), "site.yml") == {}
+
+
+@pytest.fixture
+def ansible_playbook():
+    path = os.path.join(os.path.dirname(sys.executable), "ansible-playbook")
+    if not os.path.exists(path):
+        pytest.skip("ansible-playbook is not installed next to the interpreter")
+    return path
+
+
+def test_profile_of_a_real_run(tmp_path, ansible_playbook):
+    (tmp_path / "play.yml").write_text(PLAYBOOK)
+    (tmp_path / "process_execution_item.yml").write_text(ITEM_TASKS)
+    (tmp_path / "roles" / "slow" / "tasks").mkdir(parents=True)
+    (tmp_path / "roles" / "slow" / "tasks" / "main.yml").write_text(
+        "- name: Role task\n  command: 'true'\n"
+    )
+    (tmp_path / "ansible.cfg").write_text("")
+    profile_file = tmp_path / "output" / "profile.json"
+    env = dict(
+        os.environ,
+        ANSIBLE_CONFIG=str(tmp_path / "ansible.cfg"),
+        ANSIBLE_COLLECTIONS_PATH=COLLECTIONS,
+        ANSIBLE_CALLBACKS_ENABLED="smartscaler.installer.item_profile",
+        SMARTSCALER_ITEM_PROFILE=str(profile_file),
+    )
+
+    def run():
+        subprocess.run(
+            [
+                ansible_playbook,
+                "-i",
+                "localhost,",
+                "-c",
+                "local",
+                "-e",
+                "ansible_python_interpreter=%s" % sys.executable,
+                str(tmp_path / "play.yml"),
+            ],
+            env=env,
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            cwd=str(tmp_path),
+        )
+        return json.loads(profile_file.read_text())
+
+    report = run()
+    # Written for the summary once the check task succeeded, mid-play
+    seen = json.loads((tmp_path / "seen.json").read_text())
+    assert seen["timeline"][-1]["task"] == "Check for the item timing profile"
+    assert report["playbook"] == "play.yml"
+    assert [(s["name"], s["kind"]) for s in report["critical_path"]] == [
+        ("Install", "play"),
+        ("first", "item"),
+        ("second", "item"),
+        ("Install", "play"),
+    ]
+    second = [e for e in report["timeline"] if e["segment"] == "second"]
+    assert [e["task"] for e in second] == [
+        "Apply",
+        "Apply in a role",
+        "slow : Role task",
+        "Wait",
+    ]
+    assert report["critical_path"][2]["wait"] >= 1.0
+    assert report["items"]["second"] > report["items"]["first"]
+    assert "previous" not in report
+
+    again = run()
+    assert again["previous"]["items"] == report["items"]
+    assert again["critical_path"][1]["previous"] == report["items"]["first"]
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import os
+import subprocess
+import sys
+
+import pytest
+from ansible_collections.smartscaler.installer.plugins.module_utils.kubespray_events import (
+    ProgressTracker,
+    read_events,
+)
+
+COLLECTIONS = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "..", "..")
+)
+
+PLAYBOOK = """
+- name: Prepare nodes
+  hosts: all
+  gather_facts: false
+  tasks:
+    - name: Short task
+      command: "true"
+    - name: Fails on node2
+      fail:
+        msg: disk full
+      when: inventory_hostname == 'node2'
+      ignore_errors: true
+"""
+
+
+@pytest.fixture
+def ansible_playbook():
+    path = os.path.join(os.path.dirname(sys.executable), "ansible-playbook")
+    if not os.path.exists(path):
+        pytest.skip("ansible-playbook is not installed next to the interpreter")
+    return path
+
+
+def test_events_of_a_real_run(tmp_path, ansible_playbook):
+    playbook = tmp_path / "play.yml"
+    playbook.write_text(PLAYBOOK)
+    events_file = tmp_path / "events" / "run.jsonl"
+    config = tmp_path / "ansible.cfg"
+    config.write_text("")
+    env = dict(
+        os.environ,
+        ANSIBLE_CONFIG=str(config),
+        ANSIBLE_COLLECTIONS_PATH=COLLECTIONS,
+        ANSIBLE_CALLBACKS_ENABLED="smartscaler.installer.jsonl_events",
+        SMARTSCALER_EVENTS_FILE=str(events_file),
+    )
+    subprocess.run(
+        [
+            ansible_playbook,
+            "-i",
+            "node1,node2,",
+            "-c",
+            "local",
+            "-e",
+            "ansible_python_interpreter=%s" % sys.executable,
+            str(playbook),
+        ],
+        env=env,
+        check=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+
+    events, dummy = read_events(str(events_file))
+    assert [event["event"] for event in events[:3]] == [
+        "playbook_start",
+        "play_start",
+        "task_start",
+    ]
+
+    tracker = ProgressTracker()
+    for event in events:
+        tracker.feed(event)
+    assert tracker.finished
+    assert tracker.plays == ["Prepare nodes"]
+    assert tracker.hosts["node1"]["changed"] == 1
+    assert tracker.failures == [
+        dict(
+            host="node2",
+            task="Fails on node2",
+            status="failed",
+            msg="disk full",
+            ignored=True,
+        )
+    ]
+    assert {timing["task"] for timing in tracker.slowest()} == {
+        "Short task",
+        "Fails on node2",
+    }
+    assert all(timing["duration"] >= 0 for timing in tracker.slowest())
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import pytest
+from ansible_collections.smartscaler.installer.plugins.filter.images import (
+    missing_images,
+    normalize_image,
+)
+
+
+@pytest.mark.parametrize(
+    "image,expected",
+    [
+        ("nginx", "docker.io/library/nginx:latest"),
+        ("nginx:1.25", "docker.io/library/nginx:1.25"),
+        ("aveshasystems/app:v1", "docker.io/aveshasystems/app:v1"),
+        ("nvcr.io/nim/meta/llama:1.8.5", "nvcr.io/nim/meta/llama:1.8.5"),
+        ("localhost/app", "localhost/app:latest"),
+        ("registry:5000/app:1", "registry:5000/app:1"),
+        ("nvcr.io/nim/app@sha256:abc", "nvcr.io/nim/app@sha256:abc"),
+    ],
+)
+def test_normalize_image(image, expected):
+    assert normalize_image(image) == expected
+
+
+def node(name, *names):
+    return {"metadata": {"name": name}, "status": {"images": [{"names": list(names)}]}}
+
+
+def test_missing_images():
+    nodes = [
+        node(
+            "gpu-1",
+            "nvcr.io/nim/meta/llama@sha256:abc",
+            "nvcr.io/nim/meta/llama:1.8.5",
+            "docker.io/aveshasystems/app:v1",
+        ),
+        node("gpu-2", "nvcr.io/nim/meta/llama:1.8.5"),
+        {"metadata": {"name": "gpu-3"}, "status": {}},
+    ]
+    images = ["nvcr.io/nim/meta/llama:1.8.5", "aveshasystems/app:v1"]
+    assert missing_images(nodes, images) == {
+        "gpu-2": ["aveshasystems/app:v1"],
+        "gpu-3": images,
+    }
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import pytest
+from ansible.errors import AnsibleFilterError
+from ansible_collections.smartscaler.installer.plugins.filter.model_stacks import (
+    model_stack_images,
+    model_stack_items,
+    model_stack_operations,
+    model_stack_outcomes,
+    served_model,
+    split_image,
+)
+
+STACKS = {
+    "defaults": {
+        "nim_cache": {
+            "nim_cache_pvc_size": "50Gi",
+            "nim_cache_storage_class": "local-path",
+        },
+        "inference": {"smart_scaler_labels": {"app_version": "1.0"}},
+        "warmup": {"enabled": True, "concurrency": 2},
+    },
+    "models": {
+        "70b": {
+            "model": "meta-llama3-70b-instruct",
+            "image": "nvcr.io/nim/meta/llama-3.1-70b-instruct:1.8.5",
+            "profile": "8b87146e",
+            "tensor_parallelism": 2,
+            "replicas": 1,
+            "min_replicas": 1,
+            "max_replicas": 8,
+            "pvc_size": "200Gi",
+            "waits": {"nim_cache": {"timeout": 3600}},
+        },
+        "8b": {
+            "model": "meta-llama3-8b-instruct",
+            "image": "nvcr.io/nim/meta/llama-3.1-8b-instruct:1.8.4",
+            "labels": {"tenant_id": "tenant-8b"},
+            "warmup": {"enabled": False},
+        },
+        "1b": {"enabled": False},
+    },
+}
+
+
+@pytest.mark.parametrize(
+    "image, expected",
+    [
+        ("nvcr.io/nim/meta/llama:1.8.5", ("nvcr.io/nim/meta/llama", "1.8.5")),
+        ("registry:5000/app", ("registry:5000/app", "latest")),
+        ("nginx:1.25", ("nginx", "1.25")),
+    ],
+)
+def test_split_image(image, expected):
+    assert split_image(image) == expected
+
+
+@pytest.mark.parametrize(
+    "image, expected",
+    [
+        (
+            "nvcr.io/nim/meta/llama-3.1-70b-instruct:1.8.5",
+            "meta/llama-3.1-70b-instruct",
+        ),
+        (
+            "registry.local:5000/nim/meta/llama-3.2-1b-instruct",
+            "meta/llama-3.2-1b-instruct",
+        ),
+        ("mistralai/mistral-7b", "mistralai/mistral-7b"),
+    ],
+)
+def test_served_model(image, expected):
+    assert served_model(image) == expected
+
+
+def test_model_stack_items():
+    items = model_stack_items(STACKS)
+    assert [item["item"] for item in items[:7]] == [
+        "nim_cache_manifest_70b",
+        "nim_service_manifest_70b",
+        "keda_scaled_object_manifest_70b",
+        "create_inference_pod_configmap_70b",
+        "smart_scaler_inference_70b",
+        "create_locust_configmap_70b",
+        "locust_manifest_70b",
+    ]
+    assert len(items) == 14
+    assert [item["after"] for item in items[7:9]] == [None, "nim_cache_manifest_8b"]
+
+    cache, service, keda, configmap, inference = items[:5]
+    assert cache["manifest_file"] == "files/nim-cache.yaml.j2"
+    assert cache["variables"]["nim_cache_pvc_size"] == "200Gi"
+    assert cache["variables"]["nim_cache_storage_class"] == "local-path"
+    assert cache["variables"]["nim_cache_tensor_parallelism"] == "2"
+    assert cache["variables"]["nim_cache_model_profiles"] == ["8b87146e"]
+    assert cache["wait"] == {"condition": "Ready", "timeout": 3600}
+    assert service["variables"]["nim_service_image_tag"] == "1.8.5"
+    assert service["warmup"] == {
+        "concurrency": 2,
+        "service": "meta-llama3-70b-instruct",
+        "namespace": "nim",
+        "model": "meta/llama-3.1-70b-instruct",
+    }
+    assert "warmup" not in cache and "warmup" not in items[8]
+    assert service["variables"]["nim_service_resources"] == {
+        "limits": {"nvidia.com/gpu": 2}
+    }
+    assert keda["variables"]["keda_scaled_object_max_replicas"] == 8
+    assert keda["variables"]["keda_scaled_object_query"] == (
+        'ss_deployment:smartscaler_hpa_num_pods:max{ss_deployment_name="meta-llama3-70b-instruct"}'
+    )
+    assert configmap["namespace"] == "smart-scaler"
+    assert configmap["configmaps"] == [
+        {
+            "name": "mesh-config-70b",
+            "files": {"config.json": "files/config-inference-70b.json"},
+        }
+    ]
+    assert inference["variables"]["smart_scaler_labels"] == {
+        "app_version": "1.0",
+        "service": "inference-tenant-app-70b",
+    }
+    assert items[11]["variables"]["smart_scaler_labels"]["tenant_id"] == "tenant-8b"
+    assert items[13]["variables"]["locust_target_host"] == (
+        "http://meta-llama3-8b-instruct.nim.svc.cluster.local:8000"
+    )
+
+
+def test_model_stack_items_needs_model_and_image():
+    with pytest.raises(AnsibleFilterError, match="model stack x: model and image"):
+        model_stack_items({"models": {"x": {"replicas": 1}}})
+
+
+def build(item, *kinds):
+    return {
+        "step": item,
+        "definitions": [
+            {"kind": kind, "metadata": {"name": "%s-%d" % (item["item"], i)}}
+            for i, kind in enumerate(kinds)
+        ],
+    }
+
+
+def test_model_stack_images():
+    assert model_stack_images(STACKS) == [
+        "nvcr.io/nim/meta/llama-3.1-70b-instruct:1.8.5",
+        "nvcr.io/nim/meta/llama-3.1-8b-instruct:1.8.4",
+    ]
+    stacks = dict(
+        STACKS,
+        defaults=dict(
+            STACKS["defaults"], inference={"smart_scaler_image": "inference:1.0"}
+        ),
+        models=dict(
+            STACKS["models"],
+            **{
+                "8b": dict(STACKS["models"]["8b"], enabled=False),
+                "3b": {
+                    "model": "m",
+                    "image": "nvcr.io/nim/meta/llama-3.1-70b-instruct:1.8.5",
+                    "inference": {"smart_scaler_image": "inference:2.0"},
+                },
+            }
+        ),
+    )
+    # Disabled models are left out, shared images are listed once
+    assert model_stack_images(stacks) == [
+        "nvcr.io/nim/meta/llama-3.1-70b-instruct:1.8.5"
+    ]
+    assert model_stack_images(stacks, "inference") == ["inference:1.0", "inference:2.0"]
+    assert model_stack_images(stacks, "locust") == []
+    with pytest.raises(AnsibleFilterError, match="gpu is not one of"):
+        model_stack_images(stacks, "gpu")
+
+
+def test_model_stack_operations_chain_each_stack():
+    items = model_stack_items(STACKS)
+    builds = [build(item, "Object") for item in items]
+    builds[0] = build(items[0], "NIMCache", "Secret")
+    operations = model_stack_operations(items, builds)
+    ids = [operation["id"] for operation in operations]
+    assert ids[:3] == [
+        "namespace/nim",
+        "namespace/smart-scaler",
+        "namespace/nim-load-test",
+    ]
+    by_id = dict((operation["id"], operation) for operation in operations)
+    assert by_id["nim_cache_manifest_70b/2"]["wait"]["condition"] == "Ready"
+    assert by_id["nim_service_manifest_70b"]["after"] == [
+        "namespace/nim",
+        "nim_cache_manifest_70b/1",
+        "nim_cache_manifest_70b/2",
+    ]
+    # The 8b stack does not wait for anything of the 70b stack
+    assert by_id["nim_cache_manifest_8b"]["after"] == ["namespace/nim"]
+    assert "wait" not in by_id["create_locust_configmap_8b"]
+
+    with pytest.raises(AnsibleFilterError, match="has no objects"):
+        model_stack_operations(items, builds[1:])
+
+
+def test_model_stack_outcomes():
+    items = model_stack_items(STACKS)[:3]
+    results = [
+        {
+            "id": "nim_cache_manifest_70b/1",
+            "changed": True,
+            "failed": False,
+            "waited": 812.4,
+        },
+        {"id": "nim_cache_manifest_70b/2", "changed": False, "failed": False},
+        {
+            "id": "nim_service_manifest_70b",
+            "changed": True,
+            "failed": True,
+            "msg": "timed out",
+        },
+    ]
+    outcomes = model_stack_outcomes(items, results)
+    assert outcomes[0]["changed"] and not outcomes[0]["failed"]
+    assert outcomes[0]["waited"] == 812.4
+    assert outcomes[1]["failed"] and outcomes[1]["msg"] == "timed out"
+    assert outcomes[2]["failed"] and outcomes[2]["msg"] == "not applied"
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import os
+import re
+
+import pytest
+from ansible.errors import AnsibleFilterError
+from ansible_collections.smartscaler.installer.plugins.filter.recording_rules import (
+    quantile_name,
+    recommendation_query,
+    recording_rules,
+)
+
+DASHBOARD = os.path.join(
+    os.path.dirname(__file__),
+    *([".."] * 8 + ["files", "grafana-dashboards", "nim-dashboard.json"])
+)
+
+
+@pytest.mark.parametrize(
+    "quantile, expected", [(0.5, "p50"), (0.99, "p99"), (0.999, "p999")]
+)
+def test_quantile_name(quantile, expected):
+    assert quantile_name(quantile) == expected
+
+
+def test_recording_rules_defaults():
+    smart_scaler, nim = recording_rules()
+    assert smart_scaler["interval"] == nim["interval"] == "15s"
+    assert smart_scaler["rules"] == [
+        {
+            "record": "ss_deployment:smartscaler_hpa_num_pods:max",
+            "expr": "max by (ss_namespace, ss_deployment_name) "
+            '(smartscaler_hpa_num_pods{job="pushgateway"})',
+        }
+    ]
+    rules = dict((rule["record"], rule["expr"]) for rule in nim["rules"])
+    assert rules["namespace_model:generation_tokens:rate"] == (
+        "sum by (namespace, model_name) (rate(generation_tokens_total[1m]))"
+    )
+    assert rules["namespace_model:time_to_first_token_seconds_bucket:rate"] == (
+        "sum by (namespace, model_name, le) "
+        "(rate(time_to_first_token_seconds_bucket[1m]))"
+    )
+    # Quantiles read the recorded bucket rates, not the raw buckets
+    assert rules["namespace_model:time_to_first_token_seconds:p99"] == (
+        "histogram_quantile(0.99, "
+        "namespace_model:time_to_first_token_seconds_bucket:rate)"
+    )
+    assert rules["namespace_model:gpu_cache_usage_perc:avg"] == (
+        "avg by (namespace, model_name) (gpu_cache_usage_perc)"
+    )
+    assert len(rules) == len(nim["rules"])
+
+
+def test_recording_rules_spec():
+    _, nim = recording_rules(
+        {
+            "interval": "30s",
+            "rate_window": "5m",
+            "quantiles": [0.95],
+            "counters": [],
+            "histograms": ["e2e_request_latency_seconds"],
+            "gauges": {},
+        }
+    )
+    assert nim["interval"] == "30s"
+    assert [rule["record"] for rule in nim["rules"]] == [
+        "namespace_model:e2e_request_latency_seconds_bucket:rate",
+        "namespace_model:e2e_request_latency_seconds:p95",
+        "namespace_model:e2e_request_latency_seconds:mean",
+    ]
+    with pytest.raises(AnsibleFilterError, match="median of gauge x"):
+        recording_rules({"gauges": {"x": "median"}})
+
+
+def test_recommendation_query():
+    assert recommendation_query("meta-llama3-8b-instruct") == (
+        "ss_deployment:smartscaler_hpa_num_pods:max"
+        '{ss_deployment_name="meta-llama3-8b-instruct"}'
+    )
+
+
+@pytest.mark.parametrize("window", ["1m", "5m"])
+def test_dashboard_reads_recorded_series(window):
+    if not os.path.isfile(DASHBOARD):
+        pytest.skip("the NIM dashboard is not part of this tree")
+    with open(DASHBOARD) as f:
+        read = set(re.findall(r"namespace_model:[A-Za-z0-9_:]+", f.read()))
+    _, nim = recording_rules({"rate_window": window})
+    assert read
+    assert read <= set(rule["record"] for rule in nim["rules"])
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+from ansible_collections.smartscaler.installer.plugins.filter.run_journal import (
+    item_witnesses,
+    journal_clusters,
+    journal_resumable,
+)
+
+JOURNAL = {
+    "version": 1,
+    "items": {
+        "prometheus_stack": {
+            "status": "success",
+            "kubeconfig": "output/kubeconfig",
+            "context": "admin",
+            "witnesses": item_witnesses(
+                {"release_name": "prometheus", "release_namespace": "monitoring"},
+                "helm",
+            ),
+        },
+        "nim_cache_manifest_70b": {
+            "status": "success",
+            "kubeconfig": "output/kubeconfig",
+            "context": "admin",
+            "witnesses": ["NIMCache/nim/meta-llama3-70b-instruct"],
+        },
+        "worker_chart": {
+            "status": "success",
+            "kubeconfig": "output/worker",
+            "context": "worker",
+            "witnesses": ["Namespace/kubeslice-system"],
+        },
+        "egs_workers": {
+            "status": "success",
+            "kubeconfig": "output/kubeconfig",
+            "context": "admin",
+            "witnesses": item_witnesses(
+                {
+                    "chart": {
+                        "release_name": "egs-worker",
+                        "release_namespace": "kubeslice-system",
+                    },
+                    "workers": [
+                        {"name": "worker-1"},
+                        {
+                            "name": "worker-2",
+                            "kubeconfig": "output/worker",
+                            "kubecontext": "worker",
+                        },
+                    ],
+                },
+                "egs_workers",
+                ["Cluster/kubeslice-avesha/worker-1"],
+                "output/kubeconfig",
+                "admin",
+            ),
+        },
+        "verify_ngc_secrets": {"status": "success", "witnesses": []},
+        "nim_service_manifest_70b": {
+            "status": "failed",
+            "witnesses": ["NIMService/nim/x"],
+        },
+    },
+}
+
+
+def test_item_witnesses():
+    assert JOURNAL["items"]["prometheus_stack"]["witnesses"] == [
+        {
+            "kind": "Secret",
+            "api_version": "v1",
+            "namespace": "monitoring",
+            "labels": {"owner": "helm", "name": "prometheus", "status": "deployed"},
+        }
+    ]
+    assert item_witnesses({}, "manifest", ["ConfigMap/nim/a"]) == ["ConfigMap/nim/a"]
+    assert item_witnesses({}, "command") == []
+    release = dict(
+        kind="Secret",
+        api_version="v1",
+        namespace="kubeslice-system",
+        labels=dict(owner="helm", name="egs-worker", status="deployed"),
+    )
+    assert JOURNAL["items"]["egs_workers"]["witnesses"] == [
+        "Cluster/kubeslice-avesha/worker-1",
+        dict(release, kubeconfig="output/kubeconfig", context="admin"),
+        dict(release, kubeconfig="output/worker", context="worker"),
+    ]
+
+
+def test_journal_clusters():
+    clusters = journal_clusters(JOURNAL)
+    assert [
+        (cluster["context"], sorted(cluster["witnesses"])) for cluster in clusters
+    ] == [
+        ("admin", ["egs_workers", "nim_cache_manifest_70b", "prometheus_stack"]),
+        ("worker", ["egs_workers", "worker_chart"]),
+    ]
+    # Each cluster checks the witnesses that are on it, without their cluster
+    admin, worker = clusters
+    assert admin["witnesses"]["egs_workers"][0] == "Cluster/kubeslice-avesha/worker-1"
+    assert worker["witnesses"]["egs_workers"] == [
+        {
+            "kind": "Secret",
+            "api_version": "v1",
+            "namespace": "kubeslice-system",
+            "labels": {"owner": "helm", "name": "egs-worker", "status": "deployed"},
+        }
+    ]
+
+
+def test_journal_resumable():
+    admin, worker = journal_clusters(JOURNAL)
+    checks = [
+        {"cluster": admin, "drifted": {"nim_cache_manifest_70b": ["gone"]}},
+        {"cluster": worker, "failed": True, "msg": "unreachable"},
+    ]
+    # egs_workers has a witness on the worker cluster that was not checked
+    assert journal_resumable(JOURNAL, checks) == [
+        "prometheus_stack",
+        "verify_ngc_secrets",
+    ]
+    checks[1] = {"cluster": worker, "drifted": {}}
+    assert journal_resumable(JOURNAL, checks) == [
+        "egs_workers",
+        "prometheus_stack",
+        "verify_ngc_secrets",
+        "worker_chart",
+    ]
+    # Nothing with witnesses is resumed without a check
+    assert journal_resumable(JOURNAL, []) == ["verify_ngc_secrets"]
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+COLLECTIONS = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "..", "..")
+)
+COLLECTION = os.path.join(COLLECTIONS, "smartscaler", "installer")
+REPO = os.path.dirname(os.path.dirname(COLLECTIONS))
+
+# Stands in for k8s_batch: every captured variable is the jsonpath and the
+# name of the object it was read from.
+FAKE_MODULE = """
+from ansible.module_utils.basic import AnsibleModule
+
+module = AnsibleModule(
+    argument_spec=dict(
+        operations=dict(type="list", elements="dict", required=True),
+        kubeconfig=dict(type="raw"),
+        context=dict(type="raw"),
+    )
+)
+operations = module.params["operations"]
+captured = {}
+for operation in operations:
+    for variable, expr in (operation.get("capture") or {}).items():
+        captured[variable] = "%s of %s" % (expr, operation["name"])
+module.exit_json(
+    changed=False, results=[{}] * len(operations), captured=captured, errors=[]
+)
+"""
+
+PLAYBOOK = r"""
+- name: Install
+  hosts: localhost
+  gather_facts: true
+  vars:
+    global_kubeconfig: ""
+    global_kubecontext: ""
+    run_journal: {items: {}}
+    run_journal_file: "{{ playbook_dir }}/journal.json"
+    command_exec:
+      - name: read-ca
+        operations:
+          - op: get
+            kind: Secret
+            name: root-secret
+            namespace: cert-manager
+            capture:
+              ca_crt: "{.data.ca\\.crt}"
+    kubectl_commands:
+      - name: read-token
+        operations:
+          # Uses the variable the previous item captured
+          - op: get
+            kind: Secret
+            name: "{{ ca_crt }}"
+            capture:
+              token: "{.data.token}"
+  tasks:
+    - name: Process execution items
+      include_tasks: tasks/process_execution_item.yml
+      vars:
+        execution_item: "{{ item }}"
+      loop: [read-ca, read-token]
+    - name: Save the captured variables
+      copy:
+        content: "{{ {'ca_crt': ca_crt, 'token': token} | to_json }}"
+        dest: "{{ playbook_dir }}/captured.json"
+"""
+
+
+@pytest.fixture
+def ansible_playbook():
+    path = os.path.join(os.path.dirname(sys.executable), "ansible-playbook")
+    if not os.path.exists(path):
+        pytest.skip("ansible-playbook is not installed next to the interpreter")
+    return path
+
+
+def test_captured_variables_become_facts(tmp_path, ansible_playbook):
+    collection = tmp_path / "collections" / "ansible_collections" / "smartscaler"
+    shutil.copytree(
+        COLLECTION,
+        str(collection / "installer"),
+        ignore=shutil.ignore_patterns("tests", "__pycache__"),
+    )
+    (collection / "installer" / "plugins" / "modules" / "k8s_batch.py").write_text(
+        FAKE_MODULE
+    )
+    for name in ("tasks", "roles"):
+        os.symlink(os.path.join(REPO, name), str(tmp_path / name))
+    (tmp_path / "play.yml").write_text(PLAYBOOK)
+    (tmp_path / "ansible.cfg").write_text("")
+    env = dict(
+        os.environ,
+        ANSIBLE_CONFIG=str(tmp_path / "ansible.cfg"),
+        ANSIBLE_COLLECTIONS_PATH="%s:%s" % (tmp_path / "collections", COLLECTIONS),
+    )
+    run = subprocess.run(
+        [
+            ansible_playbook,
+            "-i",
+            "localhost,",
+            "-c",
+            "local",
+            "-e",
+            "ansible_python_interpreter=%s" % sys.executable,
+            str(tmp_path / "play.yml"),
+        ],
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        cwd=str(tmp_path),
+    )
+    assert run.returncode == 0, run.stdout.decode()
+    assert json.loads((tmp_path / "captured.json").read_text()) == {
+        "ca_crt": "{.data.ca\\.crt} of root-secret",
+        "token": "{.data.token} of {.data.ca\\.crt} of root-secret",
+    }
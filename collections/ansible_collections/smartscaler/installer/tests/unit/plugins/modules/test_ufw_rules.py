@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+COLLECTIONS = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "..", "..")
+)
+
+# Stand-in for ufw keeping its rules in a file; rejects port 9999 and will
+# not delete rules of port 8888.
+FAKE_UFW = """#!%s
+import os, shlex, sys
+rules = os.environ["FAKE_UFW_RULES"]
+lines = open(rules).read().splitlines() if os.path.exists(rules) else []
+args = sys.argv[1:]
+with open(os.environ["FAKE_UFW_LOG"], "a") as log:
+    log.write(" ".join(args) + "\\n")
+if args[:2] == ["show", "added"]:
+    print("Added user rules (see 'ufw status' for running firewall):")
+    print("\\n".join(lines) or "(None)")
+    sys.exit(0)
+if "9999" in " ".join(args):
+    sys.stderr.write("ERROR: Bad port\\n")
+    sys.exit(1)
+if args[0] == "delete" and "8888" in " ".join(args):
+    sys.stderr.write("ERROR: Could not delete non-existent rule\\n")
+    sys.exit(1)
+if args[0] == "delete":
+    lines.remove(" ".join(["ufw"] + args[1:]))
+else:
+    lines.append(" ".join(["ufw"] + [shlex.quote(a) for a in args]))
+open(rules, "w").write("\\n".join(lines))
+"""
+
+PLAYBOOK = """
+- hosts: localhost
+  gather_facts: false
+  tasks:
+    - smartscaler.installer.ufw_rules:
+        rules: "{{ rules }}"
+      register: result
+      ignore_errors: true
+    - copy:
+        content: "{{ result | to_json }}"
+        dest: "{{ out }}"
+"""
+
+
+@pytest.fixture
+def ansible_playbook():
+    path = os.path.join(os.path.dirname(sys.executable), "ansible-playbook")
+    if not os.path.exists(path):
+        pytest.skip("ansible-playbook is not installed next to the interpreter")
+    return path
+
+
+def test_only_missing_rules_are_added(tmp_path, ansible_playbook):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    (bin_dir / "ufw").write_text(FAKE_UFW % sys.executable)
+    (bin_dir / "ufw").chmod(0o755)
+    rules_file = tmp_path / "rules"
+    rules_file.write_text("ufw allow 6443/tcp comment 'Kubernetes API Server'")
+    log = tmp_path / "log"
+    (tmp_path / "play.yml").write_text(PLAYBOOK)
+    (tmp_path / "ansible.cfg").write_text("")
+    env = dict(
+        os.environ,
+        ANSIBLE_CONFIG=str(tmp_path / "ansible.cfg"),
+        ANSIBLE_COLLECTIONS_PATH=COLLECTIONS,
+        PATH=str(bin_dir) + os.pathsep + os.environ["PATH"],
+        FAKE_UFW_RULES=str(rules_file),
+        FAKE_UFW_LOG=str(log),
+    )
+
+    def run(rules):
+        log.write_text("")
+        out = tmp_path / "result.json"
+        subprocess.run(
+            [
+                ansible_playbook,
+                "-i",
+                "localhost,",
+                "-c",
+                "local",
+                "-e",
+                "ansible_python_interpreter=%s" % sys.executable,
+                "-e",
+                json.dumps(dict(rules=rules, out=str(out))),
+                str(tmp_path / "play.yml"),
+            ],
+            env=env,
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        return json.loads(out.read_text()), log.read_text().splitlines()
+
+    rules = [
+        dict(port="6443", proto="tcp", comment="Kubernetes API Server"),
+        dict(port="2379:2380", proto="tcp", comment="etcd"),
+        dict(from_ip="10.0.0.1", port="8080", proto="tcp"),
+    ]
+    result, calls = run(rules)
+    assert result["changed"] is True
+    assert result["existing"] == 1
+    assert result["added"] == [
+        "ufw allow 2379:2380/tcp comment etcd",
+        "ufw allow from 10.0.0.1 to any port 8080 proto tcp",
+    ]
+    assert calls[0] == "show added"
+    assert len(calls) == 3
+
+    result, calls = run(rules)
+    assert result["changed"] is False
+    assert result["added"] == []
+    assert calls == ["show added"]
+
+    before = rules_file.read_text()
+    result, calls = run(rules + [dict(port="10250", proto="tcp"), dict(port="9999")])
+    assert result["failed"] is True
+    assert "rolled back 1 of 1 added rules" in result["msg"]
+    assert result["added"] == [] and result["rollback_failed"] == []
+    assert calls[-1] == "delete allow 10250/tcp"
+    assert rules_file.read_text() == before
+
+    # A rule the rollback cannot delete is reported, not hidden
+    result, calls = run(
+        rules + [dict(port="8888", proto="tcp"), dict(port="10250"), dict(port="9999")]
+    )
+    assert result["failed"] is True
+    assert calls[-2:] == ["delete allow 10250", "delete allow 8888/tcp"]
+    assert result["msg"] == (
+        "ufw rejected ufw allow 9999, rolled back 1 of 2 added rules;"
+        " still in place: ufw allow 8888/tcp"
+    )
+    assert result["added"] == ["ufw allow 8888/tcp"]
+    assert [failed["command"] for failed in result["rollback_failed"]] == [
+        "ufw delete allow 8888/tcp"
+    ]
+    assert result["rollback_failed"][0]["rc"] == 1
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Warm-up of the NIM replicas a scale-out adds (files/nim-warmup-controller.yaml.j2).
+# The install warms the replicas that exist when a NIMService first becomes
+# ready (smartscaler.installer.nim_warmup); KEDA and Smart Scaler add more
+# later. Every interval this controller lists the ready pods of each
+# configured Service, warms those without the smartscaler.io/warmed-up
+# annotation with the same rounds as the module (module_utils/warmup.py,
+# mounted next to this file) and annotates the ones whose latency settled.
+# A replica that did not settle is tried again after --retry-after. It only
+# uses the standard library, so it runs in a stock python image.
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import argparse
+import datetime
+import json
+import os
+import ssl
+import sys
+import time
+from urllib.parse import quote, urlencode
+from urllib.request import Request, urlopen
+
+try:
+    from ansible_collections.smartscaler.installer.plugins.module_utils.warmup import (
+        DEFAULT_PROMPTS,
+        WARMED_ANNOTATION,
+        pod_targets,
+        service_port,
+        warm_pods,
+    )
+except ImportError:
+    from warmup import (
+        DEFAULT_PROMPTS,
+        WARMED_ANNOTATION,
+        pod_targets,
+        service_port,
+        warm_pods,
+    )
+
+SERVICE_ACCOUNT = "/var/run/secrets/kubernetes.io/serviceaccount"
+# Options of a configured Service passed on to warm_pod
+WARM_OPTIONS = ("max_tokens", "concurrency", "max_rounds", "window", "tolerance")
+
+
+class Cluster(object):
+    """The few API calls of the controller, with the service account of the pod."""
+
+    def __init__(
+        self, api="https://kubernetes.default.svc", account=SERVICE_ACCOUNT, timeout=10
+    ):
+        self.api = api.rstrip("/")
+        self.account = account
+        self.timeout = timeout
+        self.context = ssl.create_default_context(
+            cafile=os.path.join(account, "ca.crt")
+        )
+
+    def _request(self, method, path, body=None, content_type="application/json"):
+        # The token is rotated by the kubelet, so it is read for every call
+        with open(os.path.join(self.account, "token")) as f:
+            token = f.read().strip()
+        headers = {"Authorization": "Bearer " + token, "Accept": "application/json"}
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = content_type
+        response = urlopen(
+            Request(self.api + path, data=data, headers=headers, method=method),
+            timeout=self.timeout,
+            context=self.context,
+        )
+        try:
+            return json.loads(response.read())
+        finally:
+            response.close()
+
+    def service(self, namespace, name):
+        return self._request(
+            "GET", "/api/v1/namespaces/%s/services/%s" % (quote(namespace), quote(name))
+        )
+
+    def pods(self, namespace, selector):
+        query = urlencode(
+            dict(
+                labelSelector=",".join(
+                    "%s=%s" % item for item in sorted(selector.items())
+                )
+            )
+        )
+        return (
+            self._request(
+                "GET", "/api/v1/namespaces/%s/pods?%s" % (quote(namespace), query)
+            ).get("items")
+            or []
+        )
+
+    def annotate(self, namespace, name, annotations):
+        self._request(
+            "PATCH",
+            "/api/v1/namespaces/%s/pods/%s" % (quote(namespace), quote(name)),
+            body={"metadata": {"annotations": annotations}},
+            content_type="application/merge-patch+json",
+        )
+
+
+class Controller(object):
+    """Warm the new replicas of I(services) on I(cluster).
+
+    Each of I(services) has the C(service), C(namespace) and C(model) of a
+    NIM Service and optionally its C(port), C(prompts), C(parallel),
+    C(request_timeout) and the options of warm_pod. Replicas are warmed
+    through their pod IP.
+    """
+
+    def __init__(self, cluster, services, retry_after=300, **kwargs):
+        self.cluster = cluster
+        self.services = services
+        self.retry_after = retry_after
+        self.kwargs = kwargs
+        self.failed = {}
+
+    def due(self, key, now):
+        """Whether the replica I(key) did not fail to settle recently."""
+        return key not in self.failed or now - self.failed[key] >= self.retry_after
+
+    def warm(self, config, now):
+        """Warm the new replicas of one Service; returns the results."""
+        namespace = config.get("namespace") or "default"
+        service = self.cluster.service(namespace, config["service"])
+        selector = (service.get("spec") or {}).get("selector") or {}
+        if not selector:
+            raise ValueError(
+                "Service %s/%s has no selector" % (namespace, config["service"])
+            )
+        port = config.get("port") or service_port(service)
+        targets = [
+            target
+            for target in pod_targets(
+                self.cluster.pods(namespace, selector), port, skip_warmed=True
+            )
+            if self.due((namespace, target["name"]), now)
+        ]
+        options = dict(
+            (key, config[key]) for key in WARM_OPTIONS if config.get(key) is not None
+        )
+        results = warm_pods(
+            targets,
+            parallel=config.get("parallel") or 4,
+            model=config["model"],
+            prompts=config.get("prompts") or list(DEFAULT_PROMPTS),
+            timeout=config.get("request_timeout") or 120,
+            **dict(self.kwargs, **options)
+        )
+        warmed_at = datetime.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+        for result in results:
+            key = (namespace, result["name"])
+            if not result["settled"]:
+                self.failed[key] = now
+                continue
+            self.failed.pop(key, None)
+            self.cluster.annotate(
+                namespace, result["name"], {WARMED_ANNOTATION: warmed_at}
+            )
+        return results
+
+    def run(self, now=None, log=print):
+        """Warm the new replicas of every Service once; returns the results."""
+        now = time.time() if now is None else now
+        results = []
+        for config in self.services:
+            name = "%s/%s" % (config.get("namespace") or "default", config["service"])
+            try:
+                warmed = self.warm(config, now)
+            except Exception as e:
+                log("%s: check failed: %s" % (name, e))
+                continue
+            for result in warmed:
+                log(
+                    "%s: %s %s after %d requests, p50 %s ms"
+                    % (
+                        name,
+                        result["name"],
+                        "warmed up" if result["settled"] else "did not settle",
+                        result["requests"],
+                        result["p50_ms"],
+                    )
+                )
+                results.append(dict(result, service=name))
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm up new NIM replicas.")
+    parser.add_argument("--config", default="/controller/services.json")
+    parser.add_argument("--interval", type=float, default=30)
+    parser.add_argument("--retry-after", type=float, default=300)
+    args = parser.parse_args(argv)
+
+    with open(args.config) as f:
+        services = json.load(f)
+    controller = Controller(Cluster(), services, retry_after=args.retry_after)
+    while True:
+        controller.run()
+        sys.stdout.flush()
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
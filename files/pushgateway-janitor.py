@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# Lifecycle of the push groups of the Pushgateway (files/pushgateway.yaml.j2).
+# Smart Scaler pushes one group per deployment and never deletes it, so the
+# groups of renamed and deleted deployments stay in memory and are scraped,
+# and exported to KEDA, until the pod restarts. The janitor sidecar of the
+# Pushgateway pod runs this file: every interval it reads all groups from
+# /api/v1/metrics, deletes the groups last pushed more than a TTL ago and those
+# of deployments that no longer exist, and serves its own metrics. It only
+# uses the standard library, so it runs in a stock python image.
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import argparse
+import base64
+import json
+import os
+import ssl
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+
+PUSH_TIME = "push_time_seconds"
+PUSH_FAILURE_TIME = "push_failure_time_seconds"
+GROUP_KEYS = ("labels", "last_push_successful")
+DEPLOYMENT_LABEL = "ss_deployment_name"
+NAMESPACE_LABEL = "ss_namespace"
+REASONS = ("ttl", "deleted")
+SERVICE_ACCOUNT = "/var/run/secrets/kubernetes.io/serviceaccount"
+# Only the metadata of deployments is needed, not their specs
+METADATA_ONLY = "application/json;as=PartialObjectMetadataList;g=meta.k8s.io;v=v1"
+UNITS = dict(s=1, m=60, h=3600, d=86400)
+
+
+def seconds(value):
+    """Seconds of a duration such as C(90), C(90s), C(10m), C(24h) or C(7d)."""
+    value = str(value).strip()
+    if value and value[-1] in UNITS:
+        return float(value[:-1]) * UNITS[value[-1]]
+    return float(value)
+
+
+def encode_label(name, value):
+    """Path segment of a grouping label, base64 encoded when it has to be."""
+    if value and "/" not in value:
+        return "%s/%s" % (name, quote(value, safe=""))
+    encoded = base64.urlsafe_b64encode(value.encode("utf-8")).decode("ascii")
+    return "%s@base64/%s" % (name, encoded or "=")
+
+
+def group_path(labels):
+    """Pushgateway path of the group with grouping key I(labels)."""
+    labels = dict(labels)
+    job = labels.pop("job")
+    return "/".join(
+        ["/metrics", encode_label("job", job)]
+        + [encode_label(name, labels[name]) for name in sorted(labels)]
+    )
+
+
+def parse_groups(
+    payload, deployment_label=DEPLOYMENT_LABEL, namespace_label=NAMESPACE_LABEL
+):
+    """Groups of a /api/v1/metrics response.
+
+    Each group has its grouping C(labels), the time of its last push, its
+    number of series and the (namespace, name) of the deployments it refers
+    to: from its grouping key when it has I(deployment_label), from the labels
+    of its series otherwise. The namespace is C(None) when not labelled.
+    """
+    groups = []
+    for data in payload.get("data") or []:
+        labels = data.get("labels") or {}
+        pushed, series, refs = None, 0, set()
+        for name, family in data.items():
+            if name in GROUP_KEYS or not isinstance(family, dict):
+                continue
+            metrics = family.get("metrics") or []
+            if name == PUSH_TIME:
+                times = [
+                    float(metric["value"]) for metric in metrics if metric.get("value")
+                ]
+                pushed = max(times) if times else None
+                continue
+            if name == PUSH_FAILURE_TIME:
+                continue
+            series += len(metrics)
+            for metric in metrics:
+                metric_labels = metric.get("labels") or {}
+                if deployment_label in metric_labels:
+                    refs.add(
+                        (
+                            metric_labels.get(namespace_label),
+                            metric_labels[deployment_label],
+                        )
+                    )
+        if deployment_label in labels:
+            refs = set([(labels.get(namespace_label), labels[deployment_label])])
+        groups.append(
+            dict(
+                labels=labels,
+                pushed=pushed,
+                series=series,
+                deployments=sorted(refs, key=lambda ref: (ref[0] or "", ref[1])),
+            )
+        )
+    return groups
+
+
+def deployment_exists(ref, deployments):
+    namespace, name = ref
+    if namespace is None:
+        return any(existing == name for dummy, existing in deployments)
+    return ref in deployments
+
+
+def eviction_reason(group, now, ttl, deployments=None, grace=300):
+    """Why I(group) should be deleted, C(ttl) or C(deleted), or C(None).
+
+    A group is deleted when its last push is older than I(ttl), or, when
+    I(deployments) is known, when none of the deployments it refers to
+    exists any more and it was last pushed more than I(grace) seconds ago.
+    Groups without a push time or a job are kept.
+    """
+    if group["pushed"] is None or "job" not in group["labels"]:
+        return None
+    age = now - group["pushed"]
+    if ttl and age > ttl:
+        return "ttl"
+    if (
+        deployments is not None
+        and group["deployments"]
+        and age > grace
+        and not any(deployment_exists(ref, deployments) for ref in group["deployments"])
+    ):
+        return "deleted"
+    return None
+
+
+def cluster_deployments(
+    api="https://kubernetes.default.svc", account=SERVICE_ACCOUNT, timeout=10
+):
+    """(namespace, name) of every deployment, with the service account of the pod."""
+    with open(os.path.join(account, "token")) as f:
+        token = f.read().strip()
+    context = ssl.create_default_context(cafile=os.path.join(account, "ca.crt"))
+    deployments, page = set(), ""
+    while True:
+        url = api + "/apis/apps/v1/deployments?limit=500"
+        if page:
+            url += "&continue=" + quote(page, safe="")
+        request = Request(
+            url, headers={"Authorization": "Bearer " + token, "Accept": METADATA_ONLY}
+        )
+        response = urlopen(request, timeout=timeout, context=context)
+        try:
+            data = json.loads(response.read())
+        finally:
+            response.close()
+        for item in data.get("items") or []:
+            deployments.add((item["metadata"]["namespace"], item["metadata"]["name"]))
+        page = (data.get("metadata") or {}).get("continue")
+        if not page:
+            return deployments
+
+
+class Janitor(object):
+    """Delete stale push groups of one Pushgateway and count what it did.
+
+    I(deployments) returns the (namespace, name) of the existing deployments;
+    without it, or when it fails, groups are only deleted after I(ttl).
+    """
+
+    def __init__(
+        self,
+        pushgateway,
+        ttl=86400,
+        grace=300,
+        deployments=None,
+        deployment_label=DEPLOYMENT_LABEL,
+        namespace_label=NAMESPACE_LABEL,
+        dry_run=False,
+        timeout=10,
+    ):
+        self.pushgateway = pushgateway.rstrip("/")
+        self.ttl = ttl
+        self.grace = grace
+        self.deployments = deployments
+        self.deployment_label = deployment_label
+        self.namespace_label = namespace_label
+        self.dry_run = dry_run
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.runs = 0
+        self.errors = 0
+        self.evictions = dict((reason, 0) for reason in REASONS)
+        self.groups = 0
+        self.series = 0
+        self.oldest = 0.0
+        self.last_success = 0.0
+
+    def _request(self, method, path):
+        response = urlopen(
+            Request(self.pushgateway + path, method=method), timeout=self.timeout
+        )
+        try:
+            return response.read()
+        finally:
+            response.close()
+
+    def error(self):
+        with self.lock:
+            self.errors += 1
+
+    def run(self, now=None):
+        """Delete the stale groups once; returns the deleted groups."""
+        with self.lock:
+            self.runs += 1
+        groups = parse_groups(
+            json.loads(self._request("GET", "/api/v1/metrics")),
+            self.deployment_label,
+            self.namespace_label,
+        )
+        now = time.time() if now is None else now
+        existing = None
+        if self.deployments is not None:
+            try:
+                existing = self.deployments()
+            except Exception:
+                # Unknown deployments evict nothing; the TTL still applies.
+                self.error()
+        evicted, kept = [], []
+        for group in groups:
+            reason = eviction_reason(group, now, self.ttl, existing, self.grace)
+            if reason is None:
+                kept.append(group)
+                continue
+            if not self.dry_run:
+                try:
+                    self._request("DELETE", group_path(group["labels"]))
+                except Exception:
+                    self.error()
+                    kept.append(group)
+                    continue
+            evicted.append(
+                dict(labels=group["labels"], reason=reason, age=now - group["pushed"])
+            )
+        ages = [now - group["pushed"] for group in kept if group["pushed"] is not None]
+        with self.lock:
+            for eviction in evicted:
+                self.evictions[eviction["reason"]] += 1
+            self.groups = len(kept)
+            self.series = sum(group["series"] for group in kept)
+            self.oldest = max(ages) if ages else 0.0
+            self.last_success = now
+        return evicted
+
+    def metrics(self):
+        """Metrics of the janitor in the Prometheus text format."""
+        with self.lock:
+            lines = [
+                "# HELP pushgateway_janitor_runs_total Checks of the push groups.",
+                "# TYPE pushgateway_janitor_runs_total counter",
+                "pushgateway_janitor_runs_total %d" % self.runs,
+                "# HELP pushgateway_janitor_errors_total Failed reads, lists and deletes.",
+                "# TYPE pushgateway_janitor_errors_total counter",
+                "pushgateway_janitor_errors_total %d" % self.errors,
+                "# HELP pushgateway_janitor_evictions_total Push groups deleted, by reason.",
+                "# TYPE pushgateway_janitor_evictions_total counter",
+            ]
+            lines.extend(
+                'pushgateway_janitor_evictions_total{reason="%s"} %d'
+                % (reason, self.evictions[reason])
+                for reason in REASONS
+            )
+            lines.extend(
+                [
+                    "# HELP pushgateway_janitor_groups Push groups kept at the last check.",
+                    "# TYPE pushgateway_janitor_groups gauge",
+                    "pushgateway_janitor_groups %d" % self.groups,
+                    "# HELP pushgateway_janitor_series Series of the push groups kept.",
+                    "# TYPE pushgateway_janitor_series gauge",
+                    "pushgateway_janitor_series %d" % self.series,
+                    "# HELP pushgateway_janitor_oldest_push_age_seconds Age of the oldest push kept.",
+                    "# TYPE pushgateway_janitor_oldest_push_age_seconds gauge",
+                    "pushgateway_janitor_oldest_push_age_seconds %.3f" % self.oldest,
+                    "# HELP pushgateway_janitor_last_success_timestamp_seconds End of the last check.",
+                    "# TYPE pushgateway_janitor_last_success_timestamp_seconds gauge",
+                    "pushgateway_janitor_last_success_timestamp_seconds %.3f"
+                    % self.last_success,
+                ]
+            )
+        return "\n".join(lines) + "\n"
+
+
+def serve(janitor, port, host=""):
+    """Serve the metrics of I(janitor) on I(port) from a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                body = janitor.metrics().encode("utf-8")
+                content_type = "text/plain; version=0.0.4"
+            elif self.path in ("/-/healthy", "/-/ready"):
+                body, content_type = b"OK\n", "text/plain"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Delete stale Pushgateway push groups."
+    )
+    parser.add_argument("--pushgateway", default="http://127.0.0.1:9091")
+    parser.add_argument("--ttl", default="24h", help="0 keeps groups regardless of age")
+    parser.add_argument("--grace", default="10m")
+    parser.add_argument("--interval", default="5m")
+    parser.add_argument("--port", type=int, default=9092)
+    parser.add_argument("--check-deployments", action="store_true")
+    parser.add_argument("--deployment-label", default=DEPLOYMENT_LABEL)
+    parser.add_argument("--namespace-label", default=NAMESPACE_LABEL)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    janitor = Janitor(
+        args.pushgateway,
+        ttl=seconds(args.ttl),
+        grace=seconds(args.grace),
+        deployments=cluster_deployments if args.check_deployments else None,
+        deployment_label=args.deployment_label,
+        namespace_label=args.namespace_label,
+        dry_run=args.dry_run,
+    )
+    serve(janitor, args.port)
+    interval = seconds(args.interval)
+    while True:
+        try:
+            for eviction in janitor.run():
+                print(
+                    "%s %s, last pushed %ds ago: %s"
+                    % (
+                        "would delete" if args.dry_run else "deleted",
+                        group_path(eviction["labels"]),
+                        eviction["age"],
+                        eviction["reason"],
+                    )
+                )
+        except Exception as e:
+            janitor.error()
+            print("check failed: %s" % e, file=sys.stderr)
+        sys.stdout.flush()
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    main()